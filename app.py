@@ -1,9 +1,9 @@
 from fastapi import FastAPI, Request, Form, BackgroundTasks
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import HTMLResponse, JSONResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 import os
-import json
 import asyncio
 from datetime import datetime
 from typing import List, Optional
@@ -12,8 +12,11 @@ from dotenv import load_dotenv
 # 로컬 모듈 import
 from modules.stock_data_collector import StockDataCollector
 from modules.gemini_client import GeminiClient
+from modules.client_registry import close_clients, registry_stats
 from modules.value_analyzer import ValueAnalyzer
 from modules.report_generator import ReportGenerator
+from modules.valuation_models import sensitivity_table
+from modules.return_matrix import price_comparison
 
 # 환경 변수 로드
 load_dotenv()
@@ -46,6 +49,13 @@ async def startup_event():
         value_analyzer = ValueAnalyzer()
         print("✅ 가치 분석기 초기화 완료")
         
+        # 실적 발표가 반영된 종목의 재무제표를 백그라운드에서 미리 재수집하고 분석 캐시 무효화
+        # (서버리스에서는 스레드 없이 재무제표 조회 시점에 확인)
+        if stock_collector.start_earnings_refresh(on_refresh=value_analyzer.invalidate_reported):
+            print("🗓️ 실적 발표 일정 기반 재무제표 갱신 시작 (백그라운드)")
+        else:
+            print("🗓️ 실적 발표 일정 기반 재무제표 갱신: 조회 시점 확인")
+        
         print("📝 보고서 생성기 초기화...")
         report_generator = ReportGenerator()
         print("✅ 보고서 생성기 초기화 완료")
@@ -56,15 +66,12 @@ async def startup_event():
         if api_key:
             print(f"🔑 API 키 발견 (길이: {len(api_key)})")
             try:
-                gemini_client = GeminiClient(api_key)
+                gemini_client = GeminiClient.shared(api_key)
                 print("✅ Gemini 클라이언트 초기화 완료")
                 
-                # 연결 테스트 (실패해도 계속 진행)
-                print("🔍 Gemini API 연결 테스트...")
-                if gemini_client.test_connection():
-                    print("✅ Gemini API 연결 성공")
-                else:
-                    print("⚠️ Gemini API 연결 실패 - 계속 진행")
+                # 연결 점검은 백그라운드에서 진행 (콜드 스타트 지연 방지, 결과는 /health)
+                gemini_client.health.start_background_probe()
+                print("🔍 Gemini API 상태 점검 시작 (백그라운드)")
             except Exception as gemini_error:
                 print(f"❌ Gemini 클라이언트 초기화 실패: {str(gemini_error)}")
                 gemini_client = None
@@ -93,6 +100,13 @@ async def startup_event():
         except:
             print("💥 긴급 복구도 실패")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """애플리케이션 종료 시 공유 Gemini 연결 풀과 재무제표 갱신 스레드 정리"""
+    close_clients()
+    if stock_collector is not None:
+        stock_collector.stop_earnings_refresh()
+
 @app.get("/", response_class=HTMLResponse)
 async def home(request: Request):
     """메인 페이지"""
@@ -140,7 +154,7 @@ async def analyze_stock(
             try:
                 api_key = os.getenv('GOOGLE_API_KEY')
                 if api_key:
-                    gemini_client = GeminiClient(api_key)
+                    gemini_client = GeminiClient.shared(api_key)
                     print("✅ gemini_client 긴급 초기화 성공")
             except Exception as e:
                 print(f"❌ gemini_client 긴급 초기화 실패: {e}")
@@ -152,11 +166,11 @@ async def analyze_stock(
                 content={"error": "주식 데이터 수집기를 초기화할 수 없습니다."}
             )
         
-        # 1. 주식 데이터 수집
+        # 1. 주식 데이터 수집 (동기 호출은 스레드 풀에서 실행해 이벤트 루프를 막지 않음)
         symbol = symbol.upper().strip()
         print(f"🔍 Validating symbol: {symbol}")
         
-        validation_result = stock_collector.validate_symbol(symbol)
+        validation_result = await run_in_threadpool(stock_collector.validate_symbol, symbol)
         print(f"🔍 Validation result for {symbol}: {validation_result}")
         
         if not validation_result:
@@ -166,18 +180,32 @@ async def analyze_stock(
                 content={"error": f"유효하지 않은 종목 코드: {symbol}"}
             )
         
-        stock_data = stock_collector.get_stock_data(symbol)
+        stock_data = await run_in_threadpool(stock_collector.get_stock_data, symbol)
         
-        # 2. 가치투자 분석
-        analysis_result = value_analyzer.analyze_stock(stock_data, gemini_client)
+        # 2. 가치투자 분석 (AI 등급 평가는 스케줄러 슬롯 대기·헤지·모델 재시도 가능)
+        analysis_result = await run_in_threadpool(value_analyzer.analyze_stock, stock_data, gemini_client)
         
         # 3. AI 심층 분석
         prompt = generate_analysis_prompt(depth)
-        ai_analysis = gemini_client.generate_analysis(
-            prompt=prompt,
-            stock_data=stock_data,
-            thinking_enabled=True
-        )
+        ai_fallback = False
+        try:
+            ai_structured = await run_in_threadpool(
+                gemini_client.generate_structured_analysis,
+                prompt=prompt,
+                stock_data=stock_data,
+                thinking_enabled=True,
+                depth=depth,
+                investment_grade=analysis_result.investment_grade.value
+            )
+            ai_analysis = ai_structured['detailed_analysis']
+            # 등급·목표가는 규칙 기반 결과(최상위 필드)가 기준이며 AI 목표가는 참고값으로만 제공
+            ai_structured['ai_target_price'] = ai_structured.pop('target_price')
+        except Exception as e:
+            # Gemini 장애/회로 차단 시 규칙 기반 분석으로 응답
+            print(f"⚠️ AI 심층 분석 실패, 규칙 기반 분석 사용: {str(e)}")
+            ai_structured = None
+            ai_analysis = analysis_result.detailed_analysis
+            ai_fallback = True
         
         # 4. 결과 반환
         return JSONResponse(content={
@@ -203,6 +231,15 @@ async def analyze_stock(
                 "income_growth": analysis_result.value_metrics.income_growth
             },
             "ai_analysis": ai_analysis,
+            "ai_structured": ai_structured,
+            "ai_fallback": ai_fallback,
+            "sensitivity": sensitivity_table(
+                analysis_result.current_price,
+                analysis_result.value_metrics.pe_ratio,
+                analysis_result.value_metrics.pb_ratio,
+                analysis_result.value_metrics.dividend_yield,
+                analysis_result.value_metrics.income_growth
+            ),
             "analysis_date": analysis_result.analysis_date
         })
         
@@ -235,27 +272,42 @@ async def compare_stocks(
                 content={"error": "비교를 위해서는 최소 2개의 종목이 필요합니다."}
             )
         
-        if len(symbol_list) > 5:
+        max_compare_symbols = int(os.getenv('MAX_COMPARE_SYMBOLS', '100'))
+        if len(symbol_list) > max_compare_symbols:
             return JSONResponse(
                 status_code=400,
-                content={"error": "최대 5개의 종목까지 비교 가능합니다."}
+                content={"error": f"최대 {max_compare_symbols}개의 종목까지 비교 가능합니다."}
             )
         
-        # 1. 데이터 수집 및 분석
-        results = []
-        stock_data_dict = {}
+        # 1. 데이터 수집 및 분석 (동기 호출은 스레드 풀에서 동시 실행 수를 제한해 이벤트 루프를 막지 않음)
+        semaphore = asyncio.Semaphore(int(os.getenv('COMPARE_CONCURRENCY', '8')))
+        
+        async def bounded(func, *args):
+            async with semaphore:
+                return await run_in_threadpool(func, *args)
         
-        for symbol in symbol_list:
-            if not stock_collector.validate_symbol(symbol):
+        valid = await asyncio.gather(*(bounded(stock_collector.validate_symbol, s) for s in symbol_list))
+        for symbol, is_valid in zip(symbol_list, valid):
+            if not is_valid:
                 return JSONResponse(
                     status_code=400,
                     content={"error": f"유효하지 않은 종목 코드: {symbol}"}
                 )
-            
-            stock_data = stock_collector.get_stock_data(symbol)
+        
+        async def collect(symbol):
+            async with semaphore:
+                stock_data = await run_in_threadpool(stock_collector.get_stock_data, symbol)
+                return stock_data, await run_in_threadpool(value_analyzer.analyze_stock, stock_data, gemini_client)
+        
+        collected = await asyncio.gather(*(collect(s) for s in symbol_list))
+        
+        results = []
+        analysis_results = []
+        stock_data_dict = {}
+        
+        for symbol, (stock_data, analysis_result) in zip(symbol_list, collected):
             stock_data_dict[symbol] = stock_data
-            
-            analysis_result = value_analyzer.analyze_stock(stock_data, gemini_client)
+            analysis_results.append(analysis_result)
             
             results.append({
                 "symbol": symbol,
@@ -277,14 +329,26 @@ async def compare_stocks(
                 }
             })
         
-        # 2. AI 비교 분석
-        comparison_analysis = gemini_client.generate_comparison_analysis(stock_data_dict)
+        # 2. 가격 이력 비교 (수익률 행렬 한 번 구성 후 상관계수·롤링 베타·낙폭 공유)
+        price_analysis = await run_in_threadpool(price_comparison, stock_data_dict, stock_collector)
+        
+        # 3. AI 비교 분석
+        ai_fallback = False
+        try:
+            comparison_analysis = await run_in_threadpool(gemini_client.generate_comparison_analysis, stock_data_dict)
+        except Exception as e:
+            # Gemini 장애/회로 차단 시 규칙 기반 요약으로 응답
+            print(f"⚠️ AI 비교 분석 실패, 규칙 기반 요약 사용: {str(e)}")
+            comparison_analysis = value_analyzer.create_analysis_summary_table(analysis_results)
+            ai_fallback = True
         
         return JSONResponse(content={
             "success": True,
             "symbols": symbol_list,
             "results": results,
             "comparison_analysis": comparison_analysis,
+            "price_analysis": price_analysis,
+            "ai_fallback": ai_fallback,
             "analysis_date": datetime.now().isoformat()
         })
         
@@ -306,11 +370,11 @@ async def validate_symbol(symbol: str):
             )
         
         symbol = symbol.upper().strip()
-        is_valid = stock_collector.validate_symbol(symbol)
+        is_valid = await run_in_threadpool(stock_collector.validate_symbol, symbol)
         
         suggestions = []
         if not is_valid:
-            suggestions = stock_collector.search_similar_symbols(symbol)
+            suggestions = await run_in_threadpool(stock_collector.search_similar_symbols, symbol)
         
         return JSONResponse(content={
             "valid": is_valid,
@@ -324,6 +388,117 @@ async def validate_symbol(symbol: str):
             content={"error": f"검증 중 오류 발생: {str(e)}"}
         )
 
+def parse_grid_axis(value: Optional[str]) -> Optional[List[float]]:
+    """민감도 격자 축 파라미터 파싱 ("10,15,20" 값 목록 또는 "8:24:20" 시작:끝:개수)"""
+    if not value:
+        return None
+    if ':' in value:
+        start, stop, count = value.split(':')
+        count = int(count)
+        if not 2 <= count <= 50:
+            raise ValueError("격자 개수는 2~50 사이여야 합니다.")
+        step = (float(stop) - float(start)) / (count - 1)
+        return [round(float(start) + step * i, 6) for i in range(count)]
+    values = [float(item) for item in value.split(',') if item.strip()]
+    if not 1 <= len(values) <= 50:
+        raise ValueError("격자 값은 1~50개여야 합니다.")
+    return values
+
+@app.get("/api/sensitivity/{symbol}")
+async def valuation_sensitivity(symbol: str, fair_pe: Optional[str] = None, fair_pbr: Optional[str] = None):
+    """목표가 민감도 격자 API (적정 PER × 적정 PBR, 히트맵용 행렬)"""
+    try:
+        if not stock_collector or not value_analyzer:
+            return JSONResponse(
+                status_code=500,
+                content={"error": "시스템이 초기화되지 않았습니다. 관리자에게 문의하세요."}
+            )
+        
+        try:
+            fair_pe_values = parse_grid_axis(fair_pe)
+            fair_pbr_values = parse_grid_axis(fair_pbr)
+        except ValueError as e:
+            return JSONResponse(
+                status_code=400,
+                content={"error": f"잘못된 격자 파라미터: {str(e)}"}
+            )
+        
+        symbol = symbol.upper().strip()
+        stock_data = await run_in_threadpool(stock_collector.get_stock_data, symbol)
+        value_metrics = value_analyzer._calculate_value_metrics(stock_data.get('financial_metrics', {}))
+        
+        return JSONResponse(content={
+            "symbol": symbol,
+            "company_name": stock_data.get('company_name', symbol),
+            **sensitivity_table(
+                stock_data.get('current_price', 0),
+                value_metrics.pe_ratio, value_metrics.pb_ratio,
+                value_metrics.dividend_yield, value_metrics.income_growth,
+                fair_pe=fair_pe_values, fair_pbr=fair_pbr_values
+            )
+        })
+        
+    except Exception as e:
+        return JSONResponse(
+            status_code=500,
+            content={"error": f"민감도 분석 중 오류 발생: {str(e)}"}
+        )
+
+@app.get("/health")
+async def health():
+    """서비스 상태 확인 API (Gemini 상태는 캐시된 값, 만료 시 백그라운드 재점검)"""
+    gemini_status = (
+        gemini_client.health.get_status()
+        if gemini_client else {"status": "unavailable"}
+    )
+    if gemini_client:
+        gemini_status["circuit_breaker"] = gemini_client.circuit_breaker.snapshot()
+        gemini_status["circuit_breakers"] = {
+            model: breaker.snapshot() for model, breaker in gemini_client.circuit_breakers.items()
+        }
+        gemini_status["routing"] = gemini_client.router.describe()
+    
+    components_ready = stock_collector is not None and value_analyzer is not None
+    if not components_ready:
+        status = "unavailable"
+    elif (gemini_status["status"] in ("healthy", "unknown")
+          and gemini_status.get("circuit_breaker", {}).get("state") != "open"):
+        status = "ok"
+    else:
+        status = "degraded"
+    
+    return JSONResponse(
+        status_code=200 if components_ready else 503,
+        content={
+            "status": status,
+            "components": {
+                "stock_collector": stock_collector is not None,
+                "value_analyzer": value_analyzer is not None,
+                "gemini": gemini_status
+            },
+            "scoring_rules": value_analyzer.scoring_plan.describe() if value_analyzer else None,
+            "statements": stock_collector.statement_stats() if stock_collector else None,
+            "checked_at": datetime.now().isoformat()
+        }
+    )
+
+@app.get("/api/usage")
+async def usage_summary():
+    """Gemini API 토큰 사용량 및 지연 시간 집계 API"""
+    if not gemini_client:
+        return JSONResponse(
+            status_code=503,
+            content={"error": "Gemini 클라이언트가 초기화되지 않았습니다."}
+        )
+    
+    return JSONResponse(content={
+        "summary": gemini_client.get_usage_summary(),
+        "recent_calls": gemini_client.usage_tracker.recent_records(limit=20),
+        "prompt_token_budget": gemini_client.prompt_token_budget,
+        "scheduler": gemini_client.scheduler.metrics(),
+        "http_clients": registry_stats()
+    })
+
 @app.get("/compare", response_class=HTMLResponse)
 async def compare_page(request: Request):
     """비교 분석 페이지"""
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Gemini 호출 경로 처리량/지연 벤치마크
+
+/api/analyze와 main.py가 수행하는 분석 경로(ValueAnalyzer.analyze_stock의 AI 등급 평가 +
+구조화 AI 분석)를 합성 주식 데이터로 실행합니다. --base-url을 생략하면 로컬 Gemini
+대역 서버(fake_gemini_server.py)를 내장 실행하므로 API 할당량 없이 CI에서 결정적으로 측정할 수 있습니다.
+
+사용 예시:
+  python benchmark.py --requests 200 --concurrency 16 --latency lognormal --latency-ms 800
+  python benchmark.py --mode compare --symbols-per-request 40
+"""
+
+import os
+import sys
+import time
+import json
+import random
+import socket
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+
+def synthetic_stock_data(symbol: str, rng: random.Random) -> Dict:
+    """yfinance 없이 분석 경로를 실행하기 위한 합성 주식 데이터를 생성합니다."""
+    price = rng.uniform(10, 500)
+    return {
+        'symbol': symbol,
+        'company_name': f"{symbol} Corp.",
+        'sector': rng.choice(['Technology', 'Healthcare', 'Financials', 'Consumer Staples', 'Utilities']),
+        'industry': 'Synthetic',
+        'current_price': price,
+        'market_cap': rng.uniform(1e9, 3e12),
+        'financial_metrics': {
+            'pe_ratio': rng.uniform(5, 40),
+            'pb_ratio': rng.uniform(0.5, 8),
+            'roe': rng.uniform(-0.05, 0.35),
+            'roa': rng.uniform(-0.02, 0.2),
+            'debt_to_equity': rng.uniform(0, 2),
+            'dividend_yield': rng.choice([0, rng.uniform(0.005, 0.05)]),
+            'revenue_growth': rng.uniform(-15, 25),
+            'income_growth': rng.uniform(-20, 30),
+            '52_week_high': price * 1.2,
+            '52_week_low': price * 0.8,
+            'beta': rng.uniform(0.5, 2),
+            'volatility_30d': rng.uniform(0.1, 0.6),
+            'avg_volume_30d': rng.uniform(1e5, 1e8),
+            'cash_and_equivalents': rng.uniform(1e8, 1e11),
+            'total_debt': rng.uniform(1e8, 1e11),
+            'free_cash_flow': rng.uniform(-1e9, 1e11),
+            'shares_outstanding': rng.uniform(1e7, 1e10),
+        },
+    }
+
+
+def start_fake_server(args) -> str:
+    """내장 대역 서버를 백그라운드 스레드에서 시작하고 base URL을 반환합니다."""
+    import uvicorn
+    from fake_gemini_server import FakeServerConfig, create_app
+
+    config = FakeServerConfig(
+        latency=args.latency,
+        latency_ms=args.latency_ms,
+        latency_jitter_ms=args.latency_jitter_ms,
+        tokens_per_second=args.tokens_per_second,
+        error_rate_429=args.error_rate_429,
+        error_rate_500=args.error_rate_500,
+        empty_rate=args.empty_rate,
+        seed=args.seed,
+    )
+
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+
+    server = uvicorn.Server(uvicorn.Config(create_app(config), host='127.0.0.1', port=port, log_level='warning'))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+
+    return f"http://127.0.0.1:{port}"
+
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(q / 100 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gemini 호출 경로 벤치마크")
+    parser.add_argument('--base-url', type=str, default=os.getenv('GEMINI_BASE_URL'),
+                        help='대상 Gemini API 주소 (생략 시 내장 대역 서버 사용)')
+    parser.add_argument('--mode', choices=['analyze', 'compare'], default='analyze')
+    parser.add_argument('--requests', type=int, default=50)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--depth', choices=['basic', 'detailed', 'comprehensive'], default='comprehensive')
+    parser.add_argument('--symbols-per-request', type=int, default=5, help='compare 모드의 요청당 종목 수')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--latency', choices=['fixed', 'uniform', 'normal', 'lognormal'], default='lognormal')
+    parser.add_argument('--latency-ms', type=float, default=300.0)
+    parser.add_argument('--latency-jitter-ms', type=float, default=150.0)
+    parser.add_argument('--tokens-per-second', type=float, default=400.0)
+    parser.add_argument('--error-rate-429', type=float, default=0.0)
+    parser.add_argument('--error-rate-500', type=float, default=0.0)
+    parser.add_argument('--empty-rate', type=float, default=0.0)
+    parser.add_argument('--priority', choices=['interactive', 'batch'], default='interactive',
+                        help='Gemini 호출 우선순위 클래스')
+    parser.add_argument('--json', action='store_true', help='결과를 JSON으로 출력')
+    args = parser.parse_args()
+
+    base_url = args.base_url or start_fake_server(args)
+    os.environ['GEMINI_BASE_URL'] = base_url
+    os.environ.setdefault('GOOGLE_API_KEY', 'fake-key')
+    os.environ.setdefault('CACHE_DIR', os.path.join('cache', 'benchmark'))
+    # 반복 실행 시에도 매번 등급 평가 호출 경로를 측정
+    os.environ.setdefault('GRADE_CACHE_TTL', '0')
+    os.environ.setdefault('ANALYSIS_MEMO_TTL', '0')
+
+    from modules.gemini_client import GeminiClient
+    from modules.value_analyzer import ValueAnalyzer
+    from modules.llm_scheduler import llm_priority
+    from main import StockValueAnalyzer
+
+    client = GeminiClient.shared(os.environ['GOOGLE_API_KEY'])
+    analyzer = ValueAnalyzer()
+    prompt = StockValueAnalyzer._generate_analysis_prompt(None, args.depth)
+
+    def run_analyze(i: int):
+        # 요청별 seed 고정으로 스레드 실행 순서와 무관하게 같은 데이터 생성
+        data = synthetic_stock_data(f"SYM{i:04d}", random.Random(args.seed + i))
+        result = analyzer.analyze_stock(data, client)
+        client.generate_structured_analysis(
+            prompt=prompt, stock_data=data, thinking_enabled=True, depth=args.depth,
+            investment_grade=result.investment_grade.value
+        )
+
+    def compare_stocks(i: int) -> Dict[str, Dict]:
+        rng = random.Random(args.seed + i)
+        return {
+            f"C{i:03d}{j:03d}": synthetic_stock_data(f"C{i:03d}{j:03d}", rng)
+            for j in range(args.symbols_per_request)
+        }
+
+    def run_compare(i: int):
+        client.generate_comparison_analysis(compare_stocks(i))
+
+    job = run_analyze if args.mode == 'analyze' else run_compare
+    latencies: List[float] = []
+    errors: List[str] = []
+    lock = threading.Lock()
+
+    def timed(i: int):
+        started = time.perf_counter()
+        try:
+            with llm_priority(args.priority):
+                job(i)
+        except Exception as e:
+            with lock:
+                errors.append(str(e))
+        with lock:
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        list(executor.map(timed, range(args.requests)))
+    elapsed = time.perf_counter() - started
+
+    result = {
+        'mode': args.mode,
+        'base_url': base_url,
+        'requests': args.requests,
+        'concurrency': args.concurrency,
+        'elapsed_s': elapsed,
+        'throughput_rps': args.requests / elapsed if elapsed else 0.0,
+        'latency_s': {
+            'p50': percentile(latencies, 50),
+            'p95': percentile(latencies, 95),
+            'p99': percentile(latencies, 99),
+            'max': max(latencies) if latencies else 0.0,
+        },
+        'errors': len(errors),
+        'gemini_usage': client.get_usage_summary()['by_endpoint'],
+        'gemini_routes': client.get_usage_summary()['by_route'],
+        'scheduler': client.scheduler.metrics(),
+    }
+    if args.mode == 'compare':
+        # 비교 데이터 블록의 인코딩별 추정 토큰 수 (full vs compact, 첫 요청 데이터 기준)
+        result['payload_tokens'] = client.compare_payload_encodings(compare_stocks(0))
+
+    if args.json:
+        print(json.dumps(result, indent=2, ensure_ascii=False))
+    else:
+        print(f"\n📊 {args.mode} 벤치마크 ({args.requests}건, 동시성 {args.concurrency})")
+        print(f"   처리량: {result['throughput_rps']:.2f} req/s (총 {elapsed:.1f}s)")
+        lat = result['latency_s']
+        print(f"   지연: p50 {lat['p50']:.2f}s / p95 {lat['p95']:.2f}s / p99 {lat['p99']:.2f}s / max {lat['max']:.2f}s")
+        print(f"   오류: {len(errors)}건")
+        for endpoint, stats in result['gemini_usage'].items():
+            print(f"   - {endpoint}: {stats['calls']}회, 평균 {stats['avg_latency_ms']:.0f}ms, 오류 {stats['errors']}")
+        print("   경로별:")
+        for route, stats in result['gemini_routes'].items():
+            print(f"   - {route}: {stats['calls']}회, 평균 {stats['avg_latency_ms']:.0f}ms, 최대 {stats['max_latency_ms']:.0f}ms")
+        sched = result['scheduler'][args.priority]
+        print(f"   스케줄러 대기({args.priority}): 평균 {sched['avg_wait_ms']:.0f}ms / p95 {sched['p95_wait_ms']:.0f}ms")
+        if 'payload_tokens' in result:
+            payload = result['payload_tokens']
+            print(f"   데이터 블록 토큰: full {payload['full_tokens']:,} → compact {payload['compact_tokens']:,} "
+                  f"(-{payload['reduction_pct']:.0f}%)")
+
+    sys.exit(1 if errors and not (args.error_rate_429 or args.error_rate_500 or args.empty_rate) else 0)
+
+
+if __name__ == "__main__":
+    main()
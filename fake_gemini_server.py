@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+"""
+로컬 Gemini API 대역 서버 (부하/지연 테스트용)
+
+GeminiClient의 generate_content 호출 경로를 흉내 내어 실제 API 할당량 없이
+결정적인(seed 고정) 지연 분포, 토큰 속도 기반 스트리밍, 오류 주입,
+등급/분석/비교 프롬프트용 템플릿 응답을 제공합니다.
+
+사용 예시:
+  python fake_gemini_server.py --port 8765 --latency lognormal --latency-ms 800 --seed 42
+  GEMINI_BASE_URL=http://127.0.0.1:8765 python main.py --symbol AAPL
+"""
+
+import re
+import json
+import math
+import random
+import asyncio
+import hashlib
+import argparse
+import threading
+from dataclasses import dataclass, asdict, fields
+from typing import Any, Dict, List, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+
+@dataclass
+class FakeServerConfig:
+    """대역 서버 동작 설정 (/_fake/config로 실행 중 변경 가능)"""
+    latency: str = "fixed"           # fixed, uniform, normal, lognormal
+    latency_ms: float = 200.0        # 평균(또는 고정) 지연
+    latency_jitter_ms: float = 50.0  # 표준편차 (uniform은 ±범위)
+    tokens_per_second: float = 200.0 # 스트리밍 및 출력 시간 모델링용 토큰 속도
+    error_rate_429: float = 0.0
+    error_rate_500: float = 0.0
+    empty_rate: float = 0.0
+    seed: int = 42
+
+
+class FakeGemini:
+    """요청별 응답, 지연, 오류를 결정합니다."""
+
+    GRADES = ["Strong Buy", "Buy", "Hold", "Sell", "Strong Sell"]
+
+    def __init__(self, config: FakeServerConfig):
+        self.config = config
+        self._lock = threading.Lock()
+        self._rng = random.Random(config.seed)
+        self.stats = {'requests': 0, 'errors_429': 0, 'errors_500': 0, 'empty': 0, 'by_kind': {}}
+
+    def reconfigure(self, updates: Dict[str, Any]):
+        known = {f.name for f in fields(FakeServerConfig)}
+        with self._lock:
+            for key, value in updates.items():
+                if key in known:
+                    setattr(self.config, key, type(getattr(self.config, key))(value))
+            self._rng = random.Random(self.config.seed)
+
+    # ---- 무작위 요소 (seed 고정) ----
+
+    def sample_latency(self) -> float:
+        """지연 시간(초)을 샘플링합니다."""
+        c = self.config
+        with self._lock:
+            if c.latency == "uniform":
+                ms = self._rng.uniform(c.latency_ms - c.latency_jitter_ms, c.latency_ms + c.latency_jitter_ms)
+            elif c.latency == "normal":
+                ms = self._rng.gauss(c.latency_ms, c.latency_jitter_ms)
+            elif c.latency == "lognormal":
+                # 평균이 latency_ms가 되도록 모수 설정 (긴 꼬리 재현)
+                sigma = max(c.latency_jitter_ms / max(c.latency_ms, 1.0), 1e-6)
+                mu = max(1e-6, c.latency_ms)
+                ms = self._rng.lognormvariate(0, sigma) * mu / math.exp(sigma ** 2 / 2)
+            else:
+                ms = c.latency_ms
+        return max(ms, 0.0) / 1000
+
+    def sample_fault(self) -> Optional[str]:
+        """주입할 오류 유형을 반환합니다 (429, 500, empty 또는 None)."""
+        c = self.config
+        with self._lock:
+            roll = self._rng.random()
+        if roll < c.error_rate_429:
+            return "429"
+        if roll < c.error_rate_429 + c.error_rate_500:
+            return "500"
+        if roll < c.error_rate_429 + c.error_rate_500 + c.empty_rate:
+            return "empty"
+        return None
+
+    def count(self, key: str, kind: Optional[str] = None):
+        with self._lock:
+            self.stats[key] = self.stats.get(key, 0) + 1
+            if kind:
+                self.stats['by_kind'][kind] = self.stats['by_kind'].get(kind, 0) + 1
+
+    # ---- 응답 생성 ----
+
+    @staticmethod
+    def extract_prompt(body: Dict) -> str:
+        texts = []
+        system = body.get('systemInstruction') or body.get('system_instruction')
+        if isinstance(system, dict):
+            texts.extend(part.get('text', '') for part in system.get('parts', []))
+        for content in body.get('contents', []):
+            texts.extend(part.get('text', '') for part in content.get('parts', []))
+        return "\n".join(texts)
+
+    @staticmethod
+    def estimate_tokens(text: str) -> int:
+        ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+        return int(ascii_chars / 4 + (len(text) - ascii_chars) / 1.5) + 1
+
+    @staticmethod
+    def classify(prompt: str, schema: Optional[Dict]) -> str:
+        if "connection test" in prompt:
+            return "connection_test"
+        if schema is not None:
+            properties = schema.get('properties', {})
+            if 'detailed_analysis' in properties:
+                return "structured_analysis"
+            if 'investment_grade' in properties:
+                return "grade"
+            return "structured"
+        if "비교 분석" in prompt:
+            return "comparison"
+        if "요약" in prompt:
+            return "summary"
+        return "analysis"
+
+    def _choice(self, prompt: str, options: List[Any]) -> Any:
+        """프롬프트 해시로 결정되는 선택 (같은 프롬프트 → 같은 응답)."""
+        digest = int(hashlib.md5(prompt.encode('utf-8')).hexdigest(), 16)
+        return options[digest % len(options)]
+
+    def _symbol(self, prompt: str) -> str:
+        match = re.search(r"종목(?: 코드)?:\s*([A-Z0-9.\-^]+)", prompt)
+        return match.group(1) if match else "N/A"
+
+    def _analysis_text(self, prompt: str) -> str:
+        symbol = self._symbol(prompt)
+        grade = self._choice(prompt, self.GRADES)
+        return (
+            f"## {symbol} 가치투자 분석 (테스트 응답)\n\n"
+            f"### 밸류에이션\n{symbol}의 PER과 PBR은 업종 평균과 비교해 중립적인 수준입니다.\n\n"
+            f"### 재무 건전성\n부채비율과 현금흐름은 안정적인 범위로 판단됩니다.\n\n"
+            f"### 투자 의견\n최종 의견: **{grade}**\n"
+        )
+
+    def _from_schema(self, schema: Dict, prompt: str, name: str = "") -> Any:
+        schema_type = str(schema.get('type', 'STRING')).upper()
+        if schema_type == 'OBJECT':
+            return {key: self._from_schema(prop, prompt, key)
+                    for key, prop in schema.get('properties', {}).items()}
+        if schema_type == 'ARRAY':
+            count = min(3, schema.get('maxItems', schema.get('max_items', 3)))
+            return [self._from_schema(schema.get('items', {}), prompt + str(i), name) for i in range(count)]
+        if schema_type in ('NUMBER', 'INTEGER'):
+            low = float(schema.get('minimum', 0))
+            high = float(schema.get('maximum', low + 100))
+            value = low + (high - low) * self._choice(prompt + name, [0.55, 0.65, 0.75, 0.85])
+            return int(value) if schema_type == 'INTEGER' else round(value, 1)
+        if schema_type == 'BOOLEAN':
+            return True
+        if 'enum' in schema:
+            return self._choice(prompt, schema['enum'])
+        if name == 'detailed_analysis':
+            return self._analysis_text(prompt)
+        return f"{self._symbol(prompt)} {name or '항목'} 테스트 응답"
+
+    def build_text(self, kind: str, prompt: str, schema: Optional[Dict]) -> str:
+        if schema is not None:
+            return json.dumps(self._from_schema(schema, prompt), ensure_ascii=False)
+        if kind == "connection_test":
+            return "Connection successful."
+        if kind == "summary":
+            return ("- 밸류에이션: 업종 평균 수준\n- 수익성/성장성: 양호\n"
+                    "- 재무 안정성: 안정적\n- 핵심 강점과 위험: 테스트 요약")
+        if kind == "comparison":
+            symbols = re.findall(r"^\|([A-Z0-9^][A-Z0-9.\-^]*)\|", prompt, flags=re.MULTILINE)
+            ranking = ", ".join(symbols) or "N/A"
+            return f"## 비교 분석 (테스트 응답)\n\n투자 우선순위: {ranking}\n"
+        return self._analysis_text(prompt)
+
+    @staticmethod
+    def usage(prompt_tokens: int, output_tokens: int) -> Dict:
+        return {
+            'promptTokenCount': prompt_tokens,
+            'candidatesTokenCount': output_tokens,
+            'totalTokenCount': prompt_tokens + output_tokens,
+        }
+
+    def response_body(self, model: str, text: str, prompt_tokens: int) -> Dict:
+        return {
+            'candidates': [{
+                'content': {'role': 'model', 'parts': [{'text': text}] if text else []},
+                'finishReason': 'STOP',
+                'index': 0,
+            }],
+            'usageMetadata': self.usage(prompt_tokens, self.estimate_tokens(text) if text else 0),
+            'modelVersion': model,
+        }
+
+
+def error_response(code: int) -> JSONResponse:
+    status = {429: "RESOURCE_EXHAUSTED", 500: "INTERNAL"}[code]
+    return JSONResponse(
+        status_code=code,
+        content={'error': {'code': code, 'message': f"Injected {status} (fake server)", 'status': status}}
+    )
+
+
+def create_app(config: Optional[FakeServerConfig] = None) -> FastAPI:
+    fake = FakeGemini(config or FakeServerConfig())
+    app = FastAPI(title="Fake Gemini API")
+    app.state.fake = fake
+
+    async def prepare(request: Request, model: str):
+        body = await request.json()
+        config_body = body.get('generationConfig') or {}
+        schema = config_body.get('responseSchema') or config_body.get('responseJsonSchema')
+        prompt = fake.extract_prompt(body)
+        kind = fake.classify(prompt, schema)
+        fake.count('requests', kind)
+
+        await asyncio.sleep(fake.sample_latency())
+
+        fault = fake.sample_fault()
+        text = "" if fault == "empty" else fake.build_text(kind, prompt, schema)
+        if fault == "empty":
+            fake.count('empty')
+        return fault, text, fake.estimate_tokens(prompt)
+
+    @app.get("/v1beta/models/{model}")
+    async def get_model(model: str):
+        return {'name': f"models/{model}", 'displayName': f"{model} (fake)",
+                'inputTokenLimit': 1048576, 'outputTokenLimit': 65536}
+
+    @app.post("/v1beta/models/{model}:countTokens")
+    async def count_tokens(model: str, request: Request):
+        body = await request.json()
+        return {'totalTokens': fake.estimate_tokens(fake.extract_prompt(body))}
+
+    @app.post("/v1beta/models/{model}:generateContent")
+    async def generate_content(model: str, request: Request):
+        fault, text, prompt_tokens = await prepare(request, model)
+        if fault in ("429", "500"):
+            fake.count(f"errors_{fault}")
+            return error_response(int(fault))
+
+        # 출력 토큰 생성 시간 반영
+        output_tokens = fake.estimate_tokens(text) if text else 0
+        await asyncio.sleep(output_tokens / max(fake.config.tokens_per_second, 1e-6))
+        return fake.response_body(model, text, prompt_tokens)
+
+    @app.post("/v1beta/models/{model}:streamGenerateContent")
+    async def stream_generate_content(model: str, request: Request):
+        fault, text, prompt_tokens = await prepare(request, model)
+        if fault in ("429", "500"):
+            fake.count(f"errors_{fault}")
+            return error_response(int(fault))
+
+        async def events():
+            # 약 4자 단위 토큰을 tokens_per_second 속도로 전송
+            chunk_chars = 16
+            delay = (chunk_chars / 4) / max(fake.config.tokens_per_second, 1e-6)
+            for start in range(0, max(len(text), 1), chunk_chars):
+                chunk = text[start:start + chunk_chars]
+                body = fake.response_body(model, chunk, prompt_tokens)
+                yield f"data: {json.dumps(body, ensure_ascii=False)}\r\n\r\n"
+                await asyncio.sleep(delay)
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @app.get("/_fake/stats")
+    async def stats():
+        return {'config': asdict(fake.config), 'stats': fake.stats}
+
+    @app.post("/_fake/config")
+    async def update_config(request: Request):
+        fake.reconfigure(await request.json())
+        return {'config': asdict(fake.config)}
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="로컬 Gemini API 대역 서버")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', choices=['fixed', 'uniform', 'normal', 'lognormal'], default='fixed')
+    parser.add_argument('--latency-ms', type=float, default=200.0)
+    parser.add_argument('--latency-jitter-ms', type=float, default=50.0)
+    parser.add_argument('--tokens-per-second', type=float, default=200.0)
+    parser.add_argument('--error-rate-429', type=float, default=0.0)
+    parser.add_argument('--error-rate-500', type=float, default=0.0)
+    parser.add_argument('--empty-rate', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    config = FakeServerConfig(
+        latency=args.latency,
+        latency_ms=args.latency_ms,
+        latency_jitter_ms=args.latency_jitter_ms,
+        tokens_per_second=args.tokens_per_second,
+        error_rate_429=args.error_rate_429,
+        error_rate_500=args.error_rate_500,
+        empty_rate=args.empty_rate,
+        seed=args.seed,
+    )
+
+    import uvicorn
+    print(f"🧪 Fake Gemini 서버 시작: http://{args.host}:{args.port} ({asdict(config)})")
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
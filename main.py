@@ -6,8 +6,10 @@ Gemini 2.5 Flash를 활용한 실시간 주식 분석 도구
 
 import os
 import sys
+import json
 import argparse
 import logging
+from datetime import datetime
 from pathlib import Path
 from typing import List, Optional, Dict, Any
 from dotenv import load_dotenv
@@ -25,6 +27,10 @@ from modules.stock_data_collector import StockDataCollector
 from modules.gemini_client import GeminiClient
 from modules.value_analyzer import ValueAnalyzer, AnalysisResult
 from modules.report_generator import ReportGenerator
+from modules.llm_scheduler import BATCH, INTERACTIVE, PRIORITY_CLASSES, llm_priority
+from modules.backtester import GradeBacktester
+from modules.portfolio_optimizer import PortfolioOptimizer
+from modules.return_matrix import price_comparison
 
 # 로깅 설정
 logging.basicConfig(
@@ -52,6 +58,10 @@ class StockValueAnalyzer:
         self.gemini_client = None
         self.value_analyzer = ValueAnalyzer()
         self.report_generator = ReportGenerator()
+        self.portfolio_optimizer = PortfolioOptimizer()
+        
+        # 마지막 분석에서 수집한 종목 데이터 (포트폴리오 최적화에 가격 이력 재사용)
+        self.collected_data: Dict[str, Dict] = {}
         
         # 설정값
         self.default_report_format = os.getenv('REPORT_FORMAT', 'markdown')
@@ -68,15 +78,12 @@ class StockValueAnalyzer:
                 console.print("📝 .env 파일을 생성하고 GOOGLE_API_KEY를 설정하세요.")
                 return False
             
-            self.gemini_client = GeminiClient(api_key)
+            self.gemini_client = GeminiClient.shared(api_key)
             
-            # 연결 테스트
-            if self.gemini_client.test_connection():
-                console.print("[green]✅ Gemini API 연결 성공[/green]")
-                return True
-            else:
-                console.print("[red]❌ Gemini API 연결 실패[/red]")
-                return False
+            # 연결 점검은 백그라운드에서 진행 (실패 시 분석은 규칙 기반 등급으로 대체)
+            self.gemini_client.health.start_background_probe()
+            console.print("[green]✅ Gemini API 클라이언트 준비 완료 (연결 상태는 백그라운드 점검)[/green]")
+            return True
                 
         except Exception as e:
             console.print(f"[red]❌ Gemini 클라이언트 초기화 실패: {str(e)}[/red]")
@@ -192,9 +199,13 @@ class StockValueAnalyzer:
         """주식들을 분석합니다."""
         console.print(f"\n📊 {len(symbols)}개 종목 분석 시작...")
         
-        # 1. 주식 데이터 수집
+        # 1. 주식 데이터 수집 (실적 발표가 반영된 종목은 재무제표·분석 캐시를 먼저 갱신)
         console.print("\n1️⃣ 주식 데이터 수집 중...")
+        reported = self.stock_collector.refresh_reported(symbols)
+        if reported:
+            self.value_analyzer.invalidate_reported(reported)
         stock_data = self.stock_collector.get_multiple_stocks_data(symbols)
+        self.collected_data = stock_data
         
         if not stock_data:
             console.print("[red]❌ 주식 데이터를 수집할 수 없습니다.[/red]")
@@ -220,18 +231,20 @@ class StockValueAnalyzer:
                     # 분석 깊이에 따른 프롬프트 생성
                     prompt = self._generate_analysis_prompt(analysis_depth)
                     
-                    ai_analysis = self.gemini_client.generate_analysis(
+                    ai_structured = self.gemini_client.generate_structured_analysis(
                         prompt=prompt,
                         stock_data=stock_data[symbol],
-                        thinking_enabled=True
+                        thinking_enabled=True,
+                        depth=analysis_depth,
+                        investment_grade=result.investment_grade.value
                     )
                     
                     # AI 분석 결과를 기존 분석에 추가
-                    result.detailed_analysis = ai_analysis
+                    result.detailed_analysis = ai_structured['detailed_analysis']
                     
                 except Exception as e:
-                    console.print(f"[yellow]⚠️ {symbol} AI 분석 실패: {str(e)}[/yellow]")
-                    result.detailed_analysis = f"AI 분석 실패: {str(e)}"
+                    # 규칙 기반 상세 분석(result.detailed_analysis)을 그대로 유지
+                    console.print(f"[yellow]⚠️ {symbol} AI 분석 실패, 규칙 기반 분석 사용: {str(e)}[/yellow]")
         
         return analysis_results
     
@@ -333,10 +346,17 @@ class StockValueAnalyzer:
                     stocks_data=stock_data
                 )
                 
+                # 수집한 가격 이력으로 상관계수·롤링 베타·낙폭 비교
+                price_analysis = price_comparison(
+                    {symbol: self.collected_data[symbol] for symbol in symbols if symbol in self.collected_data},
+                    self.stock_collector
+                )
+                
                 path = self.report_generator.generate_comparison_report(
                     analysis_results=analysis_results,
                     ai_analysis=comparison_analysis,
-                    format_type=report_format
+                    format_type=report_format,
+                    price_analysis=price_analysis
                 )
                 report_paths.append(path)
                 
@@ -346,8 +366,10 @@ class StockValueAnalyzer:
         elif mode == "portfolio":
             # 포트폴리오 요약 보고서 생성
             try:
+                portfolio = self.optimize_portfolio(analysis_results)
                 path = self.report_generator.generate_summary_report(
                     analysis_results=analysis_results,
+                    additional_info={'portfolio': portfolio} if portfolio else None,
                     format_type=report_format
                 )
                 report_paths.append(path)
@@ -369,6 +391,42 @@ class StockValueAnalyzer:
         
         return report_paths
     
+    def optimize_portfolio(self, analysis_results: List[AnalysisResult]) -> Optional[Dict]:
+        """수집한 가격 이력으로 포트폴리오 비중을 계산하고 표시합니다 (실패 시 None)."""
+        price_histories = {
+            result.symbol: self.collected_data[result.symbol].get('price_history')
+            for result in analysis_results if result.symbol in self.collected_data
+        }
+        if len(price_histories) < 2:
+            return None
+        
+        try:
+            allocation = self.portfolio_optimizer.optimize(price_histories, analysis_results)
+        except Exception as e:
+            console.print(f"[yellow]⚠️ 포트폴리오 최적화 생략: {str(e)}[/yellow]")
+            return None
+        
+        method_name = '평균-분산' if allocation.method == 'mean_variance' else '위험 균형'
+        table = Table(title=f"💼 최적 포트폴리오 ({method_name})")
+        table.add_column("종목", style="cyan")
+        table.add_column("비중", justify="right")
+        table.add_column("위험 기여", justify="right", style="yellow")
+        for holding in allocation.holdings():
+            table.add_row(
+                holding['symbol'],
+                f"{holding['weight']:.1%}",
+                f"{holding['risk_contribution']:.1%}"
+            )
+        console.print(table)
+        console.print(
+            f"기대 수익률 {allocation.expected_return:.1%}, 변동성 {allocation.volatility:.1%} "
+            f"(연율화, 공분산 축소 강도 {allocation.shrinkage:.2f})"
+        )
+        if allocation.excluded:
+            console.print(f"[yellow]⚠️ 가격 이력 부족으로 제외: {', '.join(allocation.excluded)}[/yellow]")
+        
+        return {**allocation.to_dict(), 'holdings': allocation.holdings()}
+    
     def display_results(self, analysis_results: List[AnalysisResult]):
         """분석 결과를 화면에 표시합니다."""
         console.print("\n" + "="*60)
@@ -404,6 +462,106 @@ class StockValueAnalyzer:
                 )
             )
     
+    def display_usage(self):
+        """Gemini API 토큰 사용량과 지연 시간을 표시합니다."""
+        if not self.gemini_client:
+            return
+        
+        health = self.gemini_client.health.get_status(refresh=False)
+        if health['status'] != 'healthy':
+            console.print(f"[yellow]⚠️ Gemini API 상태: {health['status']} ({health['last_error'] or '점검 중'})[/yellow]")
+        
+        summary = self.gemini_client.get_usage_summary()
+        if not summary['by_endpoint']:
+            return
+        
+        table = Table(title="🔢 Gemini API 사용량")
+        table.add_column("호출 유형", style="cyan")
+        table.add_column("호출 수", justify="right")
+        table.add_column("입력 토큰", justify="right")
+        table.add_column("출력 토큰", justify="right")
+        table.add_column("사고 토큰", justify="right")
+        table.add_column("평균 지연", justify="right", style="yellow")
+        
+        rows = list(summary['by_endpoint'].items()) + [("합계", summary['totals'])]
+        for endpoint, stats in rows:
+            table.add_row(
+                endpoint,
+                str(stats['calls']),
+                f"{stats['prompt_tokens']:,}",
+                f"{stats['output_tokens']:,}",
+                f"{stats['thinking_tokens']:,}",
+                f"{stats['avg_latency_ms'] / 1000:.1f}s"
+            )
+        
+        console.print(table)
+        
+        for priority, stats in self.gemini_client.scheduler.metrics().items():
+            if stats['completed'] or stats['timeouts']:
+                console.print(
+                    f"⏳ {priority} 대기: 평균 {stats['avg_wait_ms'] / 1000:.1f}s, "
+                    f"p95 {stats['p95_wait_ms'] / 1000:.1f}s (대기 초과 {stats['timeouts']}회)"
+                )
+    
+    def run_backtest(self, snapshots_path: str, prices_path: str,
+                     horizon_days: Optional[int] = None) -> Optional[str]:
+        """규칙 기반 등급 백테스트를 실행하고 결과를 표시·저장합니다 (Gemini 불필요)."""
+        import pandas as pd
+        
+        def load(path: str, **kwargs) -> pd.DataFrame:
+            if path.endswith('.parquet'):
+                return pd.read_parquet(path)
+            return pd.read_csv(path, **kwargs)
+        
+        try:
+            console.print(f"\n🧪 등급 백테스트 실행 중... (스냅샷: {snapshots_path}, 가격: {prices_path})")
+            snapshots = load(snapshots_path, parse_dates=['date'])
+            prices = load(prices_path, index_col=0, parse_dates=True)
+            if not isinstance(prices.index, pd.DatetimeIndex):
+                prices.index = pd.to_datetime(prices.index)
+            
+            result = GradeBacktester().run(snapshots, prices, horizon_days)
+        except Exception as e:
+            console.print(f"[red]❌ {str(e)}[/red]")
+            return None
+        
+        def percent(value: Optional[float]) -> str:
+            return "-" if value is None else f"{value * 100:.2f}%"
+        
+        table = Table(title=(
+            f"🧪 등급 백테스트 (규칙 v{result.rules_version}, {result.periods[0]} ~ {result.periods[-1]}, "
+            f"{len(result.periods)}회 리밸런싱, {result.symbols:,}개 종목)"
+        ))
+        table.add_column("등급", style="cyan")
+        table.add_column("평균 종목 수", justify="right")
+        table.add_column("기간 평균 수익률", justify="right")
+        table.add_column("연율화 수익률", justify="right")
+        table.add_column("초과 수익률", justify="right", style="yellow")
+        table.add_column("적중률", justify="right")
+        table.add_column("회전율", justify="right")
+        
+        for grade, stats in list(result.grade_stats.items()) + [("유니버스", result.universe)]:
+            table.add_row(
+                grade,
+                f"{stats['avg_members']:.0f}" if 'avg_members' in stats else "-",
+                percent(stats['mean_return']),
+                percent(stats['annualized_return']),
+                percent(stats['excess_return']),
+                percent(stats.get('hit_rate')),
+                percent(stats.get('turnover'))
+            )
+        console.print(table)
+        if result.overlapping:
+            console.print("[yellow]⚠️ 선행 수익률 기간이 리밸런싱 간격보다 길어 기간이 겹치므로 "
+                          "연율화 수익률은 산출하지 않았습니다.[/yellow]")
+        
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        path = self.report_generator.reports_dir / f"backtest_{result.rules_version}_{timestamp}.json"
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(result.to_dict(), f, indent=2, ensure_ascii=False)
+        console.print(f"[green]✅ 백테스트 결과 저장됨:[/green] {path}")
+        return str(path)
+    
     def show_menu(self):
         """메뉴를 표시합니다."""
         console.print("\n" + "="*50)
@@ -487,24 +645,29 @@ class StockValueAnalyzer:
                     # 새 분석 시작
                     user_input = self.get_user_input()
                     
-                    analysis_results = self.analyze_stocks(
-                        symbols=user_input['symbols'],
-                        analysis_depth=user_input['analysis_depth']
-                    )
-                    
-                    if analysis_results:
-                        self.display_results(analysis_results)
-                        
-                        report_paths = self.generate_reports(
-                            analysis_results=analysis_results,
-                            mode=user_input['mode'],
-                            report_format=user_input['report_format']
+                    # 포트폴리오 분석은 대량 호출이므로 batch 우선순위로 실행
+                    priority = BATCH if user_input['mode'] == 'portfolio' else INTERACTIVE
+                    with llm_priority(priority):
+                        analysis_results = self.analyze_stocks(
+                            symbols=user_input['symbols'],
+                            analysis_depth=user_input['analysis_depth']
                         )
                         
-                        if report_paths:
-                            console.print(f"\n[green]✅ 보고서가 생성되었습니다:[/green]")
-                            for path in report_paths:
-                                console.print(f"   📄 {path}")
+                        if analysis_results:
+                            self.display_results(analysis_results)
+                            
+                            report_paths = self.generate_reports(
+                                analysis_results=analysis_results,
+                                mode=user_input['mode'],
+                                report_format=user_input['report_format']
+                            )
+                            
+                            if report_paths:
+                                console.print("\n[green]✅ 보고서가 생성되었습니다:[/green]")
+                                for path in report_paths:
+                                    console.print(f"   📄 {path}")
+                            
+                            self.display_usage()
                 
                 elif choice == "2":
                     # 저장된 보고서 보기
@@ -542,6 +705,8 @@ def main():
   python main.py                    # 대화형 모드
   python main.py --symbol AAPL     # 단일 종목 분석
   python main.py --symbols AAPL,MSFT,GOOGL --format html
+  python main.py --symbols AAPL,MSFT,GOOGL --export parquet
+  python main.py --backtest snapshots.csv prices.csv --horizon-days 63
         """
     )
     
@@ -579,6 +744,35 @@ def main():
         help='출력 디렉터리 (기본값: reports)'
     )
     
+    parser.add_argument(
+        '--export',
+        type=str,
+        choices=['parquet', 'arrow'],
+        help='분석 결과 표 내보내기 형식 (종목당 한 행, pyarrow 필요)'
+    )
+    
+    parser.add_argument(
+        '--priority',
+        type=str,
+        choices=PRIORITY_CLASSES,
+        help='Gemini 호출 우선순위 클래스 - 이 프로세스 안의 동시 실행 수·분당 토큰 한도 '
+             '(LLM_*_CONCURRENCY, LLM_*_TPM) 적용 기준 (기본값: 단일 종목은 interactive, 여러 종목은 batch)'
+    )
+    
+    parser.add_argument(
+        '--backtest',
+        nargs=2,
+        metavar=('SNAPSHOTS', 'PRICES'),
+        help='규칙 기반 등급 백테스트 (지표 스냅샷 CSV/Parquet: date, symbol, 지표 열 / '
+             '수정 종가 CSV/Parquet: 날짜 인덱스 × 종목 열)'
+    )
+    
+    parser.add_argument(
+        '--horizon-days',
+        type=int,
+        help='백테스트 선행 수익률 기간(거래일, 기본값: 다음 리밸런싱까지)'
+    )
+    
     args = parser.parse_args()
     
     # 환경 변수 확인
@@ -596,7 +790,10 @@ def main():
         app.report_generator.reports_dir.mkdir(exist_ok=True)
     
     # CLI 모드 vs 대화형 모드
-    if args.symbol or args.symbols:
+    if args.backtest:
+        app.run_backtest(args.backtest[0], args.backtest[1], args.horizon_days)
+    
+    elif args.symbol or args.symbols:
         # CLI 모드
         if not app.initialize_gemini_client():
             console.print("[red]❌ 프로그램을 종료합니다.[/red]")
@@ -609,24 +806,37 @@ def main():
         else:
             symbols = [s.strip().upper() for s in args.symbols.split(',')]
             mode = "comparison" if len(symbols) > 1 else "individual"
+        priority = args.priority or (INTERACTIVE if len(symbols) == 1 else BATCH)
         
         # 분석 실행
         try:
-            analysis_results = app.analyze_stocks(symbols, args.depth)
-            
-            if analysis_results:
-                app.display_results(analysis_results)
+            with llm_priority(priority):
+                analysis_results = app.analyze_stocks(symbols, args.depth)
                 
-                report_paths = app.generate_reports(
-                    analysis_results=analysis_results,
-                    mode=mode,
-                    report_format=args.format
-                )
-                
-                if report_paths:
-                    console.print(f"\n[green]✅ 보고서가 생성되었습니다:[/green]")
-                    for path in report_paths:
-                        console.print(f"   📄 {path}")
+                if analysis_results:
+                    app.display_results(analysis_results)
+                    
+                    report_paths = app.generate_reports(
+                        analysis_results=analysis_results,
+                        mode=mode,
+                        report_format=args.format
+                    )
+                    
+                    if report_paths:
+                        console.print("\n[green]✅ 보고서가 생성되었습니다:[/green]")
+                        for path in report_paths:
+                            console.print(f"   📄 {path}")
+                    
+                    if args.export:
+                        try:
+                            path = app.report_generator.export_table(analysis_results, args.export)
+                            console.print(f"   📦 {path}")
+                        except ImportError as e:
+                            console.print(f"[yellow]⚠️ {str(e)}[/yellow]")
+                        except Exception as e:
+                            console.print(f"[red]❌ 결과 표 내보내기 실패: {str(e)}[/red]")
+                    
+                    app.display_usage()
         
         except Exception as e:
             console.print(f"[red]❌ 분석 실패: {str(e)}[/red]")
@@ -0,0 +1,177 @@
+import string
+import threading
+from typing import Dict, List, Optional
+
+from .scoring_rules import ScoringPlan, get_scoring_plan
+
+# 지표 정의와 해석 기준 (단위는 종목 데이터와 같음)
+METRIC_GUIDE = {
+    'pe_ratio': 'PER, 주가/주당순이익 (배). 0 이하는 적자로 밸류에이션 판단에서 제외하고, 15배 이하를 저평가 구간으로 봅니다.',
+    'pb_ratio': 'PBR, 주가/주당순자산 (배). 1배 미만은 청산가치 이하, 5배 초과는 자산 대비 고평가로 봅니다.',
+    'peg_ratio': 'PEG, PER/이익 성장률. 1 미만이면 성장 대비 저평가입니다.',
+    'dividend_yield': '배당수익률 (소수, 0.03 = 3%). 0이면 배당 미지급입니다.',
+    'roe': '자기자본이익률 (소수). 15% 이상이면 우수, 5% 미만이면 낮은 수익성입니다.',
+    'roa': '총자산이익률 (소수). 금융업은 부채 구조상 ROA가 낮게 나오므로 섹터 내 비교가 우선입니다.',
+    'debt_to_equity': '부채비율, 총부채/자기자본 (배). 0.3 미만은 우수, 1.0 초과는 높은 재무 위험입니다.',
+    'revenue_growth': '매출 성장률 (%, 전년 대비).',
+    'income_growth': '순이익 성장률 (%, 전년 대비). 매출과 방향이 다르면 마진 변화를 확인합니다.',
+    'beta': '시장 대비 민감도. 1.5 초과면 시장 변동성 위험이 큽니다.',
+    'upside_potential': '상승여력 (%), 규칙 기반 적정가 대비 현재가 괴리입니다.',
+    'volatility': '연환산 변동성 (소수).',
+    'sharpe_ratio': '샤프 비율, 무위험 수익률 초과 수익/변동성. 0 미만이면 위험 대비 손실입니다.',
+    'sortino_ratio': '소르티노 비율, 하방 변동성 기준 위험 조정 수익률.',
+    'max_drawdown': '최대 낙폭 (음의 소수, -0.4 = -40%).',
+    'value_at_risk': '일간 과거 VaR 95% (소수, 0.04 = 하루 4% 손실).',
+    'revenue_cagr': '다년 매출 연평균 성장률 (%).',
+    'income_cagr': '다년 순이익 연평균 성장률 (%).',
+    'gross_margin_trend': '매출총이익률 추세 (연 %p).',
+    'operating_margin_trend': '영업이익률 추세 (연 %p). 음수면 수익성이 악화되고 있습니다.',
+    'net_margin_trend': '순이익률 추세 (연 %p).',
+    'fcf_positive_ratio': '자유현금흐름 흑자 연도 비율 (소수).',
+    'fcf_cv': '자유현금흐름 변동계수. 클수록 현금흐름이 불안정합니다.',
+}
+
+# 섹터 백분위 지표 안내 (이름 규칙: <지표>_sector_pct, <지표>_industry_pct)
+PERCENTILE_GUIDE = (
+    '<지표>_sector_pct, <지표>_industry_pct: 같은 섹터·산업 내 백분위 (0~100, 클수록 값이 큼). '
+    'PER·부채비율은 낮을수록, ROE·성장률은 높을수록 유리합니다. 동종 기업이 부족하면 제공되지 않습니다.'
+)
+
+# 섹터별 분석 중점 (섹터 가중치 설정과 함께 제시)
+SECTOR_FOCUS = {
+    'Technology': '매출 성장과 연구개발 경쟁력, 기술 변화에 따른 해자 유지 여부를 중시합니다.',
+    'Healthcare': '파이프라인과 규제 승인 위험, 특허 만료 일정을 함께 고려합니다.',
+    'Financials': '자본 적정성과 신용 위험, 금리 민감도를 우선 보며 부채비율은 섹터 내 비교로만 판단합니다.',
+    'Consumer Staples': '배당 지속성과 가격 결정력, 경기 방어력을 중시합니다.',
+    'Utilities': '규제 요금 구조와 배당 안정성, 금리 상승 시 밸류에이션 부담을 고려합니다.',
+}
+
+CATEGORY_LABELS = {
+    'growth': '성장성',
+    'profitability': '수익성',
+    'stability': '안정성',
+    'valuation': '밸류에이션',
+}
+
+SIGNAL_LABELS = {'strength': '강점', 'weakness': '약점', 'risk': '위험 요인'}
+
+GRADE_MEANINGS = {
+    'Strong Buy': '매우 매력적인 저평가, 강력한 펀더멘털, 높은 상승여력',
+    'Buy': '매력적인 투자 기회, 양호한 펀더멘털',
+    'Hold': '적정 가격, 보유 유지 권장',
+    'Sell': '고평가되었거나 펀더멘털 악화',
+    'Strong Sell': '심각한 문제, 즉시 매도 권장',
+}
+
+WRITING_RULES = """
+## 작성 원칙
+- 제공된 종목 데이터와 이 기준서만 근거로 판단하고, 데이터에 없는 수치는 추정하지 않습니다.
+- N/A이거나 0으로 표시된 지표는 데이터 누락일 수 있으므로 결론의 근거로 쓰지 않습니다.
+- 금액은 USD 기준이며, 비율 지표는 위 단위 설명에 맞춰 백분율로 바꿔 표기합니다.
+- 규칙 기반 점수와 다른 결론을 낼 때는 어떤 지표 때문인지 명시합니다.
+- 한국어로 작성하고, 과장된 표현이나 수익 보장 표현은 쓰지 않습니다.
+"""
+
+_CONDITION_WORDS = [('eq', '= {}'), ('gt', '{} 초과'), ('ge', '{} 이상'), ('lt', '{} 미만'), ('le', '{} 이하')]
+
+_guide: Optional[str] = None
+_guide_version: Optional[str] = None
+_guide_lock = threading.Lock()
+
+
+def _describe_condition(condition: Dict) -> str:
+    """{'gt': 0, 'le': 10} → '0 초과 10 이하'"""
+    return ' '.join(word.format(condition[key]) for key, word in _CONDITION_WORDS if key in condition)
+
+
+def _describe_message(message: str) -> str:
+    """문구 템플릿의 포맷 필드를 지표 이름으로 바꿉니다 ('{roe:.1%}' → 'roe')."""
+    parts = []
+    for literal, field, _, _ in string.Formatter().parse(message):
+        parts.append(literal)
+        if field is not None:
+            parts.append(field)
+    return ''.join(parts)
+
+
+def _score_section(plan: ScoringPlan) -> List[str]:
+    rules = plan.rules
+    lines = [f"## 규칙 기반 점수 (기본 {rules.get('base_score', 50)}점, 지표별로 처음 일치한 구간만 적용)"]
+    for rule in rules.get('score_rules', []):
+        category = CATEGORY_LABELS.get(rule.get('category'), rule.get('category') or '기타')
+        lines.append(f"- {rule['metric']} ({category}):")
+        for case in rule.get('cases', []):
+            lines.append(f"  - {_describe_condition(case)}: {case.get('points', 0):+g}점")
+
+    lines.append("")
+    lines.append("## 투자 등급 구간")
+    for grade in rules.get('grades', []):
+        threshold = f"{grade['min_score']}점 이상" if 'min_score' in grade else "그 외"
+        lines.append(f"- {grade['grade']} ({threshold}): {GRADE_MEANINGS.get(grade['grade'], '')}")
+    return lines
+
+
+def _sector_section(plan: ScoringPlan) -> List[str]:
+    config = plan.rules.get('sector_weights') or {}
+    applied = "점수에 적용됨" if plan.sector_weighting else "참고용, 점수에는 미적용"
+    lines = [f"## 섹터별 중점 (범주 가중치 {applied})"]
+    for sector, weights in (config.get('sectors') or {}).items():
+        weight_text = ', '.join(
+            f"{CATEGORY_LABELS.get(category, category)} {weight:.0%}" for category, weight in weights.items()
+        )
+        lines.append(f"- {sector}: {weight_text}. {SECTOR_FOCUS.get(sector, '')}".rstrip())
+    for sector, focus in SECTOR_FOCUS.items():
+        if sector not in (config.get('sectors') or {}):
+            lines.append(f"- {sector}: {focus}")
+    return lines
+
+
+def _signal_section(plan: ScoringPlan) -> List[str]:
+    lines = ["## 강점·약점·위험 요인 판단 기준"]
+    for kind, label in SIGNAL_LABELS.items():
+        lines.append(f"### {label}")
+        for signal in plan.rules.get('signals', []):
+            if signal.get('kind') != kind:
+                continue
+            conditions = signal.get('all') or signal.get('any') or []
+            joiner = ' 또는 ' if 'any' in signal else ' 그리고 '
+            when = joiner.join(f"{c['metric']} {_describe_condition(c)}" for c in conditions)
+            if signal.get('sectors'):
+                when = f"섹터가 {', '.join(signal['sectors'])}"
+            lines.append(f"- {when}: {_describe_message(signal.get('message', ''))}")
+    return lines
+
+
+def build_analysis_guide(plan: ScoringPlan) -> str:
+    """
+    점수 규칙으로부터 모든 AI 호출이 공유하는 정적 평가 기준서를 생성합니다.
+
+    지표 정의, 규칙 기반 점수·등급 구간, 섹터별 중점, 강점·약점·위험 판단 기준, 작성 원칙을
+    담으며 종목 데이터는 포함하지 않습니다. 규칙이 같으면 항상 같은 문자열이 되므로
+    system_instruction 맨 앞에 두면 호출 유형과 관계없이 같은 접두어가 됩니다.
+    """
+    lines = [
+        f"# 가치투자 분석 기준서 (점수 규칙 v{plan.version})",
+        "모든 분석과 등급 평가는 아래 공통 기준을 따릅니다. 호출별 지시문과 종목 데이터는 이 기준서 뒤에 주어집니다.",
+        "",
+        "## 지표 정의와 해석",
+    ]
+    lines += [f"- {name}: {text}" for name, text in METRIC_GUIDE.items()]
+    lines.append(f"- {PERCENTILE_GUIDE}")
+    lines.append("")
+    lines += _score_section(plan)
+    lines.append("")
+    lines += _sector_section(plan)
+    lines.append("")
+    lines += _signal_section(plan)
+    return '\n'.join(lines) + '\n' + WRITING_RULES
+
+
+def analysis_guide() -> str:
+    """현재 점수 규칙의 평가 기준서 (규칙 버전이 바뀔 때만 다시 생성)"""
+    global _guide, _guide_version
+    plan = get_scoring_plan()
+    with _guide_lock:
+        if _guide is None or _guide_version != plan.version:
+            _guide, _guide_version = build_analysis_guide(plan), plan.version
+        return _guide
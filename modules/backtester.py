@@ -0,0 +1,240 @@
+import os
+import hashlib
+import logging
+from dataclasses import dataclass, asdict
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from . import batch_analyzer as batch
+from .cache_store import TTLCache, fingerprint
+from .scoring_rules import ScoringPlan, get_scoring_plan
+
+
+@dataclass
+class BacktestResult:
+    """등급 백테스트 결과 (JSON 직렬화 가능, 등급은 높은 등급부터)"""
+    rules_version: str
+    periods: List[str]                 # 리밸런싱 날짜 (ISO)
+    symbols: int                       # 유니버스 종목 수
+    horizon: str                       # 'next_rebalance' 또는 'N_days'
+    periods_per_year: float
+    grades: List[str]
+    grade_stats: Dict[str, Dict]       # 등급별 평균 종목 수, 수익률, 적중률, 회전율
+    universe: Dict                     # 동일가중 유니버스 수익률
+    period_returns: Dict[str, List[Optional[float]]]  # 등급별 기간 수익률 (해당 등급 종목이 없으면 None)
+    period_members: Dict[str, List[int]]              # 등급별 기간 종목 수
+    grade_change_rate: List[Optional[float]]          # 직전 리밸런싱 대비 등급이 바뀐 종목 비율
+    overlapping: bool = False          # 선행 기간이 다음 리밸런싱과 겹침 (누적·연율화 수익률 미산출)
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'BacktestResult':
+        return cls(**data)
+
+
+class GradeBacktester:
+    """
+    규칙 기반 등급(_fallback_investment_grade와 같은 점수 규칙)의 예측력을 과거 데이터로 검증합니다.
+
+    지표 스냅샷을 (리밸런싱 날짜 × 종목) 배열로 펼쳐 모든 날짜의 점수와 등급을 한 번에 계산하고,
+    등급별 선행 수익률·적중률·회전율을 배열 연산으로 집계합니다.
+    결과는 점수 규칙 버전과 입력 데이터 해시별로 캐시됩니다.
+    """
+
+    def __init__(self, plan: Optional[ScoringPlan] = None, cache_ttl: Optional[float] = None):
+        """
+        Args:
+            plan: 점수 규칙 (기본값: config/scoring_rules.json의 현재 규칙)
+            cache_ttl: 결과 캐시 유효 시간(초) (기본값: BACKTEST_CACHE_TTL, 0이면 캐시 비활성화)
+        """
+        self.logger = logging.getLogger(__name__)
+        self._plan = plan
+        if cache_ttl is None:
+            cache_ttl = float(os.getenv('BACKTEST_CACHE_TTL', '604800'))
+        self.cache = TTLCache(
+            'backtests', ttl_seconds=cache_ttl, max_entries=50, persist=True
+        ) if cache_ttl > 0 else None
+
+    @property
+    def plan(self) -> ScoringPlan:
+        return self._plan or get_scoring_plan()
+
+    def run(self, snapshots: pd.DataFrame, prices: pd.DataFrame,
+            horizon_days: Optional[int] = None) -> BacktestResult:
+        """
+        백테스트를 실행합니다.
+
+        Args:
+            snapshots: 지표 스냅샷 (행: 날짜·종목) - 열: date, symbol, [sector], [current_price],
+                       pe_ratio, pb_ratio, dividend_yield, roe, roa, debt_to_equity,
+                       revenue_growth, income_growth, beta (누락 지표는 기본값)
+            prices: 수정 종가 (인덱스: 거래일, 열: 종목)
+            horizon_days: 선행 수익률 기간(거래일). 없으면 다음 리밸런싱 날짜까지
+                          (리밸런싱 간격보다 길면 기간이 겹치므로 평균 수익률만 산출)
+
+        Returns:
+            BacktestResult: 백테스트 결과
+        """
+        try:
+            plan = self.plan
+            key = fingerprint('backtest', plan.version, _frame_digest(snapshots), _frame_digest(prices),
+                              horizon_days)
+            if self.cache is not None:
+                cached = self.cache.get(key)
+                if cached is not None:
+                    self.logger.info(f"백테스트 캐시 사용 (규칙 v{plan.version})")
+                    return BacktestResult.from_dict(cached)
+
+            result = self._run(plan, snapshots, prices, horizon_days)
+            if self.cache is not None:
+                self.cache.set(key, result.to_dict(), tags={'rules_version': plan.version})
+            return result
+
+        except Exception as e:
+            self.logger.error(f"백테스트 중 오류 발생: {str(e)}")
+            raise Exception(f"백테스트 실패: {str(e)}")
+
+    def _run(self, plan: ScoringPlan, snapshots: pd.DataFrame, prices: pd.DataFrame,
+             horizon_days: Optional[int]) -> BacktestResult:
+        dates = pd.DatetimeIndex(pd.to_datetime(snapshots['date']).unique()).sort_values()
+        symbols = pd.Index(sorted(snapshots['symbol'].unique()))
+        t_idx = dates.get_indexer(pd.to_datetime(snapshots['date']))
+        s_idx = symbols.get_indexer(snapshots['symbol'])
+        shape = (len(dates), len(symbols))
+
+        # 리밸런싱 날짜와 선행 기간 끝의 가격 (직전 거래일 가격으로 채움)
+        prices = prices.sort_index().reindex(columns=symbols).ffill()
+        price_values = prices.to_numpy(dtype=np.float64)
+        start_rows = np.searchsorted(prices.index.values, dates.values, side='right') - 1
+        if horizon_days:
+            end_rows = start_rows + horizon_days
+        else:
+            end_rows = np.append(start_rows[1:], -1)  # 마지막 리밸런싱은 선행 기간 없음
+        end_valid = (start_rows >= 0) & (end_rows >= 0) & (end_rows < len(prices)) & (end_rows > start_rows)
+        # 선행 기간이 다음 리밸런싱 이후까지 이어지면 기간 수익률을 복리로 이을 수 없음
+        overlapping = bool(np.any(end_valid[:-1] & (end_rows[:-1] > start_rows[1:])))
+        start_prices = np.full(shape, np.nan)
+        end_prices = np.full(shape, np.nan)
+        start_prices[start_rows >= 0] = price_values[start_rows[start_rows >= 0]]
+        end_prices[end_valid] = price_values[end_rows[end_valid]]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            forward = np.where(start_prices > 0, end_prices / start_prices - 1, np.nan)
+
+        # 스냅샷이 있는 칸만 점수 계산 (날짜 × 종목 전체를 1차원으로 평탄화)
+        present = np.zeros(shape, dtype=bool)
+        present[t_idx, s_idx] = True
+        columns = batch.to_columns(snapshots)
+        if 'current_price' not in snapshots:
+            columns['current_price'] = np.nan_to_num(start_prices[t_idx, s_idx])
+        columns['peg_ratio'] = batch.peg_ratios(columns)
+        target_prices = batch.target_prices(columns)
+        columns['upside_potential'] = batch.upside_potentials(columns['current_price'], target_prices)
+        scores = plan.score(columns)
+
+        # 등급 번호: 0이 최하위 (ScoringPlan.grade와 같은 구간), 스냅샷 없는 칸은 -1
+        grade_index = np.full(shape, -1, dtype=np.intp)
+        grade_index[t_idx, s_idx] = np.searchsorted(plan.grade_thresholds, scores, side='right')
+        labels = plan.grade_labels.tolist()
+
+        rated = present & ~np.isnan(forward)
+        periods_per_year = _periods_per_year(dates, prices.index, horizon_days)
+        universe_count = rated.sum(axis=1)
+        universe_return = np.divide(np.where(rated, forward, 0).sum(axis=1), universe_count,
+                                    out=np.full(len(dates), np.nan), where=universe_count > 0)
+
+        grade_stats, period_returns, period_members = {}, {}, {}
+        for g in reversed(range(len(labels))):
+            members = grade_index == g
+            scored = members & rated
+            count = scored.sum(axis=1)
+            returns = np.divide(np.where(scored, forward, 0).sum(axis=1), count,
+                                out=np.full(len(dates), np.nan), where=count > 0)
+            # 적중률: 같은 기간 유니버스 평균을 상회한 비율
+            beats = scored & (forward > universe_return[:, None])
+            # 회전율: 동일가중 등급 포트폴리오의 0.5 × Σ|w_t - w_{t-1}|
+            size = members.sum(axis=1)
+            weights = np.divide(members, size[:, None], out=np.zeros(shape), where=size[:, None] > 0)
+            turnover = 0.5 * np.abs(np.diff(weights, axis=0)).sum(axis=1)
+            turnover_valid = (size[1:] > 0) & (size[:-1] > 0)
+
+            grade_stats[labels[g]] = {
+                'avg_members': float(size.mean()) if len(size) else 0.0,
+                **_return_stats(returns, universe_return, periods_per_year, overlapping),
+                'hit_rate': float(beats.sum() / scored.sum()) if scored.any() else None,
+                'turnover': float(turnover[turnover_valid].mean()) if turnover_valid.any() else None,
+            }
+            period_returns[labels[g]] = _optional_list(returns)
+            period_members[labels[g]] = size.tolist()
+
+        both = present[1:] & present[:-1]
+        changed = (grade_index[1:] != grade_index[:-1]) & both
+        change_rate = np.divide(changed.sum(axis=1), both.sum(axis=1),
+                                out=np.full(len(dates) - 1, np.nan), where=both.sum(axis=1) > 0)
+
+        return BacktestResult(
+            rules_version=plan.version,
+            periods=[date.date().isoformat() for date in dates],
+            symbols=len(symbols),
+            horizon=f"{horizon_days}_days" if horizon_days else 'next_rebalance',
+            periods_per_year=periods_per_year,
+            grades=list(reversed(labels)),
+            grade_stats=grade_stats,
+            universe=_return_stats(universe_return, universe_return, periods_per_year, overlapping),
+            period_returns=period_returns,
+            period_members=period_members,
+            grade_change_rate=_optional_list(np.concatenate([[np.nan], change_rate])),
+            overlapping=overlapping,
+        )
+
+
+def _frame_digest(frame: pd.DataFrame) -> str:
+    """DataFrame 내용 해시 (캐시 키용)"""
+    digest = hashlib.sha256()
+    digest.update(','.join(map(str, frame.columns)).encode('utf-8'))
+    digest.update(pd.util.hash_pandas_object(frame, index=True).to_numpy().tobytes())
+    return digest.hexdigest()[:32]
+
+
+def _periods_per_year(dates: pd.DatetimeIndex, trading_days: pd.DatetimeIndex,
+                      horizon_days: Optional[int]) -> float:
+    """연간 기간 수 (연율화용)"""
+    if horizon_days:
+        span_years = (trading_days[-1] - trading_days[0]).days / 365.25 if len(trading_days) > 1 else 0
+        trading_per_year = len(trading_days) / span_years if span_years > 0 else 252
+        return float(trading_per_year / horizon_days)
+    if len(dates) < 2:
+        return 1.0
+    return float(365.25 / np.median(np.diff(dates.values).astype('timedelta64[D]').astype(np.float64)))
+
+
+def _return_stats(returns: np.ndarray, universe_return: np.ndarray, periods_per_year: float,
+                  overlapping: bool = False) -> Dict:
+    """
+    기간 수익률 배열의 평균·누적·연율화 수익률과 유니버스 대비 초과 수익률
+    (기간이 겹치면 누적·연율화 수익률은 None)
+    """
+    valid = ~np.isnan(returns)
+    if not valid.any():
+        return {'periods': 0, 'mean_return': None, 'cumulative_return': None,
+                'annualized_return': None, 'excess_return': None}
+    excess = returns[valid] - universe_return[valid]
+    stats = {
+        'periods': int(valid.sum()),
+        'mean_return': float(returns[valid].mean()),
+        'cumulative_return': None,
+        'annualized_return': None,
+        'excess_return': float(np.nanmean(excess)) if excess.size else None,
+    }
+    if not overlapping:
+        growth = float(np.prod(1 + returns[valid]))
+        stats['cumulative_return'] = growth - 1
+        stats['annualized_return'] = float(growth ** (periods_per_year / valid.sum()) - 1) if growth > 0 else -1.0
+    return stats
+
+
+def _optional_list(values: np.ndarray) -> List[Optional[float]]:
+    return [None if np.isnan(value) else value for value in values.tolist()]
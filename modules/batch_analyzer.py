@@ -0,0 +1,94 @@
+from typing import Dict, List, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+from . import valuation_models
+from .risk_metrics import RISK_METRIC_COLUMNS
+from .fundamentals_store import FUNDAMENTAL_COLUMNS, feature_values
+
+# 지표 열과 누락 시 기본값 (ValueAnalyzer의 metrics.get(..., 기본값)과 동일)
+METRIC_DEFAULTS = {
+    'current_price': 0.0,
+    'pe_ratio': 0.0,
+    'pb_ratio': 0.0,
+    'dividend_yield': 0.0,
+    'roe': 0.0,
+    'roa': 0.0,
+    'debt_to_equity': 0.0,
+    'revenue_growth': 0.0,
+    'income_growth': 0.0,
+    'beta': 1.0,
+    'current_ratio': 1.5,
+}
+# 있으면 읽는 선택 열 (없으면 NaN - 점수 규칙에서 조건 불만족)
+OPTIONAL_COLUMNS = RISK_METRIC_COLUMNS + FUNDAMENTAL_COLUMNS
+TEXT_COLUMNS = {'symbol': 'N/A', 'company_name': 'N/A', 'sector': 'Unknown', 'industry': 'Unknown'}
+
+MetricsTable = Union[pd.DataFrame, Dict[str, Sequence], List[Dict]]
+
+
+def to_columns(table: MetricsTable) -> Dict[str, np.ndarray]:
+    """
+    지표 테이블을 열별 배열로 변환합니다.
+
+    Args:
+        table: DataFrame, {열 이름: 값 목록} 딕셔너리, 또는 수집기의 stock_data 딕셔너리 목록
+               (financial_metrics는 평탄화)
+
+    Returns:
+        Dict[str, np.ndarray]: 숫자 열은 float64 (누락값은 기본값), 텍스트 열은 object 배열
+    """
+    if isinstance(table, list):
+        rows = []
+        for stock_data in table:
+            row = dict(stock_data.get('financial_metrics') or {})
+            row.update(feature_values(stock_data.get('fundamentals')))
+            row.update({key: stock_data.get(key) for key in TEXT_COLUMNS})
+            row['current_price'] = stock_data.get('current_price', row.get('current_price'))
+            rows.append(row)
+        frame = pd.DataFrame(rows)
+    else:
+        frame = pd.DataFrame(table)
+
+    columns = {}
+    for name, default in METRIC_DEFAULTS.items():
+        if name in frame:
+            values = pd.to_numeric(frame[name], errors='coerce').to_numpy(dtype=np.float64)
+            columns[name] = np.where(np.isnan(values), default, values)
+        else:
+            columns[name] = np.full(len(frame), default)
+    for name in OPTIONAL_COLUMNS:
+        if name in frame:
+            columns[name] = pd.to_numeric(frame[name], errors='coerce').to_numpy(dtype=np.float64)
+    for name, default in TEXT_COLUMNS.items():
+        if name in frame:
+            columns[name] = frame[name].where(frame[name].notna(), default).to_numpy(dtype=object)
+        else:
+            columns[name] = np.full(len(frame), default, dtype=object)
+    return columns
+
+
+def peg_ratios(columns: Dict[str, np.ndarray]) -> np.ndarray:
+    """PEG 비율 (수익 성장률이 양수인 행만, 나머지는 0)."""
+    growth = columns['income_growth']
+    positive = growth > 0
+    return np.divide(columns['pe_ratio'], growth, out=np.zeros_like(growth), where=positive)
+
+
+def target_prices(columns: Dict[str, np.ndarray]) -> np.ndarray:
+    """
+    PER·PBR·배당 할인 모델 목표가의 중간값을 계산합니다 (현재가의 50%~200%로 제한).
+
+    세 방법 중 유효한 값만 사용하며, 유효한 값이 없으면 현재가를 반환합니다.
+    (값이 1~2개일 때 중간값은 평균과 같으므로 단일 종목 계산과 결과가 같습니다)
+    """
+    return valuation_models.target_prices(
+        columns['current_price'], columns['pe_ratio'], columns['pb_ratio'],
+        columns['dividend_yield'], columns['income_growth']
+    )
+
+
+def upside_potentials(price: np.ndarray, target: np.ndarray) -> np.ndarray:
+    """상승 여력 (%) - 현재가가 0 이하이면 0."""
+    return np.divide(target - price, price, out=np.zeros_like(price), where=price > 0) * 100
@@ -0,0 +1,207 @@
+import os
+import json
+import time
+import atexit
+import hashlib
+import logging
+import threading
+import weakref
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+
+def fingerprint(*parts: Any) -> str:
+    """JSON 직렬화 가능한 값들로부터 안정적인 해시 키를 생성합니다."""
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:32]
+
+
+# 변경 사항을 종료 시 저장할 파일 캐시 목록 (flush() 메서드를 가진 객체)
+_persisted_caches: weakref.WeakSet = weakref.WeakSet()
+
+
+def register_flush(target):
+    """프로세스 종료 시 target.flush()를 호출하도록 등록합니다."""
+    _persisted_caches.add(target)
+
+
+def flush_all():
+    """저장되지 않은 변경이 있는 모든 파일 캐시를 저장합니다 (프로세스 종료 시 자동 호출)."""
+    for cache in list(_persisted_caches):
+        cache.flush()
+
+
+atexit.register(flush_all)
+
+
+class TTLCache:
+    """
+    만료 시간이 있는 스레드 안전 캐시입니다.
+
+    persist=True이면 CACHE_DIR/{name}.json 파일에 저장되어
+    프로세스(CLI 실행)가 바뀌어도 재사용됩니다. 값은 JSON 직렬화 가능해야 합니다.
+    파일은 변경마다 다시 쓰지 않고 flush_interval마다, flush() 호출 시, 프로세스 종료 시 저장하며,
+    저장할 수 없는 경로(읽기 전용 파일 시스템 등)이면 메모리 캐시로만 사용합니다.
+    """
+
+    def __init__(self, name: str, ttl_seconds: float = 86400, max_entries: int = 1000,
+                 persist: bool = False, cache_dir: Optional[str] = None,
+                 flush_interval: Optional[float] = None):
+        """
+        Args:
+            name: 캐시 이름 (저장 파일 이름)
+            ttl_seconds: 기본 만료 시간 (초)
+            max_entries: 최대 항목 수 (초과 시 만료가 가장 빠른 항목부터 제거)
+            persist: CACHE_DIR/{name}.json 파일 저장 여부
+            cache_dir: 저장 경로 (기본값: CACHE_DIR)
+            flush_interval: 변경 후 파일 저장 최소 간격(초) (기본값: CACHE_FLUSH_INTERVAL, 30 - 0이면 변경마다 저장)
+        """
+        self.logger = logging.getLogger(__name__)
+        self.name = name
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict] = {}
+        self.hits = 0
+        self.misses = 0
+
+        self.path = None
+        self.flush_interval = (
+            float(os.getenv('CACHE_FLUSH_INTERVAL', '30')) if flush_interval is None else flush_interval
+        )
+        self._dirty = False
+        self._flushed_at = time.time()
+        if persist:
+            self.path = Path(cache_dir or os.getenv('CACHE_DIR', 'cache')) / f"{name}.json"
+            self._load()
+            register_flush(self)
+
+    def get(self, key: str) -> Optional[Any]:
+        """키에 해당하는 값을 반환합니다 (없거나 만료되면 None)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry['expires_at'] < time.time():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry['value']
+
+    def set(self, key: str, value: Any, ttl_seconds: Optional[float] = None,
+            tags: Optional[Dict[str, Any]] = None):
+        """
+        값을 저장합니다.
+
+        Args:
+            key: 캐시 키
+            value: 저장할 값
+            ttl_seconds: 만료 시간 (기본값: 캐시 설정)
+            tags: 무효화 조건 검사용 메타데이터 (예: {'symbol': 'AAPL'})
+        """
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        with self._lock:
+            self._entries[key] = {
+                'value': value,
+                'expires_at': time.time() + ttl,
+                'tags': tags or {},
+            }
+            if len(self._entries) > self.max_entries:
+                # 만료가 가장 빠른 항목부터 제거
+                overflow = len(self._entries) - self.max_entries
+                for old_key in sorted(self._entries, key=lambda k: self._entries[k]['expires_at'])[:overflow]:
+                    del self._entries[old_key]
+            self._mark_dirty()
+
+    def get_or_compute(self, key: str, compute: Callable[[], Any], **set_kwargs) -> Any:
+        """캐시에 값이 없으면 compute()로 계산하여 저장한 뒤 반환합니다."""
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.set(key, value, **set_kwargs)
+        return value
+
+    def delete(self, key: str):
+        """키를 삭제합니다."""
+        with self._lock:
+            if self._entries.pop(key, None) is not None:
+                self._mark_dirty()
+
+    def invalidate(self, predicate: Callable[[Dict[str, Any]], bool]) -> int:
+        """태그가 조건을 만족하는 항목을 모두 삭제하고 삭제 개수를 반환합니다."""
+        with self._lock:
+            keys = [key for key, entry in self._entries.items() if predicate(entry['tags'])]
+            for key in keys:
+                del self._entries[key]
+            if keys:
+                self._mark_dirty()
+        return len(keys)
+
+    def keys(self) -> List[str]:
+        """만료되지 않은 키 목록을 반환합니다."""
+        now = time.time()
+        with self._lock:
+            return [key for key, entry in self._entries.items() if entry['expires_at'] >= now]
+
+    def clear(self):
+        """모든 항목을 삭제합니다."""
+        with self._lock:
+            self._entries.clear()
+            self._mark_dirty()
+
+    def flush(self):
+        """저장되지 않은 변경을 파일에 저장합니다."""
+        with self._lock:
+            if self._dirty:
+                self._save()
+
+    def stats(self) -> Dict:
+        """캐시 적중 통계를 반환합니다."""
+        with self._lock:
+            size = len(self._entries)
+        total = self.hits + self.misses
+        return {
+            'name': self.name,
+            'size': size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+        }
+
+    def _load(self):
+        try:
+            if self.path and self.path.exists():
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    entries = json.load(f)
+                now = time.time()
+                self._entries = {k: v for k, v in entries.items() if v.get('expires_at', 0) >= now}
+        except Exception as e:
+            self.logger.warning(f"캐시 로드 실패 ({self.name}): {str(e)}")
+            self._entries = {}
+
+    def _mark_dirty(self):
+        """잠금을 보유한 상태에서 호출됩니다. 마지막 저장 후 flush_interval이 지났으면 저장합니다."""
+        if not self.path:
+            return
+        self._dirty = True
+        if time.time() - self._flushed_at >= self.flush_interval:
+            self._save()
+
+    def _save(self):
+        """잠금을 보유한 상태에서 호출됩니다."""
+        if not self.path:
+            return
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix('.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._entries, f, ensure_ascii=False, default=str)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            # 읽기 전용 파일 시스템(서버리스 등) - 이후 저장을 시도하지 않음
+            self.logger.warning(f"캐시 저장 불가 ({self.name}), 메모리 캐시로만 사용: {str(e)}")
+            self.path = None
+        except Exception as e:
+            self.logger.warning(f"캐시 저장 실패 ({self.name}): {str(e)}")
+        self._dirty = False
+        self._flushed_at = time.time()
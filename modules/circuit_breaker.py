@@ -0,0 +1,148 @@
+import time
+import logging
+import threading
+from collections import deque
+from typing import Dict
+
+
+class CircuitOpenError(Exception):
+    """회로가 열려 있어 API 호출을 즉시 차단했을 때 발생합니다."""
+
+
+class CircuitBreaker:
+    """
+    최근 호출의 오류율·지연 초과율을 기준으로 열리는 회로 차단기입니다.
+
+    - closed: 정상 호출. 최근 window_size건 중 실패율 또는 지연 초과율이 임계값 이상이면 open
+    - open: reset_timeout 동안 모든 호출을 즉시 차단 (호출자는 즉시 fallback 사용)
+    - half_open: 시험 호출 1건만 허용. 성공 시 closed, 실패 시 다시 open
+      (시험 호출이 결과를 기록하지 못하고 trial_timeout이 지나면 새 시험 호출 허용)
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str = "gemini", window_size: int = 20, min_calls: int = 5,
+                 failure_rate_threshold: float = 0.5, slow_call_ms: float = 20000,
+                 slow_rate_threshold: float = 0.5, reset_timeout: float = 30.0,
+                 trial_timeout: float = 180.0):
+        self.logger = logging.getLogger(__name__)
+        self.name = name
+        self.min_calls = min_calls
+        self.failure_rate_threshold = failure_rate_threshold
+        self.slow_call_ms = slow_call_ms
+        self.slow_rate_threshold = slow_rate_threshold
+        self.reset_timeout = reset_timeout
+        self.trial_timeout = trial_timeout
+
+        self._lock = threading.Lock()
+        self._outcomes = deque(maxlen=window_size)  # (실패 여부, 지연 초과 여부)
+        self._state = self.CLOSED
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._trial_started_at = 0.0
+        self._rejected = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._refresh_state()
+            return self._state
+
+    def _refresh_state(self):
+        """잠금을 보유한 상태에서 호출됩니다."""
+        if self._state == self.OPEN and time.time() - self._opened_at >= self.reset_timeout:
+            self._state = self.HALF_OPEN
+            self._trial_in_flight = False
+        elif (self._state == self.HALF_OPEN and self._trial_in_flight
+              and time.time() - self._trial_started_at >= self.trial_timeout):
+            self.logger.warning(f"회로 차단기 시험 호출 시간 초과 ({self.name}), 새 시험 호출 허용")
+            self._trial_in_flight = False
+
+    def allow_request(self) -> bool:
+        """호출 허용 여부를 반환합니다 (half_open에서는 시험 호출 1건만 허용)."""
+        with self._lock:
+            self._refresh_state()
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                self._trial_started_at = time.time()
+                return True
+            self._rejected += 1
+            return False
+
+    def check(self):
+        """호출이 허용되지 않으면 CircuitOpenError를 발생시킵니다."""
+        if not self.allow_request():
+            raise CircuitOpenError(f"{self.name} 회로 차단 중 (API 장애 감지, {self.reset_timeout:.0f}초 후 재시도)")
+
+    def record_success(self, latency_ms: float):
+        """성공한 호출을 기록합니다 (지연 초과 여부 포함)."""
+        slow = latency_ms >= self.slow_call_ms
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                if slow:
+                    self._open("시험 호출 지연 초과")
+                else:
+                    self._close()
+                return
+            self._outcomes.append((False, slow))
+            self._evaluate()
+
+    def record_failure(self):
+        """실패한 호출을 기록합니다."""
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                self._open("시험 호출 실패")
+                return
+            self._outcomes.append((True, False))
+            self._evaluate()
+
+    def release_trial(self):
+        """
+        API 호출 없이 끝난 시험 호출(스케줄러 대기 시간 초과 등)을 반납합니다.
+        성공·실패로 집계하지 않고 다음 호출이 다시 시험 호출이 됩니다.
+        """
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                self._trial_in_flight = False
+
+    def _evaluate(self):
+        if self._state != self.CLOSED or len(self._outcomes) < self.min_calls:
+            return
+        total = len(self._outcomes)
+        failure_rate = sum(1 for failed, _ in self._outcomes if failed) / total
+        slow_rate = sum(1 for _, slow in self._outcomes if slow) / total
+        if failure_rate >= self.failure_rate_threshold:
+            self._open(f"실패율 {failure_rate:.0%}")
+        elif slow_rate >= self.slow_rate_threshold:
+            self._open(f"지연 초과율 {slow_rate:.0%}")
+
+    def _open(self, reason: str):
+        self._state = self.OPEN
+        self._opened_at = time.time()
+        self._trial_in_flight = False
+        self.logger.warning(f"회로 차단기 open ({self.name}): {reason}")
+
+    def _close(self):
+        self._state = self.CLOSED
+        self._outcomes.clear()
+        self._trial_in_flight = False
+        self.logger.info(f"회로 차단기 closed ({self.name})")
+
+    def snapshot(self) -> Dict:
+        """현재 상태와 최근 호출 통계를 반환합니다."""
+        with self._lock:
+            self._refresh_state()
+            total = len(self._outcomes)
+            return {
+                'name': self.name,
+                'state': self._state,
+                'recent_calls': total,
+                'failure_rate': sum(1 for failed, _ in self._outcomes if failed) / total if total else 0.0,
+                'slow_rate': sum(1 for _, slow in self._outcomes if slow) / total if total else 0.0,
+                'rejected_calls': self._rejected,
+                'reset_timeout': self.reset_timeout,
+            }
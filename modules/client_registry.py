@@ -0,0 +1,97 @@
+import os
+import hashlib
+import logging
+import threading
+from typing import Dict, Optional, Tuple
+
+import httpx
+from google import genai
+from google.genai import types
+
+logger = logging.getLogger(__name__)
+
+try:
+    import h2  # noqa: F401  (httpx HTTP/2 지원에 필요)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+_clients: Dict[Tuple, genai.Client] = {}
+_lock = threading.Lock()
+
+
+def _client_config(base_url: Optional[str]) -> Tuple[Optional[str], int, float, bool]:
+    """환경 변수에서 연결 풀 설정을 읽습니다: (base_url, 풀 크기, 타임아웃 초, HTTP/2 사용 여부)."""
+    pool_size = int(os.getenv('GEMINI_POOL_SIZE', '20'))
+    timeout = float(os.getenv('GEMINI_TIMEOUT', '120'))
+    http2 = HTTP2_AVAILABLE and os.getenv('GEMINI_HTTP2', 'true').lower() == 'true'
+    return base_url, pool_size, timeout, http2
+
+
+def get_genai_client(api_key: str, base_url: Optional[str] = None) -> genai.Client:
+    """
+    설정별로 하나의 genai.Client를 프로세스 전역에서 재사용합니다.
+
+    각 클라이언트는 keep-alive 연결 풀(GEMINI_POOL_SIZE)과 요청 타임아웃(GEMINI_TIMEOUT)을 가지며,
+    h2 패키지가 설치되어 있으면 HTTP/2를 사용합니다. 따라서 요청마다 TCP/TLS 연결을 새로 맺지 않습니다.
+
+    Args:
+        api_key: Google API 키
+        base_url: API 주소 재지정 (예: 로컬 대역 서버)
+
+    Returns:
+        genai.Client: 공유 클라이언트
+    """
+    base_url, pool_size, timeout, http2 = _client_config(base_url)
+    key = (hashlib.sha256(api_key.encode('utf-8')).hexdigest()[:16], base_url, pool_size, timeout, http2)
+
+    with _lock:
+        client = _clients.get(key)
+        if client is not None:
+            return client
+
+        limits = httpx.Limits(
+            max_connections=pool_size,
+            max_keepalive_connections=pool_size,
+            keepalive_expiry=float(os.getenv('GEMINI_KEEPALIVE_EXPIRY', '60'))
+        )
+        http_options = types.HttpOptions(
+            base_url=base_url,
+            timeout=int(timeout * 1000),  # HttpOptions.timeout은 밀리초 단위
+            client_args={'limits': limits, 'http2': http2},
+            async_client_args={'limits': limits, 'http2': http2},
+        )
+        client = genai.Client(api_key=api_key, http_options=http_options)
+        _clients[key] = client
+
+    logger.info(
+        f"Gemini HTTP 클라이언트 생성 (pool={pool_size}, timeout={timeout:.0f}s, "
+        f"http2={http2}, base_url={base_url or 'default'})"
+    )
+    return client
+
+
+def registry_stats() -> Dict:
+    """공유 클라이언트 수와 연결 설정을 반환합니다."""
+    with _lock:
+        count = len(_clients)
+    _, pool_size, timeout, http2 = _client_config(None)
+    return {
+        'clients': count,
+        'pool_size': pool_size,
+        'timeout_seconds': timeout,
+        'http2': http2,
+        'http2_available': HTTP2_AVAILABLE,
+    }
+
+
+def close_clients():
+    """공유 클라이언트의 연결 풀을 모두 닫습니다 (프로세스 종료 시 호출)."""
+    with _lock:
+        clients = list(_clients.values())
+        _clients.clear()
+    for client in clients:
+        try:
+            client.close()
+        except Exception as e:
+            logger.warning(f"Gemini HTTP 클라이언트 종료 실패: {str(e)}")
@@ -0,0 +1,275 @@
+import os
+import math
+import logging
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from google.genai import types
+
+from .cache_store import TTLCache, fingerprint
+
+
+class HierarchicalComparator:
+    """
+    대규모 종목 비교를 위한 map-reduce 비교 분석기입니다.
+
+    1. map: 종목(또는 섹터)별 요약을 병렬로 생성하고 입력 데이터 지문으로 캐시합니다.
+    2. reduce: 요약이 reduce_group_size를 넘으면 그룹 단위 중간 요약을 반복 생성한 뒤
+       최종 비교 분석을 한 번 요청합니다. 최종 프롬프트에는 그룹 요약과 시가총액 상위
+       reduce_table_rows개 종목의 지표표만 넣으므로 크기는 종목 수와 무관하게 제한됩니다.
+    """
+
+    MAP_PROMPT = """
+당신은 가치투자 분석가입니다. 아래 데이터만을 근거로 비교 분석에 쓰일 요약을 작성해주세요.
+
+형식 (최대 4줄, 각 줄 한 문장):
+- 밸류에이션:
+- 수익성/성장성:
+- 재무 안정성:
+- 핵심 강점과 위험:
+
+{data}
+"""
+
+    GROUP_PROMPT = """
+다음은 여러 종목의 가치투자 요약입니다. 종목별 핵심 차이를 유지한 채
+최종 비교에 필요한 내용만 남겨 그룹 요약을 작성해주세요.
+각 종목은 한 줄로, 그룹 내 상대적 매력도 순서로 정렬해주세요.
+
+{summaries}
+"""
+
+    # 요약 캐시 키 지표와 양자화 폭 - 가격·시총·거래량 등 시세 항목은 제외해 틱 변화로 요약이 무효화되지 않도록 함
+    # (PER·PBR은 가격에 따라 움직이므로 구간으로만 반영, 값은 ValueAnalyzer.GRADE_CACHE_TOLERANCES와 같은 폭)
+    SUMMARY_KEY_TOLERANCES = {
+        'pe_ratio': 0.5,
+        'pb_ratio': 0.1,
+        'roe': 0.005,
+        'roa': 0.005,
+        'debt_to_equity': 0.05,
+        'dividend_yield': 0.001,
+        'revenue_growth': 1.0,
+        'income_growth': 1.0,
+        'beta': 0.05,
+    }
+    # 금액 항목은 로그 스케일 상대 구간 (±5%)
+    SUMMARY_KEY_RELATIVE = ['cash_and_equivalents', 'total_debt', 'free_cash_flow', 'shares_outstanding']
+    SUMMARY_KEY_RELATIVE_TOLERANCE = 0.05
+
+    REDUCE_PROMPT = """
+다음 {count}개 종목({symbols})에 대한 가치투자 관점에서의 비교 분석을 수행해주세요.
+
+**분석 요청사항:**
+1. 각 종목(또는 그룹)의 가치투자 매력도 평가
+2. 재무 건전성 비교
+3. 성장성 및 수익성 분석
+4. 위험 요인 분석
+5. 포트폴리오 구성 시 고려사항
+6. 최종 투자 우선순위 및 이유
+
+**핵심 지표표{table_scope}:**
+{table}
+
+**종목/그룹별 요약:**
+{summaries}
+"""
+
+    def __init__(self, gemini_client, cache: Optional[TTLCache] = None,
+                 max_workers: Optional[int] = None, reduce_group_size: int = 20,
+                 summary_max_tokens: int = 400, reduce_table_rows: Optional[int] = None):
+        self.logger = logging.getLogger(__name__)
+        self.gemini_client = gemini_client
+        self.cache = cache or TTLCache(
+            'comparison_summaries',
+            ttl_seconds=float(os.getenv('COMPARISON_SUMMARY_TTL', '86400')),
+            max_entries=5000,
+            persist=True
+        )
+        self.max_workers = max_workers or int(os.getenv('COMPARISON_MAP_WORKERS', '8'))
+        self.reduce_group_size = reduce_group_size
+        self.summary_max_tokens = summary_max_tokens
+        # 최종 프롬프트 지표표 최대 행 수 (시가총액 상위)
+        self.reduce_table_rows = reduce_table_rows or int(os.getenv('COMPARISON_REDUCE_TABLE_ROWS', '20'))
+
+    def _summary_config(self) -> types.GenerateContentConfig:
+        # 모델 등급과 사고 예산은 comparison_map/comparison_group 라우팅 정책을 따름
+        return types.GenerateContentConfig(
+            temperature=0.3,
+            max_output_tokens=self.summary_max_tokens
+        )
+
+    def _summarize(self, cache_key: str, prompt: str, endpoint: str,
+                   symbol: Optional[str] = None) -> str:
+        """캐시를 확인한 뒤 요약을 생성합니다."""
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        response = self.gemini_client._generate(
+            prompt, self._summary_config(), endpoint=endpoint, symbol=symbol
+        )
+        if not response.text:
+            raise ValueError("AI로부터 요약 응답을 받지 못했습니다.")
+
+        summary = response.text.strip()
+        self.cache.set(cache_key, summary, tags={'symbol': symbol} if symbol else None)
+        return summary
+
+    def _summary_key_values(self, data: Dict) -> Dict:
+        """요약 캐시 키용 펀더멘털 구간 번호 (시세 항목 제외)"""
+        metrics = data.get('financial_metrics', {})
+        values = {}
+        for key, tolerance in self.SUMMARY_KEY_TOLERANCES.items():
+            value = metrics.get(key)
+            valid = isinstance(value, (int, float)) and not math.isnan(value)
+            values[key] = round(value / (2 * tolerance)) if valid else None
+        step = math.log1p(2 * self.SUMMARY_KEY_RELATIVE_TOLERANCE)
+        for key in self.SUMMARY_KEY_RELATIVE:
+            value = metrics.get(key)
+            valid = isinstance(value, (int, float)) and not math.isnan(value) and value != 0
+            values[key] = (value > 0, round(math.log(abs(value)) / step)) if valid else None
+        return values
+
+    def _map_units(self, stocks_data: Dict[str, Dict], group_by: str) -> List[Tuple[str, str, str, Optional[str]]]:
+        """map 단위별 (라벨, 캐시 키, 프롬프트, 종목)을 생성합니다."""
+        client = self.gemini_client
+        units = []
+
+        if group_by == "sector":
+            groups: Dict[str, Dict[str, Dict]] = {}
+            for symbol, data in stocks_data.items():
+                groups.setdefault(data.get('sector') or 'Unknown', {})[symbol] = data
+            for sector, group in sorted(groups.items()):
+                table = client._format_stocks_table(group)
+                label = f"{sector} ({', '.join(group.keys())})"
+                key = fingerprint('sector_summary', {
+                    symbol: self._summary_key_values(data) for symbol, data in group.items()
+                })
+                units.append((label, key, self.MAP_PROMPT.format(data=table), None))
+        else:
+            for symbol, data in stocks_data.items():
+                table = client._format_stocks_table({symbol: data})
+                key = fingerprint('symbol_summary', symbol, self._summary_key_values(data))
+                units.append((symbol, key, self.MAP_PROMPT.format(data=table), symbol))
+
+        return units
+
+    def summarize(self, stocks_data: Dict[str, Dict], group_by: str = "symbol") -> Dict[str, str]:
+        """
+        종목 또는 섹터별 요약을 병렬로 생성합니다 (캐시된 요약은 재사용).
+
+        Args:
+            stocks_data: 종목별 데이터 딕셔너리
+            group_by: "symbol" 또는 "sector"
+
+        Returns:
+            Dict: 라벨별 요약
+        """
+        units = self._map_units(stocks_data, group_by)
+        summaries: Dict[str, str] = {}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            # 호출자의 우선순위(interactive/batch)를 작업 스레드로 전달
+            futures = {
+                label: executor.submit(
+                    contextvars.copy_context().run, self._summarize, key, prompt, "comparison_map", symbol
+                )
+                for label, key, prompt, symbol in units
+            }
+            for label, future in futures.items():
+                try:
+                    summaries[label] = future.result()
+                except Exception as e:
+                    self.logger.warning(f"{label} 요약 실패: {str(e)}")
+                    summaries[label] = "요약 실패 (지표표 참고)"
+
+        return summaries
+
+    def _reduce_groups(self, summaries: Dict[str, str]) -> Dict[str, str]:
+        """요약 수가 reduce_group_size 이하가 될 때까지 그룹 단위 중간 요약을 반복합니다."""
+        level = 0
+        while len(summaries) > self.reduce_group_size:
+            level += 1
+            labels = list(summaries.keys())
+            chunks = [labels[i:i + self.reduce_group_size]
+                      for i in range(0, len(labels), self.reduce_group_size)]
+
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                futures = {}
+                for chunk in chunks:
+                    text = "\n\n".join(f"[{label}]\n{summaries[label]}" for label in chunk)
+                    key = fingerprint('group_summary', text)
+                    group_label = f"그룹 {level}-{len(futures) + 1} ({', '.join(chunk)})"
+                    futures[group_label] = executor.submit(
+                        contextvars.copy_context().run,
+                        self._summarize, key, self.GROUP_PROMPT.format(summaries=text), "comparison_group"
+                    )
+                summaries = {label: future.result() for label, future in futures.items()}
+
+        return summaries
+
+    def _top_symbols(self, stocks_data: Dict[str, Dict]) -> List[str]:
+        """최종 지표표에 넣을 종목 (시가총액 상위 reduce_table_rows개, 입력 순서 유지)"""
+        symbols = list(stocks_data.keys())
+        if len(symbols) <= self.reduce_table_rows:
+            return symbols
+
+        def market_cap(symbol: str) -> float:
+            data = stocks_data[symbol]
+            value = data.get('market_cap', data.get('financial_metrics', {}).get('market_cap'))
+            return float(value) if isinstance(value, (int, float)) else 0.0
+
+        top = set(sorted(symbols, key=market_cap, reverse=True)[:self.reduce_table_rows])
+        return [symbol for symbol in symbols if symbol in top]
+
+    def compare(self, stocks_data: Dict[str, Dict], custom_prompt: Optional[str] = None,
+                group_by: str = "symbol") -> str:
+        """
+        map-reduce 방식으로 비교 분석을 수행합니다.
+
+        Args:
+            stocks_data: 종목별 데이터 딕셔너리
+            custom_prompt: 사용자 지정 프롬프트 (REDUCE_PROMPT의 분석 요청 대체)
+            group_by: map 단위 ("symbol" 또는 "sector")
+
+        Returns:
+            str: 비교 분석 보고서
+        """
+        symbols = list(stocks_data.keys())
+        print(f"🔄 계층적 비교 분석 중 ({len(symbols)}개 종목, 단위: {group_by})...")
+
+        summaries = self._reduce_groups(self.summarize(stocks_data, group_by=group_by))
+
+        # 최종 지표표는 핵심 섹션과 시가총액 상위 종목만 포함하여 크기를 제한
+        top_symbols = self._top_symbols(stocks_data)
+        table = self.gemini_client._format_stocks_table(
+            {symbol: stocks_data[symbol] for symbol in top_symbols},
+            exclude_sections=list(self.gemini_client.OPTIONAL_SECTIONS)
+        )
+        table_scope = f" (시가총액 상위 {len(top_symbols)}개)" if len(top_symbols) < len(symbols) else ""
+        summaries_text = "\n\n".join(f"[{label}]\n{summary}" for label, summary in summaries.items())
+        symbol_list = ', '.join(symbols[:self.reduce_table_rows])
+        if len(symbols) > self.reduce_table_rows:
+            symbol_list += f" 외 {len(symbols) - self.reduce_table_rows}개"
+
+        prompt = self.REDUCE_PROMPT.format(
+            count=len(symbols), symbols=symbol_list, table_scope=table_scope,
+            table=table, summaries=summaries_text
+        )
+        if custom_prompt:
+            prompt = (f"{custom_prompt}\n\n**핵심 지표표{table_scope}:**\n{table}"
+                      f"\n\n**종목/그룹별 요약:**\n{summaries_text}")
+
+        config = types.GenerateContentConfig(
+            temperature=self.gemini_client.temperature,
+            max_output_tokens=self.gemini_client.max_tokens * 2
+        )
+
+        response = self.gemini_client._generate(prompt, config, endpoint="comparison_reduce")
+        if not response.text:
+            raise ValueError("AI로부터 응답을 받지 못했습니다.")
+
+        print(f"✅ 계층적 비교 분석 완료 (요약 캐시: {self.cache.stats()['hits']}회 재사용)")
+
+        return response.text
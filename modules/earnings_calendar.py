@@ -0,0 +1,201 @@
+import os
+import csv
+import json
+import time
+import logging
+import threading
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional
+
+import pandas as pd
+
+from .cache_store import TTLCache
+
+
+def yfinance_next_earnings(symbol: str) -> Optional[date]:
+    """yfinance 실적 발표 일정에서 오늘 이후 가장 가까운 실적 발표일 (없으면 None)"""
+    import yfinance as yf
+
+    calendar = yf.Ticker(symbol).calendar
+    if isinstance(calendar, pd.DataFrame):  # 구버전: 'Earnings Date' 행
+        values = calendar.loc['Earnings Date'].tolist() if 'Earnings Date' in calendar.index else []
+    elif isinstance(calendar, dict):
+        values = calendar.get('Earnings Date') or []
+        values = values if isinstance(values, (list, tuple)) else [values]
+    else:
+        values = []
+
+    today = date.today()
+    dates = sorted(pd.Timestamp(value).date() for value in values if value is not None and not pd.isna(value))
+    upcoming = [day for day in dates if day >= today]
+    return upcoming[0] if upcoming else None
+
+
+class EarningsCalendar:
+    """
+    종목별 다음 실적 발표(공시) 일정을 추적해 재무 데이터 캐시의 유효 기한을 정합니다.
+
+    재무제표와 그로부터 파생된 지표·AI 분석은 다음 실적 발표일까지 그대로 유효하며,
+    발표일이 지나면(공시 반영 지연 EARNINGS_REFRESH_LAG_DAYS 포함) 만료되어 다시 수집합니다.
+    일정은 로컬 달력 파일(EARNINGS_CALENDAR_FILE)을 먼저 사용하고, 없으면 yfinance에서 조회합니다.
+    """
+
+    def __init__(self, lookup: Optional[Callable[[str], Optional[date]]] = None,
+                 calendar_file: Optional[str] = None, refresh_lag_days: Optional[int] = None,
+                 fallback_ttl: Optional[float] = None, max_horizon_days: Optional[int] = None):
+        """
+        Args:
+            lookup: 종목의 다음 실적 발표일 조회 함수 (기본값: yfinance_next_earnings)
+            calendar_file: 로컬 달력 파일 - JSON {"AAPL": "2025-01-30"} 또는 CSV (symbol,date)
+                           (기본값: EARNINGS_CALENDAR_FILE)
+            refresh_lag_days: 발표일 이후 재수집까지 대기 일수 (기본값: EARNINGS_REFRESH_LAG_DAYS, 1)
+            fallback_ttl: 일정을 알 수 없을 때의 유효 시간(초) (기본값: EARNINGS_FALLBACK_TTL, 604800)
+            max_horizon_days: 유효 기한 상한 일수 - 분기 실적을 놓치지 않도록 (기본값: EARNINGS_MAX_HORIZON_DAYS, 100)
+        """
+        self.logger = logging.getLogger(__name__)
+        self.lookup = lookup or yfinance_next_earnings
+        if refresh_lag_days is None:
+            refresh_lag_days = int(os.getenv('EARNINGS_REFRESH_LAG_DAYS', '1'))
+        self.refresh_lag = timedelta(days=refresh_lag_days)
+        self.fallback_ttl = fallback_ttl or float(os.getenv('EARNINGS_FALLBACK_TTL', '604800'))
+        self.max_horizon = timedelta(days=max_horizon_days or int(os.getenv('EARNINGS_MAX_HORIZON_DAYS', '100')))
+        self.calendar_file = calendar_file or os.getenv('EARNINGS_CALENDAR_FILE')
+        self._file_dates = self._load_calendar_file(self.calendar_file)
+        # 기한이 지난 뒤에도 due_symbols()로 찾을 수 있도록 대체 유효 시간만큼 더 보관
+        self.cache = TTLCache(
+            'earnings_calendar', ttl_seconds=self.fallback_ttl, max_entries=5000, persist=True
+        )
+        self._lock = threading.Lock()
+
+    def _load_calendar_file(self, path: Optional[str]) -> Dict[str, List[date]]:
+        """로컬 달력 파일을 종목별 발표일 목록으로 읽습니다 (실패하면 빈 달력)."""
+        if not path:
+            return {}
+        dates: Dict[str, List[date]] = {}
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                if Path(path).suffix.lower() == '.json':
+                    rows = [
+                        (symbol, value)
+                        for symbol, values in json.load(f).items()
+                        for value in (values if isinstance(values, list) else [values])
+                    ]
+                else:
+                    rows = [(row['symbol'], row['date']) for row in csv.DictReader(f)]
+            for symbol, value in rows:
+                dates.setdefault(symbol.strip().upper(), []).append(date.fromisoformat(str(value).strip()[:10]))
+        except Exception as e:
+            self.logger.warning(f"실적 발표 달력 파일 로드 실패 ({path}): {str(e)}")
+            return {}
+        return {symbol: sorted(values) for symbol, values in dates.items()}
+
+    def _find_next_date(self, symbol: str):
+        """(다음 발표일, 출처)를 조회합니다 - 로컬 달력 우선."""
+        today = date.today()
+        upcoming = [day for day in self._file_dates.get(symbol.upper(), []) if day >= today]
+        if upcoming:
+            return upcoming[0], 'file'
+        try:
+            next_date = self.lookup(symbol)
+            return next_date, ('yfinance' if next_date else None)
+        except Exception as e:
+            self.logger.warning(f"{symbol} 실적 발표 일정 조회 실패: {str(e)}")
+            return None, None
+
+    def entry(self, symbol: str, lookup: bool = True) -> Optional[Dict]:
+        """
+        종목의 추적 정보를 반환합니다. 기한이 지났거나 없으면 다시 조회합니다 (lookup=False면 조회하지 않고 None).
+
+        Returns:
+            Optional[Dict]: next_date (ISO, 모르면 None), source, refresh_at (재수집 시각, epoch 초), tracked_at
+        """
+        with self._lock:
+            entry = self.cache.get(symbol)
+        if entry is not None and entry['refresh_at'] > time.time():
+            return entry
+        if not lookup:
+            return None
+
+        # 네트워크 조회는 잠금 밖에서 (다른 종목 조회·due_symbols를 막지 않음)
+        next_date, source = self._find_next_date(symbol)
+        with self._lock:
+            entry = self.cache.get(symbol)
+            if entry is not None and entry['refresh_at'] > time.time():
+                return entry  # 그사이 다른 스레드가 조회한 결과
+            now = datetime.now()
+            if next_date is not None:
+                refresh_at = datetime.combine(next_date + self.refresh_lag, datetime.min.time())
+                refresh_at = min(max(refresh_at, now), now + self.max_horizon)
+            else:
+                refresh_at = now + timedelta(seconds=self.fallback_ttl)
+            entry = {
+                'next_date': next_date.isoformat() if next_date else None,
+                'source': source,
+                'refresh_at': refresh_at.timestamp(),
+                'tracked_at': now.timestamp(),
+            }
+            self.cache.set(
+                symbol, entry,
+                ttl_seconds=refresh_at.timestamp() - now.timestamp() + self.fallback_ttl,
+                tags={'symbol': symbol}
+            )
+            return entry
+
+    def next_date(self, symbol: str) -> Optional[date]:
+        """다음 실적 발표일 (모르면 None)"""
+        entry = self.entry(symbol)
+        return date.fromisoformat(entry['next_date']) if entry and entry['next_date'] else None
+
+    def ttl_seconds(self, symbol: str, lookup: bool = True) -> Optional[float]:
+        """
+        재무 데이터 캐시 유효 시간(초) - 다음 실적 발표 반영 시각까지 (최소 1분).
+        lookup=False이고 추적 중이 아니면 None.
+        """
+        entry = self.entry(symbol, lookup=lookup)
+        if entry is None:
+            return None
+        return max(entry['refresh_at'] - time.time(), 60.0)
+
+    def due_symbols(self, symbols: Optional[Iterable[str]] = None) -> List[str]:
+        """
+        실적 발표 반영 시각이 지나 재수집해야 하는 추적 종목 (symbols를 주면 그 안에서만).
+        """
+        now = time.time()
+        candidates = list(symbols) if symbols is not None else self.tracked_symbols()
+        due = []
+        for symbol in candidates:
+            with self._lock:
+                entry = self.cache.get(symbol)
+            if entry is not None and entry['refresh_at'] <= now:
+                due.append(symbol)
+        return due
+
+    def tracked_symbols(self) -> List[str]:
+        """추적 중인 종목 목록"""
+        return self.cache.keys()
+
+    def forget(self, symbol: str) -> Optional[date]:
+        """
+        종목 추적 정보를 삭제합니다 (다음 조회 시 일정을 다시 확인).
+
+        Returns:
+            Optional[date]: 삭제한 정보의 실적 발표일 (모르면 None)
+        """
+        with self._lock:
+            entry = self.cache.get(symbol)
+            self.cache.delete(symbol)
+        return date.fromisoformat(entry['next_date']) if entry and entry['next_date'] else None
+
+
+_calendar: Optional[EarningsCalendar] = None
+_calendar_lock = threading.Lock()
+
+
+def get_earnings_calendar() -> EarningsCalendar:
+    """프로세스 공용 실적 발표 달력"""
+    global _calendar
+    with _calendar_lock:
+        if _calendar is None:
+            _calendar = EarningsCalendar()
+        return _calendar
@@ -0,0 +1,226 @@
+import os
+import logging
+import threading
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from .cache_store import TTLCache, fingerprint
+
+# 재무제표 항목 이름 후보 (yfinance 버전별 표기 차이)
+STATEMENT_ROWS = {
+    'revenue': ('financials', ['Total Revenue', 'Operating Revenue']),
+    'gross_profit': ('financials', ['Gross Profit']),
+    'operating_income': ('financials', ['Operating Income', 'Total Operating Income As Reported']),
+    'net_income': ('financials', ['Net Income', 'Net Income Common Stockholders']),
+    'current_assets': ('balance_sheet', ['Current Assets', 'Total Current Assets']),
+    'current_liabilities': ('balance_sheet', ['Current Liabilities', 'Total Current Liabilities']),
+    'free_cash_flow': ('cashflow', ['Free Cash Flow']),
+    'operating_cash_flow': ('cashflow', ['Operating Cash Flow', 'Total Cash From Operating Activities']),
+    'capital_expenditure': ('cashflow', ['Capital Expenditure', 'Capital Expenditures']),
+}
+# 연도별 시계열 (과거 → 최근 순)
+SERIES_NAMES = ['revenue', 'net_income', 'gross_margin', 'operating_margin', 'net_margin',
+                'free_cash_flow', 'current_ratio']
+# 점수 규칙에서 사용할 수 있는 다년 추세 열 (재무제표가 없으면 NaN)
+FUNDAMENTAL_COLUMNS = ['revenue_cagr', 'income_cagr', 'gross_margin_trend', 'operating_margin_trend',
+                       'net_margin_trend', 'fcf_positive_ratio', 'fcf_cv']
+
+
+def fiscal_period(financials: Optional[pd.DataFrame]) -> Optional[str]:
+    """손익계산서의 최근 회계연도 종료일 (예: '2024-09-30', 없으면 None)"""
+    if financials is None or financials.empty:
+        return None
+    return pd.Timestamp(max(financials.columns)).date().isoformat()
+
+
+def _statement_matrix(statements: Dict[str, Optional[pd.DataFrame]],
+                      periods: pd.DatetimeIndex) -> np.ndarray:
+    """필요한 항목만 (항목 × 회계연도) 행렬로 모읍니다 (없는 항목·연도는 NaN)."""
+    matrix = np.full((len(STATEMENT_ROWS), len(periods)), np.nan)
+    for i, (source, labels) in enumerate(STATEMENT_ROWS.values()):
+        frame = statements.get(source)
+        if frame is None or frame.empty:
+            continue
+        label = next((label for label in labels if label in frame.index), None)
+        if label is None:
+            continue
+        row = pd.to_numeric(frame.loc[label], errors='coerce')
+        row.index = pd.DatetimeIndex(row.index)
+        matrix[i] = row.groupby(level=0).first().reindex(periods).to_numpy(dtype=np.float64)
+    return matrix
+
+
+def _cagr(values: np.ndarray, years: np.ndarray) -> Optional[float]:
+    """처음·마지막 유효 값 사이의 연평균 성장률 (%, 두 값이 모두 양수일 때만)"""
+    valid = np.flatnonzero(~np.isnan(values))
+    if len(valid) < 2:
+        return None
+    first, last = values[valid[0]], values[valid[-1]]
+    span = years[valid[-1]] - years[valid[0]]
+    if first <= 0 or last <= 0 or span <= 0:
+        return None
+    return float(((last / first) ** (1 / span) - 1) * 100)
+
+
+def _trend(values: np.ndarray, years: np.ndarray) -> Optional[float]:
+    """유효 값의 최소제곱 기울기 (단위/년, 2개 연도 이상일 때만)"""
+    valid = ~np.isnan(values)
+    if valid.sum() < 2:
+        return None
+    x, y = years[valid], values[valid]
+    x = x - x.mean()
+    return float((x * (y - y.mean())).sum() / (x * x).sum())
+
+
+def _optional(value) -> Optional[float]:
+    value = float(value)
+    return None if np.isnan(value) else value
+
+
+def extract_features(financials: Optional[pd.DataFrame], balance_sheet: Optional[pd.DataFrame],
+                     cashflow: Optional[pd.DataFrame]) -> Optional[Dict]:
+    """
+    연간 재무제표에서 다년 시계열과 추세 지표를 추출합니다.
+
+    Returns:
+        Optional[Dict]: fiscal_period, years, series (SERIES_NAMES, 과거 → 최근), current_ratio와
+                        FUNDAMENTAL_COLUMNS (계산할 수 없으면 None) - 손익계산서가 없으면 None
+    """
+    period = fiscal_period(financials)
+    if period is None:
+        return None
+
+    periods = pd.DatetimeIndex(sorted(set(pd.DatetimeIndex(financials.columns))))
+    statements = {'financials': financials, 'balance_sheet': balance_sheet, 'cashflow': cashflow}
+    rows = dict(zip(STATEMENT_ROWS, _statement_matrix(statements, periods)))
+
+    # 모든 항목이 비어 있는 연도(yfinance가 채우지 않은 과거 열)는 제외
+    filled = ~np.isnan(rows['revenue']) | ~np.isnan(rows['net_income'])
+    periods = periods[filled]
+    rows = {name: values[filled] for name, values in rows.items()}
+    years = (periods - periods[0]).days.to_numpy(dtype=np.float64) / 365.25
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        revenue = np.where(rows['revenue'] > 0, rows['revenue'], np.nan)
+        free_cash_flow = np.where(
+            np.isnan(rows['free_cash_flow']),
+            rows['operating_cash_flow'] + rows['capital_expenditure'],  # 설비투자는 음수로 표기
+            rows['free_cash_flow']
+        )
+        series = {
+            'revenue': rows['revenue'],
+            'net_income': rows['net_income'],
+            'gross_margin': rows['gross_profit'] / revenue * 100,
+            'operating_margin': rows['operating_income'] / revenue * 100,
+            'net_margin': rows['net_income'] / revenue * 100,
+            'free_cash_flow': free_cash_flow,
+            'current_ratio': np.where(
+                rows['current_liabilities'] > 0, rows['current_assets'] / rows['current_liabilities'], np.nan
+            ),
+        }
+
+    current_ratios = series['current_ratio'][~np.isnan(series['current_ratio'])]
+    fcf = free_cash_flow[~np.isnan(free_cash_flow)]
+    fcf_mean = fcf.mean() if len(fcf) else 0.0
+
+    return {
+        'fiscal_period': period,
+        'years': [day.date().isoformat() for day in periods],
+        'series': {name: [_optional(value) for value in series[name]] for name in SERIES_NAMES},
+        'current_ratio': float(current_ratios[-1]) if len(current_ratios) else None,
+        'revenue_cagr': _cagr(rows['revenue'], years),
+        'income_cagr': _cagr(rows['net_income'], years),
+        'gross_margin_trend': _trend(series['gross_margin'], years),
+        'operating_margin_trend': _trend(series['operating_margin'], years),
+        'net_margin_trend': _trend(series['net_margin'], years),
+        'fcf_positive_ratio': float((fcf > 0).mean()) if len(fcf) else None,
+        'fcf_cv': float(fcf.std(ddof=1) / abs(fcf_mean)) if len(fcf) >= 2 and fcf_mean != 0 else None,
+    }
+
+
+class FundamentalsStore:
+    """
+    (종목, 회계연도)별 다년 재무 지표 저장소입니다.
+
+    재무제표 DataFrame은 새 회계연도가 공시되었을 때만 파싱하며, 같은 회계연도는
+    CACHE_DIR/fundamentals.json에 저장된 지표를 그대로 반환합니다.
+    """
+
+    def __init__(self, cache_ttl: Optional[float] = None):
+        """
+        Args:
+            cache_ttl: 지표 보관 기간(초) (기본값: FUNDAMENTALS_CACHE_TTL, 1년 - 0이면 매번 파싱)
+        """
+        self.logger = logging.getLogger(__name__)
+        if cache_ttl is None:
+            cache_ttl = float(os.getenv('FUNDAMENTALS_CACHE_TTL', '31536000'))
+        self.cache = TTLCache(
+            'fundamentals', ttl_seconds=cache_ttl, max_entries=5000, persist=True
+        ) if cache_ttl > 0 else None
+        self.extractions = 0  # 재무제표를 실제로 파싱한 횟수
+
+    @staticmethod
+    def _key(symbol: str, period: str) -> str:
+        return fingerprint('fundamentals', symbol, period)
+
+    def features(self, symbol: str, financials: Optional[pd.DataFrame],
+                 balance_sheet: Optional[pd.DataFrame], cashflow: Optional[pd.DataFrame]) -> Optional[Dict]:
+        """
+        종목의 최근 회계연도 지표를 반환합니다 (저장된 회계연도면 파싱 없이 반환, 재무제표가 없으면 None).
+        """
+        period = fiscal_period(financials)
+        if period is None:
+            return None
+
+        cached = self.get(symbol, period)
+        if cached is not None:
+            return cached
+
+        try:
+            features = extract_features(financials, balance_sheet, cashflow)
+        except Exception as e:
+            self.logger.warning(f"{symbol} 다년 재무 지표 추출 실패: {str(e)}")
+            return None
+        self.extractions += 1
+        if self.cache:
+            self.cache.set(self._key(symbol, period), features, tags={'symbol': symbol, 'fiscal_period': period})
+            self.cache.set(fingerprint('latest', symbol), period, tags={'symbol': symbol})
+        return features
+
+    def get(self, symbol: str, period: str) -> Optional[Dict]:
+        """저장된 (종목, 회계연도) 지표 (없으면 None)"""
+        return self.cache.get(self._key(symbol, period)) if self.cache else None
+
+    def latest(self, symbol: str) -> Optional[Dict]:
+        """재무제표 없이 종목의 가장 최근 저장 지표를 반환합니다 (없으면 None)."""
+        if not self.cache:
+            return None
+        period = self.cache.get(fingerprint('latest', symbol))
+        return self.get(symbol, period) if period else None
+
+    def invalidate(self, symbol: str) -> int:
+        """종목의 저장 지표를 모두 삭제하고 삭제 개수를 반환합니다."""
+        if not self.cache:
+            return 0
+        return self.cache.invalidate(lambda tags: tags.get('symbol') == symbol)
+
+
+def feature_values(features: Optional[Dict]) -> Dict[str, Optional[float]]:
+    """점수 규칙용 다년 추세 값 (FUNDAMENTAL_COLUMNS, 없으면 None)"""
+    features = features or {}
+    return {name: features.get(name) for name in FUNDAMENTAL_COLUMNS}
+
+
+_store: Optional[FundamentalsStore] = None
+_store_lock = threading.Lock()
+
+
+def get_fundamentals_store() -> FundamentalsStore:
+    """프로세스 공용 다년 재무 지표 저장소"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = FundamentalsStore()
+        return _store
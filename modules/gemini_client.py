@@ -1,14 +1,113 @@
 import os
+import json
+import time
 import asyncio
 import logging
-from typing import Dict, List, Optional, Any
-from google import genai
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Dict, List, Optional, Any, Tuple
 from google.genai import types
+
+from .response_schemas import (
+    ANALYSIS_RESPONSE_SCHEMA,
+    StructuredOutputError,
+    output_token_limit,
+    validate_structured_response,
+    with_fixed_grade,
+)
+from .analysis_guide import analysis_guide
+from .usage_tracker import UsageTracker
+from .health_monitor import HealthMonitor
+from .circuit_breaker import CircuitBreaker
+from .model_router import ModelRouter, ModelRoute
+from .client_registry import get_genai_client
+from .llm_scheduler import INTERACTIVE, SchedulerTimeoutError, current_priority, get_scheduler
+from .peer_index import get_peer_index
+from .fundamentals_store import get_fundamentals_store
 # Rich imports removed for server compatibility
 
 # Console removed for server compatibility
 
+class PromptBudgetExceededError(ValueError):
+    """필수 섹션만으로도 프롬프트 토큰 예산을 초과할 때 발생합니다."""
+
+
+_shared_clients: Dict[Tuple[str, Optional[str]], 'GeminiClient'] = {}
+_shared_lock = threading.Lock()
+
+
 class GeminiClient:
+    # _format_stock_data 섹션 (예산 초과 시 OPTIONAL_SECTIONS 순서대로 제외)
+    STOCK_DATA_SECTIONS = ['basic', 'key_metrics', 'fundamental_trends', 'peer_ranks', 'price_risk',
+                           'financial_health']
+    OPTIONAL_SECTIONS = ['financial_health', 'peer_ranks', 'fundamental_trends', 'price_risk']
+
+    # peer_ranks 섹션 항목: (표시 이름, 지표 키)
+    PEER_RANK_METRICS = [
+        ('PER', 'pe_ratio'),
+        ('PBR', 'pb_ratio'),
+        ('ROE', 'roe'),
+        ('ROA', 'roa'),
+        ('부채비율', 'debt_to_equity'),
+        ('배당수익률', 'dividend_yield'),
+        ('매출액 성장률', 'revenue_growth'),
+        ('순이익 성장률', 'income_growth'),
+    ]
+
+    # fundamental_trends 섹션 연도별 행: (표시 이름, 시계열 키, 단위: currency|percent)
+    FUNDAMENTAL_TREND_ROWS = [
+        ('매출액', 'revenue', 'currency'),
+        ('순이익', 'net_income', 'currency'),
+        ('영업이익률', 'operating_margin', 'percent'),
+        ('순이익률', 'net_margin', 'percent'),
+        ('자유현금흐름', 'free_cash_flow', 'currency'),
+    ]
+
+    # 압축 비교표 컬럼: (헤더, 섹션, 지표 키, 변환 배율, 소수점 자리수)
+    # 단위는 COMPACT_UNITS로 표 위에 한 번만 표기
+    COMPACT_COLUMNS = [
+        ('가격', 'basic', 'current_price', 1, 2),
+        ('시총', 'basic', 'market_cap', 1e-9, 1),
+        ('PER', 'key_metrics', 'pe_ratio', 1, 2),
+        ('PBR', 'key_metrics', 'pb_ratio', 1, 2),
+        ('ROE', 'key_metrics', 'roe', 100, 1),
+        ('ROA', 'key_metrics', 'roa', 100, 1),
+        ('부채비율', 'key_metrics', 'debt_to_equity', 1, 2),
+        ('배당', 'key_metrics', 'dividend_yield', 100, 2),
+        ('매출성장', 'key_metrics', 'revenue_growth', 1, 1),
+        ('이익성장', 'key_metrics', 'income_growth', 1, 1),
+        ('52주고', 'price_risk', '52_week_high', 1, 2),
+        ('52주저', 'price_risk', '52_week_low', 1, 2),
+        ('베타', 'price_risk', 'beta', 1, 2),
+        ('변동성', 'price_risk', 'volatility_30d', 100, 1),
+        ('거래량', 'price_risk', 'avg_volume_30d', 1e-6, 2),
+        ('현금', 'financial_health', 'cash_and_equivalents', 1e-9, 2),
+        ('총부채', 'financial_health', 'total_debt', 1e-9, 2),
+        ('FCF', 'financial_health', 'free_cash_flow', 1e-9, 2),
+        ('주식수', 'financial_health', 'shares_outstanding', 1e-6, 1),
+    ]
+    COMPACT_UNITS = (
+        "단위: 가격·52주고·52주저=USD, 시총·현금·총부채·FCF=USD 십억(B), "
+        "ROE·ROA·배당·매출성장·이익성장·변동성(30일 연환산)=%, 거래량(30일 평균)·주식수=백만 주"
+    )
+
+    @classmethod
+    def shared(cls, api_key: Optional[str] = None) -> 'GeminiClient':
+        """
+        API 키·주소별로 하나의 GeminiClient를 재사용합니다.
+
+        사용량 집계, 회로 차단기, 상태 점검을 요청 간에 공유하므로
+        웹 요청 처리 중 지연 초기화에서는 생성자 대신 이 메서드를 사용합니다.
+        """
+        api_key = api_key or os.getenv('GOOGLE_API_KEY')
+        key = (api_key, os.getenv('GEMINI_BASE_URL'))
+        with _shared_lock:
+            client = _shared_clients.get(key)
+            if client is None:
+                client = _shared_clients[key] = cls(api_key)
+            return client
+
     def __init__(self, api_key: Optional[str] = None):
         self.logger = logging.getLogger(__name__)
         self.api_key = api_key or os.getenv('GOOGLE_API_KEY')
@@ -16,19 +115,325 @@ class GeminiClient:
         if not self.api_key:
             raise ValueError("Google API 키가 설정되지 않았습니다. .env 파일에서 GOOGLE_API_KEY를 설정하세요.")
 
-        # Gemini 클라이언트 초기화
-        self.client = genai.Client(api_key=self.api_key)
+        # 공유 Gemini 클라이언트 (연결 풀 재사용, GEMINI_BASE_URL 지정 시 로컬 대역 서버 등으로 연결)
+        self.client = get_genai_client(self.api_key, os.getenv('GEMINI_BASE_URL'))
 
         # 기본 설정
         self.model_name = "gemini-2.5-flash"
+        self.comparison_encoding = os.getenv('COMPARISON_ENCODING', 'compact')
+        # 이 종목 수를 넘는 비교는 map-reduce 방식으로 처리
+        self.direct_comparison_limit = int(os.getenv('DIRECT_COMPARISON_LIMIT', '10'))
+        self._comparator = None
         self.max_tokens = 8192
         self.temperature = 0.7
 
+        # 구조화 출력 설정 (None이면 응답 스키마의 길이 제약에서 출력 한도를 산출)
+        structured_max = os.getenv('STRUCTURED_MAX_TOKENS')
+        self.structured_max_tokens: Optional[int] = int(structured_max) if structured_max else None
+        # 사고 토큰도 출력 한도에 포함되므로 분석 보고서는 사고 예산을 명시하고 응답 한도와 별도로 더함
+        self.analysis_thinking_budget = int(os.getenv('ANALYSIS_THINKING_BUDGET', '2048'))
+        self.max_repair_attempts = 1
+
+        # 토큰 사용량 집계 및 프롬프트 예산 (None이면 제한 없음)
+        self.usage_tracker = UsageTracker()
+        budget = os.getenv('PROMPT_TOKEN_BUDGET')
+        self.prompt_token_budget: Optional[int] = int(budget) if budget else None
+
+        # 비차단 상태 점검 (실제 호출 결과도 반영)
+        self.health = HealthMonitor(
+            self._probe,
+            ttl_seconds=float(os.getenv('HEALTH_CHECK_TTL', '300'))
+        )
+
+        # 장애 시 즉시 fallback을 위한 모델별 회로 차단기 (오류율 또는 지연 초과율 기준)
+        self.circuit_breakers: Dict[str, CircuitBreaker] = {}
+
+        # 호출 유형/분석 깊이별 모델 등급 및 사고 토큰 예산 정책
+        self.router = ModelRouter(self.model_name)
+
+        # 우선순위 호출 스케줄러 (프로세스 전역 공유, interactive 우선)
+        self.scheduler = get_scheduler()
+
+        # 지연 민감 호출(등급 평가)의 헤지 요청: p95 지연 후 두 번째 요청, 먼저 도착한 응답 사용
+        self.hedging_enabled = os.getenv('GEMINI_HEDGING', 'true').lower() == 'true'
+        self.hedge_delay_ms = float(os.getenv('GEMINI_HEDGE_DELAY_MS', '3000'))
+        self._hedge_executor: Optional[ThreadPoolExecutor] = None
+
         print(f"Gemini API 클라이언트 초기화 완료 (모델: {self.model_name})")
 
+    @property
+    def circuit_breaker(self) -> CircuitBreaker:
+        """기본 모델(model_name)의 회로 차단기"""
+        return self.get_circuit_breaker(self.model_name)
+
+    def get_circuit_breaker(self, model: str) -> CircuitBreaker:
+        """모델별 회로 차단기를 반환합니다 (없으면 생성)."""
+        breaker = self.circuit_breakers.get(model)
+        if breaker is None:
+            breaker = self.circuit_breakers.setdefault(model, CircuitBreaker(
+                model,
+                failure_rate_threshold=float(os.getenv('CIRCUIT_FAILURE_RATE', '0.5')),
+                slow_call_ms=float(os.getenv('CIRCUIT_SLOW_CALL_MS', '20000')),
+                reset_timeout=float(os.getenv('CIRCUIT_RESET_TIMEOUT', '30')),
+                trial_timeout=float(os.getenv('CIRCUIT_TRIAL_TIMEOUT', '180'))
+            ))
+        return breaker
+
+    def _apply_route(self, config: types.GenerateContentConfig,
+            route: ModelRoute) -> types.GenerateContentConfig:
+        """호출자가 사고 예산을 지정하지 않았으면 경로의 사고 예산을 적용합니다."""
+        if config.thinking_config is not None or route.thinking_budget is None:
+            return config
+        update = {'thinking_config': types.ThinkingConfig(thinking_budget=route.thinking_budget)}
+        # 구조화 출력은 응답 한도만 잡혀 있으므로 경로의 사고 예산만큼 한도를 늘림
+        if config.response_schema is not None and config.max_output_tokens:
+            update['max_output_tokens'] = config.max_output_tokens + route.thinking_budget
+        return config.model_copy(update=update)
+
+    def _generate(self, contents: str, config: types.GenerateContentConfig,
+            endpoint: str, symbol: Optional[str] = None,
+            model: Optional[str] = None, hedge: bool = False,
+            depth: Optional[str] = None, preamble: Optional[str] = None):
+        """
+        라우팅 정책에 따라 모델을 선택하고, 모델별 회로 차단기를 확인한 뒤
+        generate_content를 호출합니다. 실패하면 다음 등급 모델로 재시도합니다.
+
+        Args:
+        contents: 전송할 프롬프트
+        config: 생성 설정 (thinking_config 미지정 시 경로의 사고 예산 적용)
+        endpoint: 집계/라우팅용 호출 유형 (analysis, comparison, grade 등)
+        symbol: 집계용 종목 코드
+        model: 사용할 모델 (지정 시 라우팅 없이 해당 모델만 호출)
+        hedge: 지연이 p95를 넘으면 두 번째 요청을 보내고 먼저 도착한 응답 사용
+        depth: 라우팅용 분석 깊이 (basic, detailed, comprehensive)
+        preamble: 정적 지시문 (공통 평가 기준서 뒤에 system_instruction으로 전송 - 호출마다 같은 앞부분이 되어
+            암묵적 접두어 캐시 적용)
+
+        Returns:
+        GenerateContentResponse: API 응답
+
+        Raises:
+        CircuitOpenError: 모든 경로의 회로가 열려 있어 호출하지 않은 경우
+        """
+        if model:
+            routes = [ModelRoute(name=endpoint, tier='custom', model=model, thinking_budget=None)]
+        else:
+            routes = self.router.resolve(endpoint, depth)
+
+        if preamble:
+            preamble = self.system_instruction(preamble)
+
+        # 지시문까지 포함한 프롬프트 토큰으로 추정
+        estimated_tokens = self._estimate_raw_tokens((preamble or "") + contents)
+
+        last_error: Optional[Exception] = None
+        for index, route in enumerate(routes):
+            route_config = self._apply_route(config, route)
+            if preamble:
+                route_config = route_config.model_copy(update={'system_instruction': preamble})
+            try:
+                return self._call_route(contents, route_config, endpoint, symbol, route, hedge, estimated_tokens)
+            except SchedulerTimeoutError:
+                # 대기열 포화는 모델 문제가 아니므로 다른 등급으로 재시도하지 않음
+                raise
+            except Exception as e:
+                last_error = e
+                if index + 1 < len(routes):
+                    self.logger.warning(
+                        f"{route.model} 호출 실패, {routes[index + 1].model}로 재시도 [{route.name}]: {str(e)}"
+                    )
+
+        raise last_error
+
+    def _call_route(self, contents: str, config: types.GenerateContentConfig,
+            endpoint: str, symbol: Optional[str], route: ModelRoute,
+            hedge: bool, estimated_tokens: int):
+        """회로 차단기를 확인하고 단일 경로로 호출합니다 (interactive 호출은 헤지 가능)."""
+        # 헤지는 추가 호출을 만드므로 interactive 호출에만 적용
+        if hedge and self.hedging_enabled and current_priority() == INTERACTIVE:
+            return self._generate_hedged(contents, config, endpoint, symbol, route, estimated_tokens)
+
+        self.get_circuit_breaker(route.model).check()
+        return self._generate_once(contents, config, endpoint, symbol, route, estimated_tokens)
+
+    def _generate_once(self, contents: str, config: types.GenerateContentConfig,
+            endpoint: str, symbol: Optional[str], route: ModelRoute,
+            estimated_tokens: Optional[int] = None):
+        """
+        스케줄러 슬롯을 얻은 뒤 generate_content를 1회 호출하고
+        토큰 사용량, 경로별 지연 시간, 회로 상태를 기록합니다.
+        """
+        model = route.model
+        breaker = self.get_circuit_breaker(model)
+        if estimated_tokens is None:
+            estimated_tokens = self._estimate_raw_tokens(contents)
+
+        failure: Optional[Exception] = None
+        try:
+            with self.scheduler.slot(estimated_tokens) as slot:
+                started = time.perf_counter()
+                try:
+                    response = self.client.models.generate_content(
+                        model=model,
+                        contents=contents,
+                        config=config
+                    )
+                    slot['total_tokens'] = getattr(
+                        getattr(response, 'usage_metadata', None), 'total_token_count', None
+                    )
+                except Exception as e:
+                    failure = e
+        except BaseException:
+            # 슬롯 대기 시간 초과 등 API 호출 전 오류 - 장애로 집계하지 않고 half_open 시험 호출만 반납
+            breaker.release_trial()
+            raise
+        latency_ms = (time.perf_counter() - started) * 1000
+
+        if failure is not None:
+            self.usage_tracker.record(
+                endpoint, model, None,
+                latency_ms=latency_ms,
+                symbol=symbol,
+                estimated_prompt_tokens=estimated_tokens,
+                success=False,
+                route=route.name
+            )
+            breaker.record_failure()
+            self.health.record_failure(f"{endpoint}: {str(failure)}")
+            raise failure
+
+        breaker.record_success(latency_ms)
+        self.health.record_success()
+
+        self.usage_tracker.record(
+            endpoint, model, getattr(response, 'usage_metadata', None),
+            latency_ms=latency_ms,
+            symbol=symbol,
+            estimated_prompt_tokens=estimated_tokens,
+            success=bool(response.text),
+            route=route.name
+        )
+
+        return response
+
+    def _hedge_delay_seconds(self, endpoint: str) -> float:
+        """엔드포인트별 최근 p95 지연 시간 (표본 부족 시 hedge_delay_ms)."""
+        p95 = self.usage_tracker.latency_percentile(endpoint, 95)
+        return (p95 if p95 is not None else self.hedge_delay_ms) / 1000
+
+    def _generate_hedged(self, contents: str, config: types.GenerateContentConfig,
+            endpoint: str, symbol: Optional[str], route: ModelRoute,
+            estimated_tokens: Optional[int] = None):
+        """
+        첫 요청이 p95 지연 내에 끝나지 않으면 같은 요청을 한 번 더 보내고
+        먼저 성공한 응답을 반환합니다. 늦게 끝난 요청의 결과는 버려지지만 사용량은 기록됩니다.
+        """
+        breaker = self.get_circuit_breaker(route.model)
+        breaker.check()
+
+        if self._hedge_executor is None:
+            self._hedge_executor = ThreadPoolExecutor(
+                max_workers=int(os.getenv('GEMINI_HEDGE_WORKERS', '16')),
+                thread_name_prefix="gemini-hedge"
+            )
+
+        executor = self._hedge_executor
+        # 우선순위 컨텍스트를 헤지 스레드로 전달 (제출마다 별도 복사본 필요)
+        primary = executor.submit(
+            contextvars.copy_context().run, self._generate_once,
+            contents, config, endpoint, symbol, route, estimated_tokens
+        )
+        done, _ = wait([primary], timeout=self._hedge_delay_seconds(endpoint))
+        if done:
+            return primary.result()
+
+        # 회로가 열렸으면 두 번째 요청 없이 첫 요청만 기다림
+        if not breaker.allow_request():
+            return primary.result()
+
+        self.logger.info(f"헤지 요청 전송 [{endpoint}] symbol={symbol or '-'}")
+        pending = {primary, executor.submit(
+            contextvars.copy_context().run, self._generate_once,
+            contents, config, endpoint, symbol, route, estimated_tokens
+        )}
+        last_error: Optional[BaseException] = None
+
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+                last_error = future.exception()
+
+        raise last_error
+
+    def system_instruction(self, preamble: str) -> str:
+        """
+        공통 평가 기준서(analysis_guide) 뒤에 호출별 정적 지시문을 붙입니다.
+
+        기준서는 암묵적 캐시 최소 길이(1024토큰)를 넘고 모든 호출 유형에서 같으므로,
+        짧은 호출별 지시문만으로는 적용되지 않던 접두어 캐시가 등급·분석 호출 모두에 적용됩니다.
+        """
+        return analysis_guide() + preamble
+
+    def _estimate_raw_tokens(self, text: str) -> int:
+        """보정 전 토큰 수를 추정합니다 (ASCII 약 4자, 그 외 약 1.5자당 1토큰)."""
+        ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+        other_chars = len(text) - ascii_chars
+        return int(ascii_chars / 4 + other_chars / 1.5) + 1
+
+    def estimate_tokens(self, text: str) -> int:
+        """실제 사용량 기록으로 보정한 프롬프트 토큰 수 추정치를 반환합니다."""
+        return int(self._estimate_raw_tokens(text) * self.usage_tracker.calibration_factor()) + 1
+
+    def _build_within_budget(self, build_prompt, budget: Optional[int],
+            reserved_tokens: int = 0) -> str:
+        """
+        프롬프트가 토큰 예산 안에 들어올 때까지 선택 섹션을 제외하며 다시 구성합니다.
+
+        Args:
+        build_prompt: 제외할 섹션 목록을 받아 프롬프트를 반환하는 함수
+        budget: 프롬프트 토큰 예산 (None이면 제한 없음)
+        reserved_tokens: 별도 전송되는 정적 지시문의 토큰 수 (예산에서 차감)
+
+        Returns:
+        str: 예산 내의 프롬프트
+
+        Raises:
+        PromptBudgetExceededError: 모든 선택 섹션을 제외해도 예산을 초과한 경우
+        """
+        excluded: List[str] = []
+        full_prompt = build_prompt(excluded)
+
+        if not budget:
+            return full_prompt
+        budget -= reserved_tokens
+
+        for section in self.OPTIONAL_SECTIONS:
+            estimated = self.estimate_tokens(full_prompt)
+            if estimated <= budget:
+                return full_prompt
+            excluded.append(section)
+            self.logger.info(f"프롬프트 예산 초과 ({estimated} > {budget}), '{section}' 섹션 제외")
+            full_prompt = build_prompt(excluded)
+
+        estimated = self.estimate_tokens(full_prompt)
+        if estimated > budget:
+            raise PromptBudgetExceededError(
+                f"프롬프트 토큰 예산 초과: 추정 {estimated} > 예산 {budget}"
+            )
+
+        return full_prompt
+
+    def get_usage_summary(self) -> Dict:
+        """엔드포인트별, 종목별 토큰 사용량과 지연 시간 집계를 반환합니다."""
+        return self.usage_tracker.summary()
+
     def generate_analysis(self, prompt: str, stock_data: Dict,
             thinking_enabled: bool = True,
-            thinking_budget: int = 2048) -> str:
+            thinking_budget: Optional[int] = None,
+            prompt_token_budget: Optional[int] = None,
+            depth: Optional[str] = None) -> str:
         """
         주식 분석 보고서를 생성합니다.
 
@@ -36,7 +441,9 @@ class GeminiClient:
         prompt: 분석 요청 프롬프트
         stock_data: 주식 데이터 딕셔너리
         thinking_enabled: 사고 과정 활성화 여부
-        thinking_budget: 사고 과정 토큰 예산
+        thinking_budget: 사고 과정 토큰 예산 (None이면 라우팅 정책 적용)
+        prompt_token_budget: 프롬프트 토큰 예산 (기본값: 클라이언트 설정)
+        depth: 분석 깊이 (모델 등급 및 사고 예산 라우팅용)
 
         Returns:
         str: 생성된 분석 보고서
@@ -44,37 +451,48 @@ class GeminiClient:
         try:
             print("🤖 AI 분석 요청 중...")
 
-            # 주식 데이터를 텍스트로 변환
-            formatted_data = self._format_stock_data(stock_data)
-
-            # 최종 프롬프트 구성
-            full_prompt = f"""
+            # 정적 지시문은 system_instruction으로, 종목 데이터만 본문으로 전송
+            preamble = f"""
             {prompt}
 
+            **분석 요청사항:**
+            주어진 주식 데이터를 바탕으로 해당 주식의 가치투자 관점에서의 종합적인 분석을 수행해주세요.
+            """
+
+            # 최종 프롬프트 구성 (예산 초과 시 선택 섹션 제외)
+            def build_prompt(excluded: List[str]) -> str:
+                formatted_data = self._format_stock_data(stock_data, exclude_sections=excluded)
+                return f"""
             **분석 대상 주식 데이터:**
             {formatted_data}
-
-            **분석 요청사항:**
-            위 데이터를 바탕으로 해당 주식의 가치투자 관점에서의 종합적인 분석을 수행해주세요.
             """
 
+            full_prompt = self._build_within_budget(
+                build_prompt, prompt_token_budget or self.prompt_token_budget,
+                reserved_tokens=self.estimate_tokens(self.system_instruction(preamble))
+            )
+
             # 설정 구성
             config = types.GenerateContentConfig(
             temperature=self.temperature,
             max_output_tokens=self.max_tokens,
             )
 
-            # 사고 과정 활성화 시 설정 추가
-            if thinking_enabled:
+            # 사고 과정 설정 (예산 미지정 시 분석 깊이별 라우팅 정책 적용)
+            if not thinking_enabled:
+                config.thinking_config = types.ThinkingConfig(thinking_budget=0)
+            elif thinking_budget is not None:
                 config.thinking_config = types.ThinkingConfig(
                     thinking_budget=thinking_budget
                 )
 
             # API 호출
-            response = self.client.models.generate_content(
-                model=self.model_name,
-                contents=full_prompt,
-                config=config
+            response = self._generate(
+                full_prompt, config,
+                endpoint="analysis",
+                symbol=stock_data.get('symbol'),
+                depth=depth,
+                preamble=preamble
             )
 
             print("✅ AI 분석 완료")
@@ -88,9 +506,182 @@ class GeminiClient:
             self.logger.error(f"AI 분석 중 오류 발생: {str(e)}")
             raise Exception(f"AI 분석 실패: {str(e)}")
 
-    def _format_stock_data(self, stock_data: Dict) -> str:
-        """주식 데이터를 AI가 이해하기 쉬운 텍스트 형태로 변환합니다."""
+    def generate_structured(self, prompt: str, response_schema: Dict,
+            temperature: Optional[float] = None,
+            max_output_tokens: Optional[int] = None,
+            thinking_budget: Optional[int] = None,
+            endpoint: str = "structured",
+            symbol: Optional[str] = None,
+            hedge: bool = False,
+            depth: Optional[str] = None,
+            preamble: Optional[str] = None) -> Dict:
+        """
+        응답 스키마로 제약된 JSON 출력을 요청하고 검증합니다.
+
+        검증에 실패하면 오류 내용을 포함한 복구 요청을 최대
+        max_repair_attempts회 재시도합니다.
+
+        Args:
+        prompt: 요청 프롬프트
+        response_schema: 응답 스키마 (response_schemas 모듈 참조)
+        temperature: 생성 온도 (기본값: 클라이언트 설정)
+        max_output_tokens: 응답 JSON의 최대 출력 토큰 (기본값: structured_max_tokens,
+            미설정 시 응답 스키마에서 산출) - 사고 예산은 여기에 별도로 더함
+        thinking_budget: 사고 과정 토큰 예산 (None이면 라우팅 정책 적용)
+        endpoint: 집계/라우팅용 호출 유형
+        symbol: 집계용 종목 코드
+        hedge: 지연 민감 호출의 헤지 요청 사용 여부
+        depth: 라우팅용 분석 깊이
+        preamble: 정적 지시문 (system_instruction으로 전송, prompt에는 가변 데이터만 포함)
+
+        Returns:
+        Dict: 스키마 검증을 통과한 응답
+
+        Raises:
+        StructuredOutputError: 복구 재시도 후에도 검증에 실패한 경우
+        """
+        answer_tokens = (max_output_tokens or self.structured_max_tokens
+                         or output_token_limit(response_schema))
+        config = types.GenerateContentConfig(
+            temperature=self.temperature if temperature is None else temperature,
+            max_output_tokens=answer_tokens + (thinking_budget or 0),
+            response_mime_type="application/json",
+            response_schema=response_schema,
+        )
+
+        if thinking_budget is not None:
+            config.thinking_config = types.ThinkingConfig(
+                thinking_budget=thinking_budget
+            )
+
+        contents = prompt
+        last_error = None
+
+        for attempt in range(self.max_repair_attempts + 1):
+            response = self._generate(
+                contents, config, endpoint=endpoint, symbol=symbol, hedge=hedge, depth=depth,
+                preamble=preamble
+            )
+
+            raw_text = response.text or ""
+            try:
+                data = json.loads(raw_text)
+                validate_structured_response(data, response_schema)
+                return data
+            except (json.JSONDecodeError, StructuredOutputError) as e:
+                last_error = e
+                self.logger.warning(f"구조화 응답 검증 실패 (시도 {attempt + 1}): {str(e)}")
+
+            # 복구 요청: 원래 프롬프트 + 잘못된 응답 + 검증 오류
+            contents = f"""
+            {prompt}
+
+            **이전 응답 (스키마 검증 실패):**
+            {raw_text[:2000]}
+
+            **검증 오류:**
+            {str(last_error)}
+
+            위 오류를 수정하여 응답 스키마를 정확히 따르는 JSON만 다시 출력해주세요.
+            """
+
+        raise StructuredOutputError(f"구조화 응답 검증 실패: {str(last_error)}")
+
+    def generate_structured_analysis(self, prompt: str, stock_data: Dict,
+            thinking_enabled: bool = True,
+            thinking_budget: Optional[int] = None,
+            prompt_token_budget: Optional[int] = None,
+            depth: Optional[str] = None,
+            investment_grade: Optional[str] = None) -> Dict:
+        """
+        AnalysisResult 스키마로 제약된 주식 분석 결과를 생성합니다.
+
+        Args:
+        prompt: 분석 요청 프롬프트
+        stock_data: 주식 데이터 딕셔너리
+        thinking_enabled: 사고 과정 활성화 여부
+        thinking_budget: 사고 과정 토큰 예산 (None이면 라우팅 정책의 예산, 정책이 모델 기본값이면
+            ANALYSIS_THINKING_BUDGET) - 스키마에서 산출한 응답 한도와 별도로 더함
+        prompt_token_budget: 프롬프트 토큰 예산 (기본값: 클라이언트 설정)
+        depth: 분석 깊이 (모델 등급 및 사고 예산 라우팅용)
+        investment_grade: 규칙 기반으로 이미 결정된 투자 등급 (지정 시 응답 등급을 이 값으로 고정)
+
+        Returns:
+        Dict: investment_grade, confidence_score, target_price, key_strengths,
+        key_weaknesses, risks, detailed_analysis 필드를 가진 분석 결과
+        """
         try:
+            print("🤖 AI 구조화 분석 요청 중...")
+
+            # 정적 지시문은 system_instruction으로, 종목 데이터만 본문으로 전송
+            preamble = f"""
+            {prompt}
+
+            **응답 형식:**
+            응답 스키마에 맞는 JSON으로만 답변해주세요.
+            detailed_analysis 필드에는 위 분석 항목을 모두 다룬 마크다운 형식의 보고서를 6000자 이내로 작성하고,
+            key_strengths, key_weaknesses, risks는 각각 최대 5개의 한 줄 요약으로 작성해주세요.
+            """
+
+            response_schema = ANALYSIS_RESPONSE_SCHEMA
+            grade_note = ""
+            if investment_grade:
+                # 등급은 규칙 기반 결과를 따르고 AI는 근거와 보고서를 작성
+                response_schema = with_fixed_grade(ANALYSIS_RESPONSE_SCHEMA, investment_grade)
+                grade_note = f"""
+            **확정된 투자 등급:** {investment_grade}
+            (정량 분석으로 결정된 등급입니다. 이 등급을 그대로 사용하고 그 근거를 설명해주세요.)
+            """
+
+            def build_prompt(excluded: List[str]) -> str:
+                formatted_data = self._format_stock_data(stock_data, exclude_sections=excluded)
+                return f"""
+            **분석 대상 주식 데이터:**
+            {formatted_data}
+            {grade_note}"""
+
+            full_prompt = self._build_within_budget(
+                build_prompt, prompt_token_budget or self.prompt_token_budget,
+                reserved_tokens=self.estimate_tokens(self.system_instruction(preamble))
+            )
+
+            if not thinking_enabled:
+                thinking_budget = 0
+            elif thinking_budget is None:
+                # 대체 경로까지 같은 예산을 쓰므로 경로 중 가장 큰 예산 (모델 기본값이면 설정값)
+                budgets = [route.thinking_budget for route in self.router.resolve("analysis", depth)
+                           if route.thinking_budget is not None]
+                thinking_budget = max(budgets) if budgets else self.analysis_thinking_budget
+
+            result = self.generate_structured(
+                full_prompt,
+                response_schema,
+                thinking_budget=thinking_budget,
+                endpoint="analysis",
+                symbol=stock_data.get('symbol'),
+                depth=depth,
+                preamble=preamble
+            )
+
+            print("✅ AI 구조화 분석 완료")
+
+            return result
+
+        except Exception as e:
+            self.logger.error(f"AI 구조화 분석 중 오류 발생: {str(e)}")
+            raise Exception(f"AI 분석 실패: {str(e)}")
+
+    def _format_stock_data(self, stock_data: Dict,
+            exclude_sections: Optional[List[str]] = None) -> str:
+        """
+        주식 데이터를 AI가 이해하기 쉬운 텍스트 형태로 변환합니다.
+
+        Args:
+        stock_data: 주식 데이터 딕셔너리
+        exclude_sections: 제외할 섹션 키 (STOCK_DATA_SECTIONS 참조)
+        """
+        try:
+            excluded = set(exclude_sections or [])
             symbol = stock_data.get('symbol', 'N/A')
             company_name = stock_data.get('company_name', 'N/A')
             sector = stock_data.get('sector', 'N/A')
@@ -102,7 +693,8 @@ class GeminiClient:
             # 시가총액을 읽기 쉬운 형태로 변환
             market_cap_str = self._format_currency(market_cap)
 
-            formatted = f"""
+            sections = {
+                'basic': f"""
             ## 기업 기본 정보
             - 종목 코드: {symbol}
             - 기업명: {company_name}
@@ -110,7 +702,8 @@ class GeminiClient:
             - 산업: {industry}
             - 현재 주가: ${current_price:.2f}
             - 시가총액: {market_cap_str}
-
+            """,
+                'key_metrics': f"""
             ## 주요 재무 지표
             - PER (주가수익비율): {metrics.get('pe_ratio', 0):.2f}
             - PBR (주가순자산비율): {metrics.get('pb_ratio', 0):.2f}
@@ -120,20 +713,31 @@ class GeminiClient:
             - 배당수익률: {metrics.get('dividend_yield', 0):.2%}
             - 매출액 성장률: {metrics.get('revenue_growth', 0):.2f}%
             - 순이익 성장률: {metrics.get('income_growth', 0):.2f}%
-
+            """,
+                'price_risk': f"""
             ## 주가 및 위험 지표
             - 52주 최고가: ${metrics.get('52_week_high', 0):.2f}
             - 52주 최저가: ${metrics.get('52_week_low', 0):.2f}
             - 베타값: {metrics.get('beta', 0):.2f}
             - 30일 변동성: {metrics.get('volatility_30d', 0):.2%}
             - 평균 거래량 (30일): {metrics.get('avg_volume_30d', 0):,.0f}
-
+            """,
+                'financial_health': f"""
             ## 재무 건전성
             - 현금 및 현금성 자산: {self._format_currency(metrics.get('cash_and_equivalents', 0))}
             - 총 부채: {self._format_currency(metrics.get('total_debt', 0))}
             - 자유현금흐름: {self._format_currency(metrics.get('free_cash_flow', 0))}
             - 발행 주식 수: {metrics.get('shares_outstanding', 0):,.0f}
-            """
+            """,
+                'peer_ranks': self._format_peer_ranks(stock_data) if 'peer_ranks' not in excluded else "",
+                'fundamental_trends': (
+                    self._format_fundamental_trends(stock_data) if 'fundamental_trends' not in excluded else ""
+                ),
+            }
+
+            formatted = "".join(
+                sections[key] for key in self.STOCK_DATA_SECTIONS if key not in excluded
+            )
 
             return formatted
 
@@ -141,6 +745,145 @@ class GeminiClient:
             self.logger.error(f"주식 데이터 포맷팅 중 오류: {str(e)}")
             return f"주식 데이터 포맷팅 오류: {str(e)}"
 
+    def _format_peer_ranks(self, stock_data: Dict) -> str:
+        """
+        섹터·산업 내 지표 백분위 섹션을 생성합니다 (색인 조회만, 동종 기업 데이터는 요청하지 않음).
+        동종 기업이 부족해 백분위가 하나도 없으면 빈 문자열을 반환합니다.
+        """
+        ranks = get_peer_index().percentiles(stock_data)
+        lines = []
+        for label, metric in self.PEER_RANK_METRICS:
+            sector_pct = ranks.get(f"{metric}_sector_pct")
+            industry_pct = ranks.get(f"{metric}_industry_pct")
+            if sector_pct is None and industry_pct is None:
+                continue
+            values = [
+                f"{name} {value:.0f}%"
+                for name, value in (('섹터', sector_pct), ('산업', industry_pct)) if value is not None
+            ]
+            lines.append(f"            - {label}: {', '.join(values)}")
+        if not lines:
+            return ""
+        return f"""
+            ## 동종 기업 대비 백분위 (값이 작은 순, 섹터 {ranks['sector_peers']}개·산업 {ranks['industry_peers']}개 종목 기준)
+""" + "\n".join(lines) + "\n"
+
+    def _format_fundamental_trends(self, stock_data: Dict) -> str:
+        """
+        연간 재무제표의 다년 추세 섹션을 생성합니다 (저장소의 추출 결과 사용, 재무제표를 다시 파싱하지 않음).
+        다년 지표가 없으면 빈 문자열을 반환합니다.
+        """
+        features = stock_data.get('fundamentals') or get_fundamentals_store().latest(stock_data.get('symbol', 'N/A'))
+        if not features or len(features.get('years', [])) < 2:
+            return ""
+
+        years = [year[:4] for year in features['years']]
+        lines = [
+            f"            | 항목 | {' | '.join(years)} |",
+            f"            |------|{'|'.join(['---'] * len(years))}|",
+        ]
+        for label, key, unit in self.FUNDAMENTAL_TREND_ROWS:
+            values = features['series'].get(key) or []
+            if all(value is None for value in values):
+                continue
+            cells = [
+                "-" if value is None else
+                f"{value:.1f}%" if unit == 'percent' else
+                ("-" if value < 0 else "") + self._format_currency(abs(value))  # 적자는 부호만 표시
+                for value in values
+            ]
+            lines.append(f"            | {label} | {' | '.join(cells)} |")
+
+        summary = []
+        if features.get('revenue_cagr') is not None:
+            summary.append(f"- 매출액 연평균 성장률: {features['revenue_cagr']:.1f}%")
+        if features.get('income_cagr') is not None:
+            summary.append(f"- 순이익 연평균 성장률: {features['income_cagr']:.1f}%")
+        if features.get('operating_margin_trend') is not None:
+            summary.append(f"- 영업이익률 추세: 연 {features['operating_margin_trend']:+.1f}%p")
+        if features.get('current_ratio') is not None:
+            summary.append(f"- 유동비율 (재무상태표): {features['current_ratio']:.2f}")
+        if features.get('fcf_positive_ratio') is not None:
+            summary.append(f"- 자유현금흐름 흑자 연도 비율: {features['fcf_positive_ratio']:.0%}")
+
+        return f"""
+            ## 다년 재무 추세 (회계연도 {years[0]}~{years[-1]})
+""" + "\n".join(lines) + "\n" + "".join(f"            {line}\n" for line in summary)
+
+    def _format_stocks_table(self, stocks_data: Dict[str, Dict],
+            exclude_sections: Optional[List[str]] = None) -> str:
+        """
+        여러 종목 데이터를 하나의 지표 표로 변환합니다 (종목당 한 행, 지표당 한 열).
+
+        Args:
+        stocks_data: 종목별 데이터 딕셔너리
+        exclude_sections: 제외할 섹션 키 (STOCK_DATA_SECTIONS 참조)
+        """
+        excluded = set(exclude_sections or [])
+        columns = [col for col in self.COMPACT_COLUMNS if col[1] not in excluded]
+
+        header = ['종목', '기업명', '섹터'] + [col[0] for col in columns]
+        lines = [
+            self.COMPACT_UNITS,
+            "|" + "|".join(header) + "|",
+            "|" + "|".join(["---"] * len(header)) + "|",
+        ]
+
+        for symbol, data in stocks_data.items():
+            metrics = data.get('financial_metrics', {})
+            row = [symbol, str(data.get('company_name', 'N/A')), str(data.get('sector', 'N/A'))]
+            for _, _, key, scale, digits in columns:
+                if key == 'current_price':
+                    value = data.get('current_price', metrics.get('current_price'))
+                elif key == 'market_cap':
+                    value = data.get('market_cap', metrics.get('market_cap'))
+                else:
+                    value = metrics.get(key)
+                try:
+                    row.append(f"{float(value) * scale:.{digits}f}")
+                except (TypeError, ValueError):
+                    row.append("-")
+            lines.append("|" + "|".join(row) + "|")
+
+        return "\n".join(lines)
+
+    def _format_comparison_payload(self, stocks_data: Dict[str, Dict],
+            encoding: str = "compact",
+            exclude_sections: Optional[List[str]] = None) -> str:
+        """비교 분석용 종목 데이터 블록을 지정한 인코딩으로 생성합니다."""
+        if encoding == "compact":
+            return self._format_stocks_table(stocks_data, exclude_sections=exclude_sections)
+
+        all_data = ""
+        for symbol, data in stocks_data.items():
+            all_data += f"\n{'='*50}\n"
+            all_data += f"종목: {symbol}\n"
+            all_data += f"{'='*50}\n"
+            all_data += self._format_stock_data(data, exclude_sections=exclude_sections)
+            all_data += "\n"
+        return all_data
+
+    def compare_payload_encodings(self, stocks_data: Dict[str, Dict]) -> Dict:
+        """
+        비교 분석 데이터 블록의 인코딩별 추정 토큰 수를 비교합니다.
+
+        Returns:
+        Dict: full/compact 추정 토큰 수, 문자 수, 절감률(%)
+        """
+        full = self._format_comparison_payload(stocks_data, encoding="full")
+        compact = self._format_comparison_payload(stocks_data, encoding="compact")
+        full_tokens = self.estimate_tokens(full)
+        compact_tokens = self.estimate_tokens(compact)
+
+        return {
+            'symbols': len(stocks_data),
+            'full_tokens': full_tokens,
+            'compact_tokens': compact_tokens,
+            'full_chars': len(full),
+            'compact_chars': len(compact),
+            'reduction_pct': (1 - compact_tokens / full_tokens) * 100 if full_tokens else 0.0,
+        }
+
     def _format_currency(self, amount: float) -> str:
         """숫자를 읽기 쉬운 통화 형태로 변환합니다."""
         if amount == 0:
@@ -158,13 +901,21 @@ class GeminiClient:
             return f"${amount:.2f}"
 
     def generate_comparison_analysis(self, stocks_data: Dict[str, Dict],
-            custom_prompt: Optional[str] = None) -> str:
+            custom_prompt: Optional[str] = None,
+            prompt_token_budget: Optional[int] = None,
+            encoding: Optional[str] = None,
+            mode: str = "auto") -> str:
         """
         여러 주식을 비교 분석합니다.
 
         Args:
         stocks_data: 종목별 데이터 딕셔너리
         custom_prompt: 사용자 지정 프롬프트
+        prompt_token_budget: 프롬프트 토큰 예산 (기본값: 클라이언트 설정)
+        encoding: 데이터 인코딩 ("compact": 단일 지표 표, "full": 종목별 블록,
+            기본값: comparison_encoding)
+        mode: "direct"(단일 요청), "hierarchical"(map-reduce),
+            "auto"(direct_comparison_limit 초과 시 hierarchical)
 
         Returns:
         str: 비교 분석 보고서
@@ -175,6 +926,9 @@ class GeminiClient:
             if len(symbols) < 2:
                 raise ValueError("비교 분석을 위해서는 최소 2개의 종목이 필요합니다.")
 
+            if mode == "hierarchical" or (mode == "auto" and len(symbols) > self.direct_comparison_limit):
+                return self.generate_hierarchical_comparison(stocks_data, custom_prompt)
+
             # 기본 비교 분석 프롬프트
             default_prompt = f"""
             다음 {len(symbols)}개 종목({', '.join(symbols)})에 대한 가치투자 관점에서의 비교 분석을 수행해주세요.
@@ -193,38 +947,34 @@ class GeminiClient:
 
             prompt = custom_prompt or default_prompt
 
-            # 모든 종목 데이터를 하나의 문자열로 결합
-            all_data = ""
-            for symbol, data in stocks_data.items():
-                all_data += f"\n{'='*50}\n"
-                all_data += f"종목: {symbol}\n"
-                all_data += f"{'='*50}\n"
-                all_data += self._format_stock_data(data)
-                all_data += "\n"
+            encoding = encoding or self.comparison_encoding
+
+            # 모든 종목 데이터를 하나의 문자열로 결합 (예산 초과 시 전 종목 공통으로 섹션 제외)
+            def build_prompt(excluded: List[str]) -> str:
+                all_data = self._format_comparison_payload(
+                    stocks_data, encoding=encoding, exclude_sections=excluded
+                )
 
-            full_prompt = f"""
+                return f"""
             {prompt}
 
             **분석 대상 종목들의 데이터:**
             {all_data}
             """
 
-            # 비교 분석은 더 많은 토큰이 필요할 수 있으므로 설정 조정
+            full_prompt = self._build_within_budget(
+                build_prompt, prompt_token_budget or self.prompt_token_budget
+            )
+
+            # 비교 분석은 더 많은 토큰이 필요할 수 있으므로 설정 조정 (사고 예산은 라우팅 정책)
             config = types.GenerateContentConfig(
                 temperature=self.temperature,
-                max_output_tokens=self.max_tokens * 2,  # 더 긴 응답 허용
-                thinking_config=types.ThinkingConfig(
-                    thinking_budget=4096  # 더 많은 사고 과정 토큰
-                )
+                max_output_tokens=self.max_tokens * 2  # 더 긴 응답 허용
             )
 
             print("🔄 비교 분석 중...")
 
-            response = self.client.models.generate_content(
-                model=self.model_name,
-                contents=full_prompt,
-                config=config
-            )
+            response = self._generate(full_prompt, config, endpoint="comparison")
 
             print("✅ 비교 분석 완료")
 
@@ -237,18 +987,42 @@ class GeminiClient:
             self.logger.error(f"비교 분석 중 오류 발생: {str(e)}")
             raise Exception(f"비교 분석 실패: {str(e)}")
 
+    def generate_hierarchical_comparison(self, stocks_data: Dict[str, Dict],
+            custom_prompt: Optional[str] = None,
+            group_by: str = "symbol") -> str:
+        """
+        종목(또는 섹터)별 요약을 병렬 생성·캐시한 뒤 요약들을 비교하는 map-reduce 비교 분석입니다.
+
+        Args:
+        stocks_data: 종목별 데이터 딕셔너리
+        custom_prompt: 사용자 지정 프롬프트
+        group_by: map 단위 ("symbol" 또는 "sector")
+
+        Returns:
+        str: 비교 분석 보고서
+        """
+        if self._comparator is None:
+            from .comparison_pipeline import HierarchicalComparator
+            self._comparator = HierarchicalComparator(self)
+
+        return self._comparator.compare(stocks_data, custom_prompt=custom_prompt, group_by=group_by)
+
+    def _probe(self) -> bool:
+        """생성 요청 없이 모델 정보 조회로 API 키와 모델 접근 가능 여부를 확인합니다."""
+        return self.client.models.get(model=self.model_name) is not None
+
     def test_connection(self) -> bool:
         """API 연결 상태를 테스트합니다."""
         try:
             print("API 연결 테스트 중...")
 
-            response = self.client.models.generate_content(
-                model=self.model_name,
-                contents="Hello, this is a connection test. Please respond with 'Connection successful.'",
-                config=types.GenerateContentConfig(
+            response = self._generate(
+                "Hello, this is a connection test. Please respond with 'Connection successful.'",
+                types.GenerateContentConfig(
                     max_output_tokens=50,
                     temperature=0.1
-                )
+                ),
+                endpoint="connection_test"
             )
 
             if response.text and "successful" in response.text.lower():
@@ -264,14 +1038,19 @@ class GeminiClient:
 
     def set_model_parameters(self, model_name: Optional[str] = None,
             max_tokens: Optional[int] = None,
-            temperature: Optional[float] = None):
+            temperature: Optional[float] = None,
+            prompt_token_budget: Optional[int] = None):
         """모델 매개변수를 설정합니다."""
         if model_name:
             self.model_name = model_name
+            self.router.models['standard'] = model_name
         if max_tokens:
             self.max_tokens = max_tokens
         if temperature is not None:
             self.temperature = temperature
+        if prompt_token_budget is not None:
+            self.prompt_token_budget = prompt_token_budget or None
 
         print(f"모델 설정 업데이트: {self.model_name}, "
-            f"max_tokens={self.max_tokens}, temperature={self.temperature}")
\ No newline at end of file
+            f"max_tokens={self.max_tokens}, temperature={self.temperature}, "
+            f"prompt_token_budget={self.prompt_token_budget}")
\ No newline at end of file
@@ -0,0 +1,123 @@
+import time
+import logging
+import threading
+from datetime import datetime
+from typing import Callable, Dict, Optional
+
+
+class HealthMonitor:
+    """
+    Gemini API 상태를 백그라운드에서 점검하고 TTL 동안 결과를 캐시합니다.
+
+    시작 시 요청 처리를 막지 않도록 점검은 항상 별도 스레드에서 실행되며,
+    실제 API 호출의 성공/실패도 상태에 반영됩니다.
+    """
+
+    HEALTHY = "healthy"
+    DEGRADED = "degraded"
+    UNHEALTHY = "unhealthy"
+    UNKNOWN = "unknown"
+
+    def __init__(self, probe: Callable[[], bool], ttl_seconds: float = 300,
+                 failure_threshold: int = 3):
+        """
+        Args:
+            probe: 상태 점검 함수 (정상이면 True, 실패 시 False 반환 또는 예외)
+            ttl_seconds: 점검 결과 유효 시간
+            failure_threshold: 연속 실패가 이 횟수 이상이면 unhealthy로 표시
+        """
+        self.logger = logging.getLogger(__name__)
+        self.probe = probe
+        self.ttl_seconds = ttl_seconds
+        self.failure_threshold = failure_threshold
+
+        self._lock = threading.Lock()
+        self._probe_thread: Optional[threading.Thread] = None
+        self._status = self.UNKNOWN
+        self._checked_at: Optional[float] = None
+        self._last_error: Optional[str] = None
+        self._last_success_at: Optional[float] = None
+        self._consecutive_failures = 0
+
+    def start_background_probe(self, force: bool = False) -> bool:
+        """
+        점검이 필요하면 백그라운드 스레드에서 실행합니다 (즉시 반환).
+
+        Returns:
+            bool: 새 점검을 시작했는지 여부
+        """
+        with self._lock:
+            if self._probe_thread is not None and self._probe_thread.is_alive():
+                return False
+            if not force and not self._is_stale():
+                return False
+            self._probe_thread = threading.Thread(
+                target=self._run_probe, name="gemini-health-probe", daemon=True
+            )
+            self._probe_thread.start()
+            return True
+
+    def _run_probe(self):
+        try:
+            if self.probe():
+                self.record_success()
+            else:
+                self.record_failure("상태 점검 실패")
+        except Exception as e:
+            self.record_failure(str(e))
+
+    def _is_stale(self) -> bool:
+        return self._checked_at is None or time.time() - self._checked_at > self.ttl_seconds
+
+    def record_success(self):
+        """API 호출 성공을 기록합니다."""
+        with self._lock:
+            now = time.time()
+            self._status = self.HEALTHY
+            self._checked_at = now
+            self._last_success_at = now
+            self._consecutive_failures = 0
+
+    def record_failure(self, error: str):
+        """API 호출 실패를 기록하고 상태를 degraded/unhealthy로 낮춥니다."""
+        with self._lock:
+            self._consecutive_failures += 1
+            self._last_error = error
+            self._checked_at = time.time()
+            if self._consecutive_failures >= self.failure_threshold:
+                self._status = self.UNHEALTHY
+            else:
+                self._status = self.DEGRADED
+        self.logger.warning(f"Gemini 상태 저하 ({self._consecutive_failures}회 연속 실패): {error}")
+
+    @property
+    def status(self) -> str:
+        return self._status
+
+    def is_available(self) -> bool:
+        """unhealthy가 아니면 True를 반환합니다 (상태 미확인 포함)."""
+        return self._status != self.UNHEALTHY
+
+    def get_status(self, refresh: bool = True) -> Dict:
+        """
+        캐시된 상태를 반환합니다. 결과가 만료되었으면 백그라운드 점검을 시작합니다.
+
+        Args:
+            refresh: 만료 시 백그라운드 점검 시작 여부
+        """
+        if refresh:
+            self.start_background_probe()
+
+        def iso(timestamp: Optional[float]) -> Optional[str]:
+            return datetime.fromtimestamp(timestamp).isoformat() if timestamp else None
+
+        with self._lock:
+            return {
+                'status': self._status,
+                'checked_at': iso(self._checked_at),
+                'last_success_at': iso(self._last_success_at),
+                'consecutive_failures': self._consecutive_failures,
+                'last_error': self._last_error,
+                'probe_running': self._probe_thread is not None and self._probe_thread.is_alive(),
+                'ttl_seconds': self.ttl_seconds,
+            }
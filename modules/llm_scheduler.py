@@ -0,0 +1,257 @@
+import os
+import time
+import logging
+import itertools
+import threading
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+INTERACTIVE = "interactive"
+BATCH = "batch"
+PRIORITY_CLASSES = [INTERACTIVE, BATCH]  # 우선순위 높은 순
+
+# 현재 실행 흐름의 우선순위 (스레드 풀에는 contextvars.copy_context()로 전달)
+_current_priority: contextvars.ContextVar[str] = contextvars.ContextVar(
+    'llm_priority', default=os.getenv('LLM_DEFAULT_PRIORITY', INTERACTIVE)
+)
+
+
+class SchedulerTimeoutError(TimeoutError):
+    """대기열에서 queue_timeout 안에 실행 슬롯을 얻지 못했을 때 발생합니다."""
+
+
+def current_priority() -> str:
+    """현재 컨텍스트의 우선순위 클래스를 반환합니다."""
+    return _current_priority.get()
+
+
+@contextmanager
+def llm_priority(priority: str) -> Iterator[None]:
+    """
+    블록 안에서 발생하는 LLM 호출의 우선순위 클래스를 지정합니다.
+
+    사용 예시:
+        with llm_priority(BATCH):
+            analyzer.analyze_stocks(symbols)
+    """
+    if priority not in PRIORITY_CLASSES:
+        raise ValueError(f"알 수 없는 우선순위: {priority} (허용: {', '.join(PRIORITY_CLASSES)})")
+    token = _current_priority.set(priority)
+    try:
+        yield
+    finally:
+        _current_priority.reset(token)
+
+
+class _ClassState:
+    """우선순위 클래스별 동시성/토큰 버킷/대기 통계"""
+
+    def __init__(self, max_concurrency: int, tokens_per_minute: int):
+        self.max_concurrency = max_concurrency
+        self.tokens_per_minute = tokens_per_minute
+        self.tokens = float(tokens_per_minute)
+        self.refilled_at = time.monotonic()
+        self.running = 0
+        self.queue: deque = deque()
+        self.completed = 0
+        self.timeouts = 0
+        self.wait_ms: deque = deque(maxlen=500)
+
+    def refill(self, now: float):
+        if self.tokens_per_minute:
+            elapsed = now - self.refilled_at
+            self.tokens = min(self.tokens_per_minute, self.tokens + elapsed * self.tokens_per_minute / 60)
+        self.refilled_at = now
+
+    def token_wait_seconds(self, tokens: int) -> float:
+        """토큰 버킷에 tokens만큼 채워질 때까지 남은 시간 (0이면 즉시 가능)."""
+        if not self.tokens_per_minute:
+            return 0.0
+        # 한 번의 요청이 분당 한도보다 커도 버킷이 가득 차면 허용 (무한 대기 방지)
+        needed = min(tokens, self.tokens_per_minute)
+        if self.tokens >= needed:
+            return 0.0
+        return (needed - self.tokens) * 60 / self.tokens_per_minute
+
+
+class LLMScheduler:
+    """
+    GeminiClient 앞단의 우선순위 호출 스케줄러입니다.
+
+    - 우선순위 클래스(interactive, batch)별 최대 동시 실행 수와 분당 토큰 한도를 적용합니다.
+    - interactive 호출이 대기 중이면 대기 중인 batch 호출은 시작하지 않고 양보합니다.
+    - 클래스 내에서는 도착 순서(FIFO)로 실행합니다.
+    """
+
+    def __init__(self, limits: Optional[Dict[str, Dict]] = None, queue_timeout: Optional[float] = None):
+        """
+        Args:
+            limits: {클래스: {'max_concurrency': int, 'tokens_per_minute': int}} (0이면 토큰 한도 없음)
+            queue_timeout: 최대 대기 시간 (초)
+        """
+        self.logger = logging.getLogger(__name__)
+        limits = limits or {
+            INTERACTIVE: {
+                'max_concurrency': int(os.getenv('LLM_INTERACTIVE_CONCURRENCY', '8')),
+                'tokens_per_minute': int(os.getenv('LLM_INTERACTIVE_TPM', '0')),
+            },
+            BATCH: {
+                'max_concurrency': int(os.getenv('LLM_BATCH_CONCURRENCY', '2')),
+                'tokens_per_minute': int(os.getenv('LLM_BATCH_TPM', '200000')),
+            },
+        }
+        self.queue_timeout = queue_timeout or float(os.getenv('LLM_QUEUE_TIMEOUT', '120'))
+
+        self._condition = threading.Condition()
+        self._tickets = itertools.count()
+        self._classes = {
+            name: _ClassState(limit['max_concurrency'], limit['tokens_per_minute'])
+            for name, limit in limits.items()
+        }
+
+    def _higher_priority_waiting(self, priority: str) -> bool:
+        """잠금을 보유한 상태에서 호출됩니다."""
+        for name in PRIORITY_CLASSES:
+            if name == priority:
+                return False
+            if name in self._classes and self._classes[name].queue:
+                return True
+        return False
+
+    def _try_start(self, priority: str, ticket: int, tokens: int, now: float) -> Optional[float]:
+        """
+        잠금을 보유한 상태에서 호출됩니다. 실행 가능하면 슬롯을 차지하고 0을 반환하며,
+        토큰 부족이면 대기할 시간(초), 그 외 대기 사유면 None을 반환합니다.
+        """
+        state = self._classes[priority]
+        if state.queue[0] != ticket or state.running >= state.max_concurrency:
+            return None
+        if self._higher_priority_waiting(priority):
+            return None
+
+        state.refill(now)
+        token_wait = state.token_wait_seconds(tokens)
+        if token_wait > 0:
+            return token_wait
+
+        state.queue.popleft()
+        state.running += 1
+        if state.tokens_per_minute:
+            state.tokens -= min(tokens, state.tokens_per_minute)
+        return 0.0
+
+    def acquire(self, tokens: int = 0, priority: Optional[str] = None) -> str:
+        """
+        실행 슬롯을 얻을 때까지 대기합니다.
+
+        Args:
+            tokens: 예상 토큰 수 (토큰 버킷 차감용)
+            priority: 우선순위 클래스 (기본값: 현재 컨텍스트)
+
+        Returns:
+            str: 슬롯을 얻은 우선순위 클래스 (release에 전달)
+
+        Raises:
+            SchedulerTimeoutError: queue_timeout 안에 슬롯을 얻지 못한 경우
+        """
+        priority = priority or current_priority()
+        if priority not in self._classes:
+            priority = INTERACTIVE
+
+        started = time.monotonic()
+        deadline = started + self.queue_timeout
+
+        with self._condition:
+            state = self._classes[priority]
+            ticket = next(self._tickets)
+            state.queue.append(ticket)
+
+            while True:
+                now = time.monotonic()
+                result = self._try_start(priority, ticket, tokens, now)
+                if result == 0.0:
+                    # 같은 클래스의 다음 대기자와 양보 중이던 하위 클래스가 다시 확인하도록 알림
+                    self._condition.notify_all()
+                    break
+                if now >= deadline:
+                    state.queue.remove(ticket)
+                    state.timeouts += 1
+                    self._condition.notify_all()
+                    raise SchedulerTimeoutError(
+                        f"LLM 호출 대기 시간 초과 ({priority}, {self.queue_timeout:.0f}초)"
+                    )
+                # 토큰 대기는 재충전 시점까지, 그 외에는 슬롯 반환 알림까지 대기
+                timeout = deadline - now if result is None else min(result, deadline - now)
+                self._condition.wait(timeout=timeout)
+
+            state.wait_ms.append((time.monotonic() - started) * 1000)
+
+        return priority
+
+    def release(self, priority: str, estimated_tokens: int = 0, actual_tokens: Optional[int] = None):
+        """
+        슬롯을 반환합니다. 실제 토큰 사용량이 주어지면 추정치와의 차이를 버킷에 반영합니다.
+        """
+        with self._condition:
+            state = self._classes[priority]
+            state.running -= 1
+            state.completed += 1
+            if state.tokens_per_minute and actual_tokens is not None:
+                state.tokens -= actual_tokens - min(estimated_tokens, state.tokens_per_minute)
+            self._condition.notify_all()
+
+    @contextmanager
+    def slot(self, tokens: int = 0, priority: Optional[str] = None) -> Iterator[Dict]:
+        """
+        실행 슬롯 컨텍스트 관리자입니다. 블록 안에서 usage['total_tokens']를 설정하면
+        반환 시 실제 사용량으로 토큰 버킷을 보정합니다.
+        """
+        acquired = self.acquire(tokens, priority)
+        usage: Dict = {'priority': acquired, 'total_tokens': None}
+        try:
+            yield usage
+        finally:
+            self.release(acquired, tokens, usage['total_tokens'])
+
+    def metrics(self) -> Dict:
+        """클래스별 대기열 깊이, 실행 수, 대기 시간, 남은 토큰을 반환합니다."""
+        def percentile(values, q):
+            if not values:
+                return 0.0
+            ordered = sorted(values)
+            return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+
+        with self._condition:
+            now = time.monotonic()
+            result = {}
+            for name, state in self._classes.items():
+                state.refill(now)
+                waits = list(state.wait_ms)
+                result[name] = {
+                    'queue_depth': len(state.queue),
+                    'running': state.running,
+                    'max_concurrency': state.max_concurrency,
+                    'tokens_per_minute': state.tokens_per_minute,
+                    'tokens_available': int(state.tokens) if state.tokens_per_minute else None,
+                    'completed': state.completed,
+                    'timeouts': state.timeouts,
+                    'avg_wait_ms': sum(waits) / len(waits) if waits else 0.0,
+                    'p95_wait_ms': percentile(waits, 95),
+                    'max_wait_ms': max(waits) if waits else 0.0,
+                }
+            return result
+
+
+_scheduler: Optional[LLMScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> LLMScheduler:
+    """프로세스 전역 스케줄러를 반환합니다 (모든 GeminiClient가 할당량을 공유)."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = LLMScheduler()
+        return _scheduler
@@ -0,0 +1,106 @@
+import os
+import json
+import logging
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+
+@dataclass
+class ModelRoute:
+    """호출 유형/분석 깊이별 모델 선택 결과"""
+    name: str
+    tier: str
+    model: str
+    thinking_budget: Optional[int]  # None이면 모델 기본값, 0이면 사고 비활성화
+
+
+class ModelRouter:
+    """
+    호출 유형(endpoint)과 분석 깊이(depth)를 모델 등급과 사고 토큰 예산으로 매핑합니다.
+
+    정책 키는 "endpoint:depth" 또는 "endpoint"이며 앞의 키가 우선합니다.
+    1순위 모델 호출이 실패하면 FALLBACK_TIERS 순서대로 다음 등급 모델로 재시도합니다.
+    """
+
+    TIER_ORDER = ['lite', 'standard', 'pro']
+
+    # 실패 시 대체 등급 (장애 시 같은 등급을 반복하지 않고 다른 용량의 모델로 전환)
+    FALLBACK_TIERS = {
+        'lite': ['standard'],
+        'standard': ['lite'],
+        'pro': ['standard'],
+    }
+
+    DEFAULT_POLICY = {
+        'analysis:basic': {'tier': 'lite', 'thinking_budget': 0},
+        'analysis:detailed': {'tier': 'standard', 'thinking_budget': 1024},
+        'analysis:comprehensive': {'tier': 'standard', 'thinking_budget': 2048},
+        'analysis': {'tier': 'standard', 'thinking_budget': 2048},
+        'grade': {'tier': 'standard', 'thinking_budget': 0},
+        'comparison': {'tier': 'standard', 'thinking_budget': 4096},
+        'comparison_map': {'tier': 'lite', 'thinking_budget': 0},
+        'comparison_group': {'tier': 'lite', 'thinking_budget': 0},
+        'comparison_reduce': {'tier': 'standard', 'thinking_budget': 4096},
+    }
+
+    # pro 모델은 사고 과정을 끌 수 없으므로 최소 예산으로 대체
+    PRO_MIN_THINKING_BUDGET = 128
+
+    def __init__(self, standard_model: str, policy: Optional[Dict[str, Dict]] = None):
+        """
+        Args:
+            standard_model: standard 등급 모델명 (GeminiClient.model_name)
+            policy: DEFAULT_POLICY에 덮어쓸 정책 (기본값: MODEL_ROUTING_POLICY 환경 변수 JSON)
+        """
+        self.logger = logging.getLogger(__name__)
+        self.models = {
+            'lite': os.getenv('GEMINI_MODEL_LITE', 'gemini-2.5-flash-lite'),
+            'standard': standard_model,
+            'pro': os.getenv('GEMINI_MODEL_PRO', 'gemini-2.5-pro'),
+        }
+        self.enabled = os.getenv('MODEL_ROUTING', 'true').lower() == 'true'
+
+        self.policy = dict(self.DEFAULT_POLICY)
+        if policy is None:
+            policy = json.loads(os.getenv('MODEL_ROUTING_POLICY', '{}'))
+        self.policy.update(policy)
+
+    def _route(self, name: str, tier: str, thinking_budget: Optional[int]) -> ModelRoute:
+        if tier == 'pro' and thinking_budget is not None:
+            thinking_budget = max(thinking_budget, self.PRO_MIN_THINKING_BUDGET)
+        return ModelRoute(name=name, tier=tier, model=self.models[tier], thinking_budget=thinking_budget)
+
+    def resolve(self, endpoint: str, depth: Optional[str] = None) -> List[ModelRoute]:
+        """
+        호출 유형과 분석 깊이에 해당하는 경로 목록을 반환합니다 (1순위 + 대체 경로).
+
+        Args:
+            endpoint: 호출 유형 (analysis, grade, comparison 등)
+            depth: 분석 깊이 (basic, detailed, comprehensive)
+
+        Returns:
+            List[ModelRoute]: 시도 순서대로 정렬된 경로
+        """
+        name = f"{endpoint}:{depth}" if depth else endpoint
+        rule = self.policy.get(name) or self.policy.get(endpoint) or {'tier': 'standard', 'thinking_budget': None}
+
+        if not self.enabled:
+            return [self._route(name, 'standard', rule.get('thinking_budget'))]
+
+        tier = rule.get('tier', 'standard')
+        routes = [self._route(name, tier, rule.get('thinking_budget'))]
+        for fallback_tier in rule.get('fallback_tiers', self.FALLBACK_TIERS.get(tier, [])):
+            if self.models[fallback_tier] not in (route.model for route in routes):
+                routes.append(self._route(name, fallback_tier, rule.get('thinking_budget')))
+        return routes
+
+    def describe(self) -> Dict:
+        """현재 모델 등급과 라우팅 정책을 반환합니다."""
+        return {
+            'enabled': self.enabled,
+            'models': dict(self.models),
+            'policy': {
+                name: {**rule, 'model': self.models[rule.get('tier', 'standard')]}
+                for name, rule in self.policy.items()
+            },
+        }
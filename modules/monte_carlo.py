@@ -0,0 +1,185 @@
+import os
+import json
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from . import valuation_models
+
+
+class TargetPriceSimulator:
+    """
+    목표가 가정(적정 PER·PBR, 요구 수익률, 배당 성장률 상한)을 분포에서 표본 추출해
+    종목별 목표가·상승여력 분포를 계산합니다.
+
+    가정 표본은 시뮬레이터당 한 번 생성해 모든 종목에 공통으로 사용하므로(공통 난수),
+    종목 간 비교가 가능하고 단일 종목 호출도 표본 생성 비용 없이 계산됩니다.
+    """
+
+    # 가정별 분포 (MONTE_CARLO_ASSUMPTIONS 환경 변수 JSON으로 가정별 재정의)
+    DEFAULT_DISTRIBUTIONS = {
+        'fair_pe': {'type': 'lognormal', 'median': 15.0, 'sigma': 0.25},
+        'fair_pbr': {'type': 'lognormal', 'median': 2.0, 'sigma': 0.25},
+        'required_return': {'type': 'normal', 'mean': 0.10, 'std': 0.015, 'min': 0.04},
+        'max_growth': {'type': 'triangular', 'low': 0.03, 'mode': 0.06, 'high': 0.08},
+    }
+    DEFAULT_PERCENTILES = [5, 25, 50, 75, 95]
+
+    # 한 번에 계산할 (종목 × 표본) 원소 수 상한 (메모리 사용량 제한)
+    CHUNK_ELEMENTS = 1_000_000
+
+    def __init__(self, distributions: Optional[Dict[str, Dict]] = None, draws: Optional[int] = None,
+                 percentiles: Optional[List[float]] = None, seed: Optional[int] = None,
+                 workers: Optional[int] = None):
+        """
+        Args:
+            distributions: 가정별 분포 (기본값: DEFAULT_DISTRIBUTIONS + MONTE_CARLO_ASSUMPTIONS)
+            draws: 종목당 표본 수 (기본값: MONTE_CARLO_DRAWS, 100000)
+            percentiles: 계산할 백분위수
+            seed: 난수 시드 (기본값: MONTE_CARLO_SEED, 없으면 무작위)
+            workers: 종목 분할 병렬 처리 프로세스 수 (기본값: MONTE_CARLO_WORKERS, 1이면 단일 프로세스)
+        """
+        self.logger = logging.getLogger(__name__)
+        self.distributions = dict(self.DEFAULT_DISTRIBUTIONS)
+        if distributions is None:
+            distributions = json.loads(os.getenv('MONTE_CARLO_ASSUMPTIONS', '{}'))
+        self.distributions.update(distributions)
+        unknown = set(self.distributions) - set(valuation_models.DEFAULT_ASSUMPTIONS)
+        if unknown:
+            raise ValueError(f"알 수 없는 목표가 가정: {', '.join(sorted(unknown))}")
+
+        self.draws = draws or int(os.getenv('MONTE_CARLO_DRAWS', '100000'))
+        self.percentiles = list(percentiles or self.DEFAULT_PERCENTILES)
+        self.workers = workers or int(os.getenv('MONTE_CARLO_WORKERS', '1'))
+        if seed is None and os.getenv('MONTE_CARLO_SEED'):
+            seed = int(os.getenv('MONTE_CARLO_SEED'))
+        # 병렬 작업자도 같은 표본을 재생성하도록 시드를 고정
+        self.seed = seed if seed is not None else int(np.random.SeedSequence().entropy % (2 ** 63))
+        self._samples: Optional[Dict[str, np.ndarray]] = None
+
+    @staticmethod
+    def _sample(rng: np.random.Generator, spec: Dict, size: int) -> np.ndarray:
+        kind = spec.get('type', 'fixed')
+        if kind == 'fixed':
+            values = np.full(size, float(spec['value']))
+        elif kind == 'normal':
+            values = rng.normal(spec['mean'], spec['std'], size)
+        elif kind == 'lognormal':
+            values = spec['median'] * np.exp(rng.normal(0.0, spec['sigma'], size))
+        elif kind == 'uniform':
+            values = rng.uniform(spec['low'], spec['high'], size)
+        elif kind == 'triangular':
+            values = rng.triangular(spec['low'], spec['mode'], spec['high'], size)
+        else:
+            raise ValueError(f"지원하지 않는 분포: {kind} (fixed, normal, lognormal, uniform, triangular)")
+        if 'min' in spec or 'max' in spec:
+            values = np.clip(values, spec.get('min', -np.inf), spec.get('max', np.inf))
+        return values
+
+    @property
+    def samples(self) -> Dict[str, np.ndarray]:
+        """가정별 표본 (draws,) - 최초 접근 시 한 번 생성"""
+        if self._samples is None:
+            rng = np.random.default_rng(self.seed)
+            self._samples = {
+                name: self._sample(rng, self.distributions[name], self.draws)
+                for name in valuation_models.DEFAULT_ASSUMPTIONS
+            }
+        return self._samples
+
+    def simulate(self, columns: Dict[str, np.ndarray]) -> Dict:
+        """
+        여러 종목의 목표가 분포를 계산합니다.
+
+        Args:
+            columns: current_price, pe_ratio, pb_ratio, dividend_yield, income_growth 배열
+
+        Returns:
+            Dict: percentiles (백분위수 목록), target/upside ((종목 수, 백분위수 수) 배열),
+                  mean_target, prob_upside (목표가 > 현재가 확률) 배열
+        """
+        n = len(columns['current_price'])
+        if self.workers > 1 and n * self.draws > self.CHUNK_ELEMENTS * self.workers:
+            return self._simulate_parallel(columns)
+
+        # 표본 계산은 float32 (대역폭 절반, 백분위수 정밀도에는 충분)
+        samples = {name: values.astype(np.float32)[None, :] for name, values in self.samples.items()}
+        target = np.empty((n, len(self.percentiles)))
+        mean_target = np.empty(n)
+        prob_upside = np.empty(n)
+
+        chunk = max(1, self.CHUNK_ELEMENTS // self.draws)
+        for start in range(0, n, chunk):
+            rows = slice(start, start + chunk)
+            price, pe, pb, dividend_yield, income_growth = (
+                np.asarray(columns[name][rows], dtype=np.float32)[:, None] for name in _SIMULATION_COLUMNS
+            )
+            draws = valuation_models.target_prices(price, pe, pb, dividend_yield, income_growth, samples)
+            target[rows] = np.percentile(draws, self.percentiles, axis=1).T
+            mean_target[rows] = draws.mean(axis=1)
+            prob_upside[rows] = (draws > price).mean(axis=1)
+
+        # 상승여력은 목표가의 단조 변환이므로 목표가 백분위수에서 바로 계산
+        price = columns['current_price'][:, None]
+        upside = np.divide(target - price, price, out=np.zeros_like(target), where=price > 0) * 100
+
+        return {
+            'percentiles': self.percentiles,
+            'draws': self.draws,
+            'target': target,
+            'upside': upside,
+            'mean_target': mean_target,
+            'prob_upside': prob_upside,
+        }
+
+    def _simulate_parallel(self, columns: Dict[str, np.ndarray]) -> Dict:
+        """종목을 작업자 수만큼 나눠 프로세스 풀에서 계산합니다 (각 작업자는 같은 시드로 표본 재생성)."""
+        n = len(columns['current_price'])
+        bounds = np.linspace(0, n, self.workers + 1).astype(int)
+        parts = [
+            {name: columns[name][lo:hi] for name in _SIMULATION_COLUMNS}
+            for lo, hi in zip(bounds[:-1], bounds[1:]) if hi > lo
+        ]
+        options = {
+            'distributions': self.distributions, 'draws': self.draws,
+            'percentiles': self.percentiles, 'seed': self.seed,
+        }
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            results = list(executor.map(_simulate_part, [options] * len(parts), parts))
+
+        merged = {'percentiles': self.percentiles, 'draws': self.draws}
+        for key in ('target', 'upside', 'mean_target', 'prob_upside'):
+            merged[key] = np.concatenate([result[key] for result in results])
+        return merged
+
+    def simulate_one(self, current_price: float, pe_ratio: float, pb_ratio: float,
+                     dividend_yield: float, income_growth: float) -> Dict:
+        """단일 종목의 목표가 분포를 JSON 직렬화 가능한 딕셔너리로 반환합니다."""
+        columns = {
+            name: np.array([float(value or 0)])
+            for name, value in zip(_SIMULATION_COLUMNS,
+                                   (current_price, pe_ratio, pb_ratio, dividend_yield, income_growth))
+        }
+        return self.distribution(self.simulate(columns), 0)
+
+    @staticmethod
+    def distribution(result: Dict, index: int) -> Dict:
+        """simulate() 결과에서 한 종목의 분포를 딕셔너리로 꺼냅니다."""
+        labels = [f"p{q:g}" for q in result['percentiles']]
+        return {
+            'draws': result['draws'],
+            'target_price': dict(zip(labels, result['target'][index].tolist())),
+            'upside_potential': dict(zip(labels, result['upside'][index].tolist())),
+            'mean_target_price': float(result['mean_target'][index]),
+            'prob_upside': float(result['prob_upside'][index]),
+        }
+
+
+_SIMULATION_COLUMNS = ['current_price', 'pe_ratio', 'pb_ratio', 'dividend_yield', 'income_growth']
+
+
+def _simulate_part(options: Dict, columns: Dict[str, np.ndarray]) -> Dict:
+    """프로세스 풀 작업 함수 (모듈 수준 함수여야 피클 가능)"""
+    return TargetPriceSimulator(workers=1, **options).simulate(columns)
@@ -0,0 +1,433 @@
+import os
+import json
+import time
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .cache_store import register_flush
+
+# 백분위를 계산할 지표 (True: 양수만 유효 - PER/PBR 0 이하는 적자·자본잠식 또는 누락)
+PEER_METRICS = {
+    'pe_ratio': True,
+    'pb_ratio': True,
+    'roe': False,
+    'roa': False,
+    'debt_to_equity': False,
+    'dividend_yield': False,
+    'revenue_growth': False,
+    'income_growth': False,
+}
+PEER_LEVELS = ['sector', 'industry']
+
+
+def percentile_names() -> List[str]:
+    """백분위 열 이름 목록 (예: roe_sector_pct, roe_industry_pct)"""
+    return [f"{metric}_{level}_pct" for metric in PEER_METRICS for level in PEER_LEVELS]
+
+
+def _group_codes(groups: Sequence) -> Tuple[Dict, np.ndarray]:
+    """그룹 이름을 등장 순서대로 0부터 번호 매깁니다 ({이름: 번호}, 행별 번호)."""
+    index: Dict = {}
+    codes = np.fromiter((index.setdefault(group, len(index)) for group in groups), dtype=np.intp, count=len(groups))
+    return index, codes
+
+
+class PercentileRows(Sequence):
+    """
+    percentile_columns() 결과 열에서 종목별 백분위 딕셔너리(percentiles()와 같은 형태)를
+    접근할 때 만드는 지연 목록입니다. 일괄 분석에서 실제로 꺼낸 종목만 딕셔너리를 생성합니다.
+    """
+
+    def __init__(self, columns: Dict[str, np.ndarray], groups: Dict[str, np.ndarray], peers: Dict[str, np.ndarray]):
+        self._columns = columns
+        self._groups = groups
+        self._peers = peers
+        self._lists: Optional[Dict[str, list]] = None
+
+    def __len__(self) -> int:
+        return len(self._groups['sector'])
+
+    def _values(self) -> Dict[str, list]:
+        """처음 접근할 때 열을 파이썬 목록으로 한 번에 변환합니다 (NaN은 None)."""
+        if self._lists is None:
+            lists = {level: list(self._groups[level]) for level in PEER_LEVELS}
+            lists.update({f"{level}_peers": self._peers[level].tolist() for level in PEER_LEVELS})
+            for name in percentile_names():
+                column = np.asarray(self._columns[name], dtype=np.float64)
+                lists[name] = np.where(np.isnan(column), None, column).tolist()
+            self._lists = lists
+        return self._lists
+
+    def __getitem__(self, index: int) -> Dict:
+        return {name: values[index] for name, values in self._values().items()}
+
+
+class SectorPercentileIndex:
+    """
+    섹터·산업별 지표 정렬 배열 색인입니다.
+
+    (수준, 그룹, 지표)마다 정렬된 numpy 배열을 유지해 백분위를 이진 탐색(O(log n))으로 계산하며,
+    종목 스냅샷이 바뀌면 해당 종목의 이전 값만 제거·삽입해 증분 갱신합니다.
+    분석 요청마다 동종 기업 데이터를 조회하지 않고, 그동안 분석·수집한 종목 전체를 동종 기업 집합으로 사용합니다.
+    종목별 갱신은 파일을 바로 다시 쓰지 않고 flush_interval마다(또는 flush() 호출·프로세스 종료 시) 저장합니다.
+    """
+
+    def __init__(self, min_peers: Optional[int] = None, persist: bool = True,
+                 cache_dir: Optional[str] = None, flush_interval: Optional[float] = None):
+        """
+        Args:
+            min_peers: 백분위를 계산할 최소 동종 기업 수 (기본값: PEER_MIN_COUNT, 5)
+            persist: CACHE_DIR/peer_index.json에 스냅샷 저장 여부
+            cache_dir: 저장 경로 (기본값: CACHE_DIR)
+            flush_interval: 종목별 갱신 후 저장 최소 간격(초) (기본값: CACHE_FLUSH_INTERVAL, 30)
+        """
+        self.logger = logging.getLogger(__name__)
+        self.min_peers = min_peers or int(os.getenv('PEER_MIN_COUNT', '5'))
+        self._lock = threading.RLock()
+        self._snapshots: Dict[str, Dict] = {}  # 종목 -> {'sector', 'industry', 'values'}
+        self._sorted: Dict[Tuple[str, str, str], np.ndarray] = {}
+        self._counts: Dict[Tuple[str, str], int] = {}
+
+        self.path = None
+        self.flush_interval = (
+            float(os.getenv('CACHE_FLUSH_INTERVAL', '30')) if flush_interval is None else flush_interval
+        )
+        self._dirty = False
+        self._flushed_at = time.time()
+        if persist:
+            self.path = Path(cache_dir or os.getenv('CACHE_DIR', 'cache')) / 'peer_index.json'
+            self._load()
+            register_flush(self)
+
+    def __len__(self) -> int:
+        return len(self._snapshots)
+
+    @staticmethod
+    def _clean(metric: str, value) -> Optional[float]:
+        if value is None or not isinstance(value, (int, float, np.number)):
+            return None
+        value = float(value)
+        if not np.isfinite(value) or (PEER_METRICS[metric] and value <= 0):
+            return None
+        return value
+
+    def update(self, symbol: str, sector: Optional[str], industry: Optional[str],
+               metrics: Dict, save: bool = True) -> bool:
+        """
+        종목 스냅샷을 추가하거나 갱신합니다 (이전 값 제거 후 삽입).
+        save=True이면 저장을 예약하며, 마지막 저장 후 flush_interval이 지났을 때만 파일을 다시 씁니다.
+
+        Returns:
+            bool: 색인이 바뀌었는지 여부
+        """
+        groups = {'sector': sector or 'Unknown', 'industry': industry or 'Unknown'}
+        values = {metric: self._clean(metric, metrics.get(metric)) for metric in PEER_METRICS}
+        snapshot = {**groups, 'values': values}
+
+        with self._lock:
+            previous = self._snapshots.get(symbol)
+            if previous == snapshot:
+                return False
+            if previous is not None:
+                self._apply(previous, remove=True)
+            self._apply(snapshot, remove=False)
+            self._snapshots[symbol] = snapshot
+            if save:
+                self._mark_dirty()
+        return True
+
+    def update_from_stock_data(self, stock_data: Dict, save: bool = True) -> bool:
+        """수집기 stock_data로 종목 스냅샷을 갱신합니다."""
+        return self.update(
+            stock_data.get('symbol', 'N/A'), stock_data.get('sector'), stock_data.get('industry'),
+            stock_data.get('financial_metrics', {}), save=save
+        )
+
+    def update_many(self, columns: Dict[str, np.ndarray]) -> int:
+        """
+        열 단위 테이블(batch_analyzer.to_columns 형식)로 여러 종목을 갱신하고 바뀐 종목 수를 반환합니다.
+
+        값 검증은 열 단위로 하고, 정렬 배열은 (수준, 그룹, 지표)마다 제거·삽입을 한 번씩 모아서
+        병합합니다 (종목마다 np.insert로 배열을 다시 만들지 않음). 저장은 마지막에 한 번.
+        """
+        n = len(columns['symbol'])
+        metrics = {metric: self._clean_column(metric, columns.get(metric), n) for metric in PEER_METRICS}
+        sectors = columns['sector']
+        industries = columns.get('industry', [None] * n)
+
+        changed = 0
+        with self._lock:
+            removed: List[Dict] = []
+            added: Dict[str, Dict] = {}
+            for i, symbol in enumerate(columns['symbol']):
+                snapshot = {
+                    'sector': sectors[i] or 'Unknown', 'industry': industries[i] or 'Unknown',
+                    'values': {metric: values[i] for metric, values in metrics.items()},
+                }
+                previous = self._snapshots.get(symbol)
+                if previous == snapshot:
+                    continue
+                # 같은 배치에서 먼저 추가한 스냅샷은 아직 배열에 없으므로 교체만 함
+                if previous is not None and symbol not in added:
+                    removed.append(previous)
+                added[symbol] = snapshot
+                self._snapshots[symbol] = snapshot
+                changed += 1
+            if removed:
+                self._apply_many(removed, remove=True)
+            if added:
+                self._apply_many(list(added.values()), remove=False)
+            if changed:
+                self.save()
+        return changed
+
+    @classmethod
+    def _clean_column(cls, metric: str, values, n: int) -> List[Optional[float]]:
+        """열 전체에 _clean()을 적용합니다 (숫자 배열은 벡터 연산)."""
+        if values is None:
+            return [None] * n
+        array = np.asarray(values)
+        if array.dtype.kind not in 'fiu':
+            return [cls._clean(metric, value) for value in array.tolist()]
+        array = array.astype(np.float64)
+        valid = np.isfinite(array)
+        if PEER_METRICS[metric]:
+            valid &= array > 0
+        return [value if ok else None for value, ok in zip(array.tolist(), valid.tolist())]
+
+    def remove(self, symbol: str) -> bool:
+        """종목을 색인에서 제거합니다."""
+        with self._lock:
+            previous = self._snapshots.pop(symbol, None)
+            if previous is None:
+                return False
+            self._apply(previous, remove=True)
+            self._mark_dirty()
+        return True
+
+    def _apply(self, snapshot: Dict, remove: bool):
+        """스냅샷 값을 정렬 배열에서 제거하거나 삽입합니다 (잠금 보유 상태에서 호출)."""
+        for level in PEER_LEVELS:
+            group = snapshot[level]
+            self._counts[(level, group)] = self._counts.get((level, group), 0) + (-1 if remove else 1)
+            for metric, value in snapshot['values'].items():
+                if value is None:
+                    continue
+                key = (level, group, metric)
+                values = self._sorted.get(key, np.empty(0))
+                position = int(np.searchsorted(values, value))
+                if remove:
+                    self._sorted[key] = np.delete(values, position)
+                else:
+                    self._sorted[key] = np.insert(values, position, value)
+
+    def _apply_many(self, snapshots: List[Dict], remove: bool):
+        """
+        여러 스냅샷을 정렬 배열에 한 번에 반영합니다 (잠금 보유 상태에서 호출, _apply를 순서대로
+        반복한 것과 같은 결과). 제거는 값마다 첫 번째 일치 위치를 np.delete 한 번으로,
+        삽입은 정렬된 새 값을 np.insert 한 번으로 병합합니다.
+        """
+        buckets: Dict[Tuple[str, str, str], List[float]] = {}
+        for snapshot in snapshots:
+            for level in PEER_LEVELS:
+                group = snapshot[level]
+                self._counts[(level, group)] = self._counts.get((level, group), 0) + (-1 if remove else 1)
+                for metric, value in snapshot['values'].items():
+                    if value is not None:
+                        buckets.setdefault((level, group, metric), []).append(value)
+
+        for key, new_values in buckets.items():
+            new_values = np.sort(np.array(new_values, dtype=np.float64))
+            values = self._sorted.get(key, np.empty(0))
+            positions = np.searchsorted(values, new_values)
+            if remove:
+                # 같은 값이 여러 개면 첫 위치부터 차례로 (값별 등장 순번만큼 뒤로)
+                positions = positions + np.arange(len(new_values)) - np.searchsorted(new_values, new_values)
+                self._sorted[key] = np.delete(values, positions)
+            else:
+                self._sorted[key] = np.insert(values, positions, new_values)
+
+    def percentile(self, metric: str, value: float, group: str, level: str = 'sector') -> Optional[float]:
+        """
+        그룹 내 백분위 (0~100, 같은 값은 중간 순위)를 이진 탐색으로 계산합니다.
+        동종 기업 수가 min_peers 미만이거나 값이 유효하지 않으면 None.
+        """
+        value = self._clean(metric, value)
+        values = self._sorted.get((level, group, metric))
+        if value is None or values is None or len(values) < self.min_peers:
+            return None
+        below = np.searchsorted(values, value, side='left')
+        at_or_below = np.searchsorted(values, value, side='right')
+        return float((below + at_or_below) / 2 / len(values) * 100)
+
+    def percentiles(self, stock_data: Dict) -> Dict:
+        """
+        종목의 섹터·산업 내 지표 백분위를 반환합니다 (색인을 갱신하지 않음).
+
+        Returns:
+            Dict: sector, industry, sector_peers, industry_peers와 {지표}_{sector|industry}_pct (없으면 None)
+        """
+        metrics = stock_data.get('financial_metrics', {})
+        groups = {'sector': stock_data.get('sector') or 'Unknown',
+                  'industry': stock_data.get('industry') or 'Unknown'}
+        with self._lock:
+            result = {**groups}
+            for level in PEER_LEVELS:
+                result[f"{level}_peers"] = self._counts.get((level, groups[level]), 0)
+            for metric in PEER_METRICS:
+                for level in PEER_LEVELS:
+                    result[f"{metric}_{level}_pct"] = self.percentile(
+                        metric, metrics.get(metric), groups[level], level
+                    )
+        return result
+
+    def observe(self, stock_data: Dict) -> Dict:
+        """종목 스냅샷으로 색인을 갱신한 뒤 백분위를 반환합니다."""
+        self.update_from_stock_data(stock_data)
+        return self.percentiles(stock_data)
+
+    def percentile_columns(self, columns: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        """
+        여러 종목의 백분위 열을 계산합니다 (결과는 percentiles()와 같음).
+
+        (수준, 지표)마다 그룹별 정렬 배열을 그룹 번호 순으로 이어 붙이고, 값을 (그룹 번호, 값 순위)
+        정수 키로 바꿔 전체 열을 searchsorted 한 번으로 찾습니다 (그룹 수만큼 반복하지 않음).
+
+        Returns:
+            Dict[str, np.ndarray]: {지표}_{sector|industry}_pct 열 (없으면 NaN)
+        """
+        n = len(columns['symbol'])
+        result = {name: np.full(n, np.nan) for name in percentile_names()}
+        with self._lock:
+            for level in PEER_LEVELS:
+                index, codes = _group_codes(columns.get(level, ['Unknown'] * n))
+                for metric, positive_only in PEER_METRICS.items():
+                    if metric not in columns:
+                        continue
+                    segments = [(code, self._sorted.get((level, group, metric))) for group, code in index.items()]
+                    segments = [(code, values) for code, values in segments
+                                if values is not None and len(values) >= self.min_peers]
+                    if not segments:
+                        continue
+
+                    # 그룹 번호별 시작 위치·크기 (대상이 아닌 그룹은 크기 0)
+                    sizes = np.zeros(len(index), dtype=np.intp)
+                    sizes[[code for code, _ in segments]] = [len(values) for _, values in segments]
+                    starts = np.cumsum(sizes) - sizes
+                    data = np.concatenate([values for _, values in segments])
+
+                    row_values = np.asarray(columns[metric], dtype=np.float64)
+                    rows = np.flatnonzero(
+                        np.isfinite(row_values) & ((row_values > 0) if positive_only else True) & (sizes[codes] > 0)
+                    )
+                    queries, row_codes = row_values[rows], codes[rows]
+
+                    # 값을 전체 고유값 내 순위로 바꿔 (그룹 번호, 순위) 정수 키로 정렬 순서를 보존
+                    distinct = np.unique(np.concatenate([data, queries]))
+                    width = len(distinct)
+                    data_keys = np.repeat(np.arange(len(index))[sizes > 0], sizes[sizes > 0]) * width + \
+                        np.searchsorted(distinct, data)
+                    query_keys = row_codes * width + np.searchsorted(distinct, queries)
+                    # 정렬된 키로 찾으면 이진 탐색 범위가 좁아져 빠름 (결과는 원래 행 순서로 되돌림)
+                    order = np.argsort(query_keys)
+                    rows, row_codes, query_keys = rows[order], row_codes[order], query_keys[order]
+                    below = np.searchsorted(data_keys, query_keys, side='left') - starts[row_codes]
+                    at_or_below = np.searchsorted(data_keys, query_keys, side='right') - starts[row_codes]
+                    result[f"{metric}_{level}_pct"][rows] = (below + at_or_below) / 2 / sizes[row_codes] * 100
+        return result
+
+    def percentile_rows(self, columns: Dict[str, np.ndarray]) -> PercentileRows:
+        """
+        percentile_columns()가 추가된 열에서 종목별 백분위(percentiles()와 같은 형태)를 꺼내는 지연 목록.
+        동종 기업 수는 지금 시점의 값으로 고정합니다.
+        """
+        n = len(columns['symbol'])
+        groups, peers = {}, {}
+        with self._lock:
+            for level in PEER_LEVELS:
+                groups[level] = columns.get(level, np.full(n, 'Unknown', dtype=object))
+                index, codes = _group_codes(groups[level])
+                counts = np.array([self._counts.get((level, group), 0) for group in index], dtype=np.intp)
+                peers[level] = counts[codes] if len(index) else np.zeros(n, dtype=np.intp)
+        return PercentileRows(columns, groups, peers)
+
+    def stats(self) -> Dict:
+        """색인 규모 요약을 반환합니다."""
+        with self._lock:
+            return {
+                'symbols': len(self._snapshots),
+                'sectors': sum(1 for level, _ in self._counts if level == 'sector'),
+                'industries': sum(1 for level, _ in self._counts if level == 'industry'),
+                'min_peers': self.min_peers,
+            }
+
+    def _mark_dirty(self):
+        """잠금 보유 상태에서 호출됩니다. 마지막 저장 후 flush_interval이 지났으면 저장합니다."""
+        if not self.path:
+            return
+        self._dirty = True
+        if time.time() - self._flushed_at >= self.flush_interval:
+            self.save()
+
+    def flush(self):
+        """저장되지 않은 갱신을 파일에 저장합니다."""
+        with self._lock:
+            if self._dirty:
+                self.save()
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                tmp_path = self.path.with_suffix('.tmp')
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(self._snapshots, f, ensure_ascii=False)
+                os.replace(tmp_path, self.path)
+            except OSError as e:
+                # 읽기 전용 파일 시스템(서버리스 등) - 이후 저장을 시도하지 않음
+                self.logger.warning(f"동종 기업 색인 저장 불가, 메모리 색인으로만 사용: {str(e)}")
+                self.path = None
+            except Exception as e:
+                self.logger.warning(f"동종 기업 색인 저장 실패: {str(e)}")
+            self._dirty = False
+            self._flushed_at = time.time()
+
+    def _load(self):
+        """저장된 스냅샷으로 정렬 배열을 한 번에 재구성합니다."""
+        try:
+            if not self.path.exists():
+                return
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self._snapshots = json.load(f)
+        except Exception as e:
+            self.logger.warning(f"동종 기업 색인 로드 실패: {str(e)}")
+            self._snapshots = {}
+
+        buckets: Dict[Tuple[str, str, str], List[float]] = {}
+        for snapshot in self._snapshots.values():
+            for level in PEER_LEVELS:
+                group = snapshot[level]
+                self._counts[(level, group)] = self._counts.get((level, group), 0) + 1
+                for metric, value in snapshot['values'].items():
+                    if value is not None:
+                        buckets.setdefault((level, group, metric), []).append(value)
+        self._sorted = {key: np.sort(np.array(values)) for key, values in buckets.items()}
+
+
+_index: Optional[SectorPercentileIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_peer_index() -> SectorPercentileIndex:
+    """프로세스 공용 동종 기업 색인을 반환합니다 (최초 호출 시 저장된 스냅샷 로드)."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = SectorPercentileIndex()
+        return _index
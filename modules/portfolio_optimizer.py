@@ -0,0 +1,277 @@
+import os
+import logging
+from dataclasses import dataclass, asdict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .return_matrix import TRADING_DAYS, aligned_returns
+
+# 투자 등급별 연간 기대 수익률 사전값 (prior='grade')
+GRADE_RETURN_PRIORS = {
+    'Strong Buy': 0.15,
+    'Buy': 0.10,
+    'Hold': 0.06,
+    'Sell': 0.0,
+    'Strong Sell': -0.05,
+}
+METHODS = ['mean_variance', 'risk_parity']
+PRIORS = ['upside', 'grade', 'none']
+
+
+@dataclass
+class PortfolioAllocation:
+    """포트폴리오 최적화 결과 (연율화, JSON 직렬화 가능)"""
+    method: str
+    symbols: List[str]
+    weights: List[float]
+    expected_return: float
+    volatility: float
+    sharpe_ratio: Optional[float]       # 무위험 수익률 0 기준
+    risk_contributions: List[float]     # 종목별 위험 기여 비율 (합계 1)
+    shrinkage: float                    # 공분산 축소 강도 (0: 표본, 1: 상수 상관 목표)
+    observations: int                   # 사용한 일간 수익률 수
+    prior: Optional[str] = None         # 기대 수익률 사전값 ('upside', 'grade')
+    excluded: Optional[List[str]] = None  # 가격 이력이 부족해 제외한 종목
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+    def holdings(self, min_weight: float = 1e-4) -> List[Dict]:
+        """비중 내림차순 보유 종목 목록 (min_weight 미만 제외)"""
+        rows = [
+            {'symbol': symbol, 'weight': weight, 'risk_contribution': risk}
+            for symbol, weight, risk in zip(self.symbols, self.weights, self.risk_contributions)
+            if weight >= min_weight
+        ]
+        return sorted(rows, key=lambda row: row['weight'], reverse=True)
+
+
+def shrunk_covariance(returns: np.ndarray) -> Tuple[np.ndarray, float]:
+    """
+    Ledoit-Wolf 상수 상관 목표 축소 공분산 (일간)을 계산합니다.
+
+    표본 공분산을 평균 상관계수로 만든 목표 행렬 쪽으로 최적 강도만큼 축소하며,
+    모든 항을 (관측 수 × 종목 수) 행렬 곱으로 계산합니다.
+
+    Returns:
+        Tuple[np.ndarray, float]: (공분산 행렬, 축소 강도 0~1)
+    """
+    t, n = returns.shape
+    x = returns - returns.mean(axis=0)
+    sample = x.T @ x / t
+    if n == 1:
+        return sample, 0.0
+
+    variance = np.diag(sample).copy()
+    std = np.sqrt(variance)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        inv_std = np.where(std > 0, 1 / std, 0.0)
+    correlation = sample * np.outer(inv_std, inv_std)
+    mean_corr = (correlation.sum() - np.trace(correlation)) / (n * (n - 1))
+    target = mean_corr * np.outer(std, std)
+    np.fill_diagonal(target, variance)
+
+    # 추정 오차 (pi), 목표 행렬 편향 보정 (rho), 목표와 표본의 거리 (gamma)
+    x2 = x ** 2
+    pi_mat = x2.T @ x2 / t - sample ** 2
+    theta = (x ** 3).T @ x / t - variance[:, None] * sample
+    np.fill_diagonal(theta, 0.0)
+    rho = np.trace(pi_mat) + mean_corr * np.sum(np.outer(inv_std, std) * theta)
+    gamma = np.sum((target - sample) ** 2)
+
+    shrinkage = float(np.clip((pi_mat.sum() - rho) / gamma / t, 0.0, 1.0)) if gamma > 0 else 1.0
+    return shrinkage * target + (1 - shrinkage) * sample, shrinkage
+
+
+def project_capped_simplex(values: np.ndarray, cap: float, iterations: int = 50) -> np.ndarray:
+    """합계 1, 0 ≤ w ≤ cap 집합으로의 유클리드 사영 (이동량 τ를 이분 탐색)"""
+    low, high = values.min() - 1.0, values.max()
+    for _ in range(iterations):
+        tau = (low + high) / 2
+        if np.clip(values - tau, 0.0, cap).sum() > 1.0:
+            low = tau
+        else:
+            high = tau
+    return np.clip(values - (low + high) / 2, 0.0, cap)
+
+
+class PortfolioOptimizer:
+    """
+    분석 종목의 가격 이력으로 포트폴리오 비중을 계산합니다.
+
+    일간 수익률로 축소 공분산을 추정하고, 평균-분산(롱온리, 종목당 비중 상한) 또는
+    위험 균형(종목별 위험 기여 동일) 비중을 행렬 연산으로 풉니다.
+    기대 수익률은 과거 평균에 분석 결과의 상승여력 또는 투자 등급을 사전값으로 섞을 수 있습니다.
+    """
+
+    def __init__(self, method: Optional[str] = None, risk_aversion: Optional[float] = None,
+                 max_weight: Optional[float] = None, prior: Optional[str] = None,
+                 prior_weight: Optional[float] = None, min_observations: Optional[int] = None,
+                 lookback_days: Optional[int] = None):
+        """
+        Args:
+            method: 'mean_variance' 또는 'risk_parity' (기본값: PORTFOLIO_METHOD, risk_parity)
+            risk_aversion: 평균-분산 위험 회피 계수 (기본값: PORTFOLIO_RISK_AVERSION, 3)
+            max_weight: 평균-분산 종목당 비중 상한 (기본값: PORTFOLIO_MAX_WEIGHT, 0.2 - 1/종목 수 이상으로 보정)
+            prior: 기대 수익률 사전값 'upside', 'grade', 'none' (기본값: PORTFOLIO_PRIOR, upside)
+            prior_weight: 사전값 가중치 0~1 (기본값: PORTFOLIO_PRIOR_WEIGHT, 0.5)
+            min_observations: 종목별 최소 일간 수익률 수 (기본값: PORTFOLIO_MIN_OBSERVATIONS, 60)
+            lookback_days: 사용할 최근 거래일 수 (기본값: PORTFOLIO_LOOKBACK_DAYS, 없으면 전체 이력)
+        """
+        self.logger = logging.getLogger(__name__)
+        self.method = method or os.getenv('PORTFOLIO_METHOD', 'risk_parity')
+        if self.method not in METHODS:
+            raise ValueError(f"지원하지 않는 최적화 방법: {self.method} ({', '.join(METHODS)})")
+        self.risk_aversion = risk_aversion or float(os.getenv('PORTFOLIO_RISK_AVERSION', '3'))
+        self.max_weight = max_weight or float(os.getenv('PORTFOLIO_MAX_WEIGHT', '0.2'))
+        self.prior = prior or os.getenv('PORTFOLIO_PRIOR', 'upside')
+        if self.prior not in PRIORS:
+            raise ValueError(f"지원하지 않는 기대 수익률 사전값: {self.prior} ({', '.join(PRIORS)})")
+        if prior_weight is None:
+            prior_weight = float(os.getenv('PORTFOLIO_PRIOR_WEIGHT', '0.5'))
+        self.prior_weight = min(max(prior_weight, 0.0), 1.0)
+        self.min_observations = min_observations or int(os.getenv('PORTFOLIO_MIN_OBSERVATIONS', '60'))
+        lookback = lookback_days or os.getenv('PORTFOLIO_LOOKBACK_DAYS')
+        self.lookback_days = int(lookback) if lookback else None
+
+    def optimize(self, price_histories: Dict[str, pd.DataFrame], results: Optional[List] = None,
+                 method: Optional[str] = None) -> PortfolioAllocation:
+        """
+        가격 이력으로 포트폴리오 비중을 계산합니다.
+
+        Args:
+            price_histories: 종목별 price_history (수집기 stock_data['price_history']) 또는 종가 Series
+            results: 종목별 AnalysisResult (상승여력·등급 사전값용, 없으면 과거 수익률만 사용)
+            method: 이번 호출의 최적화 방법 (기본값: 생성 시 설정)
+
+        Returns:
+            PortfolioAllocation: 최적화 결과
+        """
+        try:
+            returns, excluded = aligned_returns(price_histories, self.min_observations, self.lookback_days)
+            if returns.shape[1] == 0:
+                raise ValueError("가격 이력이 충분한 종목이 없습니다.")
+            if excluded:
+                self.logger.warning(f"가격 이력 부족으로 제외: {', '.join(excluded)}")
+
+            symbols = returns.columns.tolist()
+            prior_returns = self._prior_returns(symbols, results) if results else None
+            allocation = self.optimize_returns(returns.to_numpy(), symbols, prior_returns, method)
+            allocation.excluded = excluded
+            return allocation
+
+        except Exception as e:
+            self.logger.error(f"포트폴리오 최적화 중 오류 발생: {str(e)}")
+            raise Exception(f"포트폴리오 최적화 실패: {str(e)}")
+
+    def optimize_returns(self, returns: np.ndarray, symbols: List[str],
+                         prior_returns: Optional[np.ndarray] = None,
+                         method: Optional[str] = None) -> PortfolioAllocation:
+        """
+        (관측 수 × 종목 수) 일간 수익률 행렬로 비중을 계산합니다.
+
+        Args:
+            returns: 일간 수익률 행렬 (NaN 없음)
+            symbols: 열 순서의 종목 코드
+            prior_returns: 종목별 연간 기대 수익률 사전값 (NaN은 과거 평균 사용)
+            method: 최적화 방법 (기본값: 생성 시 설정)
+        """
+        method = method or self.method
+        if method not in METHODS:
+            raise ValueError(f"지원하지 않는 최적화 방법: {method} ({', '.join(METHODS)})")
+
+        cov, shrinkage = shrunk_covariance(returns)
+        cov *= TRADING_DAYS
+        expected = returns.mean(axis=0) * TRADING_DAYS
+        if prior_returns is not None:
+            prior_returns = np.asarray(prior_returns, dtype=np.float64)
+            blended = (1 - self.prior_weight) * expected + self.prior_weight * prior_returns
+            expected = np.where(np.isnan(prior_returns), expected, blended)
+
+        if method == 'mean_variance':
+            weights = self._mean_variance(expected, cov)
+        else:
+            weights = self._risk_parity(cov)
+
+        marginal = cov @ weights
+        variance = float(weights @ marginal)
+        volatility = float(np.sqrt(max(variance, 0.0)))
+        expected_return = float(weights @ expected)
+        risk = weights * marginal / variance if variance > 0 else np.full(len(weights), 1 / len(weights))
+
+        return PortfolioAllocation(
+            method=method,
+            symbols=list(symbols),
+            weights=weights.tolist(),
+            expected_return=expected_return,
+            volatility=volatility,
+            sharpe_ratio=expected_return / volatility if volatility > 0 else None,
+            risk_contributions=risk.tolist(),
+            shrinkage=shrinkage,
+            observations=int(returns.shape[0]),
+            prior=self.prior if prior_returns is not None else None,
+        )
+
+    def _prior_returns(self, symbols: List[str], results: List) -> Optional[np.ndarray]:
+        """분석 결과에서 종목별 연간 기대 수익률 사전값을 만듭니다 (결과가 없는 종목은 NaN)."""
+        if self.prior == 'none':
+            return None
+        by_symbol = {result.symbol: result for result in results}
+        priors = np.full(len(symbols), np.nan)
+        for i, symbol in enumerate(symbols):
+            result = by_symbol.get(symbol)
+            if result is None:
+                continue
+            if self.prior == 'upside':
+                # 목표가 상승여력을 1년 기대 수익률로 간주 (극단값 제한)
+                priors[i] = np.clip(result.upside_potential / 100, -0.5, 1.0)
+            else:
+                priors[i] = GRADE_RETURN_PRIORS.get(result.investment_grade.value, np.nan)
+        return priors
+
+    def _mean_variance(self, expected: np.ndarray, cov: np.ndarray,
+                       max_iterations: int = 500, tolerance: float = 1e-9) -> np.ndarray:
+        """
+        max μ'w - (λ/2) w'Σw (합계 1, 0 ≤ w ≤ 상한)를 가속 사영 경사법으로 풉니다.
+        """
+        n = len(expected)
+        cap = max(self.max_weight, 1.0 / n)
+        step = 1.0 / (self.risk_aversion * np.linalg.eigvalsh(cov)[-1])
+
+        weights = np.full(n, 1.0 / n)
+        momentum = weights.copy()
+        t = 1.0
+        for _ in range(max_iterations):
+            gradient = expected - self.risk_aversion * (cov @ momentum)
+            updated = project_capped_simplex(momentum + step * gradient, cap)
+            t_next = (1 + np.sqrt(1 + 4 * t * t)) / 2
+            momentum = updated + ((t - 1) / t_next) * (updated - weights)
+            converged = np.abs(updated - weights).max() < tolerance
+            weights, t = updated, t_next
+            if converged:
+                break
+        return weights
+
+    def _risk_parity(self, cov: np.ndarray, max_iterations: int = 50,
+                     tolerance: float = 1e-10) -> np.ndarray:
+        """
+        종목별 위험 기여가 같은 비중을 구합니다.
+        min ½ y'Σy - Σ log(y_i) / n (y > 0)를 뉴턴법으로 풀고 합계 1로 정규화합니다.
+        """
+        n = len(cov)
+        budget = np.full(n, 1.0 / n)
+        y = 1.0 / np.sqrt(np.maximum(np.diag(cov), 1e-12))
+        y /= np.sqrt(y @ cov @ y)
+        for _ in range(max_iterations):
+            gradient = cov @ y - budget / y
+            hessian = cov + np.diag(budget / y ** 2)
+            direction = np.linalg.solve(hessian, -gradient)
+            # y > 0을 유지하는 최대 보폭
+            shrink = direction < 0
+            scale = min(1.0, 0.95 * float(np.min(-y[shrink] / direction[shrink]))) if shrink.any() else 1.0
+            y = y + scale * direction
+            if -gradient @ direction < tolerance:
+                break
+        return y / y.sum()
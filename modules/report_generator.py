@@ -2,13 +2,15 @@ import os
 import json
 import logging
 from datetime import datetime
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Union
 from pathlib import Path
 import markdown
 from jinja2 import Template
 # Rich imports removed for server compatibility
 
 from .value_analyzer import AnalysisResult, InvestmentGrade
+from .result_store import AnalysisResultStore
+from .valuation_models import sensitivity_table
 
 # Console removed for server compatibility
 
@@ -29,7 +31,8 @@ class ReportGenerator:
     
     def generate_individual_report(self, analysis_result: AnalysisResult, 
             ai_analysis: str, 
-            format_type: str = "markdown") -> str:
+            format_type: str = "markdown",
+            include_sensitivity: bool = True) -> str:
         """
         개별 종목 분석 보고서를 생성합니다.
         
@@ -37,6 +40,7 @@ class ReportGenerator:
             analysis_result: 분석 결과
             ai_analysis: AI 생성 분석 내용
             format_type: 보고서 형식 ("markdown", "html", "json")
+            include_sensitivity: 적정 PER × 적정 PBR 목표가 민감도 히트맵 포함 여부
         
         Returns:
             str: 생성된 보고서 파일 경로
@@ -57,6 +61,16 @@ class ReportGenerator:
             'report_type': 'individual'
             }
             
+            if include_sensitivity:
+                metrics = analysis_result.value_metrics
+                sensitivity = sensitivity_table(
+                    analysis_result.current_price, metrics.pe_ratio, metrics.pb_ratio,
+                    metrics.dividend_yield, metrics.income_growth
+                )
+                report_data['sensitivity'] = sensitivity
+                if format_type != "json":
+                    report_data['sensitivity_heatmap'] = self._sensitivity_heatmap(sensitivity)
+            
             # 형식에 따라 보고서 생성
             if format_type == "json":
                 content = self._generate_json_report(report_data)
@@ -81,7 +95,8 @@ class ReportGenerator:
     
     def generate_comparison_report(self, analysis_results: List[AnalysisResult], 
             ai_analysis: str, 
-            format_type: str = "markdown") -> str:
+            format_type: str = "markdown",
+            price_analysis: Optional[Dict] = None) -> str:
         """
         비교 분석 보고서를 생성합니다.
         
@@ -89,6 +104,7 @@ class ReportGenerator:
             analysis_results: 분석 결과 리스트
             ai_analysis: AI 생성 비교 분석 내용
             format_type: 보고서 형식
+            price_analysis: 가격 비교 통계 (return_matrix.price_comparison 결과)
         
         Returns:
             str: 생성된 보고서 파일 경로
@@ -104,11 +120,12 @@ class ReportGenerator:
             
             # 보고서 데이터 준비
             report_data = {
-            'analysis_results': [result.to_dict() for result in analysis_results],
+            'analysis_results': AnalysisResultStore.from_results(analysis_results).to_records(),
             'ai_analysis': ai_analysis,
             'generated_at': datetime.now().isoformat(),
             'report_type': 'comparison',
-            'symbols': [result.symbol for result in analysis_results]
+            'symbols': [result.symbol for result in analysis_results],
+            'price_analysis': price_analysis
             }
             
             # 형식에 따라 보고서 생성
@@ -155,12 +172,13 @@ class ReportGenerator:
             filename = f"summary_report_{timestamp}.{format_type}"
             filepath = self.reports_dir / filename
             
-            # 요약 통계 계산
-            summary_stats = self._calculate_summary_stats(analysis_results)
+            # 요약 통계 계산 (열 단위 저장소 한 번 생성 후 통계와 보고서 데이터에 재사용)
+            store = AnalysisResultStore.from_results(analysis_results)
+            summary_stats = store.summary_stats()
             
             # 보고서 데이터 준비
             report_data = {
-            'analysis_results': [result.to_dict() for result in analysis_results],
+            'analysis_results': store.to_records(),
             'summary_stats': summary_stats,
             'additional_info': additional_info or {},
             'generated_at': datetime.now().isoformat(),
@@ -276,32 +294,65 @@ class ReportGenerator:
         
         return html_template
     
+    def _sensitivity_heatmap(self, sensitivity: Dict) -> str:
+        """
+        민감도 격자를 상승여력 색상의 HTML 표로 변환합니다 (행: 적정 PER, 열: 적정 PBR).
+        Markdown 보고서에도 그대로 삽입되며, 기본 가정 칸은 굵게 표시합니다.
+        """
+        base = sensitivity['base']
+        
+        def cell_style(upside: float) -> str:
+            # 상승여력 ±50%에서 최대 농도
+            alpha = 0.1 + 0.6 * min(abs(upside), 50) / 50
+            color = "39, 174, 96" if upside >= 0 else "231, 76, 60"
+            return f"background: rgba({color}, {alpha:.2f}); text-align: right; padding: 4px;"
+        
+        header = ''.join(f'<th style="padding: 4px;">{pbr:g}</th>' for pbr in sensitivity['fair_pbr'])
+        rows = []
+        for fair_pe, targets, upsides in zip(sensitivity['fair_pe'], sensitivity['target_price'],
+                                             sensitivity['upside_potential']):
+            cells = []
+            for fair_pbr, target, upside in zip(sensitivity['fair_pbr'], targets, upsides):
+                text = f"{upside:+.0f}%"
+                if fair_pe == base['fair_pe'] and fair_pbr == base['fair_pbr']:
+                    text = f"<strong>{text}</strong>"
+                cells.append(f'<td style="{cell_style(upside)}" title="목표가 ${target:,.2f}">{text}</td>')
+            rows.append(f'<tr><th style="padding: 4px;">{fair_pe:g}</th>{"".join(cells)}</tr>')
+        
+        return (
+            '<table class="sensitivity-heatmap" style="font-size: 0.8em;">\n'
+            f'<tr><th style="padding: 4px;">PER \\ PBR</th>{header}</tr>\n'
+            + '\n'.join(rows)
+            + '\n</table>'
+        )
+    
     def _calculate_summary_stats(self, analysis_results: List[AnalysisResult]) -> Dict:
         """요약 통계를 계산합니다."""
-        if not analysis_results:
-            return {}
+        return AnalysisResultStore.from_results(analysis_results).summary_stats()
+    
+    def export_table(self, analysis_results: Union[List[AnalysisResult], AnalysisResultStore],
+            format_type: str = "parquet") -> str:
+        """
+        분석 결과를 종목당 한 행의 표로 내보냅니다 (노트북 등 후속 분석용).
         
-        # 등급별 분포
-        grade_distribution = {}
-        for result in analysis_results:
-            grade = result.investment_grade.value
-            grade_distribution[grade] = grade_distribution.get(grade, 0) + 1
+        Args:
+            analysis_results: 분석 결과 리스트 또는 AnalysisResultStore
+            format_type: 파일 형식 ("parquet", "arrow")
         
-        # 평균 지표 계산
-        pe_ratios = [r.value_metrics.pe_ratio for r in analysis_results if r.value_metrics.pe_ratio > 0]
-        pb_ratios = [r.value_metrics.pb_ratio for r in analysis_results if r.value_metrics.pb_ratio > 0]
-        roe_values = [r.value_metrics.roe for r in analysis_results if r.value_metrics.roe > 0]
+        Returns:
+            str: 생성된 파일 경로
+        """
+        store = analysis_results if isinstance(analysis_results, AnalysisResultStore) \
+            else AnalysisResultStore.from_results(analysis_results)
         
-        return {
-            'total_stocks': len(analysis_results),
-            'grade_distribution': grade_distribution,
-            'avg_pe_ratio': sum(pe_ratios) / len(pe_ratios) if pe_ratios else 0,
-            'avg_pb_ratio': sum(pb_ratios) / len(pb_ratios) if pb_ratios else 0,
-            'avg_roe': sum(roe_values) / len(roe_values) if roe_values else 0,
-            'avg_upside_potential': sum(r.upside_potential for r in analysis_results) / len(analysis_results),
-            'best_performer': max(analysis_results, key=lambda x: x.upside_potential).symbol,
-            'worst_performer': min(analysis_results, key=lambda x: x.upside_potential).symbol
-        }
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        if format_type == "arrow":
+            path = store.to_feather(self.reports_dir / f"analysis_table_{timestamp}.arrow")
+        else:
+            path = store.to_parquet(self.reports_dir / f"analysis_table_{timestamp}.parquet")
+        
+        print(f"✓ 분석 결과 표 저장됨: {path} ({len(store)}개 종목)")
+        return path
     
     def _get_individual_report_template(self) -> str:
         """개별 보고서 템플릿을 반환합니다."""
@@ -323,6 +374,47 @@ class ReportGenerator:
 | 상승 여력 | {{ analysis_result.upside_potential|round(1) }}% |
 | 시장 | {{ analysis_result.company_name }} |
 
+{% if analysis_result.target_price_distribution %}
+{% set dist = analysis_result.target_price_distribution %}
+### 목표가 분포 (몬테카를로 {{ dist.draws }}회)
+
+| 구분 | 하위 5% | 중간값 | 상위 5% |
+|------|---------|--------|---------|
+| 목표 주가 | ${{ dist.target_price.p5|round(2) }} | ${{ dist.target_price.p50|round(2) }} | ${{ dist.target_price.p95|round(2) }} |
+| 상승 여력 | {{ dist.upside_potential.p5|round(1) }}% | {{ dist.upside_potential.p50|round(1) }}% | {{ dist.upside_potential.p95|round(1) }}% |
+
+**상승 확률:** {{ (dist.prob_upside * 100)|round(1) }}%  
+{% endif %}
+
+{% if analysis_result.risk_metrics %}
+{% set risk = analysis_result.risk_metrics %}
+### 위험 지표 (최근 {{ risk.observations }}거래일{% if risk.benchmark %}, 벤치마크 {{ risk.benchmark }}{% endif %})
+
+| 지표 | 값 |
+|------|-----|
+{% if risk.beta is not none -%}
+| 베타 | {{ risk.beta|round(2) }} |
+{% endif -%}
+| 연환산 수익률 | {{ (risk.annual_return * 100)|round(1) }}% |
+| 연환산 변동성 | {{ (risk.volatility * 100)|round(1) }}% |
+{% if risk.sharpe_ratio is not none -%}
+| 샤프 비율 | {{ risk.sharpe_ratio|round(2) }} |
+{% endif -%}
+{% if risk.sortino_ratio is not none -%}
+| 소르티노 비율 | {{ risk.sortino_ratio|round(2) }} |
+{% endif -%}
+| 최대 낙폭 | {{ (risk.max_drawdown * 100)|round(1) }}% |
+| 일간 VaR ({{ (risk.var_level * 100)|round(0)|int }}%) | {{ (risk.value_at_risk * 100)|round(2) }}% |
+{% endif %}
+
+{% if sensitivity_heatmap %}
+### 목표가 민감도 (적정 PER × 적정 PBR)
+
+칸 값은 상승여력이며, 굵은 칸이 기본 가정(PER {{ sensitivity.base.fair_pe }}배, PBR {{ sensitivity.base.fair_pbr }}배)입니다.
+
+{{ sensitivity_heatmap }}
+
+{% endif %}
 ---
 
 ## 📈 주요 재무 지표
@@ -401,6 +493,33 @@ class ReportGenerator:
 {% endfor %}
 
 ---
+{% if price_analysis %}
+
+## 🔗 가격 상관관계 및 위험
+
+**기간:** {{ price_analysis.start_date }} ~ {{ price_analysis.end_date }} ({{ price_analysis.observations }}거래일)  
+**벤치마크:** {{ price_analysis.benchmark }}  
+**평균 상관계수:** {{ price_analysis.average_correlation|round(2) }}  
+
+| 종목 | {{ price_analysis.symbols|join(' | ') }} |
+|------|{% for symbol in price_analysis.symbols %}------|{% endfor %}
+{% for row in price_analysis.correlation -%}
+| {{ price_analysis.symbols[loop.index0] }} | {% for value in row %}{{ value|round(2) }} | {% endfor %}
+{% endfor %}
+
+| 종목 | 베타 | 최근 {{ price_analysis.beta_window }}일 베타 | 연 변동성 | 최대 낙폭 | 현재 낙폭 |
+|------|------|------|------|------|------|
+{% for symbol, stats in price_analysis.per_symbol.items() -%}
+| {{ symbol }} | {{ stats.beta|round(2) if stats.beta is not none else '-' }} | {{ stats.rolling_beta|round(2) if stats.rolling_beta is not none else '-' }} | {{ (stats.volatility * 100)|round(1) }}% | {{ (stats.max_drawdown * 100)|round(1) }}% | {{ (stats.current_drawdown * 100)|round(1) }}% |
+{% endfor %}
+
+**낙폭 동시 발생 비율** ({{ (price_analysis.drawdown_threshold * 100)|round(0) }}% 이상 하락한 날 기준, 상관계수 높은 순):
+{% for pair in price_analysis.pairs[:5] -%}
+- {{ pair.pair|join(' / ') }}: 상관계수 {{ pair.correlation|round(2) }}, 동시 낙폭 {{ '%.0f%%'|format(pair.drawdown_overlap * 100) if pair.drawdown_overlap is not none else '-' }}
+{% endfor %}
+
+---
+{% endif %}
 
 ## 📈 상세 비교 분석
 
@@ -472,6 +591,24 @@ class ReportGenerator:
 **{{ summary_stats.worst_performer }}** (최저 상승여력)
 
 ---
+{% if additional_info.portfolio %}
+
+## 💼 최적 포트폴리오 비중 ({{ '평균-분산' if additional_info.portfolio.method == 'mean_variance' else '위험 균형' }})
+
+| 종목 | 비중 | 위험 기여 |
+|------|------|-----------|
+{% for holding in additional_info.portfolio.holdings -%}
+| {{ holding.symbol }} | {{ (holding.weight * 100)|round(1) }}% | {{ (holding.risk_contribution * 100)|round(1) }}% |
+{% endfor %}
+
+- **기대 수익률 (연):** {{ (additional_info.portfolio.expected_return * 100)|round(1) }}%
+- **변동성 (연):** {{ (additional_info.portfolio.volatility * 100)|round(1) }}%
+- **공분산 축소 강도:** {{ additional_info.portfolio.shrinkage|round(2) }} ({{ additional_info.portfolio.observations }}일 수익률)
+{% if additional_info.portfolio.excluded %}- **제외 종목 (가격 이력 부족):** {{ additional_info.portfolio.excluded|join(', ') }}
+{% endif %}
+
+---
+{% endif %}
 
 ## 📋 전체 종목 리스트
 
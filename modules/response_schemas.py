@@ -0,0 +1,215 @@
+import copy
+import math
+import typing
+from dataclasses import fields
+from enum import Enum
+from typing import Any, Dict, List, Tuple
+
+from .value_analyzer import AnalysisResult, InvestmentGrade
+
+
+class StructuredOutputError(ValueError):
+    """AI 응답이 응답 스키마를 만족하지 않을 때 발생합니다."""
+
+
+# AnalysisResult 필드 중 AI가 직접 채우는 항목
+GRADE_FIELDS = ['investment_grade', 'confidence_score']
+ANALYSIS_FIELDS = [
+    'investment_grade', 'confidence_score', 'target_price',
+    'key_strengths', 'key_weaknesses', 'risks', 'detailed_analysis'
+]
+
+# 필드별 추가 제약 조건
+FIELD_CONSTRAINTS = {
+    'confidence_score': {'minimum': 0, 'maximum': 100},
+    'target_price': {'minimum': 0},
+    'key_strengths': {'maxItems': 5},
+    'key_weaknesses': {'maxItems': 5},
+    'risks': {'maxItems': 5},
+    'detailed_analysis': {'maxLength': 6000},
+}
+
+# 목록 필드 항목별 제약 조건 (한 줄 요약)
+FIELD_ITEM_CONSTRAINTS = {
+    'key_strengths': {'maxLength': 150},
+    'key_weaknesses': {'maxLength': 150},
+    'risks': {'maxLength': 150},
+}
+
+# 출력 토큰 추정치 (한국어 기준 토큰당 약 1.5자)
+CHARS_PER_TOKEN = 1.5
+# 길이 제한이 없는 문자열, 숫자 등 짧은 값의 토큰 추정치
+SHORT_VALUE_TOKENS = 64
+# 키 이름, 따옴표, 구분자 등 JSON 구조 토큰 추정치 (필드당)
+FIELD_OVERHEAD_TOKENS = 8
+
+# 필드별 설명 (모델에 전달됨)
+FIELD_DESCRIPTIONS = {
+    'investment_grade': '투자 등급',
+    'confidence_score': '등급에 대한 신뢰도 (0-100)',
+    'target_price': '적정 목표 주가 (USD)',
+    'key_strengths': '핵심 강점 (한 줄씩)',
+    'key_weaknesses': '핵심 약점 (한 줄씩)',
+    'risks': '주요 위험 요인 (한 줄씩)',
+    'detailed_analysis': '마크다운 형식의 상세 분석 보고서',
+    'rationale': '등급 결정의 핵심 근거 한 줄 요약',
+}
+
+
+def _schema_for_type(field_type: Any) -> Dict:
+    """파이썬 타입 힌트를 Gemini 응답 스키마 타입으로 변환합니다."""
+    if isinstance(field_type, type) and issubclass(field_type, Enum):
+        return {'type': 'STRING', 'enum': [member.value for member in field_type]}
+    if field_type is str:
+        return {'type': 'STRING'}
+    if field_type is float:
+        return {'type': 'NUMBER'}
+    if field_type is int:
+        return {'type': 'INTEGER'}
+    if field_type is bool:
+        return {'type': 'BOOLEAN'}
+    if typing.get_origin(field_type) in (list, List):
+        item_type = typing.get_args(field_type)[0]
+        return {'type': 'ARRAY', 'items': _schema_for_type(item_type)}
+    raise TypeError(f"스키마로 변환할 수 없는 타입: {field_type}")
+
+
+def build_response_schema(field_names: List[str], extra_properties: Dict[str, Dict] = None) -> Dict:
+    """AnalysisResult 필드 정의로부터 응답 스키마를 생성합니다."""
+    type_hints = typing.get_type_hints(AnalysisResult)
+    known_fields = {f.name for f in fields(AnalysisResult)}
+
+    properties = {}
+    for name in field_names:
+        if name not in known_fields:
+            raise KeyError(f"AnalysisResult에 없는 필드: {name}")
+        prop = _schema_for_type(type_hints[name])
+        prop.update(FIELD_CONSTRAINTS.get(name, {}))
+        if name in FIELD_ITEM_CONSTRAINTS:
+            prop['items'].update(FIELD_ITEM_CONSTRAINTS[name])
+        if name in FIELD_DESCRIPTIONS:
+            prop['description'] = FIELD_DESCRIPTIONS[name]
+        properties[name] = prop
+
+    for name, prop in (extra_properties or {}).items():
+        prop = dict(prop)
+        if name in FIELD_DESCRIPTIONS:
+            prop['description'] = FIELD_DESCRIPTIONS[name]
+        properties[name] = prop
+
+    ordering = list(properties.keys())
+    return {
+        'type': 'OBJECT',
+        'properties': properties,
+        'required': ordering,
+        'propertyOrdering': ordering,
+    }
+
+
+GRADE_RESPONSE_SCHEMA = build_response_schema(
+    GRADE_FIELDS, extra_properties={'rationale': {'type': 'STRING'}}
+)
+ANALYSIS_RESPONSE_SCHEMA = build_response_schema(ANALYSIS_FIELDS)
+
+
+def output_token_limit(schema: Dict) -> int:
+    """
+    스키마를 만족하는 가장 긴 응답의 출력 토큰 수를 추정합니다.
+
+    문자열은 maxLength, 배열은 maxItems 제약으로 길이가 정해지므로
+    구조화 출력의 max_output_tokens를 스키마에서 산출하는 데 사용합니다.
+    사고 토큰은 포함하지 않습니다.
+    """
+    schema_type = schema.get('type')
+
+    if schema_type == 'OBJECT':
+        return 2 + sum(
+            output_token_limit(prop) + FIELD_OVERHEAD_TOKENS
+            for prop in schema.get('properties', {}).values()
+        )
+    if schema_type == 'ARRAY':
+        max_items = schema.get('maxItems', 10)
+        return 2 + max_items * (output_token_limit(schema['items']) + 2)
+    if schema_type == 'STRING' and 'maxLength' in schema:
+        return math.ceil(schema['maxLength'] / CHARS_PER_TOKEN)
+    return SHORT_VALUE_TOKENS
+
+
+def with_fixed_grade(schema: Dict, grade: str) -> Dict:
+    """investment_grade를 이미 결정된 등급 하나로 고정한 스키마 사본을 반환합니다."""
+    if grade not in schema['properties']['investment_grade']['enum']:
+        raise ValueError(f"알 수 없는 투자 등급: {grade}")
+    fixed = copy.deepcopy(schema)
+    fixed['properties']['investment_grade']['enum'] = [grade]
+    return fixed
+
+
+def validate_structured_response(data: Any, schema: Dict, path: str = '$') -> None:
+    """
+    응답 데이터를 스키마에 대해 엄격하게 검증합니다.
+
+    Args:
+        data: json.loads로 파싱된 응답
+        schema: build_response_schema로 생성한 스키마
+        path: 오류 메시지에 표시할 경로
+
+    Raises:
+        StructuredOutputError: 스키마 위반 시
+    """
+    schema_type = schema.get('type')
+
+    if schema_type == 'OBJECT':
+        if not isinstance(data, dict):
+            raise StructuredOutputError(f"{path}: 객체가 필요합니다.")
+        properties = schema.get('properties', {})
+        missing = [key for key in schema.get('required', []) if key not in data]
+        if missing:
+            raise StructuredOutputError(f"{path}: 필수 필드 누락 ({', '.join(missing)})")
+        unknown = [key for key in data if key not in properties]
+        if unknown:
+            raise StructuredOutputError(f"{path}: 알 수 없는 필드 ({', '.join(unknown)})")
+        for key, value in data.items():
+            validate_structured_response(value, properties[key], f"{path}.{key}")
+
+    elif schema_type == 'ARRAY':
+        if not isinstance(data, list):
+            raise StructuredOutputError(f"{path}: 배열이 필요합니다.")
+        max_items = schema.get('maxItems')
+        if max_items is not None and len(data) > max_items:
+            raise StructuredOutputError(f"{path}: 최대 {max_items}개 항목까지 허용됩니다.")
+        for i, item in enumerate(data):
+            validate_structured_response(item, schema['items'], f"{path}[{i}]")
+
+    elif schema_type == 'STRING':
+        if not isinstance(data, str):
+            raise StructuredOutputError(f"{path}: 문자열이 필요합니다.")
+        if 'enum' in schema and data not in schema['enum']:
+            raise StructuredOutputError(f"{path}: 허용되지 않은 값 '{data}' (허용: {', '.join(schema['enum'])})")
+        if not data.strip():
+            raise StructuredOutputError(f"{path}: 빈 문자열입니다.")
+        if 'maxLength' in schema and len(data) > schema['maxLength']:
+            raise StructuredOutputError(f"{path}: 최대 {schema['maxLength']}자까지 허용됩니다.")
+
+    elif schema_type in ('NUMBER', 'INTEGER'):
+        if isinstance(data, bool) or not isinstance(data, (int, float)):
+            raise StructuredOutputError(f"{path}: 숫자가 필요합니다.")
+        if schema_type == 'INTEGER' and not isinstance(data, int):
+            raise StructuredOutputError(f"{path}: 정수가 필요합니다.")
+        if 'minimum' in schema and data < schema['minimum']:
+            raise StructuredOutputError(f"{path}: {schema['minimum']} 이상이어야 합니다.")
+        if 'maximum' in schema and data > schema['maximum']:
+            raise StructuredOutputError(f"{path}: {schema['maximum']} 이하여야 합니다.")
+
+    elif schema_type == 'BOOLEAN':
+        if not isinstance(data, bool):
+            raise StructuredOutputError(f"{path}: 불리언이 필요합니다.")
+
+
+def parse_grade_response(data: Dict) -> Tuple[InvestmentGrade, float, str]:
+    """검증된 등급 응답을 (등급, 신뢰도, 근거)로 변환합니다."""
+    validate_structured_response(data, GRADE_RESPONSE_SCHEMA)
+    return (
+        InvestmentGrade(data['investment_grade']),
+        float(data['confidence_score']),
+        data['rationale'],
+    )
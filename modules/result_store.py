@@ -0,0 +1,327 @@
+import logging
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Union
+
+import numpy as np
+
+from .peer_index import percentile_names
+from .risk_metrics import RISK_METRIC_COLUMNS
+from .value_analyzer import AnalysisResult, BatchAnalysisResult, InvestmentGrade, ValueMetrics
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+# 결과 열 (AnalysisResult 필드 순서, value_metrics는 평탄화)
+TEXT_FIELDS = ['symbol', 'company_name', 'analysis_date', 'investment_grade', 'detailed_analysis']
+NUMERIC_FIELDS = ['confidence_score', 'target_price', 'current_price', 'upside_potential']
+LIST_FIELDS = ['key_strengths', 'key_weaknesses', 'risks']
+METRIC_FIELDS = list(ValueMetrics.__dataclass_fields__)
+OBJECT_FIELDS = ['target_price_distribution', 'peer_percentiles', 'risk_metrics']  # 선택 항목 (없으면 None)
+
+
+class AnalysisResultRow:
+    """저장소의 한 행에 대한 읽기 전용 뷰 (AnalysisResult와 같은 속성 이름)"""
+
+    __slots__ = ('_store', '_index')
+
+    def __init__(self, store: 'AnalysisResultStore', index: int):
+        self._store = store
+        self._index = index
+
+    def __getattr__(self, name: str):
+        store = object.__getattribute__(self, '_store')
+        index = object.__getattribute__(self, '_index')
+        if name == 'investment_grade':
+            return InvestmentGrade(store.text['investment_grade'][index])
+        if name == 'value_metrics':
+            return ValueMetrics(**{field: float(store.metrics[field][index]) for field in METRIC_FIELDS})
+        if name in store.text:
+            return store.text[name][index]
+        if name in store.numeric:
+            return float(store.numeric[name][index])
+        if name in store.lists:
+            return store.lists[name][index]
+        if name in store.objects:
+            return store.objects[name][index]
+        raise AttributeError(name)
+
+    def to_dict(self) -> Dict:
+        """AnalysisResult.to_dict()와 같은 형태의 딕셔너리를 반환합니다."""
+        return self._store.record(self._index)
+
+    def to_result(self) -> AnalysisResult:
+        """AnalysisResult 객체로 변환합니다."""
+        return AnalysisResult(
+            symbol=self.symbol,
+            company_name=self.company_name,
+            analysis_date=self.analysis_date,
+            investment_grade=self.investment_grade,
+            confidence_score=self.confidence_score,
+            target_price=self.target_price,
+            current_price=self.current_price,
+            upside_potential=self.upside_potential,
+            key_strengths=list(self.key_strengths),
+            key_weaknesses=list(self.key_weaknesses),
+            risks=list(self.risks),
+            value_metrics=self.value_metrics,
+            detailed_analysis=self.detailed_analysis,
+            target_price_distribution=self.target_price_distribution,
+            peer_percentiles=self.peer_percentiles,
+            risk_metrics=self.risk_metrics
+        )
+
+    def __repr__(self) -> str:
+        return f"AnalysisResultRow({self.symbol}, {self._store.text['investment_grade'][self._index]})"
+
+
+class AnalysisResultStore:
+    """
+    분석 결과 모음의 열 단위(struct-of-arrays) 저장소입니다.
+
+    숫자 열과 ValueMetrics 지표는 float64 numpy 배열로, 텍스트와 목록 열, 선택 항목(목표가 분포,
+    동종 기업 백분위, 위험 지표 - 없으면 None)은 파이썬 리스트로 보관합니다.
+    요약 통계는 배열 연산으로 계산하며, Arrow/Parquet 내보내기 시 숫자 열은 복사 없이 전달됩니다.
+    """
+
+    def __init__(self, text: Dict[str, List[str]], numeric: Dict[str, np.ndarray],
+                 metrics: Dict[str, np.ndarray], lists: Dict[str, List[List[str]]],
+                 objects: Optional[Dict[str, List[Optional[Dict]]]] = None):
+        self.logger = logging.getLogger(__name__)
+        self.text = text
+        self.numeric = numeric
+        self.metrics = metrics
+        self.lists = lists
+        self.objects = {field: [None] * len(text['symbol']) for field in OBJECT_FIELDS}
+        self.objects.update(objects or {})
+
+    @classmethod
+    def from_results(cls, results: List[AnalysisResult]) -> 'AnalysisResultStore':
+        """AnalysisResult 목록으로부터 저장소를 생성합니다."""
+        text = {field: [getattr(result, field) for result in results] for field in TEXT_FIELDS}
+        text['investment_grade'] = [result.investment_grade.value for result in results]
+        numeric = {
+            field: np.fromiter((getattr(result, field) for result in results), dtype=np.float64, count=len(results))
+            for field in NUMERIC_FIELDS
+        }
+        metrics = {
+            field: np.fromiter((getattr(result.value_metrics, field) for result in results),
+                               dtype=np.float64, count=len(results))
+            for field in METRIC_FIELDS
+        }
+        lists = {field: [getattr(result, field) for result in results] for field in LIST_FIELDS}
+        objects = {field: [getattr(result, field) for result in results] for field in OBJECT_FIELDS}
+        return cls(text, numeric, metrics, lists, objects)
+
+    @classmethod
+    def from_batch(cls, batch: BatchAnalysisResult,
+                   analysis_date: Optional[str] = None) -> 'AnalysisResultStore':
+        """
+        ValueAnalyzer.analyze_batch() 결과를 종목별 객체 생성 없이 저장소로 변환합니다.
+        (상세 분석 텍스트는 비워 둡니다)
+        """
+        n = len(batch)
+        columns = batch.columns
+        text = {
+            'symbol': list(batch.symbols),
+            'company_name': list(batch.company_names),
+            'analysis_date': [analysis_date or datetime.now().isoformat()] * n,
+            'investment_grade': list(batch.investment_grades),
+            'detailed_analysis': [''] * n,
+        }
+        numeric = {
+            'confidence_score': batch.confidence_scores,
+            'target_price': batch.target_prices,
+            'current_price': columns['current_price'],
+            'upside_potential': batch.upside_potentials,
+        }
+        metrics = {
+            field: columns[field] if field in columns else np.full(n, 1.5)  # current_ratio 기본값
+            for field in METRIC_FIELDS
+        }
+        lists = {
+            'key_strengths': batch.key_strengths,
+            'key_weaknesses': batch.key_weaknesses,
+            'risks': batch.risks,
+        }
+        objects = {}
+        if batch.target_distribution is not None:
+            from .monte_carlo import TargetPriceSimulator
+            objects['target_price_distribution'] = [
+                TargetPriceSimulator.distribution(batch.target_distribution, i) for i in range(n)
+            ]
+        if batch.peer_percentiles is not None:
+            objects['peer_percentiles'] = batch.peer_percentiles
+        if batch.risk_metrics is not None:
+            objects['risk_metrics'] = batch.risk_metrics
+        return cls(text, numeric, metrics, lists, objects)
+
+    def __len__(self) -> int:
+        return len(self.text['symbol'])
+
+    def __getitem__(self, index: int) -> AnalysisResultRow:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return AnalysisResultRow(self, index)
+
+    def __iter__(self) -> Iterator[AnalysisResultRow]:
+        return (AnalysisResultRow(self, index) for index in range(len(self)))
+
+    def column(self, name: str) -> Union[np.ndarray, List]:
+        """열 하나를 반환합니다 (숫자 열과 지표는 numpy 배열)."""
+        for group in (self.numeric, self.metrics, self.text, self.lists):
+            if name in group:
+                return group[name]
+        raise KeyError(name)
+
+    def record(self, index: int) -> Dict:
+        """행 하나를 AnalysisResult.to_dict()와 같은 형태로 반환합니다."""
+        record = {field: self.text[field][index] for field in TEXT_FIELDS}
+        record.update({field: float(self.numeric[field][index]) for field in NUMERIC_FIELDS})
+        record.update({field: list(self.lists[field][index]) for field in LIST_FIELDS})
+        record['value_metrics'] = {field: float(self.metrics[field][index]) for field in METRIC_FIELDS}
+        record.update({field: values[index] for field, values in self.objects.items()})
+        return record
+
+    def to_records(self) -> List[Dict]:
+        """모든 행을 딕셔너리 목록으로 반환합니다 (보고서 템플릿, JSON 응답용)."""
+        numeric = {field: values.tolist() for field, values in self.numeric.items()}
+        metrics = {field: values.tolist() for field, values in self.metrics.items()}
+        records = []
+        for index in range(len(self)):
+            record = {field: self.text[field][index] for field in TEXT_FIELDS}
+            record.update({field: numeric[field][index] for field in NUMERIC_FIELDS})
+            record.update({field: list(self.lists[field][index]) for field in LIST_FIELDS})
+            record['value_metrics'] = {field: metrics[field][index] for field in METRIC_FIELDS}
+            record.update({field: values[index] for field, values in self.objects.items()})
+            records.append(record)
+        return records
+
+    def summary_stats(self) -> Dict:
+        """등급 분포와 평균 지표를 계산합니다 (ReportGenerator 요약 통계와 같은 키)."""
+        if len(self) == 0:
+            return {}
+
+        grade_distribution: Dict[str, int] = {}
+        for grade in self.text['investment_grade']:
+            grade_distribution[grade] = grade_distribution.get(grade, 0) + 1
+
+        def positive_mean(values: np.ndarray) -> float:
+            positive = values[values > 0]
+            return float(positive.mean()) if positive.size else 0
+
+        upside = self.numeric['upside_potential']
+        return {
+            'total_stocks': len(self),
+            'grade_distribution': grade_distribution,
+            'avg_pe_ratio': positive_mean(self.metrics['pe_ratio']),
+            'avg_pb_ratio': positive_mean(self.metrics['pb_ratio']),
+            'avg_roe': positive_mean(self.metrics['roe']),
+            'avg_upside_potential': float(upside.mean()),
+            'best_performer': self.text['symbol'][int(np.argmax(upside))],
+            'worst_performer': self.text['symbol'][int(np.argmin(upside))]
+        }
+
+    def distribution_columns(self) -> Dict[str, np.ndarray]:
+        """
+        목표가 분포를 평탄화한 열을 반환합니다 (예: target_price_p5, upside_potential_p95, prob_upside).
+        분포가 없는 행은 NaN이며, 어떤 행에도 분포가 없으면 빈 딕셔너리입니다.
+        """
+        distributions = self.objects['target_price_distribution']
+        sample = next((dist for dist in distributions if dist), None)
+        if sample is None:
+            return {}
+
+        keys = [(group, label) for group in ('target_price', 'upside_potential') for label in sample[group]]
+        keys += [(name, None) for name in ('mean_target_price', 'prob_upside')]
+        columns = {}
+        for group, label in keys:
+            name = f"{group}_{label}" if label else group
+            columns[name] = np.array([
+                (dist[group][label] if label else dist[group]) if dist else np.nan
+                for dist in distributions
+            ], dtype=np.float64)
+        return columns
+
+    def percentile_columns(self) -> Dict[str, np.ndarray]:
+        """동종 기업 백분위를 평탄화한 열을 반환합니다 (예: roe_sector_pct, 없으면 NaN)."""
+        ranks = self.objects['peer_percentiles']
+        if not any(ranks):
+            return {}
+        return {
+            name: np.array([
+                rank[name] if rank and rank.get(name) is not None else np.nan for rank in ranks
+            ], dtype=np.float64)
+            for name in percentile_names()
+        }
+
+    def risk_metric_columns(self) -> Dict[str, np.ndarray]:
+        """위험 지표를 평탄화한 열을 반환합니다 (예: risk_beta, risk_max_drawdown, 없으면 NaN)."""
+        rows = self.objects['risk_metrics']
+        if not any(rows):
+            return {}
+        return {
+            f"risk_{name}": np.array([
+                row[name] if row and row.get(name) is not None else np.nan for row in rows
+            ], dtype=np.float64)
+            for name in ['beta', 'annual_return'] + RISK_METRIC_COLUMNS
+        }
+
+    def to_pandas(self):
+        """평탄화된 열(지표, 목표가 분포, 동종 기업 백분위, 위험 지표 포함)로 DataFrame을 생성합니다."""
+        import pandas as pd
+
+        data = {**self.text, **self.numeric, **self.metrics, **self.lists,
+                **self.distribution_columns(), **self.percentile_columns(), **self.risk_metric_columns()}
+        return pd.DataFrame(data)
+
+    def to_arrow(self):
+        """
+        pyarrow.Table로 변환합니다. 숫자 열은 numpy 버퍼를 복사 없이 공유합니다.
+
+        Raises:
+            ImportError: pyarrow가 설치되지 않은 경우
+        """
+        if not PYARROW_AVAILABLE:
+            raise ImportError("Arrow/Parquet 내보내기에는 pyarrow 패키지가 필요합니다 (pip install pyarrow)")
+
+        arrays = {}
+        for field in TEXT_FIELDS:
+            arrays[field] = pa.array(self.text[field], type=pa.string())
+        for field in NUMERIC_FIELDS:
+            arrays[field] = pa.array(np.ascontiguousarray(self.numeric[field], dtype=np.float64))
+        for field in LIST_FIELDS:
+            arrays[field] = pa.array(self.lists[field], type=pa.list_(pa.string()))
+        for field in METRIC_FIELDS:
+            arrays[field] = pa.array(np.ascontiguousarray(self.metrics[field], dtype=np.float64))
+        for field, values in {**self.distribution_columns(), **self.percentile_columns(),
+                              **self.risk_metric_columns()}.items():
+            arrays[field] = pa.array(values, from_pandas=True)  # NaN → null
+        return pa.table(arrays)
+
+    def to_parquet(self, path: Union[str, Path]) -> str:
+        """Parquet 파일로 저장하고 경로를 반환합니다."""
+        table = self.to_arrow()
+        try:
+            pq.write_table(table, str(path), compression='zstd')
+            return str(path)
+        except Exception as e:
+            self.logger.error(f"Parquet 저장 중 오류: {str(e)}")
+            raise Exception(f"Parquet 저장 실패: {str(e)}")
+
+    def to_feather(self, path: Union[str, Path]) -> str:
+        """Arrow IPC(Feather v2) 파일로 저장하고 경로를 반환합니다."""
+        table = self.to_arrow()
+        try:
+            import pyarrow.feather as feather
+            feather.write_feather(table, str(path))
+            return str(path)
+        except Exception as e:
+            self.logger.error(f"Arrow 파일 저장 중 오류: {str(e)}")
+            raise Exception(f"Arrow 파일 저장 실패: {str(e)}")
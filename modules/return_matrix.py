@@ -0,0 +1,313 @@
+import os
+import logging
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+TRADING_DAYS = 252
+
+# 비교군 대표 지수 (COMPARISON_BENCHMARK로 재정의)
+DEFAULT_BENCHMARK = '^GSPC'
+KOREA_BENCHMARK = '^KS11'
+KOREA_SUFFIXES = ('.KS', '.KQ')
+EQUAL_WEIGHT_BENCHMARK = 'EQUAL_WEIGHT'  # 지수 이력이 없을 때 비교 종목 동일가중 수익률
+
+
+def benchmark_for(symbols: List[str]) -> str:
+    """비교 종목에 맞는 대표 지수 (모두 국내 종목이면 KOSPI, 그 외 S&P 500)"""
+    configured = os.getenv('COMPARISON_BENCHMARK')
+    if configured:
+        return configured
+    if symbols and all(symbol.upper().endswith(KOREA_SUFFIXES) for symbol in symbols):
+        return KOREA_BENCHMARK
+    return DEFAULT_BENCHMARK
+
+
+def close_prices(price_histories: Dict[str, pd.DataFrame]) -> Tuple[pd.DataFrame, List[str]]:
+    """
+    수집기 price_history(또는 종가 Series)를 날짜 × 종목 종가 표로 합칩니다.
+    시간대는 제거해 날짜 단위로 맞추고, 거래소 휴장일 차이는 직전 종가로 채웁니다 (상장 전 구간은 NaN 유지).
+
+    Returns:
+        Tuple[pd.DataFrame, List[str]]: (종가 표, 가격 이력이 없는 종목)
+    """
+    symbols, days, values, units = [], [], [], []
+    for symbol, history in price_histories.items():
+        if history is None or len(history) == 0:
+            continue
+        close = history['Close'] if isinstance(history, pd.DataFrame) else history
+        index = close.index
+        if not isinstance(index, pd.DatetimeIndex):
+            index = pd.DatetimeIndex(pd.to_datetime(index))
+        if index.tz is not None:
+            index = index.tz_localize(None)
+        symbols.append(symbol)
+        days.append(index.values.astype('datetime64[D]'))
+        units.append(index.dtype)
+        values.append(close.to_numpy(dtype=np.float64))
+
+    missing = [symbol for symbol in price_histories if symbol not in set(symbols)]
+    if not symbols:
+        return pd.DataFrame(), missing
+
+    # 모든 종목의 (날짜, 종목) 관측을 한 배열로 이어 붙여 날짜 정렬·정규화를 한 번에 처리
+    columns = np.repeat(np.arange(len(symbols)), [len(day) for day in days])
+    dates, rows = np.unique(np.concatenate(days), return_inverse=True)
+    values = np.concatenate(values)
+
+    # 같은 날짜의 중복 관측은 마지막 값 사용
+    cells = rows * len(symbols) + columns
+    _, last = np.unique(cells[::-1], return_index=True)
+    keep = len(cells) - 1 - last
+    table = np.full((len(dates), len(symbols)), np.nan)
+    table.flat[cells[keep]] = values[keep]
+
+    # 날짜 인덱스는 입력 이력의 시간 단위(ns, us 등)를 유지
+    frame = pd.DataFrame(table, index=pd.DatetimeIndex(dates.astype(np.result_type(*units))), columns=symbols)
+    return frame.ffill(), missing
+
+
+def aligned_returns(price_histories: Dict[str, pd.DataFrame], min_observations: int = 60,
+                    lookback_days: Optional[int] = None) -> Tuple[pd.DataFrame, List[str]]:
+    """
+    수집기 price_history(또는 종가 Series)를 날짜 기준으로 맞춘 일간 수익률 표로 변환합니다.
+
+    유효 수익률이 min_observations 미만인 종목은 제외한 뒤 남은 종목이 모두 값을 가진 날짜만 사용합니다.
+
+    Returns:
+        Tuple[pd.DataFrame, List[str]]: (날짜 × 종목 수익률, 제외한 종목)
+    """
+    prices, excluded = close_prices(price_histories)
+    if prices.empty:
+        return pd.DataFrame(), excluded
+
+    if lookback_days:
+        prices = prices.iloc[-(lookback_days + 1):]
+    returns = prices.pct_change(fill_method=None).iloc[1:]
+    returns = returns.replace([np.inf, -np.inf], np.nan)
+
+    short = returns.columns[returns.notna().sum() < min_observations]
+    excluded += short.tolist()
+    returns = returns.drop(columns=short).dropna()
+    return returns, excluded
+
+
+class ReturnMatrix:
+    """
+    비교 종목의 날짜 정렬 일간 수익률 행렬 (관측 수 × 종목 수)과 벤치마크 수익률입니다.
+
+    가격 이력은 생성 시 한 번만 정렬·변환하며, 상관계수, 롤링 베타, 낙폭 동시 발생 비율 등
+    파생 통계는 모두 이 행렬에서 행렬 곱과 누적합으로 계산합니다.
+    """
+
+    def __init__(self, dates: pd.DatetimeIndex, symbols: List[str], returns: np.ndarray,
+                 benchmark: Optional[np.ndarray] = None, benchmark_symbol: Optional[str] = None,
+                 excluded: Optional[List[str]] = None):
+        self.dates = dates
+        self.symbols = list(symbols)
+        self.returns = returns
+        self.excluded = excluded or []
+        if benchmark is None:
+            # 지수 이력이 없으면 비교 종목 동일가중 수익률을 벤치마크로 사용
+            benchmark = returns.mean(axis=1)
+            benchmark_symbol = EQUAL_WEIGHT_BENCHMARK
+        self.benchmark = benchmark
+        self.benchmark_symbol = benchmark_symbol
+
+    @classmethod
+    def from_price_histories(cls, price_histories: Dict[str, pd.DataFrame],
+                             benchmark_history: Optional[pd.DataFrame] = None,
+                             benchmark_symbol: Optional[str] = None,
+                             min_observations: Optional[int] = None) -> 'ReturnMatrix':
+        """
+        종목별 price_history와 (선택) 벤치마크 가격 이력을 같은 날짜 축으로 정렬합니다.
+
+        Args:
+            price_histories: 종목별 price_history (수집기 stock_data['price_history']) 또는 종가 Series
+            benchmark_history: 벤치마크 지수 가격 이력 (없거나 부족하면 동일가중 비교군)
+            benchmark_symbol: 벤치마크 이름
+            min_observations: 종목별 최소 일간 수익률 수 (기본값: COMPARISON_MIN_OBSERVATIONS, 60)
+        """
+        min_observations = min_observations or int(os.getenv('COMPARISON_MIN_OBSERVATIONS', '60'))
+        histories = dict(price_histories)
+        benchmark_key = None
+        if benchmark_history is not None and len(benchmark_history) > 0:
+            benchmark_key = f"__benchmark__{benchmark_symbol}"
+            histories[benchmark_key] = benchmark_history
+
+        returns, excluded = aligned_returns(histories, min_observations)
+        benchmark = None
+        if benchmark_key in returns.columns:
+            benchmark = returns.pop(benchmark_key).to_numpy()
+        excluded = [symbol for symbol in excluded if symbol != benchmark_key]
+        if returns.shape[1] == 0:
+            raise ValueError("가격 이력이 충분한 종목이 없습니다.")
+
+        return cls(returns.index, returns.columns.tolist(), returns.to_numpy(), benchmark,
+                   benchmark_symbol if benchmark is not None else None, excluded)
+
+    @property
+    def observations(self) -> int:
+        return self.returns.shape[0]
+
+    def correlation(self) -> np.ndarray:
+        """종목 간 상관계수 행렬 (표준화 수익률의 행렬 곱)"""
+        x = self.returns - self.returns.mean(axis=0)
+        std = x.std(axis=0)
+        z = np.divide(x, std, out=np.zeros_like(x), where=std > 0)
+        corr = z.T @ z / len(z)
+        np.fill_diagonal(corr, 1.0)
+        return corr
+
+    def betas(self) -> np.ndarray:
+        """전체 기간 벤치마크 대비 베타"""
+        x = self.returns - self.returns.mean(axis=0)
+        b = self.benchmark - self.benchmark.mean()
+        variance = b @ b
+        return x.T @ b / variance if variance > 0 else np.full(len(self.symbols), np.nan)
+
+    def rolling_betas(self, window: int) -> np.ndarray:
+        """
+        window 거래일 롤링 베타 ((관측 수 - window + 1) × 종목 수).
+        누적합 차분으로 모든 구간의 공분산·분산을 한 번에 계산합니다.
+        """
+        if self.observations < window:
+            return np.empty((0, len(self.symbols)))
+        r, b = self.returns, self.benchmark
+
+        def window_sum(values: np.ndarray) -> np.ndarray:
+            cumulative = np.cumsum(values, axis=0)
+            cumulative = np.concatenate([np.zeros((1,) + values.shape[1:]), cumulative])
+            return cumulative[window:] - cumulative[:-window]
+
+        sum_r, sum_b = window_sum(r), window_sum(b)
+        covariance = window_sum(r * b[:, None]) - sum_r * sum_b[:, None] / window
+        variance = window_sum(b * b) - sum_b * sum_b / window
+        return np.divide(covariance, variance[:, None], out=np.full_like(covariance, np.nan),
+                         where=variance[:, None] > 1e-18)
+
+    def drawdowns(self) -> np.ndarray:
+        """일별 고점 대비 낙폭 (관측 수 × 종목 수, 0 이하)"""
+        wealth = np.cumprod(1 + self.returns, axis=0)
+        return wealth / np.maximum.accumulate(wealth, axis=0) - 1
+
+    def drawdown_overlap(self, threshold: float, drawdowns: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        두 종목이 동시에 threshold 이상 하락해 있던 날의 비율 (어느 한쪽이라도 하락한 날 대비, 자카드 지수).
+        하락 없이 겹칠 날이 없으면 NaN.
+        """
+        if drawdowns is None:
+            drawdowns = self.drawdowns()
+        under = (drawdowns <= -threshold).astype(np.float64)
+        both = under.T @ under
+        days = np.diag(both)
+        either = days[:, None] + days[None, :] - both
+        return np.divide(both, either, out=np.full_like(both, np.nan), where=either > 0)
+
+    def summary(self, beta_window: Optional[int] = None, drawdown_threshold: Optional[float] = None,
+                series_step: int = 5) -> Dict:
+        """
+        비교용 가격 통계를 JSON 직렬화 가능한 딕셔너리로 반환합니다.
+
+        Args:
+            beta_window: 롤링 베타 기간 (기본값: COMPARISON_BETA_WINDOW, 60거래일)
+            drawdown_threshold: 낙폭 동시 발생 기준 (기본값: COMPARISON_DRAWDOWN_THRESHOLD, 0.10)
+            series_step: 롤링 베타 시계열 표본 간격 (거래일)
+        """
+        beta_window = beta_window or int(os.getenv('COMPARISON_BETA_WINDOW', '60'))
+        if drawdown_threshold is None:
+            drawdown_threshold = float(os.getenv('COMPARISON_DRAWDOWN_THRESHOLD', '0.10'))
+        n = len(self.symbols)
+
+        corr = self.correlation()
+        pairs = np.triu_indices(n, k=1)
+        betas = self.betas()
+        rolling = self.rolling_betas(beta_window)
+        drawdowns = self.drawdowns()
+        overlap = self.drawdown_overlap(drawdown_threshold, drawdowns)
+        annual_return = np.prod(1 + self.returns, axis=0) ** (TRADING_DAYS / self.observations) - 1
+        volatility = self.returns.std(axis=0) * np.sqrt(TRADING_DAYS)
+
+        # 가장 강하게 함께 움직이는 종목 쌍
+        pair_rows = [
+            {'pair': [self.symbols[i], self.symbols[j]], 'correlation': float(corr[i, j]),
+             'drawdown_overlap': _optional(overlap[i, j])}
+            for i, j in zip(*pairs)
+        ]
+        pair_rows.sort(key=lambda row: row['correlation'], reverse=True)
+
+        sampled = np.arange(len(rolling) - 1, -1, -series_step)[::-1]
+        window_dates = self.dates[beta_window - 1:]
+
+        return {
+            'symbols': self.symbols,
+            'benchmark': self.benchmark_symbol,
+            'start_date': self.dates[0].date().isoformat(),
+            'end_date': self.dates[-1].date().isoformat(),
+            'observations': self.observations,
+            'excluded': self.excluded,
+            'correlation': corr.tolist(),
+            'average_correlation': float(corr[pairs].mean()) if n > 1 else None,
+            'pairs': pair_rows,
+            'per_symbol': {
+                symbol: {
+                    'annual_return': float(annual_return[i]),
+                    'volatility': float(volatility[i]),
+                    'beta': _optional(betas[i]),
+                    'rolling_beta': _optional(rolling[-1, i]) if len(rolling) else None,
+                    'rolling_beta_min': _optional(np.nanmin(rolling[:, i])) if len(rolling) else None,
+                    'rolling_beta_max': _optional(np.nanmax(rolling[:, i])) if len(rolling) else None,
+                    'max_drawdown': float(drawdowns[:, i].min()),
+                    'current_drawdown': float(drawdowns[-1, i]),
+                }
+                for i, symbol in enumerate(self.symbols)
+            },
+            'beta_window': beta_window,
+            'rolling_beta': {
+                'dates': [date.date().isoformat() for date in window_dates[sampled]],
+                'values': {
+                    symbol: [_optional(value) for value in rolling[sampled, i].tolist()]
+                    for i, symbol in enumerate(self.symbols)
+                },
+            },
+            'drawdown_threshold': drawdown_threshold,
+            'drawdown_overlap': [[_optional(value) for value in row] for row in overlap.tolist()],
+        }
+
+
+def price_comparison(stock_data: Dict[str, Dict], collector=None,
+                     period: str = "2y") -> Optional[Dict]:
+    """
+    비교 종목 stock_data의 price_history로 가격 비교 통계를 계산합니다.
+
+    수익률 행렬은 한 번만 만들어 상관계수·롤링 베타·낙폭 통계가 공유하며,
+    collector가 있으면 대표 지수(benchmark_for)를 벤치마크로 수집하고 실패하면 동일가중 비교군을 사용합니다.
+
+    Returns:
+        Optional[Dict]: ReturnMatrix.summary() 결과 (가격 이력이 부족하면 None)
+    """
+    logger = logging.getLogger(__name__)
+    price_histories = {symbol: data.get('price_history') for symbol, data in stock_data.items()}
+    if len(price_histories) < 2:
+        return None
+
+    benchmark_symbol = benchmark_for(list(price_histories))
+    benchmark_history = None
+    if collector is not None:
+        try:
+            benchmark_history = collector.get_price_history(benchmark_symbol, period)
+        except Exception as e:
+            logger.warning(f"벤치마크 {benchmark_symbol} 수집 실패, 동일가중 비교군 사용: {str(e)}")
+
+    try:
+        matrix = ReturnMatrix.from_price_histories(price_histories, benchmark_history, benchmark_symbol)
+        return matrix.summary()
+    except Exception as e:
+        logger.warning(f"가격 비교 통계 계산 실패: {str(e)}")
+        return None
+
+
+def _optional(value) -> Optional[float]:
+    value = float(value)
+    return None if np.isnan(value) else value
@@ -0,0 +1,221 @@
+import os
+import logging
+import threading
+from datetime import date
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from .cache_store import TTLCache, fingerprint
+from .return_matrix import TRADING_DAYS, benchmark_for, close_prices
+
+# 점수 규칙에서 사용할 수 있는 위험 지표 열 (beta는 기존 열을 직접 계산한 값으로 대체)
+RISK_METRIC_COLUMNS = ['volatility', 'sharpe_ratio', 'sortino_ratio', 'max_drawdown', 'value_at_risk']
+
+
+class RiskMetricsEngine:
+    """
+    가격 이력으로 베타, 샤프·소르티노 비율, 최대 낙폭, 과거 VaR을 계산합니다.
+
+    벤치마크 지수 이력은 지수별로 하루 한 번만 수집해 캐시하며, 같은 벤치마크를 쓰는 종목들은
+    (거래일 × 종목) 수익률 행렬 하나로 모아 결측 마스크를 적용한 행렬 연산으로 한 번에 계산합니다.
+    """
+
+    def __init__(self, loader: Optional[Callable[[str, str], pd.DataFrame]] = None,
+                 period: str = "2y", cache_ttl: Optional[float] = None,
+                 var_level: Optional[float] = None, risk_free_rate: Optional[float] = None,
+                 min_observations: Optional[int] = None):
+        """
+        Args:
+            loader: 벤치마크 가격 이력 수집 함수 (symbol, period) -> DataFrame
+                    (기본값: StockDataCollector.get_price_history)
+            period: 벤치마크 수집 기간
+            cache_ttl: 벤치마크 캐시 유효 시간(초) (기본값: BENCHMARK_CACHE_TTL, 86400 - 날짜가 바뀌면 다시 수집)
+            var_level: VaR 신뢰 수준 (기본값: RISK_VAR_LEVEL, 0.95)
+            risk_free_rate: 연간 무위험 수익률 (기본값: RISK_FREE_RATE, 0)
+            min_observations: 지표를 계산할 최소 일간 수익률 수 (기본값: RISK_MIN_OBSERVATIONS, 60)
+        """
+        self.logger = logging.getLogger(__name__)
+        self._loader = loader
+        self.period = period
+        if cache_ttl is None:
+            cache_ttl = float(os.getenv('BENCHMARK_CACHE_TTL', '86400'))
+        self.cache = TTLCache(
+            'benchmarks', ttl_seconds=cache_ttl, max_entries=20, persist=True
+        ) if cache_ttl > 0 else None
+        self.var_level = var_level or float(os.getenv('RISK_VAR_LEVEL', '0.95'))
+        if risk_free_rate is None:
+            risk_free_rate = float(os.getenv('RISK_FREE_RATE', '0'))
+        self.risk_free_rate = risk_free_rate
+        self.min_observations = min_observations or int(os.getenv('RISK_MIN_OBSERVATIONS', '60'))
+        self._lock = threading.Lock()
+        self._series: Dict[str, Optional[pd.Series]] = {}  # 캐시 키 -> 종가 (JSON 재해석 방지)
+
+    @property
+    def loader(self) -> Callable[[str, str], pd.DataFrame]:
+        if self._loader is None:
+            from .stock_data_collector import StockDataCollector
+            self._loader = StockDataCollector().get_price_history
+        return self._loader
+
+    def benchmark_closes(self, symbol: str) -> Optional[pd.Series]:
+        """
+        벤치마크 종가를 반환합니다 (하루 한 번 수집, 실패하면 None - 당일에는 다시 시도하지 않음).
+        """
+        key = fingerprint('benchmark', symbol, self.period, date.today().isoformat())
+        with self._lock:
+            if key in self._series:
+                return self._series[key]
+
+            cached = self.cache.get(key) if self.cache else None
+            if cached is not None:
+                closes = pd.Series(cached['close'], index=pd.DatetimeIndex(cached['dates']), name=symbol)
+            else:
+                try:
+                    history = self.loader(symbol, self.period)
+                    closes, _ = close_prices({symbol: history})
+                    closes = closes[symbol].dropna()
+                    print(f"📈 벤치마크 {symbol} 가격 이력 수집 ({len(closes)}일)")
+                    if self.cache:
+                        self.cache.set(key, {
+                            'dates': [day.date().isoformat() for day in closes.index],
+                            'close': closes.tolist(),
+                        }, tags={'benchmark': symbol})
+                except Exception as e:
+                    self.logger.warning(f"벤치마크 {symbol} 수집 실패, 베타 계산 생략: {str(e)}")
+                    closes = None
+
+            self._series[key] = closes
+            return closes
+
+    def compute(self, price_histories: Dict[str, pd.DataFrame],
+                benchmark: Optional[str] = None) -> Dict[str, Optional[Dict]]:
+        """
+        여러 종목의 위험 지표를 계산합니다.
+
+        Args:
+            price_histories: 종목별 price_history (수집기 stock_data['price_history']) 또는 종가 Series
+            benchmark: 모든 종목에 사용할 벤치마크 (기본값: 종목별 benchmark_for - 국내 ^KS11, 그 외 ^GSPC)
+
+        Returns:
+            Dict[str, Optional[Dict]]: 종목별 지표 (가격 이력이 부족하면 None)
+        """
+        groups: Dict[str, List[str]] = {}
+        for symbol in price_histories:
+            groups.setdefault(benchmark or benchmark_for([symbol]), []).append(symbol)
+
+        results: Dict[str, Optional[Dict]] = {}
+        for benchmark_symbol, symbols in groups.items():
+            results.update(self._compute_group(
+                {symbol: price_histories[symbol] for symbol in symbols}, benchmark_symbol
+            ))
+        return {symbol: results.get(symbol) for symbol in price_histories}
+
+    def compute_one(self, stock_data: Dict) -> Optional[Dict]:
+        """stock_data 하나의 위험 지표 (price_history가 없으면 None)"""
+        history = stock_data.get('price_history')
+        if history is None or len(history) == 0:
+            return None
+        symbol = stock_data.get('symbol', 'N/A')
+        return self.compute({symbol: history})[symbol]
+
+    def _compute_group(self, price_histories: Dict[str, pd.DataFrame],
+                       benchmark_symbol: str) -> Dict[str, Optional[Dict]]:
+        prices, _ = close_prices(price_histories)
+        if prices.empty:
+            return {}
+
+        benchmark_closes = self.benchmark_closes(benchmark_symbol)
+        if benchmark_closes is not None and len(benchmark_closes) > 1:
+            # 벤치마크 거래일 기준으로 정렬 (종목 휴장일은 직전 종가)
+            dates = benchmark_closes.index.union(prices.index)
+            prices = prices.reindex(dates).ffill()
+            bench = benchmark_closes.reindex(dates).ffill()
+            returns = prices.pct_change(fill_method=None).iloc[1:]
+            bench_returns = bench.pct_change(fill_method=None).iloc[1:].to_numpy()
+            rows = ~np.isnan(bench_returns)
+            r, b = returns.to_numpy()[rows], bench_returns[rows]
+        else:
+            benchmark_symbol = None
+            r = prices.pct_change(fill_method=None).iloc[1:].to_numpy()
+            b = None
+
+        metrics = self._metrics(r, b)
+        results = {}
+        for i, symbol in enumerate(prices.columns):
+            if metrics['observations'][i] < self.min_observations:
+                results[symbol] = None
+                continue
+            row = {name: _optional(values[i]) for name, values in metrics.items()}
+            row['observations'] = int(metrics['observations'][i])
+            row['benchmark'] = benchmark_symbol
+            row['var_level'] = self.var_level
+            results[symbol] = row
+        return results
+
+    def _metrics(self, r: np.ndarray, b: Optional[np.ndarray]) -> Dict[str, np.ndarray]:
+        """
+        (거래일 × 종목) 수익률 행렬의 지표를 결측 마스크 행렬 연산으로 계산합니다.
+        각 종목은 자기 수익률이 있는 날만 사용하며 베타의 벤치마크 평균·분산도 같은 날로 계산합니다.
+        """
+        r = np.where(np.isfinite(r), r, np.nan)
+        mask = ~np.isnan(r)
+        x = np.where(mask, r, 0.0)
+        count = mask.sum(axis=0)
+        n = np.maximum(count, 1)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mean = x.sum(axis=0) / n
+            variance = np.maximum((x * x).sum(axis=0) / n - mean ** 2, 0.0) * n / np.maximum(n - 1, 1)
+            std = np.sqrt(variance)
+
+            beta = np.full(r.shape[1], np.nan)
+            if b is not None:
+                weights = mask.astype(np.float64)
+                bench_mean = b @ weights / n
+                covariance = b @ x / n - mean * bench_mean
+                bench_variance = (b * b) @ weights / n - bench_mean ** 2
+                beta = np.where(bench_variance > 0, covariance / bench_variance, np.nan)
+
+            daily_rf = self.risk_free_rate / TRADING_DAYS
+            excess = mean - daily_rf
+            downside = np.where(mask, np.minimum(r - daily_rf, 0.0), 0.0)
+            downside_dev = np.sqrt((downside * downside).sum(axis=0) / n)
+            sharpe = np.where(std > 0, excess / std * np.sqrt(TRADING_DAYS), np.nan)
+            sortino = np.where(downside_dev > 0, excess / downside_dev * np.sqrt(TRADING_DAYS), np.nan)
+
+            # 수익률이 없는 날은 가격 변화 없음으로 누적
+            wealth = np.cumprod(1 + x, axis=0)
+            max_drawdown = (wealth / np.maximum.accumulate(wealth, axis=0) - 1).min(axis=0)
+            annual_return = wealth[-1] ** (TRADING_DAYS / n) - 1
+            value_at_risk = -np.nanquantile(np.where(count > 0, r, 0.0), 1 - self.var_level, axis=0)
+
+        return {
+            'beta': beta,
+            'annual_return': annual_return,
+            'volatility': std * np.sqrt(TRADING_DAYS),
+            'sharpe_ratio': sharpe,
+            'sortino_ratio': sortino,
+            'max_drawdown': max_drawdown,
+            'value_at_risk': value_at_risk,
+            'observations': count,
+        }
+
+
+def _optional(value) -> Optional[float]:
+    value = float(value)
+    return None if np.isnan(value) else value
+
+
+_engine: Optional[RiskMetricsEngine] = None
+_engine_lock = threading.Lock()
+
+
+def get_risk_engine() -> RiskMetricsEngine:
+    """프로세스 공용 위험 지표 엔진 (벤치마크 일간 캐시 공유)"""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = RiskMetricsEngine()
+        return _engine
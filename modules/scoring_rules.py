@@ -0,0 +1,350 @@
+import os
+import json
+import string
+import logging
+import threading
+from pathlib import Path
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .cache_store import fingerprint
+from .peer_index import percentile_names
+from .risk_metrics import RISK_METRIC_COLUMNS
+from .fundamentals_store import FUNDAMENTAL_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RULES_PATH = Path(__file__).resolve().parent.parent / 'config' / 'scoring_rules.json'
+
+# 규칙에서 사용할 수 있는 지표와 누락 시 기본값
+METRIC_DEFAULTS = {
+    'current_price': 0.0,
+    'pe_ratio': 0.0,
+    'pb_ratio': 0.0,
+    'peg_ratio': 0.0,
+    'dividend_yield': 0.0,
+    'roe': 0.0,
+    'roa': 0.0,
+    'debt_to_equity': 0.0,
+    'revenue_growth': 0.0,
+    'income_growth': 0.0,
+    'beta': 1.0,
+    'upside_potential': 0.0,
+}
+# 섹터·산업 내 백분위 (0~100, peer_index) - 동종 기업이 부족하면 NaN이므로 어떤 조건도 만족하지 않음
+METRIC_DEFAULTS.update({name: np.nan for name in percentile_names()})
+# 가격 이력 기반 위험 지표 (risk_metrics) - 가격 이력이 없으면 NaN
+METRIC_DEFAULTS.update({name: np.nan for name in RISK_METRIC_COLUMNS})
+# 연간 재무제표 기반 다년 추세 (fundamentals_store) - 재무제표가 없으면 NaN
+METRIC_DEFAULTS.update({name: np.nan for name in FUNDAMENTAL_COLUMNS})
+
+SIGNAL_KINDS = ['strength', 'weakness', 'risk']
+
+
+def _column(columns: Dict[str, np.ndarray], metric: str, n: int) -> np.ndarray:
+    """지표 열 (입력에 없으면 기본값 열)"""
+    values = columns.get(metric)
+    return np.full(n, METRIC_DEFAULTS[metric]) if values is None else values
+
+
+class ScoringRulesError(ValueError):
+    """규칙 정의가 잘못되었을 때 발생합니다."""
+
+
+@dataclass
+class _Bounds:
+    """구간 조건 배열 (행 = 조건, 열 방향 비교는 브로드캐스트)"""
+    lower: np.ndarray
+    lower_inclusive: np.ndarray
+    upper: np.ndarray
+    upper_inclusive: np.ndarray
+
+    def test(self, values: np.ndarray, i: int) -> np.ndarray:
+        """values (n,)가 i번째 조건을 만족하는지 나타내는 불리언 배열"""
+        above = values >= self.lower[i] if self.lower_inclusive[i] else values > self.lower[i]
+        below = values <= self.upper[i] if self.upper_inclusive[i] else values < self.upper[i]
+        return above & below
+
+    def contains(self, values: np.ndarray) -> np.ndarray:
+        """values (n,)에 대한 (n, 조건 수) 불리언 행렬"""
+        values = values[:, None]
+        above = np.where(self.lower_inclusive, values >= self.lower, values > self.lower)
+        below = np.where(self.upper_inclusive, values <= self.upper, values < self.upper)
+        return above & below
+
+
+def _compile_bounds(conditions: Sequence[Dict], where: str) -> _Bounds:
+    """{'gt'|'ge'|'lt'|'le'|'eq': 값} 조건 목록을 구간 배열로 변환합니다."""
+    size = len(conditions)
+    bounds = _Bounds(
+        lower=np.full(size, -np.inf), lower_inclusive=np.zeros(size, dtype=bool),
+        upper=np.full(size, np.inf), upper_inclusive=np.zeros(size, dtype=bool),
+    )
+    for i, condition in enumerate(conditions):
+        keys = {'gt', 'ge', 'lt', 'le', 'eq'} & set(condition)
+        if not keys:
+            raise ScoringRulesError(f"{where}: 조건(gt/ge/lt/le/eq)이 없습니다: {condition}")
+        if 'eq' in condition:
+            bounds.lower[i] = bounds.upper[i] = float(condition['eq'])
+            bounds.lower_inclusive[i] = bounds.upper_inclusive[i] = True
+        if 'gt' in condition or 'ge' in condition:
+            bounds.lower[i] = float(condition.get('gt', condition.get('ge')))
+            bounds.lower_inclusive[i] = 'ge' in condition
+        if 'lt' in condition or 'le' in condition:
+            bounds.upper[i] = float(condition.get('lt', condition.get('le')))
+            bounds.upper_inclusive[i] = 'le' in condition
+    return bounds
+
+
+def _check_metric(metric: str, where: str) -> str:
+    if metric not in METRIC_DEFAULTS:
+        raise ScoringRulesError(f"{where}: 알 수 없는 지표 '{metric}' (사용 가능: {', '.join(METRIC_DEFAULTS)})")
+    return metric
+
+
+@dataclass
+class _ScoreRule:
+    """지표 하나의 if/elif 점수 규칙 (먼저 일치한 구간의 점수 적용)"""
+    metric: str
+    category: Optional[str]
+    bounds: _Bounds
+    points: np.ndarray
+
+
+@dataclass
+class _Signal:
+    """강점/약점/위험 문구 규칙"""
+    kind: str
+    metrics: List[str]
+    bounds: Optional[_Bounds]
+    match_any: bool
+    sectors: Optional[List[str]]
+    message: str
+    fields: List[str]
+    template: str  # 필드 이름을 위치 인덱스로 바꾼 문구 (예: "{0:.1f}")
+
+
+class ScoringPlan:
+    """
+    scoring_rules.json을 컴파일한 점수 계획입니다.
+
+    점수 규칙은 지표별 구간 배열과 점수 배열로, 섹터 가중치는 (섹터 × 범주) 배율 행렬로 변환되어
+    종목 수와 관계없이 배열 연산 몇 번으로 전체 종목을 평가합니다.
+    단일 종목 분석(ValueAnalyzer.analyze_stock)과 일괄 분석(analyze_batch)이 같은 계획을 사용합니다.
+    """
+
+    def __init__(self, rules: Dict, source: Optional[str] = None):
+        """
+        Args:
+            rules: 규칙 정의 (scoring_rules.json 형식)
+            source: 규칙 파일 경로 (표시용)
+        """
+        self.rules = rules
+        self.source = source
+        self.version = fingerprint('scoring_rules', rules)[:12]
+        self.base_score = float(rules.get('base_score', 50))
+        self.confidence_range = tuple(rules.get('confidence_range', [0, 100]))
+
+        self._compile_scores(rules.get('score_rules', []))
+        self._compile_grades(rules.get('grades', []))
+        self._compile_sector_weights(rules.get('sector_weights') or {})
+        self._compile_signals(rules.get('signals', []))
+
+    def _compile_scores(self, score_rules: List[Dict]):
+        self.score_rules: List[_ScoreRule] = []
+        for i, rule in enumerate(score_rules):
+            where = f"score_rules[{i}]"
+            cases = rule.get('cases') or []
+            self.score_rules.append(_ScoreRule(
+                metric=_check_metric(rule.get('metric'), where),
+                category=rule.get('category'),
+                bounds=_compile_bounds(cases, where),
+                points=np.array([float(case.get('points', 0)) for case in cases]),
+            ))
+
+    def _compile_grades(self, grades: List[Dict]):
+        # 하한 오름차순 정렬 후 searchsorted로 등급 구간 결정 (하한 없는 등급이 최하위)
+        ranked = sorted(grades, key=lambda grade: grade.get('min_score', -np.inf))
+        if not ranked or 'min_score' in ranked[0]:
+            raise ScoringRulesError("grades: 하한(min_score)이 없는 최하위 등급이 하나 필요합니다")
+        self.grade_thresholds = np.array([grade['min_score'] for grade in ranked[1:]], dtype=np.float64)
+        self.grade_labels = np.array([grade['grade'] for grade in ranked], dtype=object)
+
+    def _compile_sector_weights(self, config: Dict):
+        self.sector_weighting = bool(config.get('enabled', False))
+        self.categories = list(config.get('categories', []))
+        default = config.get('default', {})
+        sectors = config.get('sectors', {})
+
+        # 행 0은 default, 이후 섹터 순서. default 대비 배율로 적용 (default 섹터는 배율 1)
+        self.sector_index = {sector: i + 1 for i, sector in enumerate(sectors)}
+        weights = np.array(
+            [[float(default.get(category, 0)) for category in self.categories]] +
+            [[float(weights.get(category, 0)) for category in self.categories] for weights in sectors.values()]
+        ).reshape(len(sectors) + 1, len(self.categories))
+        self.sector_multipliers = np.divide(
+            weights, weights[0], out=np.ones_like(weights), where=weights[0] > 0
+        )
+
+    def _compile_signals(self, signals: List[Dict]):
+        self.signals: List[_Signal] = []
+        formatter = string.Formatter()
+        for i, signal in enumerate(signals):
+            where = f"signals[{i}]"
+            kind = signal.get('kind')
+            if kind not in SIGNAL_KINDS:
+                raise ScoringRulesError(f"{where}: kind는 {', '.join(SIGNAL_KINDS)} 중 하나여야 합니다")
+            conditions = signal.get('all') or signal.get('any') or []
+            message = signal.get('message', '')
+            fields, template = [], ''
+            for literal, field, spec, conversion in formatter.parse(message):
+                template += literal.replace('{', '{{').replace('}', '}}')
+                if field is not None:
+                    fields.append(_check_metric(field, f"{where}.message"))
+                    template += '{' + str(len(fields) - 1) + (f'!{conversion}' if conversion else '') + \
+                        (f':{spec}' if spec else '') + '}'
+
+            self.signals.append(_Signal(
+                kind=kind,
+                metrics=[_check_metric(condition.get('metric'), where) for condition in conditions],
+                bounds=_compile_bounds(conditions, where) if conditions else None,
+                match_any='any' in signal,
+                sectors=signal.get('sectors'),
+                message=message,
+                fields=fields,
+                template=template,
+            ))
+
+    def _sector_rows(self, sectors: Sequence[str]) -> np.ndarray:
+        return np.fromiter((self.sector_index.get(sector, 0) for sector in sectors),
+                           dtype=np.intp, count=len(sectors))
+
+    def score(self, columns: Dict[str, np.ndarray]) -> np.ndarray:
+        """
+        규칙 점수를 계산합니다.
+
+        Args:
+            columns: 지표 배열 (upside_potential 포함, 섹터 가중치 사용 시 'sector' 열 필요)
+        """
+        n = len(columns['upside_potential'])
+        score = np.full(n, self.base_score)
+        multipliers = None
+        if self.sector_weighting and self.categories:
+            multipliers = self.sector_multipliers[self._sector_rows(columns['sector'])]
+
+        for rule in self.score_rules:
+            if not len(rule.points):
+                continue
+            matches = rule.bounds.contains(_column(columns, rule.metric, n))
+            # 각 행에서 처음 일치한 구간 (elif 의미)
+            first = matches.argmax(axis=1)
+            points = np.where(matches.any(axis=1), rule.points[first], 0.0)
+            if multipliers is not None and rule.category in self.categories:
+                points = points * multipliers[:, self.categories.index(rule.category)]
+            score += points
+        return score
+
+    def grade(self, scores: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        점수를 등급 값과 신뢰도로 변환합니다.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: (등급 값 문자열 배열, 신뢰도)
+        """
+        grades = self.grade_labels[np.searchsorted(self.grade_thresholds, scores, side='right')]
+        return grades, np.clip(scores, *self.confidence_range)
+
+    def signal_lists(self, columns: Dict[str, np.ndarray]) -> Dict[str, List[List[str]]]:
+        """
+        행별 강점/약점/위험 문구를 규칙 순서대로 생성합니다.
+
+        Returns:
+            Dict[str, List[List[str]]]: {'strength': [...], 'weakness': [...], 'risk': [...]}
+        """
+        n = len(columns['upside_potential'])
+        result = {kind: [[] for _ in range(n)] for kind in SIGNAL_KINDS}
+
+        for signal in self.signals:
+            mask = np.ones(n, dtype=bool)
+            if signal.bounds is not None:
+                tests = [signal.bounds.test(_column(columns, metric, n), i) for i, metric in enumerate(signal.metrics)]
+                mask = np.logical_or.reduce(tests) if signal.match_any else np.logical_and.reduce(tests)
+            if signal.sectors is not None:
+                mask &= np.isin(columns['sector'], signal.sectors)
+
+            lists = result[signal.kind]
+            rows = np.flatnonzero(mask)
+            if signal.fields:
+                # 일치한 행의 값만 파이썬 float로 꺼내 포맷 (numpy 스칼라 포맷보다 빠름)
+                values = zip(*(_column(columns, field, n)[rows].tolist() for field in signal.fields))
+                messages = [signal.template.format(*row) for row in values]
+            else:
+                messages = [signal.message] * len(rows)
+            for i, message in zip(rows.tolist(), messages):
+                lists[i].append(message)
+        return result
+
+    @staticmethod
+    def single_row(values: Dict, sector: Optional[str] = None) -> Dict[str, np.ndarray]:
+        """단일 종목 지표 딕셔너리를 1행 배열 열로 변환합니다 (누락값은 기본값)."""
+        columns = {}
+        for name, default in METRIC_DEFAULTS.items():
+            value = values.get(name)
+            columns[name] = np.array([default if value is None else float(value)])
+        columns['sector'] = np.array([sector or 'Unknown'], dtype=object)
+        return columns
+
+    def describe(self) -> Dict:
+        """규칙 버전과 구성 요약을 반환합니다."""
+        return {
+            'version': self.version,
+            'source': self.source,
+            'score_rules': len(self.score_rules),
+            'signals': len(self.signals),
+            'grades': self.grade_labels.tolist(),
+            'sector_weighting': self.sector_weighting,
+        }
+
+
+_plan: Optional[ScoringPlan] = None
+_plan_mtime: Optional[float] = None
+_plan_lock = threading.Lock()
+
+
+def rules_path() -> Path:
+    """규칙 파일 경로 (SCORING_RULES_PATH 환경 변수로 재지정)."""
+    return Path(os.getenv('SCORING_RULES_PATH') or DEFAULT_RULES_PATH)
+
+
+def get_scoring_plan() -> ScoringPlan:
+    """
+    규칙 파일을 컴파일한 계획을 반환합니다. 파일이 수정되면 다시 컴파일하며,
+    새 규칙이 잘못되었으면 경고 후 이전 계획을 계속 사용합니다.
+    """
+    global _plan, _plan_mtime
+    path = rules_path()
+    try:
+        mtime = path.stat().st_mtime
+    except OSError as e:
+        if _plan is None:
+            raise Exception(f"점수 규칙 파일을 찾을 수 없습니다 ({path}): {str(e)}")
+        return _plan
+
+    with _plan_lock:
+        if _plan is not None and mtime == _plan_mtime and _plan.source == str(path):
+            return _plan
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                plan = ScoringPlan(json.load(f), source=str(path))
+        except (ValueError, KeyError, TypeError) as e:
+            if _plan is None:
+                raise Exception(f"점수 규칙 로드 실패 ({path}): {str(e)}")
+            logger.warning(f"점수 규칙 로드 실패, 이전 규칙(v{_plan.version}) 유지: {str(e)}")
+            _plan_mtime = mtime
+            return _plan
+        if _plan is not None:
+            logger.info(f"점수 규칙 변경 감지: v{_plan.version} → v{plan.version}")
+        _plan, _plan_mtime = plan, mtime
+        return _plan
@@ -1,14 +1,57 @@
 import yfinance as yf
 import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Tuple
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+import os
 import logging
+import threading
+
+from .cache_store import TTLCache
+from .earnings_calendar import get_earnings_calendar
+from .fundamentals_store import fiscal_period, get_fundamentals_store
+
+STATEMENT_NAMES = ['financials', 'balance_sheet', 'cashflow']
+
+
+def _frame_to_json(frame: pd.DataFrame) -> Dict:
+    """재무제표 DataFrame을 JSON 직렬화 가능한 딕셔너리로 변환합니다 (결측은 None)."""
+    values = frame.apply(pd.to_numeric, errors='coerce').to_numpy(dtype=np.float64)
+    return {
+        'index': [str(label) for label in frame.index],
+        'columns': [pd.Timestamp(column).isoformat() for column in frame.columns],
+        'data': [[None if np.isnan(value) else float(value) for value in row] for row in values],
+    }
+
+
+def _frame_from_json(data: Dict) -> pd.DataFrame:
+    return pd.DataFrame(
+        data['data'], index=data['index'], columns=pd.DatetimeIndex(data['columns']), dtype=np.float64
+    )
+
 
 class StockDataCollector:
     def __init__(self):
         self.logger = logging.getLogger(__name__)
         
+        # 재무제표 캐시 - 다음 실적 발표 반영 시각까지 유효 (STATEMENT_CACHE=false면 매번 수집)
+        self.calendar = get_earnings_calendar()
+        self.statement_cache = TTLCache(
+            'statements', ttl_seconds=self.calendar.fallback_ttl, max_entries=2000, persist=True
+        ) if os.getenv('STATEMENT_CACHE', 'true').lower() == 'true' else None
+        self.statement_fetches = 0
+        self.statement_cache_hits = 0
+        # 실적 발표 후 새 회계연도 재무제표가 아직 없으면 짧은 주기로 재확인 (발표일로부터 최대 EARNINGS_RETRY_DAYS일)
+        self.report_retry_ttl = float(os.getenv('EARNINGS_RETRY_TTL', '21600'))
+        self.report_retry_window = timedelta(days=int(os.getenv('EARNINGS_RETRY_DAYS', '14')))
+        # 종목별 직전 실적 발표일 (새 회계연도 열 확인 대기 중, 프로세스 메모리에만 보관)
+        self._awaiting_reports: Dict[str, date] = {}
+        # 실적 일정을 아직 조회하지 않은 종목 (백그라운드 스레드가 있으면 그쪽에서 조회)
+        self._untracked: set = set()
+        self._refresh_thread = None
+        self._refresh_stop = threading.Event()
+        self._on_refresh: Optional[Callable[[List[str]], None]] = None
+        
     def get_stock_data(self, symbol: str, period: str = "2y") -> Dict:
         """
         주식 종목의 기본 정보와 재무 데이터를 수집합니다.
@@ -34,10 +77,8 @@ class StockDataCollector:
             if hist.empty:
                 raise ValueError(f"종목 {symbol}의 주가 데이터를 찾을 수 없습니다.")
             
-            # 재무제표 데이터
-            financials = stock.financials
-            balance_sheet = stock.balance_sheet
-            cashflow = stock.cashflow
+            # 재무제표 데이터 (다음 실적 발표 전까지는 캐시 사용)
+            financials, balance_sheet, cashflow = self.get_statements(symbol, stock)
             
             # 배당 정보
             dividends = stock.dividends
@@ -47,6 +88,11 @@ class StockDataCollector:
                 info, hist, financials, balance_sheet, cashflow, dividends
             )
             
+            # 다년 재무 추세 (새 회계연도가 공시되었을 때만 재무제표 파싱)
+            fundamentals = get_fundamentals_store().features(symbol, financials, balance_sheet, cashflow)
+            if fundamentals and fundamentals.get('current_ratio') is not None:
+                financial_metrics['current_ratio'] = fundamentals['current_ratio']
+            
             print(f"✅ {symbol} 데이터 수집 완료")
             
             return {
@@ -63,6 +109,7 @@ class StockDataCollector:
                 'cashflow': cashflow,
                 'dividends': dividends,
                 'financial_metrics': financial_metrics,
+                'fundamentals': fundamentals,
                 'data_collected_at': datetime.now().isoformat()
             }
                 
@@ -162,6 +209,182 @@ class StockDataCollector:
         
         return metrics
     
+    def get_statements(self, symbol: str, stock: Optional[yf.Ticker] = None
+                       ) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+        """
+        연간 손익계산서, 재무상태표, 현금흐름표를 반환합니다.
+        
+        캐시된 재무제표는 다음 실적 발표 반영 시각(EarningsCalendar)까지 다시 수집하지 않으며,
+        그 시각이 지나면 만료되어 새로 수집합니다. 백그라운드 갱신 스레드가 없어도 이 시점에
+        반영 시각이 지났는지 확인해 파생 캐시 무효화 콜백을 호출합니다.
+        
+        실적 발표 후 다시 수집한 손익계산서에 그 발표로 공시되었어야 할 회계연도 열이 아직 없으면
+        (데이터 제공처 반영 지연) 다음 실적 발표까지가 아니라 EARNINGS_RETRY_TTL 동안만 캐시합니다.
+        """
+        if self.calendar.due_symbols([symbol]):
+            self._expire_reported(symbol)
+        
+        cached = self.statement_cache.get(symbol) if self.statement_cache else None
+        if cached is not None:
+            self.statement_cache_hits += 1
+            return tuple(_frame_from_json(cached[name]) for name in STATEMENT_NAMES)
+        
+        stock = stock or yf.Ticker(symbol)
+        statements = (stock.financials, stock.balance_sheet, stock.cashflow)
+        self.statement_fetches += 1
+        
+        if self.statement_cache and not statements[0].empty:
+            ttl = self._statement_ttl(symbol, statements[0])
+            self.statement_cache.set(
+                symbol,
+                {name: _frame_to_json(frame) for name, frame in zip(STATEMENT_NAMES, statements)},
+                ttl_seconds=ttl,
+                tags={'symbol': symbol}
+            )
+        return statements
+    
+    def _statement_ttl(self, symbol: str, financials: pd.DataFrame) -> float:
+        """
+        재무제표 캐시 유효 시간(초)을 정합니다.
+        
+        직전 실적 발표로 새 회계연도 열이 추가되었어야 하는데 없으면 재확인 주기를 사용하고,
+        그 외에는 달력에 저장된 다음 실적 발표 반영 시각까지 유지합니다. 달력 조회(네트워크)는
+        백그라운드 갱신 스레드가 실행 중이면 그쪽으로 미루고 그동안은 대체 유효 시간을 사용합니다.
+        """
+        reported = self._awaiting_reports.get(symbol)
+        if reported is not None:
+            if self._report_missing(financials, reported):
+                if date.today() <= reported + self.report_retry_window:
+                    print(f"🗓️ {symbol} 새 회계연도 재무제표 미반영 - {self.report_retry_ttl / 3600:.0f}시간 후 재확인")
+                    return self.report_retry_ttl
+                self.logger.warning(
+                    f"{symbol} 실적 발표({reported.isoformat()}) 후 {self.report_retry_window.days}일이 지나도록 "
+                    f"새 회계연도 재무제표가 없어 현재 데이터로 캐시합니다."
+                )
+            elif self._on_refresh:
+                # 재확인 중 새 열이 반영되면 이전 재무제표로 만든 파생 캐시도 무효화
+                try:
+                    self._on_refresh([symbol])
+                except Exception as e:
+                    self.logger.warning(f"{symbol} 실적 발표 반영 캐시 무효화 실패: {str(e)}")
+            self._awaiting_reports.pop(symbol, None)
+        
+        background = self._refresh_thread is not None and self._refresh_thread.is_alive()
+        ttl = self.calendar.ttl_seconds(symbol, lookup=not background)
+        if ttl is None:
+            self._untracked.add(symbol)
+            ttl = self.calendar.fallback_ttl
+            print(f"🗓️ {symbol} 재무제표 캐시 (실적 일정 확인 전, {ttl / 86400:.1f}일)")
+        else:
+            print(f"🗓️ {symbol} 재무제표 캐시 (다음 실적 발표 반영까지 {ttl / 86400:.1f}일)")
+        return ttl
+    
+    @staticmethod
+    def _report_missing(financials: pd.DataFrame, reported: date) -> bool:
+        """
+        실적 발표일 이전에 끝난 회계연도의 열이 손익계산서에 없는지 확인합니다.
+        
+        최근 열(회계연도 종료일)로부터 1년이 지나기 전에 발표되었다면 분기 실적이므로 새 연간 열이
+        필요하지 않고, 1년 이상 지나 발표되었다면 그 사이에 끝난 회계연도의 연간 실적 발표입니다.
+        """
+        latest = fiscal_period(financials)
+        if latest is None:
+            return True
+        return date.fromisoformat(latest) + timedelta(days=365) <= reported
+    
+    def refresh_reported(self, symbols: Optional[List[str]] = None) -> List[str]:
+        """
+        실적 발표 반영 시각이 지난 추적 종목의 재무제표를 미리 다시 수집하고 다년 지표를 갱신합니다.
+        
+        Args:
+            symbols: 확인할 종목 (기본값: 달력이 추적 중인 모든 종목)
+        
+        Returns:
+            List[str]: 재수집한 종목 (파생 지표·AI 분석 캐시를 무효화할 대상)
+        """
+        # 재무제표 조회 시점에 미뤄 둔 실적 일정 조회
+        for symbol in list(self._untracked):
+            self._untracked.discard(symbol)
+            self.calendar.entry(symbol)
+        
+        refreshed = []
+        for symbol in self.calendar.due_symbols(symbols):
+            try:
+                self._expire_reported(symbol, notify=False)
+                statements = self.get_statements(symbol)
+                get_fundamentals_store().features(symbol, *statements)
+                refreshed.append(symbol)
+            except Exception as e:
+                self.logger.warning(f"{symbol} 실적 발표 후 재무제표 재수집 실패: {str(e)}")
+        if refreshed:
+            print(f"🗓️ 실적 발표 반영: {', '.join(refreshed)} 재무제표 재수집")
+        return refreshed
+    
+    def _expire_reported(self, symbol: str, notify: bool = True):
+        """실적 발표가 반영된 종목의 재무제표 캐시와 일정을 폐기합니다 (notify면 파생 캐시 무효화 콜백 호출)."""
+        if self.statement_cache:
+            self.statement_cache.delete(symbol)
+        reported = self.calendar.forget(symbol)
+        if reported is not None:
+            self._awaiting_reports[symbol] = reported
+        if notify and self._on_refresh:
+            try:
+                self._on_refresh([symbol])
+            except Exception as e:
+                self.logger.warning(f"{symbol} 실적 발표 반영 캐시 무효화 실패: {str(e)}")
+    
+    def start_earnings_refresh(self, interval_seconds: Optional[float] = None,
+                               on_refresh: Optional[Callable[[List[str]], None]] = None) -> bool:
+        """
+        백그라운드 스레드에서 주기적으로 refresh_reported()를 실행합니다.
+        
+        on_refresh는 스레드 사용 여부와 관계없이 get_statements()의 지연 확인에도 사용됩니다.
+        EARNINGS_REFRESH_THREAD=false(서버리스 환경 VERCEL의 기본값)이면 스레드를 시작하지 않고
+        조회 시점의 지연 확인만 사용합니다.
+        
+        Args:
+            interval_seconds: 확인 주기 (기본값: EARNINGS_REFRESH_INTERVAL, 3600)
+            on_refresh: 재수집한 종목 목록을 받아 파생 캐시를 무효화하는 콜백
+        
+        Returns:
+            bool: 스레드를 시작했는지 여부 (비활성화되었거나 이미 실행 중이면 False)
+        """
+        self._on_refresh = on_refresh
+        default = 'false' if os.getenv('VERCEL') else 'true'
+        if os.getenv('EARNINGS_REFRESH_THREAD', default).lower() != 'true':
+            return False
+        if self._refresh_thread is not None and self._refresh_thread.is_alive():
+            return False
+        interval = interval_seconds or float(os.getenv('EARNINGS_REFRESH_INTERVAL', '3600'))
+        
+        def run():
+            while not self._refresh_stop.wait(interval):
+                try:
+                    refreshed = self.refresh_reported()
+                    if refreshed and on_refresh:
+                        on_refresh(refreshed)
+                except Exception as e:
+                    self.logger.warning(f"실적 발표 반영 확인 실패: {str(e)}")
+        
+        self._refresh_stop.clear()
+        self._refresh_thread = threading.Thread(target=run, name="earnings-refresh", daemon=True)
+        self._refresh_thread.start()
+        return True
+    
+    def stop_earnings_refresh(self):
+        """백그라운드 재수집 스레드를 중지합니다."""
+        self._refresh_stop.set()
+    
+    def statement_stats(self) -> Dict:
+        """재무제표 수집·캐시 적중 횟수를 반환합니다."""
+        total = self.statement_fetches + self.statement_cache_hits
+        return {
+            'fetches': self.statement_fetches,
+            'cache_hits': self.statement_cache_hits,
+            'hit_rate': self.statement_cache_hits / total if total else 0.0,
+            'tracked_symbols': len(self.calendar.tracked_symbols()),
+        }
+    
     def get_multiple_stocks_data(self, symbols: List[str], period: str = "2y") -> Dict[str, Dict]:
         """
         여러 종목의 데이터를 한 번에 수집합니다.
@@ -194,6 +417,26 @@ class StockDataCollector:
         
         return results
     
+    def get_price_history(self, symbol: str, period: str = "2y") -> pd.DataFrame:
+        """
+        지수·종목의 가격 이력만 수집합니다 (벤치마크용, 재무 데이터 없음).
+        
+        Args:
+            symbol: 종목 또는 지수 코드 (예: ^GSPC, ^KS11)
+            period: 데이터 수집 기간
+        
+        Returns:
+            pd.DataFrame: yfinance 가격 이력 (Close 열 포함)
+        """
+        try:
+            hist = yf.Ticker(symbol).history(period=period)
+            if hist.empty:
+                raise ValueError(f"{symbol}의 주가 데이터를 찾을 수 없습니다.")
+            return hist
+        except Exception as e:
+            self.logger.error(f"가격 이력 수집 중 오류 발생 ({symbol}): {str(e)}")
+            raise Exception(f"'{symbol}' 가격 이력 수집 실패: {str(e)}")
+    
     def validate_symbol(self, symbol: str) -> bool:
         """종목 코드가 유효한지 확인합니다."""
         try:
@@ -0,0 +1,207 @@
+import logging
+import threading
+from collections import deque
+from dataclasses import dataclass, asdict
+from datetime import datetime
+from typing import Dict, List, Optional
+
+
+@dataclass
+class UsageRecord:
+    """Gemini API 호출 1건의 사용량 기록"""
+    endpoint: str
+    model: str
+    symbol: Optional[str]
+    prompt_tokens: int
+    output_tokens: int
+    thinking_tokens: int
+    cached_tokens: int
+    total_tokens: int
+    estimated_prompt_tokens: int
+    latency_ms: float
+    success: bool
+    timestamp: str
+    route: Optional[str] = None
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+
+def _empty_aggregate() -> Dict:
+    return {
+        'calls': 0,
+        'errors': 0,
+        'prompt_tokens': 0,
+        'output_tokens': 0,
+        'thinking_tokens': 0,
+        'cached_tokens': 0,
+        'total_tokens': 0,
+        'total_latency_ms': 0.0,
+        'max_latency_ms': 0.0,
+        'models': [],
+    }
+
+
+class UsageTracker:
+    """Gemini API 호출별 토큰 사용량과 지연 시간을 집계합니다."""
+
+    def __init__(self, max_records: int = 1000):
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self._records = deque(maxlen=max_records)
+        self._by_endpoint: Dict[str, Dict] = {}
+        self._by_symbol: Dict[str, Dict] = {}
+        self._by_route: Dict[str, Dict] = {}
+
+        # 토큰 추정치 보정용 누적값 (실제 프롬프트 토큰 / 추정 토큰)
+        self._actual_prompt_tokens = 0
+        self._estimated_prompt_tokens = 0
+
+    def record(self, endpoint: str, model: str, usage_metadata=None,
+               latency_ms: float = 0.0, symbol: Optional[str] = None,
+               estimated_prompt_tokens: int = 0, success: bool = True,
+               route: Optional[str] = None) -> UsageRecord:
+        """
+        API 호출 결과를 기록합니다.
+
+        Args:
+            endpoint: 호출 유형 (analysis, comparison, grade 등)
+            model: 사용한 모델명
+            usage_metadata: 응답의 usage_metadata (실패 시 None)
+            latency_ms: 호출 소요 시간 (밀리초)
+            symbol: 관련 종목 코드
+            estimated_prompt_tokens: 전송 전 추정한 프롬프트 토큰 수
+            success: 호출 성공 여부
+            route: 라우팅 경로 (endpoint:depth), 경로·모델별 지연 집계용
+
+        Returns:
+            UsageRecord: 저장된 기록
+        """
+        def count(name: str) -> int:
+            return int(getattr(usage_metadata, name, None) or 0) if usage_metadata else 0
+
+        record = UsageRecord(
+            endpoint=endpoint,
+            model=model,
+            symbol=symbol,
+            prompt_tokens=count('prompt_token_count'),
+            output_tokens=count('candidates_token_count'),
+            thinking_tokens=count('thoughts_token_count'),
+            cached_tokens=count('cached_content_token_count'),
+            total_tokens=count('total_token_count'),
+            estimated_prompt_tokens=estimated_prompt_tokens,
+            latency_ms=latency_ms,
+            success=success,
+            timestamp=datetime.now().isoformat(),
+            route=route
+        )
+
+        with self._lock:
+            self._records.append(record)
+            self._accumulate(self._by_endpoint.setdefault(endpoint, _empty_aggregate()), record)
+            if symbol:
+                self._accumulate(self._by_symbol.setdefault(symbol, _empty_aggregate()), record)
+            if route:
+                self._accumulate(self._by_route.setdefault(f"{route}@{model}", _empty_aggregate()), record)
+
+            if record.prompt_tokens and estimated_prompt_tokens:
+                self._actual_prompt_tokens += record.prompt_tokens
+                self._estimated_prompt_tokens += estimated_prompt_tokens
+
+        self.logger.info(
+            f"Gemini 호출 [{endpoint}] model={model} symbol={symbol or '-'} "
+            f"prompt={record.prompt_tokens} output={record.output_tokens} "
+            f"thinking={record.thinking_tokens} latency={latency_ms:.0f}ms success={success}"
+        )
+
+        return record
+
+    def _accumulate(self, aggregate: Dict, record: UsageRecord):
+        aggregate['calls'] += 1
+        if not record.success:
+            aggregate['errors'] += 1
+        aggregate['prompt_tokens'] += record.prompt_tokens
+        aggregate['output_tokens'] += record.output_tokens
+        aggregate['thinking_tokens'] += record.thinking_tokens
+        aggregate['cached_tokens'] += record.cached_tokens
+        aggregate['total_tokens'] += record.total_tokens
+        aggregate['total_latency_ms'] += record.latency_ms
+        aggregate['max_latency_ms'] = max(aggregate['max_latency_ms'], record.latency_ms)
+        if record.model not in aggregate['models']:
+            aggregate['models'].append(record.model)
+
+    def calibration_factor(self) -> float:
+        """추정 토큰 대비 실제 프롬프트 토큰 비율을 반환합니다 (기록이 없으면 1.0)."""
+        with self._lock:
+            if self._estimated_prompt_tokens == 0:
+                return 1.0
+            return self._actual_prompt_tokens / self._estimated_prompt_tokens
+
+    def latency_percentile(self, endpoint: str, q: float = 95,
+                           min_samples: int = 20) -> Optional[float]:
+        """
+        최근 성공 호출의 지연 시간 백분위수(밀리초)를 반환합니다.
+
+        Args:
+            endpoint: 호출 유형
+            q: 백분위수 (0-100)
+            min_samples: 최소 표본 수 (미달 시 None)
+        """
+        with self._lock:
+            latencies = sorted(
+                record.latency_ms for record in self._records
+                if record.endpoint == endpoint and record.success
+            )
+        if len(latencies) < min_samples:
+            return None
+        index = min(len(latencies) - 1, int(round(q / 100 * (len(latencies) - 1))))
+        return latencies[index]
+
+    def recent_records(self, limit: int = 50) -> List[Dict]:
+        """최근 호출 기록을 반환합니다."""
+        with self._lock:
+            records = list(self._records)[-limit:]
+        return [record.to_dict() for record in records]
+
+    def summary(self) -> Dict:
+        """엔드포인트별, 종목별, 경로(endpoint:depth@model)별 집계를 반환합니다."""
+        def finalize(aggregate: Dict) -> Dict:
+            result = dict(aggregate)
+            result['models'] = list(aggregate['models'])
+            result['avg_latency_ms'] = (
+                aggregate['total_latency_ms'] / aggregate['calls'] if aggregate['calls'] else 0.0
+            )
+            return result
+
+        with self._lock:
+            by_endpoint = {key: finalize(value) for key, value in self._by_endpoint.items()}
+            by_symbol = {key: finalize(value) for key, value in self._by_symbol.items()}
+            by_route = {key: finalize(value) for key, value in self._by_route.items()}
+
+        totals = _empty_aggregate()
+        for aggregate in by_endpoint.values():
+            for key in ('calls', 'errors', 'prompt_tokens', 'output_tokens', 'thinking_tokens',
+                        'cached_tokens', 'total_tokens', 'total_latency_ms'):
+                totals[key] += aggregate[key]
+            totals['max_latency_ms'] = max(totals['max_latency_ms'], aggregate['max_latency_ms'])
+            for model in aggregate['models']:
+                if model not in totals['models']:
+                    totals['models'].append(model)
+
+        return {
+            'totals': finalize(totals),
+            'by_endpoint': by_endpoint,
+            'by_symbol': by_symbol,
+            'by_route': by_route,
+            'calibration_factor': self.calibration_factor(),
+        }
+
+    def reset(self):
+        """모든 기록을 초기화합니다."""
+        with self._lock:
+            self._records.clear()
+            self._by_endpoint.clear()
+            self._by_symbol.clear()
+            self._by_route.clear()
+            self._actual_prompt_tokens = 0
+            self._estimated_prompt_tokens = 0
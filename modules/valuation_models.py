@@ -0,0 +1,161 @@
+from typing import Dict, Optional
+
+import numpy as np
+
+# ValueAnalyzer._calculate_target_price의 고정 가정
+DEFAULT_ASSUMPTIONS = {
+    'fair_pe': 15.0,           # 적정 PER
+    'fair_pbr': 2.0,           # 적정 PBR
+    'required_return': 0.10,   # 배당 할인 모델 요구 수익률
+    'max_growth': 0.06,        # 배당 성장률 상한
+}
+# 목표가 제한 범위 (현재가 대비 배율)
+TARGET_FLOOR = 0.5
+TARGET_CAP = 2.0
+
+
+def _as_float(values) -> np.ndarray:
+    """실수 배열은 정밀도(float32/float64)를 유지하고, 그 외는 float64로 변환합니다."""
+    values = np.asarray(values)
+    return values if values.dtype.kind == 'f' else values.astype(np.float64)
+
+
+def valuation_legs(price, pe, pb, dividend_yield, income_growth,
+                   fair_pe=DEFAULT_ASSUMPTIONS['fair_pe'],
+                   fair_pbr=DEFAULT_ASSUMPTIONS['fair_pbr'],
+                   required_return=DEFAULT_ASSUMPTIONS['required_return'],
+                   max_growth=DEFAULT_ASSUMPTIONS['max_growth']):
+    """
+    PER·PBR·배당 할인 모델 목표가를 계산합니다 (적용할 수 없는 방법은 NaN).
+
+    모든 인자는 numpy 브로드캐스트 규칙을 따르므로, 종목 열 (n, 1)과 가정 표본 (1, m)을 넘기면
+    (n, m) 격자를 한 번에 계산합니다.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, np.ndarray]: (PER 기반, PBR 기반, 배당 할인 모델) 목표가
+    """
+    price, pe, pb, dividend_yield, income_growth = (
+        _as_float(value) for value in (price, pe, pb, dividend_yield, income_growth)
+    )
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # 1. PER 기반: EPS × 적정 PER
+        eps = np.where(pe > 0, price / pe, 0.0)
+        per_leg = np.where(eps > 0, eps * fair_pe, np.nan)
+
+        # 2. PBR 기반: BPS × 적정 PBR
+        book_value = np.where(pb > 0, price / pb, 0.0)
+        pbr_leg = np.where(book_value > 0, book_value * fair_pbr, np.nan)
+
+        # 3. 배당 할인 모델: DPS / (요구 수익률 - 성장률), 성장률은 0 ~ max_growth
+        growth = np.clip(income_growth / 100, 0, max_growth)
+        spread = required_return - growth
+        ddm_leg = np.where((dividend_yield > 0) & (spread > 0), price * dividend_yield / spread, np.nan)
+
+    return per_leg, pbr_leg, ddm_leg
+
+
+def combine_legs(price, per_leg, pbr_leg, ddm_leg) -> np.ndarray:
+    """
+    유효한 목표가들의 중간값을 현재가의 50%~200%로 제한해 반환합니다 (유효한 값이 없으면 현재가).
+
+    값이 3개면 중간값, 1~2개면 평균으로 _calculate_target_price와 같은 결과를 내며,
+    nanmedian 대신 원소별 min/max로 계산해 표본이 많아도 빠릅니다.
+    """
+    a, b, c = np.broadcast_arrays(per_leg, pbr_leg, ddm_leg)
+    price = np.asarray(price, dtype=a.dtype)
+    a_nan, b_nan, c_nan = np.isnan(a), np.isnan(b), np.isnan(c)
+
+    # 3개: 중간값 = max(min(a, b), min(max(a, b), c))
+    middle = np.fmax(np.fmin(a, b), np.fmin(np.fmax(a, b), c))
+
+    # 1~2개: 유효한 값의 합 / 개수
+    valid = (~a_nan).view(np.int8) + (~b_nan).view(np.int8) + (~c_nan).view(np.int8)
+    total = np.where(a_nan, 0, a)
+    total += np.where(b_nan, 0, b)
+    total += np.where(c_nan, 0, c)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        total /= valid
+    combined = np.where(valid == 3, middle, total)
+
+    np.clip(combined, price * TARGET_FLOOR, price * TARGET_CAP, out=combined)
+    return np.where(valid > 0, combined, price)
+
+
+def target_prices(price, pe, pb, dividend_yield, income_growth,
+                  assumptions: Optional[Dict[str, float]] = None) -> np.ndarray:
+    """가정(기본값: DEFAULT_ASSUMPTIONS)에 따른 목표가를 계산합니다 (브로드캐스트 지원)."""
+    assumptions = {**DEFAULT_ASSUMPTIONS, **(assumptions or {})}
+    legs = valuation_legs(price, pe, pb, dividend_yield, income_growth, **assumptions)
+    return combine_legs(price, *legs)
+
+
+# 민감도 격자 기본 축 (각 20개, 기본 가정 15배·2.0배 포함)
+SENSITIVITY_FAIR_PE = np.linspace(6.0, 25.0, 20)
+SENSITIVITY_FAIR_PBR = np.round(np.linspace(0.4, 4.2, 20), 2)
+
+
+def sensitivity_grid(price, pe, pb, dividend_yield, income_growth,
+                     fair_pe=None, fair_pbr=None,
+                     required_return=DEFAULT_ASSUMPTIONS['required_return'],
+                     max_growth=DEFAULT_ASSUMPTIONS['max_growth']) -> Dict[str, np.ndarray]:
+    """
+    적정 PER × 적정 PBR 격자의 목표가와 상승여력을 한 번의 브로드캐스트로 계산합니다.
+
+    종목 인자가 스칼라면 (PER 축, PBR 축) 행렬을, 길이 n 배열이면 (n, PER 축, PBR 축) 배열을 반환합니다.
+    PER 기반 목표가는 PER 축에만, PBR 기반 목표가는 PBR 축에만 의존하므로 방법별 목표가는 축 단위로 계산하고
+    중간값 결합과 상·하한 제한만 격자 전체에서 수행합니다.
+
+    Returns:
+        Dict: fair_pe, fair_pbr (축), target, upside (격자), per_leg (PER 축), pbr_leg (PBR 축), ddm_leg
+    """
+    fair_pe = np.asarray(SENSITIVITY_FAIR_PE if fair_pe is None else fair_pe, dtype=np.float64)
+    fair_pbr = np.asarray(SENSITIVITY_FAIR_PBR if fair_pbr is None else fair_pbr, dtype=np.float64)
+    price, pe, pb, dividend_yield, income_growth = (
+        _as_float(value)[..., None, None] for value in (price, pe, pb, dividend_yield, income_growth)
+    )
+
+    per_leg, pbr_leg, ddm_leg = valuation_legs(
+        price, pe, pb, dividend_yield, income_growth,
+        fair_pe=fair_pe[:, None], fair_pbr=fair_pbr[None, :],
+        required_return=required_return, max_growth=max_growth
+    )
+    target = combine_legs(price, per_leg, pbr_leg, ddm_leg)
+    upside = np.divide(target - price, price, out=np.zeros_like(target), where=price > 0) * 100
+
+    return {
+        'fair_pe': fair_pe,
+        'fair_pbr': fair_pbr,
+        'target': target,
+        'upside': upside,
+        'per_leg': per_leg[..., 0],
+        'pbr_leg': pbr_leg[..., 0, :],
+        'ddm_leg': ddm_leg[..., 0, 0],
+    }
+
+
+def sensitivity_table(current_price: float, pe_ratio: float, pb_ratio: float,
+                      dividend_yield: float, income_growth: float,
+                      fair_pe=None, fair_pbr=None) -> Dict:
+    """단일 종목의 민감도 격자를 JSON 직렬화 가능한 딕셔너리로 반환합니다 (보고서·웹 히트맵용)."""
+    grid = sensitivity_grid(
+        float(current_price or 0), float(pe_ratio or 0), float(pb_ratio or 0),
+        float(dividend_yield or 0), float(income_growth or 0), fair_pe, fair_pbr
+    )
+
+    def optional(value) -> Optional[float]:
+        return None if np.isnan(value) else float(value)
+
+    return {
+        'current_price': float(current_price or 0),
+        'fair_pe': grid['fair_pe'].tolist(),
+        'fair_pbr': grid['fair_pbr'].tolist(),
+        'base': {'fair_pe': DEFAULT_ASSUMPTIONS['fair_pe'], 'fair_pbr': DEFAULT_ASSUMPTIONS['fair_pbr']},
+        'target_price': grid['target'].tolist(),
+        'upside_potential': grid['upside'].tolist(),
+        'legs': {
+            'per': [optional(value) for value in grid['per_leg'].tolist()],
+            'pbr': [optional(value) for value in grid['pbr_leg'].tolist()],
+            'ddm': optional(grid['ddm_leg']),
+        },
+    }
@@ -1,10 +1,15 @@
 import os
 import json
+import math
 import logging
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, List, Optional, Sequence, Tuple
 from datetime import datetime, timedelta
 from dataclasses import dataclass, asdict
 from enum import Enum
+from .circuit_breaker import CircuitOpenError
+from .cache_store import TTLCache, fingerprint
+from .scoring_rules import ScoringPlan, get_scoring_plan
+from .fundamentals_store import feature_values
 # Rich imports removed for server compatibility
 
 # Console removed for server compatibility
@@ -49,41 +54,152 @@ class AnalysisResult:
     risks: List[str]
     value_metrics: ValueMetrics
     detailed_analysis: str
+    target_price_distribution: Optional[Dict] = None  # 몬테카를로 목표가·상승여력 백분위수
+    peer_percentiles: Optional[Dict] = None  # 섹터·산업 내 지표 백분위 (SectorPercentileIndex.percentiles)
+    risk_metrics: Optional[Dict] = None  # 가격 이력으로 계산한 베타·샤프·소르티노·최대 낙폭·VaR (RiskMetricsEngine)
     
     def to_dict(self) -> Dict:
         result = asdict(self)
         result['investment_grade'] = self.investment_grade.value
         return result
+    
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'AnalysisResult':
+        """to_dict() 결과(캐시, JSON 보고서)로부터 분석 결과를 복원합니다."""
+        values = dict(data)
+        values['investment_grade'] = InvestmentGrade(values['investment_grade'])
+        values['value_metrics'] = ValueMetrics(**values['value_metrics'])
+        return cls(**values)
+
+@dataclass
+class BatchAnalysisResult:
+    """
+    규칙 기반 일괄 분석 결과 (열 단위 배열, 행 i가 한 종목)
+
+    숫자 열은 numpy 배열이며, 종목별 AnalysisResult가 필요하면
+    ValueAnalyzer.batch_results()로 변환합니다.
+    """
+    symbols: List[str]
+    company_names: List[str]
+    sectors: List[str]
+    columns: Dict  # 지표 열 (current_price, pe_ratio, ... , peg_ratio)
+    target_prices: object
+    upside_potentials: object
+    scores: object
+    investment_grades: object  # 등급 값 문자열 배열 (InvestmentGrade.value)
+    confidence_scores: object
+    key_strengths: List[List[str]]
+    key_weaknesses: List[List[str]]
+    risks: List[List[str]]
+    rules_version: Optional[str] = None  # 사용한 점수 규칙 버전
+    target_distribution: Optional[Dict] = None  # TargetPriceSimulator.simulate() 결과 (simulate=True일 때)
+    peer_percentiles: Optional[Sequence[Dict]] = None  # 종목별 섹터·산업 내 지표 백분위 (PercentileRows)
+    risk_metrics: Optional[List[Optional[Dict]]] = None  # 종목별 위험 지표 (stock_data 목록 입력일 때)
+    
+    def __len__(self) -> int:
+        return len(self.symbols)
+    
+    def grade_counts(self) -> Dict[str, int]:
+        """등급별 종목 수를 반환합니다."""
+        counts = {grade.value: 0 for grade in InvestmentGrade}
+        for grade in self.investment_grades:
+            counts[grade] += 1
+        return counts
 
 class ValueAnalyzer:
+    # AI 등급 평가 정적 지시문 (모든 종목 공통, 공통 평가 기준서 뒤에 system_instruction으로 전송)
+    GRADE_PREAMBLE = """
+당신은 워렌 버핏과 벤저민 그레이엄의 가치투자 철학을 따르는 전문 투자 분석가입니다.
+주어진 주식의 기업 정보, 핵심 재무지표, 강점, 약점, 위험 요인을 바탕으로
+위 기준서의 투자 등급 구간에 따라 투자 등급을 결정해주세요.
+
+**요청사항:**
+응답 스키마에 맞는 JSON으로만 답변해주세요.
+- investment_grade: Strong Buy / Buy / Hold / Sell / Strong Sell 중 하나
+- confidence_score: 0-100 사이의 숫자
+- rationale: 핵심 근거 한 줄 요약
+"""
+
+    # AI 등급 캐시 허용 오차 (±값): current_price는 상대 비율, 나머지는 절대값
+    # 같은 구간에 속하는 입력은 같은 요청으로 보고 캐시된 등급을 재사용
+    GRADE_CACHE_TOLERANCES = {
+        'current_price': 0.01,
+        'upside_potential': 2.0,
+        'pe_ratio': 0.5,
+        'pb_ratio': 0.1,
+        'dividend_yield': 0.001,
+        'roe': 0.005,
+        'roa': 0.005,
+        'debt_to_equity': 0.05,
+        'revenue_growth': 1.0,
+        'income_growth': 1.0,
+    }
+    # 가격과 무관한 펀더멘털 지표: 구간이 바뀌면 해당 종목의 기존 등급 캐시를 무효화
+    GRADE_FUNDAMENTAL_KEYS = ['roe', 'roa', 'debt_to_equity', 'revenue_growth', 'income_growth']
+
     def __init__(self):
         self.logger = logging.getLogger(__name__)
         
-        # 가치투자 평가 기준
-        self.evaluation_criteria = {
-            'pe_ratio': {'excellent': 15, 'good': 20, 'acceptable': 25},
-            'pb_ratio': {'excellent': 1.5, 'good': 2.0, 'acceptable': 3.0},
-            'roe': {'excellent': 0.15, 'good': 0.12, 'acceptable': 0.10},
-            'debt_to_equity': {'excellent': 0.3, 'good': 0.5, 'acceptable': 1.0},
-            'dividend_yield': {'excellent': 0.03, 'good': 0.02, 'acceptable': 0.01},
-            'revenue_growth': {'excellent': 10, 'good': 5, 'acceptable': 0},
-            'income_growth': {'excellent': 15, 'good': 10, 'acceptable': 5},
-        }
+        # 평가 기준(점수 구간, 등급, 강점/약점/위험 문구)과 섹터별 가중치는
+        # config/scoring_rules.json에서 로드 (scoring_plan 참조)
+        get_scoring_plan()  # 규칙 파일 오류를 초기화 시점에 확인
         
-        # 섹터별 가중치
-        self.sector_weights = {
-            'Technology': {'growth': 0.4, 'profitability': 0.3, 'stability': 0.2, 'valuation': 0.1},
-            'Healthcare': {'growth': 0.3, 'profitability': 0.3, 'stability': 0.3, 'valuation': 0.1},
-            'Financials': {'stability': 0.4, 'valuation': 0.3, 'profitability': 0.2, 'growth': 0.1},
-            'Consumer Staples': {'stability': 0.4, 'profitability': 0.3, 'valuation': 0.2, 'growth': 0.1},
-            'Utilities': {'stability': 0.5, 'valuation': 0.3, 'profitability': 0.2, 'growth': 0.0},
-            'default': {'growth': 0.25, 'profitability': 0.25, 'stability': 0.25, 'valuation': 0.25}
-        }
+        # AI 등급 캐시 (GRADE_CACHE_TTL=0이면 비활성화, GRADE_CACHE_TOLERANCES로 허용 오차 재정의)
+        self.grade_cache_tolerances = dict(self.GRADE_CACHE_TOLERANCES)
+        self.grade_cache_tolerances.update(json.loads(os.getenv('GRADE_CACHE_TOLERANCES', '{}')))
+        grade_cache_ttl = float(os.getenv('GRADE_CACHE_TTL', '86400'))
+        self.grade_cache = TTLCache(
+            'investment_grades', ttl_seconds=grade_cache_ttl, max_entries=5000, persist=True
+        ) if grade_cache_ttl > 0 else None
+        
+        # 목표가 가정의 불확실성을 반영한 몬테카를로 목표가 분포 (MONTE_CARLO=false면 비활성화)
+        self.monte_carlo_enabled = os.getenv('MONTE_CARLO', 'true').lower() == 'true'
+        self._target_simulator = None
+        
+        # 벤치마크 대비 베타·위험 지표를 가격 이력으로 직접 계산 (RISK_METRICS=false면 제공 베타 사용)
+        self.risk_metrics_enabled = os.getenv('RISK_METRICS', 'true').lower() == 'true'
+        
+        # 종목별 구성 요소 입력 지문과 다시 계산할 수 없는 직전 결과 필드 (ANALYSIS_MEMO_TTL=0이면 비활성화)
+        analysis_memo_ttl = float(os.getenv('ANALYSIS_MEMO_TTL', '86400'))
+        self.analysis_memo = TTLCache(
+            'analysis_memo', ttl_seconds=analysis_memo_ttl, max_entries=5000, persist=True
+        ) if analysis_memo_ttl > 0 else None
+        
+        # 등급 캐시·분석 결과를 다음 실적 발표 반영 시각까지 유지 (EARNINGS_AWARE_CACHE=false면 고정 TTL)
+        self.earnings_aware_cache = os.getenv('EARNINGS_AWARE_CACHE', 'true').lower() == 'true'
+    
+    @property
+    def scoring_plan(self) -> ScoringPlan:
+        """컴파일된 점수 규칙 (규칙 파일이 수정되면 자동으로 다시 컴파일)"""
+        return get_scoring_plan()
+    
+    @property
+    def peer_index(self):
+        """섹터·산업별 동종 기업 백분위 색인 (프로세스 공용, 분석한 종목으로 증분 갱신)"""
+        from .peer_index import get_peer_index
+        return get_peer_index()
+    
+    @property
+    def risk_engine(self):
+        """위험 지표 엔진 (프로세스 공용, 벤치마크 이력은 하루 한 번 수집)"""
+        from .risk_metrics import get_risk_engine
+        return get_risk_engine()
+    
+    @property
+    def target_simulator(self):
+        """목표가 분포 시뮬레이터 (최초 사용 시 생성, 가정 표본은 모든 종목이 공유)"""
+        if self._target_simulator is None:
+            from .monte_carlo import TargetPriceSimulator
+            self._target_simulator = TargetPriceSimulator()
+        return self._target_simulator
     
     def analyze_stock(self, stock_data: Dict, gemini_client=None) -> AnalysisResult:
         """
         주식 데이터를 분석하여 가치투자 관점에서 평가합니다.
         
+        같은 종목의 직전 결과가 있으면 구성 요소(목표가 분포, 강점/약점/위험 요인, 투자 등급)별로
+        입력 지문을 비교해 입력이 바뀐 부분만 다시 계산하며, 모두 같으면 이전 등급·요인·분석 시각을 그대로 사용합니다.
+        
         Args:
             stock_data: 주식 데이터 딕셔너리
             gemini_client: Gemini API 클라이언트 (투자 등급 결정용)
@@ -92,7 +208,7 @@ class ValueAnalyzer:
             AnalysisResult: 분석 결과
         """
         try:
-            console.print(f"[cyan]{stock_data.get('symbol', 'N/A')} 가치투자 분석 시작[/cyan]")
+            print(f"{stock_data.get('symbol', 'N/A')} 가치투자 분석 시작")
             
             # 기본 정보 추출
             symbol = stock_data.get('symbol', 'N/A')
@@ -107,23 +223,64 @@ class ValueAnalyzer:
             # 목표 가격 계산
             target_price = self._calculate_target_price(stock_data, value_metrics)
             
+            # 섹터·산업 내 백분위 (색인에 이 종목을 반영한 뒤 이진 탐색)
+            peer_percentiles = self.peer_index.observe(stock_data)
+            
+            # 벤치마크 대비 베타·위험 지표 (가격 이력이 없으면 None)
+            risk_metrics = self._compute_risk_metrics(stock_data)
+            
             # 상승 여력 계산
             upside_potential = ((target_price - current_price) / current_price) * 100 if current_price > 0 else 0
             
-            # 강점/약점 분석
-            strengths, weaknesses = self._analyze_strengths_weaknesses(value_metrics)
+            # 직전 분석 결과와 입력 지문 비교 (이전 형식의 전체 결과 항목은 무시)
+            memo = self.analysis_memo.get(symbol) if self.analysis_memo else None
+            if memo is not None and 'fields' not in memo:
+                memo = None
+            previous = memo['fields'] if memo else {}
+            fingerprints = self._analysis_fingerprints(stock_data, value_metrics, peer_percentiles, risk_metrics)
             
-            # 위험 요인 분석
-            risks = self._identify_risks(stock_data, value_metrics)
+            def unchanged(part: str) -> bool:
+                return memo is not None and memo['fingerprints'].get(part) == fingerprints[part]
+            
+            # 목표가 분포 (가정 불확실성) - 가격·밸류에이션 지표가 같으면 재사용
+            if unchanged('valuation'):
+                target_price_distribution = previous['target_price_distribution']
+            else:
+                target_price_distribution = self._simulate_target_distribution(current_price, value_metrics)
             
-            # AI 기반 투자 등급 결정
-            if gemini_client:
-                investment_grade, confidence_score = self._ai_determine_investment_grade(
-                    gemini_client, stock_data, value_metrics, strengths, weaknesses, risks, upside_potential
+            # 강점/약점, 위험 요인 분석
+            if unchanged('signals'):
+                strengths, weaknesses, risks = (
+                    previous['key_strengths'], previous['key_weaknesses'], previous['risks']
                 )
             else:
-                # Fallback: 기본 등급 시스템
-                investment_grade, confidence_score = self._fallback_investment_grade(value_metrics, upside_potential)
+                strengths, weaknesses = self._analyze_strengths_weaknesses(
+                    value_metrics, peer_percentiles, stock_data.get('fundamentals')
+                )
+                risks = self._identify_risks(stock_data, value_metrics, peer_percentiles, risk_metrics)
+            
+            # 투자 등급 (AI 또는 규칙 기반) - 등급 입력 구간이 같으면 재사용
+            fingerprints['grade'] = self._grade_fingerprint(
+                gemini_client, stock_data, value_metrics, strengths, weaknesses, risks, upside_potential,
+                peer_percentiles
+            )
+            reused = False
+            if unchanged('grade'):
+                investment_grade = InvestmentGrade(previous['investment_grade'])
+                confidence_score = previous['confidence_score']
+                reused = all(unchanged(part) for part in fingerprints)
+                if reused:
+                    print(f"✓ {symbol} 입력 변경 없음, 이전 분석 결과 사용 (등급: {investment_grade.value})")
+                else:
+                    print(f"{symbol} 등급 입력 변경 없음, 이전 등급 사용: {investment_grade.value}")
+            else:
+                investment_grade, confidence_score, grade_source = self._determine_investment_grade(
+                    gemini_client, stock_data, value_metrics, strengths, weaknesses, risks, upside_potential,
+                    peer_percentiles
+                )
+                if gemini_client and grade_source != 'ai':
+                    # AI 실패로 규칙 등급을 사용한 경우 다음 분석에서 AI 등급을 다시 시도
+                    fingerprints['grade'] = None
             
             # 상세 분석 생성
             detailed_analysis = self._generate_detailed_analysis(
@@ -133,7 +290,7 @@ class ValueAnalyzer:
             result = AnalysisResult(
                 symbol=symbol,
                 company_name=company_name,
-                analysis_date=datetime.now().isoformat(),
+                analysis_date=previous['analysis_date'] if reused else datetime.now().isoformat(),
                 investment_grade=investment_grade,
                 confidence_score=confidence_score,
                 target_price=target_price,
@@ -143,10 +300,35 @@ class ValueAnalyzer:
                 key_weaknesses=weaknesses,
                 risks=risks,
                 value_metrics=value_metrics,
-                detailed_analysis=detailed_analysis
+                detailed_analysis=detailed_analysis,
+                target_price_distribution=target_price_distribution,
+                peer_percentiles=peer_percentiles,
+                risk_metrics=risk_metrics
             )
             
-            console.print(f"[green]✓ {symbol} 분석 완료 (등급: {investment_grade.value})[/green]")
+            if self.analysis_memo and not reused:
+                # 지표·목표가·백분위·상세 분석은 매번 다시 계산하므로 지문과 재사용 필드만 저장
+                self.analysis_memo.set(
+                    symbol,
+                    {
+                        'fingerprints': fingerprints,
+                        'fields': {
+                            'analysis_date': result.analysis_date,
+                            'investment_grade': investment_grade.value,
+                            'confidence_score': confidence_score,
+                            'key_strengths': strengths,
+                            'key_weaknesses': weaknesses,
+                            'risks': risks,
+                            'target_price_distribution': target_price_distribution,
+                        },
+                    },
+                    ttl_seconds=self._earnings_ttl(symbol),
+                    tags={'symbol': symbol}
+                )
+            
+            if reused:
+                return result
+            print(f"✓ {symbol} 분석 완료 (등급: {investment_grade.value})")
             
             return result
             
@@ -154,6 +336,121 @@ class ValueAnalyzer:
             self.logger.error(f"주식 분석 중 오류 발생: {str(e)}")
             raise Exception(f"주식 분석 실패: {str(e)}")
     
+    def analyze_batch(self, table, simulate: bool = False, update_peers: bool = True) -> BatchAnalysisResult:
+        """
+        여러 종목을 규칙 기반으로 한 번에 분석합니다 (AI 호출 없음).
+        
+        목표가, 상승여력, 점수, 등급, 강점/약점, 위험 요인을 종목별 반복 없이
+        numpy 배열 연산으로 계산하며, 결과는 종목별 analyze_stock(gemini_client=None)과 같습니다.
+        
+        Args:
+            table: 지표 테이블 (DataFrame, {열 이름: 값 목록}, 또는 stock_data 딕셔너리 목록)
+                   열: symbol, company_name, sector, industry, current_price, pe_ratio, pb_ratio,
+                   dividend_yield, roe, roa, debt_to_equity, revenue_growth, income_growth, beta
+            simulate: True면 몬테카를로 목표가 분포도 함께 계산 (target_distribution)
+            update_peers: True면 테이블 종목으로 동종 기업 색인을 먼저 갱신 (False면 기존 색인으로 백분위만 계산)
+        
+        Returns:
+            BatchAnalysisResult: 열 단위 분석 결과
+        """
+        try:
+            from . import batch_analyzer as batch
+            
+            plan = self.scoring_plan
+            columns = batch.to_columns(table)
+            columns['peg_ratio'] = batch.peg_ratios(columns)
+            
+            # 가격 이력이 있으면 위험 지표를 벤치마크별 행렬 연산 한 번으로 계산하고 베타를 대체
+            risk_metrics = self._batch_risk_metrics(table, columns)
+            
+            target_prices = batch.target_prices(columns)
+            upside_potentials = batch.upside_potentials(columns['current_price'], target_prices)
+            columns['upside_potential'] = upside_potentials
+            scores = plan.score(columns)
+            grades, confidence_scores = plan.grade(scores)
+            
+            # 섹터·산업 내 백분위 열 (지표별 searchsorted 한 번, 종목별 딕셔너리는 꺼낼 때 생성)
+            peer_index = self.peer_index
+            if update_peers:
+                peer_index.update_many(columns)
+            columns.update(peer_index.percentile_columns(columns))
+            peer_percentiles = peer_index.percentile_rows(columns)
+            
+            signals = plan.signal_lists(columns)
+            target_distribution = self.target_simulator.simulate(columns) if simulate else None
+            
+            return BatchAnalysisResult(
+                symbols=columns.pop('symbol').tolist(),
+                company_names=columns.pop('company_name').tolist(),
+                sectors=columns['sector'].tolist(),
+                columns=columns,
+                target_prices=target_prices,
+                upside_potentials=upside_potentials,
+                scores=scores,
+                investment_grades=grades,
+                confidence_scores=confidence_scores,
+                key_strengths=signals['strength'],
+                key_weaknesses=signals['weakness'],
+                risks=signals['risk'],
+                rules_version=plan.version,
+                target_distribution=target_distribution,
+                peer_percentiles=peer_percentiles,
+                risk_metrics=risk_metrics
+            )
+            
+        except Exception as e:
+            self.logger.error(f"일괄 분석 중 오류 발생: {str(e)}")
+            raise Exception(f"일괄 분석 실패: {str(e)}")
+    
+    def batch_results(self, batch: BatchAnalysisResult) -> List[AnalysisResult]:
+        """일괄 분석 결과를 종목별 AnalysisResult 목록으로 변환합니다."""
+        analysis_date = datetime.now().isoformat()
+        columns = batch.columns
+        results = []
+        
+        if batch.target_distribution is not None:
+            from .monte_carlo import TargetPriceSimulator
+        
+        for i, symbol in enumerate(batch.symbols):
+            value_metrics = ValueMetrics(
+                pe_ratio=float(columns['pe_ratio'][i]),
+                pb_ratio=float(columns['pb_ratio'][i]),
+                peg_ratio=float(columns['peg_ratio'][i]),
+                dividend_yield=float(columns['dividend_yield'][i]),
+                roe=float(columns['roe'][i]),
+                roa=float(columns['roa'][i]),
+                debt_to_equity=float(columns['debt_to_equity'][i]),
+                current_ratio=float(columns['current_ratio'][i]),
+                revenue_growth=float(columns['revenue_growth'][i]),
+                income_growth=float(columns['income_growth'][i])
+            )
+            investment_grade = InvestmentGrade(batch.investment_grades[i])
+            stock_data = {'symbol': symbol, 'company_name': batch.company_names[i]}
+            
+            results.append(AnalysisResult(
+                symbol=symbol,
+                company_name=batch.company_names[i],
+                analysis_date=analysis_date,
+                investment_grade=investment_grade,
+                confidence_score=float(batch.confidence_scores[i]),
+                target_price=float(batch.target_prices[i]),
+                current_price=float(columns['current_price'][i]),
+                upside_potential=float(batch.upside_potentials[i]),
+                key_strengths=batch.key_strengths[i],
+                key_weaknesses=batch.key_weaknesses[i],
+                risks=batch.risks[i],
+                value_metrics=value_metrics,
+                detailed_analysis=self._generate_detailed_analysis(stock_data, value_metrics, investment_grade),
+                target_price_distribution=(
+                    TargetPriceSimulator.distribution(batch.target_distribution, i)
+                    if batch.target_distribution is not None else None
+                ),
+                peer_percentiles=batch.peer_percentiles[i] if batch.peer_percentiles is not None else None,
+                risk_metrics=batch.risk_metrics[i] if batch.risk_metrics is not None else None
+            ))
+        
+        return results
+    
     def _calculate_value_metrics(self, metrics: Dict) -> ValueMetrics:
         """가치투자 핵심 지표들을 계산합니다."""
         pe_ratio = metrics.get('pe_ratio', 0)
@@ -163,8 +460,8 @@ class ValueAnalyzer:
         income_growth = metrics.get('income_growth', 0)
         peg_ratio = pe_ratio / income_growth if income_growth > 0 else 0
         
-        # Current Ratio 계산 (간단한 추정)
-        current_ratio = 1.5  # 기본값 (실제로는 유동자산/유동부채)
+        # Current Ratio (재무상태표 유동자산/유동부채, 없으면 기본값)
+        current_ratio = metrics.get('current_ratio', 1.5)
         
         return ValueMetrics(
             pe_ratio=pe_ratio,
@@ -180,6 +477,142 @@ class ValueAnalyzer:
         )
     
     
+    def _analysis_fingerprints(self, stock_data: Dict, value_metrics: ValueMetrics,
+                               peer_percentiles: Optional[Dict] = None,
+                               risk_metrics: Optional[Dict] = None) -> Dict[str, str]:
+        """
+        분석 구성 요소별 입력 지문을 생성합니다 (grade는 강점/약점 계산 후 _grade_fingerprint로 추가).
+        
+        Returns:
+            Dict[str, str]: profile (기업 정보), valuation (목표가·분포), signals (강점/약점/위험 요인)
+        """
+        metrics = stock_data.get('financial_metrics', {})
+        simulation = None
+        if self.monte_carlo_enabled:
+            simulator = self.target_simulator
+            simulation = [simulator.distributions, simulator.draws, simulator.percentiles]
+        return {
+            'profile': fingerprint(stock_data.get('company_name', 'N/A')),
+            'valuation': fingerprint(
+                stock_data.get('current_price', 0),
+                [value_metrics.pe_ratio, value_metrics.pb_ratio,
+                 value_metrics.dividend_yield, value_metrics.income_growth],
+                simulation
+            ),
+            'signals': fingerprint(
+                self.scoring_plan.version,
+                value_metrics.to_dict(),
+                metrics.get('beta', 1.0),
+                stock_data.get('sector', ''),
+                peer_percentiles,
+                risk_metrics,
+                feature_values(stock_data.get('fundamentals'))
+            ),
+        }
+    
+    def _grade_fingerprint(self, gemini_client, stock_data: Dict, value_metrics: ValueMetrics,
+                           strengths: List[str], weaknesses: List[str], risks: List[str],
+                           upside_potential: float, peer_percentiles: Optional[Dict] = None) -> str:
+        """
+        투자 등급 입력 지문을 생성합니다.
+        AI 등급은 등급 캐시와 같은 허용 오차 구간(가격은 로그 구간)으로, 규칙 등급은 정확한 값으로 비교합니다.
+        """
+        if gemini_client:
+            cache_key, _ = self._grade_cache_keys(
+                gemini_client, stock_data, value_metrics, strengths, weaknesses, risks, upside_potential,
+                peer_percentiles
+            )
+            return fingerprint('ai', cache_key)
+        return fingerprint(
+            'rules',
+            self.scoring_plan.version,
+            stock_data.get('sector', 'Unknown'),
+            value_metrics.to_dict(),
+            upside_potential
+        )
+    
+    def invalidate_analysis_memo(self, symbol: Optional[str] = None) -> int:
+        """종목(또는 전체)의 저장된 분석 결과를 삭제하고 삭제 개수를 반환합니다."""
+        if not self.analysis_memo:
+            return 0
+        if symbol is None:
+            removed = self.analysis_memo.stats()['size']
+            self.analysis_memo.clear()
+            return removed
+        return self.analysis_memo.invalidate(lambda tags: tags.get('symbol') == symbol)
+    
+    def invalidate_reported(self, symbols: List[str]) -> int:
+        """실적 발표로 재무제표가 바뀐 종목의 분석 결과·AI 등급 캐시를 삭제하고 삭제 개수를 반환합니다."""
+        removed = 0
+        for symbol in symbols:
+            removed += self.invalidate_analysis_memo(symbol) + self.invalidate_grade_cache(symbol)
+        return removed
+    
+    def _earnings_ttl(self, symbol: Optional[str]) -> Optional[float]:
+        """
+        종목 캐시 유효 시간 - 다음 실적 발표 반영 시각까지 (달력이 추적하지 않는 종목이면 None: 캐시 기본값).
+        """
+        if not self.earnings_aware_cache or not symbol:
+            return None
+        from .earnings_calendar import get_earnings_calendar
+        return get_earnings_calendar().ttl_seconds(symbol, lookup=False)
+    
+    def _compute_risk_metrics(self, stock_data: Dict) -> Optional[Dict]:
+        """가격 이력으로 위험 지표를 계산합니다 (비활성화·가격 이력 부족·실패 시 None)."""
+        if not self.risk_metrics_enabled:
+            return None
+        try:
+            return self.risk_engine.compute_one(stock_data)
+        except Exception as e:
+            self.logger.warning(f"위험 지표 계산 실패: {str(e)}")
+            return None
+    
+    def _batch_risk_metrics(self, table, columns: Dict) -> Optional[List[Optional[Dict]]]:
+        """
+        stock_data 목록의 위험 지표를 한 번에 계산해 열에 반영합니다 (다른 테이블 형식이면 None).
+        계산한 베타는 제공 베타를 대체하고, 나머지 지표는 RISK_METRIC_COLUMNS 열로 추가됩니다.
+        """
+        if not self.risk_metrics_enabled or not isinstance(table, list):
+            return None
+        import numpy as np
+        from .risk_metrics import RISK_METRIC_COLUMNS
+        
+        histories = {}
+        for stock_data in table:
+            history = stock_data.get('price_history')
+            if history is not None and len(history) > 0:
+                histories[stock_data.get('symbol', 'N/A')] = history
+        try:
+            computed = self.risk_engine.compute(histories) if histories else {}
+        except Exception as e:
+            self.logger.warning(f"위험 지표 일괄 계산 실패: {str(e)}")
+            return None
+        
+        risk_metrics = [computed.get(symbol) for symbol in columns['symbol']]
+        for name in ['beta'] + RISK_METRIC_COLUMNS:
+            values = np.array([
+                np.nan if row is None or row.get(name) is None else row[name] for row in risk_metrics
+            ])
+            if name == 'beta':
+                columns['beta'] = np.where(np.isnan(values), columns['beta'], values)
+            else:
+                columns[name] = values
+        return risk_metrics
+    
+    def _simulate_target_distribution(self, current_price: float,
+                                      value_metrics: ValueMetrics) -> Optional[Dict]:
+        """목표가 가정을 분포에서 표본 추출해 목표가·상승여력 백분위수를 계산합니다 (실패 시 None)."""
+        if not self.monte_carlo_enabled or not current_price or current_price <= 0:
+            return None
+        try:
+            return self.target_simulator.simulate_one(
+                current_price, value_metrics.pe_ratio, value_metrics.pb_ratio,
+                value_metrics.dividend_yield, value_metrics.income_growth
+            )
+        except Exception as e:
+            self.logger.warning(f"목표가 분포 계산 실패: {str(e)}")
+            return None
+    
     def _calculate_target_price(self, stock_data: Dict, value_metrics: ValueMetrics) -> float:
         """목표 가격을 계산합니다."""
         try:
@@ -236,13 +669,57 @@ class ValueAnalyzer:
                                       value_metrics: ValueMetrics, strengths: List[str], 
                                       weaknesses: List[str], risks: List[str], 
                                       upside_potential: float) -> Tuple[InvestmentGrade, float]:
-        """AI를 사용하여 투자 등급을 결정합니다."""
-        try:
-            console.print("[cyan]AI 기반 투자 등급 평가 중...[/cyan]")
-            
-            prompt = f"""
-당신은 워렌 버핏과 벤저민 그레이엄의 가치투자 철학을 따르는 전문 투자 분석가입니다.
-
+        """AI를 사용하여 투자 등급을 결정합니다 (실패 시 규칙 기반 등급)."""
+        investment_grade, confidence_score, _ = self._determine_investment_grade(
+            gemini_client, stock_data, value_metrics, strengths, weaknesses, risks, upside_potential
+        )
+        return investment_grade, confidence_score
+    
+    def _determine_investment_grade(self, gemini_client, stock_data: Dict,
+                                    value_metrics: ValueMetrics, strengths: List[str],
+                                    weaknesses: List[str], risks: List[str],
+                                    upside_potential: float,
+                                    peer_percentiles: Optional[Dict] = None) -> Tuple[InvestmentGrade, float, str]:
+        """
+        투자 등급을 결정합니다. gemini_client가 없거나 AI 평가에 실패하면 규칙 기반 등급을 사용합니다.
+        
+        Returns:
+            Tuple[InvestmentGrade, float, str]: (등급, 신뢰도, 출처 'ai' 또는 'rules')
+        """
+        if gemini_client:
+            try:
+                return (*self._request_ai_grade(
+                    gemini_client, stock_data, value_metrics, strengths, weaknesses, risks, upside_potential,
+                    peer_percentiles
+                ), 'ai')
+            except CircuitOpenError as e:
+                # 회로 차단 중에는 API 대기 없이 즉시 규칙 기반 등급 사용
+                self.logger.warning(f"AI 투자 등급 생략: {str(e)}")
+            except Exception as e:
+                self.logger.error(f"AI 투자 등급 결정 중 오류: {str(e)}")
+        
+        return (*self._fallback_investment_grade(value_metrics, upside_potential, stock_data.get('sector')), 'rules')
+    
+    def _request_ai_grade(self, gemini_client, stock_data: Dict,
+                          value_metrics: ValueMetrics, strengths: List[str],
+                          weaknesses: List[str], risks: List[str],
+                          upside_potential: float,
+                          peer_percentiles: Optional[Dict] = None) -> Tuple[InvestmentGrade, float]:
+        """AI 투자 등급을 요청합니다 (양자화된 입력 지문으로 캐시, 실패 시 예외 발생)."""
+        cache_key, fundamentals_key = self._grade_cache_keys(
+            gemini_client, stock_data, value_metrics, strengths, weaknesses, risks, upside_potential,
+            peer_percentiles
+        )
+        cached = self.grade_cache.get(cache_key) if self.grade_cache else None
+        if cached is not None:
+            investment_grade = InvestmentGrade(cached['investment_grade'])
+            print(f"AI 등급 캐시 사용: {investment_grade.value} (신뢰도 {cached['confidence_score']:.0f})")
+            return investment_grade, cached['confidence_score']
+        
+        print("AI 기반 투자 등급 평가 중...")
+        
+        # 종목별 데이터만 본문으로 전송 (평가 기준은 공통 기준서와 GRADE_PREAMBLE로 접두어 캐시)
+        prompt = f"""
 다음 주식에 대해 투자 등급을 결정해주세요:
 
 **기업 정보:**
@@ -260,7 +737,7 @@ class ValueAnalyzer:
 - 매출 성장률: {value_metrics.revenue_growth:.1f}%
 - 순이익 성장률: {value_metrics.income_growth:.1f}%
 - 상승여력: {upside_potential:.1f}%
-
+{self._peer_rank_section(peer_percentiles)}
 **주요 강점:**
 {chr(10).join(f"- {s}" for s in strengths)}
 
@@ -269,198 +746,158 @@ class ValueAnalyzer:
 
 **위험 요인:**
 {chr(10).join(f"- {r}" for r in risks)}
-
-**평가 기준:**
-1. Strong Buy: 매우 매력적인 저평가, 강력한 펀더멘털, 높은 상승여력
-2. Buy: 매력적인 투자 기회, 양호한 펀더멘털
-3. Hold: 적정 가격, 보유 유지 권장
-4. Sell: 고평가되었거나 펀더멘털 악화
-5. Strong Sell: 심각한 문제, 즉시 매도 권장
-
-**요청사항:**
-다음 형식으로만 답변해주세요:
-
-등급: [Strong Buy/Buy/Hold/Sell/Strong Sell]
-신뢰도: [0-100 숫자]
-핵심근거: [한 줄 요약]
-
-예시:
-등급: Buy
-신뢰도: 85
-핵심근거: 낮은 PER과 높은 ROE로 매력적인 저평가 상태
 """
-            
-            from google.genai import types
-            
-            response = gemini_client.client.models.generate_content(
-                model=gemini_client.model_name,
-                contents=prompt,
-                config=types.GenerateContentConfig(
-                    temperature=0.3,  # 일관성을 위해 낮은 온도
-                    max_output_tokens=200
-                )
+        
+        from .response_schemas import GRADE_RESPONSE_SCHEMA, parse_grade_response
+        
+        # 스키마로 제약된 JSON 응답 요청 (검증 실패 시 1회 복구 재시도)
+        response_data = gemini_client.generate_structured(
+            prompt,
+            GRADE_RESPONSE_SCHEMA,
+            temperature=0.3,  # 일관성을 위해 낮은 온도
+            max_output_tokens=256,
+            thinking_budget=0,  # 사고 토큰이 출력 한도를 소진하지 않도록 비활성화
+            endpoint="grade",
+            symbol=stock_data.get('symbol'),
+            hedge=True,  # 지연 민감 호출: p95 초과 시 헤지 요청
+            preamble=self.GRADE_PREAMBLE
+        )
+        
+        investment_grade, confidence_score, rationale = parse_grade_response(response_data)
+        print(f"AI 등급 평가: {investment_grade.value} (신뢰도 {confidence_score:.0f}) - {rationale}")
+        
+        if self.grade_cache:
+            symbol = stock_data.get('symbol')
+            # 펀더멘털이 바뀐 종목의 이전 등급은 더 이상 재사용하지 않음
+            self.grade_cache.invalidate(
+                lambda tags: tags.get('symbol') == symbol and tags.get('fundamentals') != fundamentals_key
+            )
+            self.grade_cache.set(
+                cache_key,
+                {
+                    'investment_grade': investment_grade.value,
+                    'confidence_score': confidence_score,
+                    'rationale': rationale,
+                },
+                ttl_seconds=self._earnings_ttl(symbol),
+                tags={'symbol': symbol, 'fundamentals': fundamentals_key}
             )
-            
-            # AI 응답 파싱
-            ai_response = response.text.strip() if response.text else ""
-            console.print(f"[blue]AI 등급 평가: {ai_response}[/blue]")
-            
-            if not ai_response:
-                console.print("[yellow]⚠️ AI 응답이 비어있음, fallback 시스템 사용[/yellow]")
-                return self._fallback_investment_grade(value_metrics, upside_potential)
-            
-            # 응답에서 등급과 신뢰도 추출
-            grade_mapping = {
-                'Strong Buy': InvestmentGrade.STRONG_BUY,
-                'Buy': InvestmentGrade.BUY,
-                'Hold': InvestmentGrade.HOLD,
-                'Sell': InvestmentGrade.SELL,
-                'Strong Sell': InvestmentGrade.STRONG_SELL
-            }
-            
-            investment_grade = InvestmentGrade.HOLD  # 기본값
-            confidence_score = 50.0  # 기본값
-            
-            for line in ai_response.split('\n'):
-                if '등급:' in line:
-                    grade_text = line.split('등급:')[1].strip()
-                    investment_grade = grade_mapping.get(grade_text, InvestmentGrade.HOLD)
-                elif '신뢰도:' in line:
-                    try:
-                        confidence_score = float(line.split('신뢰도:')[1].strip())
-                    except:
-                        confidence_score = 50.0
-            
-            return investment_grade, confidence_score
-            
-        except Exception as e:
-            self.logger.error(f"AI 투자 등급 결정 중 오류: {str(e)}")
-            # Fallback으로 기본 시스템 사용
-            return self._fallback_investment_grade(value_metrics, upside_potential)
-    
-    def _fallback_investment_grade(self, value_metrics: ValueMetrics, upside_potential: float) -> Tuple[InvestmentGrade, float]:
-        """AI 실패 시 사용할 기본 투자 등급 시스템"""
-        # 간단한 규칙 기반 시스템
-        score = 50  # 기본 점수
-        
-        # PER 기반 점수
-        if 0 < value_metrics.pe_ratio <= 10:
-            score += 20
-        elif 10 < value_metrics.pe_ratio <= 15:
-            score += 10
-        elif value_metrics.pe_ratio > 25:
-            score -= 10
-        
-        # ROE 기반 점수
-        if value_metrics.roe >= 0.15:
-            score += 15
-        elif value_metrics.roe >= 0.10:
-            score += 10
-        elif value_metrics.roe < 0.05:
-            score -= 15
-        
-        # 성장률 기반 점수
-        if value_metrics.revenue_growth > 10:
-            score += 10
-        elif value_metrics.revenue_growth < -10:
-            score -= 15
-        
-        # 상승여력 기반 점수
-        if upside_potential > 30:
-            score += 15
-        elif upside_potential > 15:
-            score += 10
-        elif upside_potential < 0:
-            score -= 20
-        
-        # 등급 결정
-        if score >= 80:
-            grade = InvestmentGrade.STRONG_BUY
-        elif score >= 70:
-            grade = InvestmentGrade.BUY
-        elif score >= 50:
-            grade = InvestmentGrade.HOLD
-        elif score >= 30:
-            grade = InvestmentGrade.SELL
-        else:
-            grade = InvestmentGrade.STRONG_SELL
-        
-        confidence_score = min(max(score, 0), 100)
-        
-        return grade, confidence_score
-    
-    def _analyze_strengths_weaknesses(self, value_metrics: ValueMetrics) -> Tuple[List[str], List[str]]:
-        """강점과 약점을 분석합니다."""
-        strengths = []
-        weaknesses = []
-        
-        # 성장성 평가
-        if value_metrics.revenue_growth > 10:
-            strengths.append(f"우수한 매출 성장률 ({value_metrics.revenue_growth:.1f}%)")
-        elif value_metrics.revenue_growth < -10:
-            weaknesses.append(f"저조한 성장성 (매출 {value_metrics.revenue_growth:.1f}%, 순이익 {value_metrics.income_growth:.1f}% 성장)")
-        
-        # 수익성 평가
-        if value_metrics.roe >= 0.15 and value_metrics.roa >= 0.08:
-            strengths.append(f"높은 수익성 (ROE {value_metrics.roe:.1%}, ROA {value_metrics.roa:.1%})")
-        elif value_metrics.roe < 0.05:
-            weaknesses.append(f"낮은 수익성 (ROE {value_metrics.roe:.1%}, ROA {value_metrics.roa:.1%})")
-        
-        # 재무 안정성 평가 (부채비율이 매우 낮으면 강점)
-        if value_metrics.debt_to_equity < 0.3:
-            strengths.append(f"우수한 재무 건전성 (부채비율 {value_metrics.debt_to_equity:.1f})")
-        elif value_metrics.debt_to_equity > 1.0:
-            weaknesses.append(f"높은 부채비율 ({value_metrics.debt_to_equity:.1f})")
-        
-        # 밸류에이션 평가
-        if 0 < value_metrics.pe_ratio <= 15 and 0 < value_metrics.pb_ratio <= 2:
-            strengths.append(f"매력적인 밸류에이션 (PER {value_metrics.pe_ratio:.1f}, PBR {value_metrics.pb_ratio:.1f})")
-        elif value_metrics.pe_ratio > 30 or value_metrics.pb_ratio > 5:
-            weaknesses.append(f"높은 밸류에이션 (PER {value_metrics.pe_ratio:.1f}, PBR {value_metrics.pb_ratio:.1f})")
-        
-        # 배당 관련
-        if value_metrics.dividend_yield >= 0.03:
-            strengths.append(f"매력적인 배당수익률 ({value_metrics.dividend_yield:.1%})")
-        elif value_metrics.dividend_yield == 0:
-            weaknesses.append("배당 미지급")
-        
-        return strengths, weaknesses
-    
-    def _identify_risks(self, stock_data: Dict, value_metrics: ValueMetrics) -> List[str]:
-        """위험 요인을 식별합니다."""
-        risks = []
-        
-        # 부채 위험
-        if value_metrics.debt_to_equity > 1.0:
-            risks.append("높은 부채 비율로 인한 재무 위험")
-        
-        # 밸류에이션 위험
-        if value_metrics.pe_ratio > 30:
-            risks.append("높은 PER로 인한 밸류에이션 위험")
-        
-        # 성장률 위험
-        if value_metrics.revenue_growth < 0:
-            risks.append("매출 감소로 인한 성장성 위험")
-        
-        if value_metrics.income_growth < 0:
-            risks.append("순이익 감소로 인한 수익성 위험")
-        
-        # 섹터별 위험
-        sector = stock_data.get('sector', '')
-        if sector == 'Technology':
-            risks.append("기술 변화 및 경쟁 심화 위험")
-        elif sector == 'Healthcare':
-            risks.append("규제 변화 및 임상 시험 실패 위험")
-        elif sector == 'Financials':
-            risks.append("금리 변동 및 신용 위험")
-        
-        # 시장 위험
-        metrics = stock_data.get('financial_metrics', {})
-        beta = metrics.get('beta', 1.0)
-        if beta > 1.5:
-            risks.append("높은 베타로 인한 시장 변동성 위험")
         
-        return risks
+        return investment_grade, confidence_score
+    
+    # 프롬프트에 표시할 섹터 내 백분위 지표
+    PEER_RANK_LABELS = {
+        'pe_ratio': 'PER',
+        'pb_ratio': 'PBR',
+        'roe': 'ROE',
+        'debt_to_equity': '부채비율',
+        'dividend_yield': '배당수익률',
+        'revenue_growth': '매출 성장률',
+    }
+    
+    def _peer_deciles(self, peer_percentiles: Optional[Dict]) -> Dict[str, Optional[int]]:
+        """프롬프트 지표의 섹터 내 백분위를 10분위 번호로 변환합니다 (캐시 키, 프롬프트 공통)."""
+        deciles = {}
+        for metric in self.PEER_RANK_LABELS:
+            value = (peer_percentiles or {}).get(f"{metric}_sector_pct")
+            deciles[metric] = None if value is None else min(int(value // 10), 9)
+        return deciles
+    
+    def _peer_rank_section(self, peer_percentiles: Optional[Dict]) -> str:
+        """AI 등급 프롬프트의 섹터 내 백분위 항목 (백분위가 없으면 빈 문자열)"""
+        deciles = self._peer_deciles(peer_percentiles)
+        lines = [
+            f"- {label}: 하위 {deciles[metric] * 10}~{deciles[metric] * 10 + 10}% 구간"
+            for metric, label in self.PEER_RANK_LABELS.items() if deciles[metric] is not None
+        ]
+        if not lines:
+            return ''
+        peers = peer_percentiles.get('sector_peers', 0)
+        return f"\n**섹터 내 백분위 ({peer_percentiles.get('sector')}, 동종 기업 {peers}개, 값이 작은 순):**\n" + '\n'.join(lines) + '\n'
+    
+    def _quantize(self, key: str, value) -> Optional[int]:
+        """허용 오차(±tolerance) 폭의 구간 번호로 값을 양자화합니다."""
+        tolerance = self.grade_cache_tolerances.get(key)
+        if value is None or not isinstance(value, (int, float)) or math.isnan(value):
+            return None
+        if not tolerance:
+            return value
+        if key == 'current_price':
+            # 가격은 로그 스케일 구간 (상대 오차)
+            return round(math.log(value) / math.log1p(2 * tolerance)) if value > 0 else 0
+        return round(value / (2 * tolerance))
+    
+    def _grade_cache_keys(self, gemini_client, stock_data: Dict, value_metrics: ValueMetrics,
+                          strengths: List[str], weaknesses: List[str], risks: List[str],
+                          upside_potential: float, peer_percentiles: Optional[Dict] = None) -> Tuple[str, str]:
+        """
+        AI 등급 캐시 키와 펀더멘털 지문을 생성합니다.
+        
+        Returns:
+            Tuple[str, str]: (전체 입력 캐시 키, 펀더멘털 지문)
+        """
+        values = value_metrics.to_dict()
+        values['current_price'] = stock_data.get('current_price', 0)
+        values['upside_potential'] = upside_potential
+        
+        quantized = {key: self._quantize(key, values.get(key)) for key in self.grade_cache_tolerances}
+        fundamentals_key = fingerprint(
+            stock_data.get('symbol'),
+            {key: quantized.get(key) for key in self.GRADE_FUNDAMENTAL_KEYS}
+        )
+        cache_key = fingerprint(
+            'grade',
+            getattr(gemini_client, 'model_name', None),
+            self.scoring_plan.version,  # 규칙이 바뀌면 기준서와 강점/약점 문구도 바뀜
+            stock_data.get('symbol'),
+            stock_data.get('sector'),
+            quantized,
+            self._peer_deciles(peer_percentiles),
+            strengths, weaknesses, risks
+        )
+        return cache_key, fundamentals_key
+    
+    def invalidate_grade_cache(self, symbol: Optional[str] = None) -> int:
+        """종목(또는 전체)의 AI 등급 캐시를 삭제하고 삭제 개수를 반환합니다."""
+        if not self.grade_cache:
+            return 0
+        if symbol is None:
+            removed = self.grade_cache.stats()['size']
+            self.grade_cache.clear()
+            return removed
+        return self.grade_cache.invalidate(lambda tags: tags.get('symbol') == symbol)
+    
+    def _fallback_investment_grade(self, value_metrics: ValueMetrics, upside_potential: float,
+                                   sector: Optional[str] = None) -> Tuple[InvestmentGrade, float]:
+        """AI 실패 시 사용할 기본 투자 등급 시스템 (config/scoring_rules.json 규칙 점수)"""
+        plan = self.scoring_plan
+        columns = plan.single_row({**value_metrics.to_dict(), 'upside_potential': upside_potential}, sector)
+        grades, confidence_scores = plan.grade(plan.score(columns))
+        return InvestmentGrade(grades[0]), float(confidence_scores[0])
+    
+    def _analyze_strengths_weaknesses(self, value_metrics: ValueMetrics,
+                                      peer_percentiles: Optional[Dict] = None,
+                                      fundamentals: Optional[Dict] = None) -> Tuple[List[str], List[str]]:
+        """강점과 약점을 분석합니다 (섹터 내 백분위·다년 재무 추세가 있으면 해당 신호 포함)."""
+        signals = self.scoring_plan.signal_lists(ScoringPlan.single_row(
+            {**value_metrics.to_dict(), **(peer_percentiles or {}), **feature_values(fundamentals)}
+        ))
+        return signals['strength'][0], signals['weakness'][0]
+    
+    def _identify_risks(self, stock_data: Dict, value_metrics: ValueMetrics,
+                        peer_percentiles: Optional[Dict] = None,
+                        risk_metrics: Optional[Dict] = None) -> List[str]:
+        """위험 요인을 식별합니다 (직접 계산한 위험 지표가 있으면 베타를 대체하고 낙폭·VaR 신호 포함)."""
+        metrics = stock_data.get('financial_metrics', {})
+        risk_metrics = risk_metrics or {}
+        beta = risk_metrics.get('beta')
+        columns = ScoringPlan.single_row(
+            {**value_metrics.to_dict(), **(peer_percentiles or {}), **risk_metrics,
+             **feature_values(stock_data.get('fundamentals')),
+             'beta': beta if beta is not None else metrics.get('beta', 1.0)},
+            stock_data.get('sector', '')
+        )
+        return self.scoring_plan.signal_lists(columns)['risk'][0]
     
     def _generate_detailed_analysis(self, stock_data: Dict, value_metrics: ValueMetrics, 
                                   investment_grade: InvestmentGrade) -> str:
@@ -524,5 +961,4 @@ def np_std(values):
     return variance ** 0.5
 
 # numpy 대신 사용
-import math
 np = type('np', (), {'std': np_std})()
\ No newline at end of file
@@ -0,0 +1,10 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# 저장소 루트를 import 경로에 추가 (pytest를 어느 위치에서 실행해도 modules 패키지 사용)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# 영속 캐시(CACHE_DIR)가 작업 디렉터리의 cache/를 건드리지 않도록 테스트 세션 전용 디렉터리 사용
+os.environ.setdefault('CACHE_DIR', tempfile.mkdtemp(prefix='stock-analyzer-tests-'))
@@ -0,0 +1,67 @@
+import json
+import time
+
+from modules import cache_store
+from modules.cache_store import TTLCache
+
+
+def test_changes_are_written_on_flush_and_reloaded(tmp_path):
+    cache = TTLCache('grades', persist=True, cache_dir=str(tmp_path), flush_interval=3600)
+    cache.set('a', {'grade': 'Buy'})
+
+    assert not (tmp_path / 'grades.json').exists()  # flush_interval 전에는 쓰지 않음
+    cache.flush()
+    assert json.loads((tmp_path / 'grades.json').read_text(encoding='utf-8'))['a']['value'] == {'grade': 'Buy'}
+
+    reloaded = TTLCache('grades', persist=True, cache_dir=str(tmp_path))
+    assert reloaded.get('a') == {'grade': 'Buy'}
+
+
+def test_expired_entries_are_dropped_on_load(tmp_path):
+    cache = TTLCache('prices', persist=True, cache_dir=str(tmp_path), flush_interval=3600)
+    cache.set('fresh', 1)
+    cache.set('stale', 2, ttl_seconds=-1)
+    cache.flush()
+
+    reloaded = TTLCache('prices', persist=True, cache_dir=str(tmp_path))
+    assert reloaded.keys() == ['fresh']
+
+
+def test_flush_all_writes_dirty_caches(tmp_path):
+    cache = TTLCache('statements', persist=True, cache_dir=str(tmp_path), flush_interval=3600)
+    cache.set('a', 1)
+
+    cache_store.flush_all()
+    assert (tmp_path / 'statements.json').exists()
+
+
+def test_zero_flush_interval_writes_every_change(tmp_path):
+    cache = TTLCache('quotes', persist=True, cache_dir=str(tmp_path), flush_interval=0)
+    cache.set('a', 1)
+    assert 'a' in json.loads((tmp_path / 'quotes.json').read_text(encoding='utf-8'))
+
+    cache.delete('a')
+    assert json.loads((tmp_path / 'quotes.json').read_text(encoding='utf-8')) == {}
+
+
+def test_flush_interval_elapsed_writes_on_next_change(tmp_path, monkeypatch):
+    cache = TTLCache('history', persist=True, cache_dir=str(tmp_path), flush_interval=30)
+    cache.set('a', 1)
+    assert not (tmp_path / 'history.json').exists()
+
+    now = time.time()
+    monkeypatch.setattr(cache_store.time, 'time', lambda: now + 31)
+    cache.set('b', 2)
+    assert set(json.loads((tmp_path / 'history.json').read_text(encoding='utf-8'))) == {'a', 'b'}
+
+
+def test_unwritable_path_falls_back_to_memory(tmp_path):
+    blocker = tmp_path / 'not_a_dir'
+    blocker.write_text('')
+    cache = TTLCache('grades', persist=True, cache_dir=str(blocker / 'cache'), flush_interval=0)
+
+    cache.set('a', 1)
+    assert cache.path is None
+    assert cache.get('a') == 1
+    cache.set('b', 2)  # 이후 저장을 시도하지 않음
+    assert cache.get('b') == 2
@@ -0,0 +1,104 @@
+import pytest
+
+from modules import circuit_breaker
+from modules.circuit_breaker import CircuitBreaker, CircuitOpenError
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(circuit_breaker, 'time', clock)
+    return clock
+
+
+def _breaker(**kwargs):
+    options = dict(window_size=10, min_calls=4, failure_rate_threshold=0.5, slow_call_ms=1000,
+                   reset_timeout=30, trial_timeout=60)
+    options.update(kwargs)
+    return CircuitBreaker('test', **options)
+
+
+def _trip(breaker):
+    for _ in range(breaker.min_calls):
+        breaker.record_failure()
+
+
+def test_opens_after_failure_rate_and_rejects_calls(clock):
+    breaker = _breaker()
+    breaker.record_success(100)
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED  # 최소 호출 수 미만
+
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow_request()
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+    assert breaker.snapshot()['rejected_calls'] == 2
+
+
+def test_opens_on_slow_calls(clock):
+    breaker = _breaker()
+    for _ in range(4):
+        breaker.record_success(5000)
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_half_open_allows_single_trial_and_closes_on_success(clock):
+    breaker = _breaker()
+    _trip(breaker)
+
+    clock.now += 30
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow_request()
+    assert not breaker.allow_request()  # 시험 호출 진행 중
+
+    breaker.record_success(100)
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.snapshot()['recent_calls'] == 0
+
+
+def test_half_open_trial_failure_reopens(clock):
+    breaker = _breaker()
+    _trip(breaker)
+    clock.now += 30
+    assert breaker.allow_request()
+
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    clock.now += 29
+    assert not breaker.allow_request()
+
+
+def test_released_trial_lets_next_call_try(clock):
+    """API 호출 없이 끝난 시험 호출(스케줄러 대기 초과)은 반납되어 다음 호출이 시험 호출이 됩니다."""
+    breaker = _breaker()
+    _trip(breaker)
+    clock.now += 30
+    assert breaker.allow_request()
+    assert not breaker.allow_request()
+
+    breaker.release_trial()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow_request()
+
+
+def test_stuck_trial_expires_after_trial_timeout(clock):
+    breaker = _breaker()
+    _trip(breaker)
+    clock.now += 30
+    assert breaker.allow_request()
+
+    clock.now += 59
+    assert not breaker.allow_request()
+    clock.now += 1
+    assert breaker.allow_request()
@@ -0,0 +1,104 @@
+import math
+
+import pytest
+
+from modules.value_analyzer import InvestmentGrade, ValueAnalyzer, ValueMetrics
+
+
+class FakeGeminiClient:
+    model_name = 'fake-model'
+
+    def __init__(self):
+        self.calls = 0
+
+    def generate_structured(self, prompt, schema, **kwargs):
+        self.calls += 1
+        return {'investment_grade': 'Buy', 'confidence_score': 72, 'rationale': '양호한 펀더멘털'}
+
+
+@pytest.fixture
+def analyzer(monkeypatch, tmp_path):
+    monkeypatch.setenv('CACHE_DIR', str(tmp_path))
+    analyzer = ValueAnalyzer()
+    analyzer.earnings_aware_cache = False
+    return analyzer
+
+
+def _metrics(**overrides):
+    values = dict(pe_ratio=12.0, pb_ratio=1.5, peg_ratio=1.0, dividend_yield=0.02, roe=0.18, roa=0.08,
+                  debt_to_equity=0.4, current_ratio=1.5, revenue_growth=8.0, income_growth=6.0)
+    values.update(overrides)
+    return ValueMetrics(**values)
+
+
+def _keys(analyzer, price=100.0, upside=10.0, **overrides):
+    stock_data = {'symbol': 'TEST', 'sector': 'Technology', 'current_price': price}
+    return analyzer._grade_cache_keys(FakeGeminiClient(), stock_data, _metrics(**overrides), [], [], [], upside)
+
+
+def test_quantize_uses_tolerance_wide_buckets(analyzer):
+    tolerance = analyzer.grade_cache_tolerances['pe_ratio']
+    assert analyzer._quantize('pe_ratio', 12.0) == round(12.0 / (2 * tolerance))
+    assert analyzer._quantize('pe_ratio', 12.2) == analyzer._quantize('pe_ratio', 12.0)
+    assert analyzer._quantize('pe_ratio', 13.0) != analyzer._quantize('pe_ratio', 12.0)
+    assert analyzer._quantize('pe_ratio', None) is None
+    assert analyzer._quantize('pe_ratio', math.nan) is None
+
+
+def test_quantize_price_on_log_scale(analyzer):
+    tolerance = analyzer.grade_cache_tolerances['current_price']
+    step = math.log1p(2 * tolerance)
+    assert analyzer._quantize('current_price', 100.0) == round(math.log(100.0) / step)
+    # 같은 상대 변화는 가격 수준과 무관하게 같은 구간 수만큼 이동
+    assert (analyzer._quantize('current_price', 1000.0 * (1 + 4 * tolerance))
+            - analyzer._quantize('current_price', 1000.0)) == \
+        (analyzer._quantize('current_price', 10.0 * (1 + 4 * tolerance)) - analyzer._quantize('current_price', 10.0))
+    assert analyzer._quantize('current_price', 0) == 0
+
+
+def test_cache_key_ignores_changes_within_bucket(analyzer):
+    base_key, base_fundamentals = _keys(analyzer)
+    # 각 입력이 같은 구간에 남도록 구간 번호로 확인한 뒤 비교
+    assert analyzer._quantize('current_price', 100.3) == analyzer._quantize('current_price', 100.0)
+    assert analyzer._quantize('roe', 0.181) == analyzer._quantize('roe', 0.18)
+
+    key, fundamentals = _keys(analyzer, price=100.3, roe=0.181)
+    assert key == base_key
+    assert fundamentals == base_fundamentals
+
+
+def test_price_change_keeps_fundamentals_key(analyzer):
+    base_key, base_fundamentals = _keys(analyzer)
+    key, fundamentals = _keys(analyzer, price=110.0, upside=0.0)
+    assert key != base_key
+    assert fundamentals == base_fundamentals
+
+
+def test_fundamental_change_changes_both_keys(analyzer):
+    base_key, base_fundamentals = _keys(analyzer)
+    key, fundamentals = _keys(analyzer, roe=0.25)
+    assert key != base_key
+    assert fundamentals != base_fundamentals
+
+
+def test_ai_grade_is_served_from_cache_within_tolerance(analyzer):
+    client = FakeGeminiClient()
+    stock_data = {'symbol': 'TEST', 'sector': 'Technology', 'current_price': 100.0}
+
+    first = analyzer._request_ai_grade(client, stock_data, _metrics(), ['강점'], [], [], 10.0)
+    second = analyzer._request_ai_grade(client, dict(stock_data, current_price=100.3), _metrics(),
+                                        ['강점'], [], [], 10.0)
+
+    assert first == second == (InvestmentGrade.BUY, 72.0)
+    assert client.calls == 1
+
+
+def test_fundamental_change_invalidates_previous_grades(analyzer):
+    client = FakeGeminiClient()
+    stock_data = {'symbol': 'TEST', 'sector': 'Technology', 'current_price': 100.0}
+
+    analyzer._request_ai_grade(client, stock_data, _metrics(), [], [], [], 10.0)
+    analyzer._request_ai_grade(client, stock_data, _metrics(roe=0.25), [], [], [], 10.0)
+
+    assert client.calls == 2
+    assert len(analyzer.grade_cache.keys()) == 1
@@ -0,0 +1,86 @@
+import threading
+import time
+
+import pytest
+
+from modules.llm_scheduler import BATCH, INTERACTIVE, LLMScheduler, SchedulerTimeoutError
+
+
+def _scheduler(queue_timeout=5):
+    return LLMScheduler({
+        INTERACTIVE: {'max_concurrency': 1, 'tokens_per_minute': 0},
+        BATCH: {'max_concurrency': 1, 'tokens_per_minute': 0},
+    }, queue_timeout=queue_timeout)
+
+
+def _wait_for(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "대기 조건 시간 초과"
+        time.sleep(0.005)
+
+
+def _start(scheduler, priority, order, name):
+    def run():
+        with scheduler.slot(priority=priority):
+            order.append(name)
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread
+
+
+def test_queued_interactive_call_runs_before_waiting_batch_call():
+    """interactive 호출이 대기 중이면 batch 슬롯이 비어 있어도 batch 호출은 양보합니다."""
+    scheduler = _scheduler()
+    order = []
+    held = scheduler.acquire(priority=INTERACTIVE)
+
+    batch = _start(scheduler, BATCH, order, 'batch')
+    _wait_for(lambda: order == ['batch'])  # interactive 대기자가 없으면 바로 실행
+    batch.join()
+
+    interactive = _start(scheduler, INTERACTIVE, order, 'interactive')
+    _wait_for(lambda: scheduler.metrics()[INTERACTIVE]['queue_depth'] == 1)
+    batch = _start(scheduler, BATCH, order, 'batch')
+    _wait_for(lambda: scheduler.metrics()[BATCH]['queue_depth'] == 1)
+    time.sleep(0.05)
+    assert order == ['batch']  # batch 슬롯은 비어 있지만 양보 중
+
+    scheduler.release(held)
+    interactive.join(2)
+    batch.join(2)
+    assert order == ['batch', 'interactive', 'batch']
+
+
+def test_same_class_runs_in_arrival_order():
+    scheduler = _scheduler()
+    order = []
+    held = scheduler.acquire(priority=BATCH)
+
+    threads = []
+    for i in range(3):
+        threads.append(_start(scheduler, BATCH, order, i))
+        _wait_for(lambda: scheduler.metrics()[BATCH]['queue_depth'] == i + 1)
+
+    scheduler.release(held)
+    for thread in threads:
+        thread.join(2)
+    assert order == [0, 1, 2]
+    assert scheduler.metrics()[BATCH]['completed'] == 4
+
+
+def test_queue_timeout_raises_and_leaves_queue():
+    scheduler = _scheduler(queue_timeout=0.05)
+    held = scheduler.acquire(priority=BATCH)
+
+    with pytest.raises(SchedulerTimeoutError):
+        scheduler.acquire(priority=BATCH)
+
+    metrics = scheduler.metrics()[BATCH]
+    assert metrics['timeouts'] == 1
+    assert metrics['queue_depth'] == 0
+    assert metrics['running'] == 1
+
+    # 대기 초과한 호출이 대기열을 막지 않음
+    scheduler.release(held)
+    scheduler.release(scheduler.acquire(priority=BATCH))
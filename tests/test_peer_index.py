@@ -0,0 +1,132 @@
+import numpy as np
+import pytest
+
+from modules.peer_index import SectorPercentileIndex, percentile_names
+
+
+def _index(**kwargs):
+    kwargs.setdefault('persist', False)
+    kwargs.setdefault('min_peers', 3)
+    return SectorPercentileIndex(**kwargs)
+
+
+def _stock(symbol, sector='Technology', industry='Software', **metrics):
+    return {'symbol': symbol, 'sector': sector, 'industry': industry, 'financial_metrics': metrics}
+
+
+def _columns(stocks):
+    columns = {
+        'symbol': np.array([s['symbol'] for s in stocks], dtype=object),
+        'sector': np.array([s['sector'] for s in stocks], dtype=object),
+        'industry': np.array([s['industry'] for s in stocks], dtype=object),
+    }
+    for metric in ['pe_ratio', 'roe', 'revenue_growth']:
+        columns[metric] = np.array([s['financial_metrics'].get(metric, np.nan) for s in stocks], dtype=np.float64)
+    return columns
+
+
+def _random_stocks(n, seed=0):
+    rng = np.random.default_rng(seed)
+    sectors = ['Technology', 'Utilities', 'Financials', 'Energy']
+    return [
+        _stock(f"S{i}", sector=sectors[i % 4], industry=f"I{i % 7}",
+               pe_ratio=float(rng.choice([-5.0, 8.0, 12.0, rng.uniform(1, 40)])),
+               roe=float(round(rng.normal(0.1, 0.05), 2)),
+               revenue_growth=float(rng.normal(5, 10)))
+        for i in range(n)
+    ]
+
+
+def test_ties_use_mid_rank():
+    index = _index()
+    for i, roe in enumerate([0.1, 0.2, 0.2, 0.3]):
+        index.update(f"S{i}", 'Technology', 'Software', {'roe': roe})
+
+    assert index.percentile('roe', 0.2, 'Technology') == pytest.approx((1 + 3) / 2 / 4 * 100)
+    assert index.percentile('roe', 0.05, 'Technology') == 0.0
+    assert index.percentile('roe', 0.3, 'Technology') == pytest.approx((3 + 4) / 2 / 4 * 100)
+
+
+def test_requires_min_peers():
+    index = _index(min_peers=3)
+    index.update('A', 'Technology', 'Software', {'roe': 0.1})
+    index.update('B', 'Technology', 'Software', {'roe': 0.2})
+    assert index.percentile('roe', 0.15, 'Technology') is None
+
+    index.update('C', 'Technology', 'Software', {'roe': 0.3})
+    assert index.percentile('roe', 0.15, 'Technology') is not None
+
+
+def test_pe_ratio_counts_positive_values_only():
+    index = _index()
+    for i, pe in enumerate([-3.0, 0.0, 10.0, 20.0, 30.0]):
+        index.update(f"S{i}", 'Technology', 'Software', {'pe_ratio': pe})
+
+    assert index.percentile('pe_ratio', 20.0, 'Technology') == pytest.approx(50.0)
+    assert index.percentile('pe_ratio', -3.0, 'Technology') is None
+
+
+def test_update_replaces_previous_snapshot_and_remove():
+    index = _index()
+    for i, roe in enumerate([0.1, 0.2, 0.3]):
+        index.update(f"S{i}", 'Technology', 'Software', {'roe': roe})
+    assert not index.update('S0', 'Technology', 'Software', {'roe': 0.1})  # 변화 없음
+
+    index.update('S0', 'Technology', 'Software', {'roe': 0.4})
+    assert index.percentile('roe', 0.35, 'Technology') == pytest.approx(2 / 3 * 100)
+
+    assert index.remove('S0')
+    assert not index.remove('S0')
+    assert index.percentile('roe', 0.35, 'Technology') is None  # 동종 기업 2개 < min_peers
+
+
+def test_update_many_matches_sequential_updates():
+    stocks = _random_stocks(60)
+    changed = [dict(s, financial_metrics=dict(s['financial_metrics'], roe=0.5)) for s in stocks[:10]]
+
+    sequential = _index()
+    for stock in stocks + changed:
+        sequential.update_from_stock_data(stock)
+
+    batched = _index()
+    assert batched.update_many(_columns(stocks)) == 60
+    assert batched.update_many(_columns(stocks)) == 0
+    assert batched.update_many(_columns(changed)) == 10
+
+    assert batched._snapshots == sequential._snapshots
+    assert batched._sorted.keys() == sequential._sorted.keys()
+    for key, values in sequential._sorted.items():
+        np.testing.assert_array_equal(batched._sorted[key], values)
+
+
+def test_percentile_columns_and_rows_match_percentiles():
+    index = _index()
+    stocks = _random_stocks(80)
+    index.update_many(_columns(stocks))
+    queries = _random_stocks(40, seed=1) + [_stock('X', sector='Unknown', industry='Other', roe=0.1)]
+
+    columns = _columns(queries)
+    columns.update(index.percentile_columns(columns))
+    rows = index.percentile_rows(columns)
+
+    assert len(rows) == len(queries)
+    for stock, row in zip(queries, rows):
+        expected = index.percentiles(stock)
+        assert row.keys() >= expected.keys()
+        for name in percentile_names():
+            assert row[name] == pytest.approx(expected[name]), name
+        for key in ['sector', 'industry', 'sector_peers', 'industry_peers']:
+            assert row[key] == expected[key]
+
+
+def test_saved_index_reloads(tmp_path):
+    index = _index(persist=True, cache_dir=str(tmp_path), flush_interval=3600)
+    for i, roe in enumerate([0.1, 0.2, 0.3]):
+        index.update(f"S{i}", 'Technology', 'Software', {'roe': roe})
+    assert not (tmp_path / 'peer_index.json').exists()
+    index.flush()
+
+    reloaded = _index(persist=True, cache_dir=str(tmp_path))
+    assert len(reloaded) == 3
+    assert reloaded.percentile('roe', 0.2, 'Technology') == index.percentile('roe', 0.2, 'Technology')
+    assert reloaded.stats() == index.stats()
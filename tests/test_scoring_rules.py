@@ -0,0 +1,138 @@
+import copy
+import json
+
+import numpy as np
+import pytest
+
+from modules.scoring_rules import DEFAULT_RULES_PATH, ScoringPlan
+
+
+@pytest.fixture
+def rules():
+    with open(DEFAULT_RULES_PATH, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _columns(rows):
+    """지표 딕셔너리 목록을 ScoringPlan.score() 입력 열로 변환합니다."""
+    singles = [ScoringPlan.single_row(row, row.get('sector')) for row in rows]
+    return {name: np.concatenate([single[name] for single in singles]) for name in singles[0]}
+
+
+def test_sector_weights_disabled_by_default(rules):
+    """배포된 규칙은 섹터 가중치를 적용하지 않아 섹터와 무관하게 같은 점수를 냅니다."""
+    plan = ScoringPlan(rules)
+    row = {'pe_ratio': 8, 'roe': 0.2, 'revenue_growth': 20, 'upside_potential': 40}
+    scores = plan.score(_columns([dict(row, sector=sector) for sector in ['Technology', 'Utilities', 'Unknown']]))
+
+    assert not plan.sector_weighting
+    assert scores.tolist() == [50 + 20 + 15 + 10 + 15] * 3
+
+
+def test_enabled_sector_weights_scale_points_by_category(rules):
+    """활성화하면 범주 점수에 섹터 가중치/default 가중치 배율이 곱해집니다."""
+    rules = copy.deepcopy(rules)
+    rules['sector_weights']['enabled'] = True
+    plan = ScoringPlan(rules)
+    default = rules['sector_weights']['default']
+    sectors = rules['sector_weights']['sectors']
+
+    row = {'pe_ratio': 8, 'roe': 0.2, 'revenue_growth': 20, 'upside_potential': 40}
+    names = ['Technology', 'Financials', 'Utilities', 'Unknown']
+    scores = plan.score(_columns([dict(row, sector=sector) for sector in names]))
+
+    def expected(sector):
+        weights = sectors.get(sector, default)
+        ratio = {category: weights[category] / default[category] for category in default}
+        return (50 + 20 * ratio['valuation'] + 15 * ratio['profitability']
+                + 10 * ratio['growth'] + 15 * ratio['valuation'])
+
+    assert plan.sector_weighting
+    assert scores == pytest.approx([expected(sector) for sector in names])
+    # Technology: 성장성 0.4/0.25 = 1.6배, Utilities: 성장성 가중치 0 → 성장 점수 제외
+    assert scores[0] == pytest.approx(50 + 20 * 0.4 + 15 * 1.2 + 10 * 1.6 + 15 * 0.4)
+    assert scores[2] == pytest.approx(50 + 20 * 1.2 + 15 * 0.8 + 0 + 15 * 1.2)
+    # 목록에 없는 섹터는 default 가중치 (배율 1)
+    assert scores[3] == pytest.approx(50 + 20 + 15 + 10 + 15)
+
+
+def test_enabled_sector_weights_apply_to_penalties(rules):
+    """감점도 같은 배율로 조정됩니다."""
+    rules = copy.deepcopy(rules)
+    rules['sector_weights']['enabled'] = True
+    plan = ScoringPlan(rules)
+
+    row = {'pe_ratio': 40, 'roe': 0.01, 'revenue_growth': -20, 'upside_potential': -5}
+    tech, utilities = plan.score(_columns([dict(row, sector='Technology'), dict(row, sector='Utilities')]))
+
+    assert tech == pytest.approx(50 - 10 * 0.4 - 15 * 1.2 - 15 * 1.6 - 20 * 0.4)
+    assert utilities == pytest.approx(50 - 10 * 1.2 - 15 * 0.8 - 0 - 20 * 1.2)
+
+
+def _legacy_grade(pe_ratio, roe, revenue_growth, upside_potential):
+    """규칙 파일 도입 전 ValueAnalyzer._fallback_investment_grade의 if/elif 점수"""
+    score = 50
+    if 0 < pe_ratio <= 10:
+        score += 20
+    elif 10 < pe_ratio <= 15:
+        score += 10
+    elif pe_ratio > 25:
+        score -= 10
+
+    if roe >= 0.15:
+        score += 15
+    elif roe >= 0.10:
+        score += 10
+    elif roe < 0.05:
+        score -= 15
+
+    if revenue_growth > 10:
+        score += 10
+    elif revenue_growth < -10:
+        score -= 15
+
+    if upside_potential > 30:
+        score += 15
+    elif upside_potential > 15:
+        score += 10
+    elif upside_potential < 0:
+        score -= 20
+
+    if score >= 80:
+        grade = 'Strong Buy'
+    elif score >= 70:
+        grade = 'Buy'
+    elif score >= 50:
+        grade = 'Hold'
+    elif score >= 30:
+        grade = 'Sell'
+    else:
+        grade = 'Strong Sell'
+    return grade, min(max(score, 0), 100)
+
+
+def test_plan_matches_legacy_scalar_scoring(rules):
+    """컴파일된 계획의 점수·등급·신뢰도가 경계값을 포함해 이전 if/elif 점수와 같습니다."""
+    plan = ScoringPlan(rules)
+    pe_values = [-5, 0, 5, 10, 12, 15, 20, 25, 26]
+    roe_values = [-0.1, 0.0, 0.05, 0.08, 0.10, 0.12, 0.15, 0.3]
+    growth_values = [-20, -10, 0, 10, 15]
+    upside_values = [-10, 0, 10, 15, 20, 30, 40]
+
+    rows = [
+        {'pe_ratio': pe, 'roe': roe, 'revenue_growth': growth, 'upside_potential': upside}
+        for pe in pe_values for roe in roe_values for growth in growth_values for upside in upside_values
+    ]
+    rng = np.random.default_rng(0)
+    rows += [
+        {'pe_ratio': pe, 'roe': roe, 'revenue_growth': growth, 'upside_potential': upside}
+        for pe, roe, growth, upside in zip(
+            rng.normal(18, 12, 500), rng.normal(0.1, 0.1, 500), rng.normal(0, 15, 500), rng.normal(10, 25, 500)
+        )
+    ]
+
+    grades, confidence = plan.grade(plan.score(_columns(rows)))
+    expected = [_legacy_grade(**row) for row in rows]
+
+    assert grades.tolist() == [grade for grade, _ in expected]
+    assert confidence.tolist() == [score for _, score in expected]